@@ -72,6 +72,15 @@ def setup_cli_logging():
             if handler.stream.name in ['<stderr>', '<stdout>']:
                 root_logger.removeHandler(handler)
 
+    # In async mode the handlers live behind the queue listener
+    for handler in root_logger.handlers:
+        listener = getattr(handler, 'listener', None)
+        if listener is not None:
+            listener.handlers = tuple(
+                h for h in listener.handlers
+                if not (isinstance(h, logging.StreamHandler) and getattr(h.stream, 'name', None) in ['<stderr>', '<stdout>'])
+            )
+
     # Also remove console handlers from tradingagents logger
     tradingagents_logger = logging.getLogger('tradingagents')
     for handler in tradingagents_logger.handlers[:]:
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Tushare日线批量入库工具
+按交易日拉取全市场日线到本地日线库，之后自选股分析直接读取本地数据
+"""
+
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('scripts')
+
+
+def main():
+    """主函数"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="按交易日批量拉取Tushare日线到本地日线库")
+    parser.add_argument("--start", default=None, help="开始日期 YYYYMMDD (默认: 一年前)")
+    parser.add_argument("--end", default=None, help="结束日期 YYYYMMDD (默认: 今天)")
+
+    args = parser.parse_args()
+
+    from tradingagents.dataflows.tushare_utils import get_tushare_provider
+
+    end_date = args.end or datetime.now().strftime('%Y%m%d')
+    start_date = args.start or (datetime.now() - timedelta(days=365)).strftime('%Y%m%d')
+
+    provider = get_tushare_provider()
+    if not provider.connected:
+        logger.error("❌ Tushare未连接，请检查 TUSHARE_TOKEN")
+        return 1
+
+    logger.info(f"📥 开始批量入库: {start_date} - {end_date}")
+    summary = provider.ingest_trade_dates(start_date, end_date)
+    if not summary:
+        return 1
+    logger.info(f"🎉 入库完成: 拉取{summary['trade_dates']}个交易日，跳过{summary['skipped']}个，"
+                f"写入{summary['symbols']}只股票")
+    if not summary['complete']:
+        logger.warning("⚠️ 部分交易日拉取失败，重新运行将从失败的交易日继续")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+缓存格式迁移工具
+将已有的CSV行情缓存（us_stocks/china_stocks）转换为Feather或Parquet列式格式
+"""
+
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('scripts')
+
+
+def main():
+    """主函数"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="将CSV行情缓存转换为列式格式")
+    parser.add_argument("--format", choices=["feather", "parquet"], default=None,
+                        help="目标格式 (默认: 使用 CACHE_DATAFRAME_FORMAT 配置)")
+    parser.add_argument("--cache-dir", default=None,
+                        help="缓存目录 (默认: tradingagents/dataflows/data_cache)")
+
+    args = parser.parse_args()
+
+    from tradingagents.dataflows.cache_manager import StockDataCache
+
+    cache = StockDataCache(args.cache_dir)
+    target_format = args.format or cache.dataframe_format
+    if target_format == 'csv':
+        logger.error("❌ 请通过 --format 或 CACHE_DATAFRAME_FORMAT 指定 feather/parquet")
+        return 1
+
+    logger.info(f"📦 开始迁移缓存: {cache.cache_dir} -> {target_format}")
+    migrated = cache.migrate_dataframe_cache(target_format)
+    logger.info(f"🎉 迁移完成，共转换 {migrated} 个缓存文件")
+    logger.info(f"💡 请在 .env 中设置 CACHE_DATAFRAME_FORMAT={target_format}，新缓存将使用相同格式")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
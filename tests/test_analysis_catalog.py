@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+分析历史目录测试
+验证目录的增量同步、分页和条件查询、收藏标签持久化，以及完整报告的按需读取
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from web.utils.analysis_catalog import AnalysisCatalog
+
+
+def _write_result(results_dir: Path, analysis_id: str, stock_symbol: str, timestamp: float,
+                  analysts=None, summary="") -> Path:
+    result_file = results_dir / f"analysis_{analysis_id}.json"
+    with open(result_file, 'w', encoding='utf-8') as f:
+        json.dump({
+            'analysis_id': analysis_id,
+            'timestamp': timestamp,
+            'stock_symbol': stock_symbol,
+            'analysts': analysts or ['market'],
+            'research_depth': 2,
+            'status': 'completed',
+            'summary': summary,
+            'performance': {},
+            'full_data': {'market_report': f"{stock_symbol} 技术分析" * 100},
+        }, f, ensure_ascii=False)
+    return result_file
+
+
+def _write_reports(detailed_dir: Path, stock_code: str, date_str: str, decision: str) -> Path:
+    reports_dir = detailed_dir / stock_code / date_str / "reports"
+    reports_dir.mkdir(parents=True, exist_ok=True)
+    (reports_dir / "final_trade_decision.md").write_text(decision, encoding='utf-8')
+    (reports_dir / "market_report.md").write_text("# 技术分析\n\n上涨趋势", encoding='utf-8')
+    return reports_dir
+
+
+def _make_catalog(work_dir: str) -> AnalysisCatalog:
+    work = Path(work_dir)
+    results_dir = work / "results"
+    results_dir.mkdir(exist_ok=True)
+    return AnalysisCatalog(work / "catalog.db", results_dir, work / "detailed")
+
+
+def test_query_and_pagination():
+    """测试分页、条件过滤与按时间倒序"""
+    print("🧪 测试分页和条件查询")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        catalog = _make_catalog(work_dir)
+        base = datetime(2025, 7, 1).timestamp()
+        for i in range(25):
+            _write_result(catalog.results_dir, f"id{i:02d}", "AAPL" if i % 2 else "000001", base + i * 3600,
+                          analysts=['market', 'news'] if i % 5 == 0 else ['market'], summary=f"建议买入 {i}")
+        assert catalog.sync(force=True) == 25
+
+        page1 = catalog.query(limit=10)
+        page3 = catalog.query(limit=10, offset=20)
+        assert [r['analysis_id'] for r in page1] == [f"id{i:02d}" for i in range(24, 14, -1)], "应按时间倒序"
+        assert len(page3) == 5 and catalog.count() == 25
+        assert 'full_data' not in page1[0] and 'reports' not in page1[0], "列表条目不应包含完整报告"
+
+        assert catalog.count(stock_symbol="aap") == 12, "股票代码应按不区分大小写的子串匹配"
+        assert catalog.count(analyst_type="news") == 5
+        assert catalog.count(analyst_type="new") == 0, "分析师类型应完整匹配"
+        assert catalog.count(search_text="买入 7") == 1
+        assert catalog.count(min_timestamp=base + 10 * 3600, max_timestamp=base + 20 * 3600) == 10
+        catalog.close()
+        print("✅ 分页和条件查询测试通过")
+
+
+def test_incremental_sync_and_lazy_reports():
+    """测试增量同步只读取变化的结果，以及报告目录的摘要与按需读取"""
+    print("🧪 测试增量同步和按需读取")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        catalog = _make_catalog(work_dir)
+        decision = "# 最终决策\n\n**买入**" + "理由" * 200
+        _write_reports(catalog.detailed_dir, "000001", "2025-07-31", decision)
+        first = _write_result(catalog.results_dir, "web1", "AAPL", time.time())
+        assert catalog.sync(force=True) == 2
+        assert catalog.sync(force=True) == 0, "未变化的结果不应重新索引"
+
+        report_entry = catalog.query(stock_symbol="000001")[0]
+        assert report_entry['summary'].endswith("...") and '#' not in report_entry['summary']
+        assert report_entry['analysis_id'].startswith("000001_2025-07-31_")
+
+        details = catalog.load_details(report_entry['analysis_id'])
+        assert details['reports']['final_trade_decision'] == decision, "详情应读取完整报告"
+        assert 'market_report' in catalog.load_details("web1")['full_data']
+
+        first.unlink()
+        second = _write_result(catalog.results_dir, "web2", "TSLA", time.time())
+        assert catalog.sync(force=True) == 2, "应只处理新增和删除的结果"
+        assert {r['analysis_id'] for r in catalog.query()} == {"web2", report_entry['analysis_id']}
+
+        os.utime(second, (time.time() + 10, time.time() + 10))
+        assert catalog.sync() == 0, "同步间隔内不应重复扫描"
+        catalog.close()
+        print("✅ 增量同步和按需读取测试通过")
+
+
+def test_favorites_and_tags_persist():
+    """测试收藏标签的导入、查询和重建后保留"""
+    print("🧪 测试收藏和标签")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        results_dir = Path(work_dir) / "results"
+        results_dir.mkdir()
+        (results_dir / "favorites.json").write_text(json.dumps(["a"]), encoding='utf-8')
+        (results_dir / "tags.json").write_text(json.dumps({"a": ["重点"]}, ensure_ascii=False), encoding='utf-8')
+        for analysis_id in ("a", "b"):
+            _write_result(results_dir, analysis_id, "AAPL", time.time())
+
+        catalog = AnalysisCatalog(Path(work_dir) / "catalog.db", results_dir)
+        assert catalog.get_favorites() == ["a"] and catalog.get_all_tags() == {"a": ["重点"]}, "应导入旧版收藏和标签"
+        assert catalog.count() == 2, "favorites.json和tags.json不是分析结果"
+
+        assert catalog.toggle_favorite("b") is True
+        assert catalog.toggle_favorite("a") is False
+        catalog.add_tag("b", "长线")
+        assert [r['analysis_id'] for r in catalog.query(favorites_only=True)] == ["b"]
+        assert [r['analysis_id'] for r in catalog.query(tags_filter=["长线"])] == ["b"]
+
+        catalog.rebuild()
+        catalog.close()
+
+        reopened = AnalysisCatalog(Path(work_dir) / "catalog.db", results_dir)
+        entry = reopened.query(favorites_only=True)[0]
+        assert entry['is_favorite'] and entry['tags'] == ["长线"], "重建和重新打开后收藏标签应保留"
+        assert reopened.get_tags("a") == ["重点"]
+        reopened.close()
+        print("✅ 收藏和标签测试通过")
+
+
+def main():
+    """主测试函数"""
+    try:
+        test_query_and_pagination()
+        test_incremental_sync_and_lazy_reports()
+        test_favorites_and_tags_persist()
+
+        print("\n🎉 所有测试通过！")
+        return True
+
+    except Exception as e:
+        print(f"\n❌ 测试失败: {e}")
+        import traceback
+        print(f"错误详情: {traceback.format_exc()}")
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
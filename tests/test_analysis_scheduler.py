@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+分析任务调度器测试
+验证并发上限、按用户轮转出队、排队位置、取消（含运行中的分析图）、准入控制以及队列文件恢复
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from web.utils.analysis_scheduler import AnalysisCancelledError, AnalysisQueueFullError, AnalysisScheduler
+
+
+class _BlockingRunner:
+    """阻塞直到放行的任务执行函数，记录执行顺序和最大并发数"""
+
+    def __init__(self):
+        self.started = []
+        self.release = threading.Event()
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, job, cancel_event):
+        with self._lock:
+            self.started.append(job['analysis_id'])
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            while not self.release.wait(0.01):
+                if cancel_event.is_set():
+                    raise AnalysisCancelledError(job['analysis_id'])
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def _wait_for(condition, timeout: float = 5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_worker_bound():
+    """测试同时运行的任务数不超过工作线程数"""
+    print("🧪 测试并发上限")
+
+    runner = _BlockingRunner()
+    scheduler = AnalysisScheduler(runner, max_workers=2, max_queue_size=20, max_jobs_per_user=5)
+
+    assert scheduler.submit("a1", "alice", {}) == 0, "有空闲线程时应立即运行"
+    for job_id in ("a2", "a3", "a4", "a5"):
+        scheduler.submit(job_id, "alice", {})
+    assert _wait_for(lambda: len(runner.started) == 2)
+    assert scheduler.get_stats()["queued"] == 3
+    assert scheduler.estimate_wait_seconds("a5") == 2 * scheduler.DEFAULT_JOB_DURATION
+
+    runner.release.set()
+    assert _wait_for(lambda: scheduler.get_stats()["completed"] == 5)
+    assert runner.max_active == 2, f"同时运行数不应超过2: {runner.max_active}"
+    print(f"✅ 并发上限测试通过: {scheduler.get_stats()}")
+
+
+def test_user_fairness():
+    """测试按用户轮转出队"""
+    print("🧪 测试用户公平")
+
+    runner = _BlockingRunner()
+    scheduler = AnalysisScheduler(runner, max_workers=1, max_queue_size=20, max_jobs_per_user=5)
+    scheduler.submit("a1", "alice", {})
+    assert _wait_for(lambda: runner.started == ["a1"])
+
+    for job_id in ("a2", "a3", "a4"):
+        scheduler.submit(job_id, "alice", {})
+    scheduler.submit("b1", "bob", {})
+    scheduler.submit("b2", "bob", {})
+
+    # alice先提交了3个任务，bob的任务仍与其交替出队
+    assert [scheduler.get_position(j) for j in ("a2", "b1", "a3", "b2", "a4")] == [1, 2, 3, 4, 5]
+    assert scheduler.get_status("b2") == "queued" and scheduler.get_status("a1") == "running"
+
+    runner.release.set()
+    assert _wait_for(lambda: scheduler.get_stats()["completed"] == 6)
+    assert runner.started == ["a1", "a2", "b1", "a3", "b2", "a4"], f"出队顺序异常: {runner.started}"
+    print("✅ 用户公平测试通过")
+
+
+def test_cancel():
+    """测试取消排队中和运行中的任务"""
+    print("🧪 测试取消任务")
+
+    runner = _BlockingRunner()
+    scheduler = AnalysisScheduler(runner, max_workers=1, max_jobs_per_user=5)
+    scheduler.submit("running", "alice", {})
+    scheduler.submit("queued", "alice", {})
+    assert _wait_for(lambda: runner.started == ["running"])
+
+    assert scheduler.cancel("queued") and scheduler.get_status("queued") == "cancelled"
+    assert scheduler.cancel("running")
+    assert _wait_for(lambda: scheduler.get_status("running") == "cancelled"), "运行中的任务应在回调时中止"
+    assert runner.started == ["running"], "已取消的排队任务不应运行"
+    assert not scheduler.cancel("unknown")
+    print("✅ 取消任务测试通过")
+
+
+class _SlowGraph:
+    """逐个节点产出状态的假分析图，记录已执行的节点数"""
+
+    def __init__(self, steps: int, delay: float):
+        self.steps = steps
+        self.delay = delay
+        self.executed = 0
+
+    def stream(self, init_state, **kwargs):
+        for _ in range(self.steps):
+            time.sleep(self.delay)
+            self.executed += 1
+            yield dict(init_state, final_trade_decision="HOLD")
+
+
+def test_cancel_running_graph():
+    """测试运行中的分析图在节点之间响应取消并释放工作线程"""
+    print("🧪 测试取消运行中的分析图")
+
+    from tradingagents.graph.propagation import Propagator
+    from tradingagents.graph.trading_graph import TradingAgentsGraph
+
+    graphs = {}
+
+    def run_graph(job, cancel_event):
+        def check_cancelled(_state):
+            if cancel_event.is_set():
+                raise AnalysisCancelledError(job['analysis_id'])
+
+        # 只替换图的执行部分，保留 propagate 的流式执行逻辑
+        graph = object.__new__(TradingAgentsGraph)
+        graph.debug = False
+        graph.propagator = Propagator()
+        graph.graph = graphs[job['analysis_id']] = _SlowGraph(job['params']['steps'], 0.02)
+        graph._log_state = lambda trade_date, final_state: None
+        graph.process_signal = lambda signal, stock_symbol=None: signal
+        graph.propagate("AAPL", "2025-01-02", step_callback=check_cancelled)
+
+    scheduler = AnalysisScheduler(run_graph, max_workers=1, max_jobs_per_user=5)
+    scheduler.submit("long", "alice", {"steps": 1000})
+    scheduler.submit("next", "alice", {"steps": 3})
+    assert _wait_for(lambda: "long" in graphs and graphs["long"].executed >= 3)
+
+    assert scheduler.cancel("long")
+    assert _wait_for(lambda: scheduler.get_status("long") == "cancelled", timeout=2.0), "分析图应在节点之间中止"
+    assert graphs["long"].executed < 100, f"取消后不应继续执行节点: {graphs['long'].executed}"
+    assert _wait_for(lambda: scheduler.get_status("next") == "completed"), "取消后工作线程应执行下一个任务"
+    assert graphs["next"].executed == 3
+    print(f"✅ 取消运行中的分析图测试通过（执行 {graphs['long'].executed} 个节点后中止）")
+
+
+def test_admission_control():
+    """测试排队上限、单用户上限与预计等待上限"""
+    print("🧪 测试准入控制")
+
+    runner = _BlockingRunner()
+    scheduler = AnalysisScheduler(runner, max_workers=1, max_queue_size=2, max_jobs_per_user=2)
+    scheduler.submit("a1", "alice", {})
+    scheduler.submit("a2", "alice", {})
+    assert _wait_for(lambda: runner.started == ["a1"])
+
+    try:
+        scheduler.submit("a3", "alice", {})
+        raise AssertionError("单用户任务数超限时应拒绝")
+    except AnalysisQueueFullError:
+        pass
+    assert scheduler.submit("c1", "carol", {}) == 2, "其他用户仍可排队"
+    try:
+        scheduler.submit("d1", "dave", {})
+        raise AssertionError("排队已满时应拒绝")
+    except AnalysisQueueFullError:
+        pass
+    assert scheduler.get_stats()["rejected"] == 2
+
+    limited = AnalysisScheduler(_BlockingRunner(), max_workers=1, max_jobs_per_user=5,
+                                max_wait_seconds=AnalysisScheduler.DEFAULT_JOB_DURATION)
+    limited.submit("x1", "alice", {})
+    limited.submit("x2", "bob", {})
+    try:
+        limited.submit("x3", "carol", {})
+        raise AssertionError("预计等待过长时应拒绝")
+    except AnalysisQueueFullError:
+        pass
+
+    runner.release.set()
+    print("✅ 准入控制测试通过")
+
+
+def test_queue_file_recovery():
+    """测试队列文件持久化，重启后排队和被中断的任务重新执行"""
+    print("🧪 测试队列持久化")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        queue_file = os.path.join(tmp_dir, "analysis_queue.json")
+        runner = _BlockingRunner()
+        scheduler = AnalysisScheduler(runner, max_workers=1, max_jobs_per_user=5, queue_file=queue_file)
+        scheduler.submit("j1", "alice", {"stock_symbol": "AAPL"})
+        scheduler.submit("j2", "bob", {"stock_symbol": "000001"})
+        assert _wait_for(lambda: runner.started == ["j1"])
+
+        # 模拟进程重启：新的调度器从队列文件恢复
+        params = []
+        restarted = AnalysisScheduler(lambda job, event: params.append(job['params']['stock_symbol']),
+                                      max_workers=1, queue_file=queue_file)
+        assert _wait_for(lambda: restarted.get_stats()["completed"] == 2)
+        assert params == ["AAPL", "000001"], f"恢复顺序异常: {params}"
+        assert '"jobs": []' in Path(queue_file).read_text(encoding="utf-8"), "任务结束后应从队列文件移除"
+
+        # 原调度器停止写文件后再清理临时目录
+        scheduler.queue_file = None
+        runner.release.set()
+        assert _wait_for(lambda: scheduler.get_stats()["completed"] == 2)
+    print("✅ 队列持久化测试通过")
+
+
+def main():
+    """主测试函数"""
+    try:
+        test_worker_bound()
+        test_user_fairness()
+        test_cancel()
+        test_cancel_running_graph()
+        test_admission_control()
+        test_queue_file_recovery()
+
+        print("\n🎉 所有测试通过！")
+        return True
+
+    except Exception as e:
+        print(f"\n❌ 测试失败: {e}")
+        import traceback
+        print(f"错误详情: {traceback.format_exc()}")
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+缓存元数据索引测试
+验证从旧元数据文件自动重建索引、按索引查找并检查TTL、过期清理和外部删除后的同步
+"""
+
+import json
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from tradingagents.dataflows.cache_manager import StockDataCache
+
+
+def _write_legacy_metadata(cache: StockDataCache, count: int, hours_ago: float = 0.0):
+    """直接写入 *_meta.json，模拟索引出现之前生成的缓存"""
+    cached_at = (datetime.now() - timedelta(hours=hours_ago)).isoformat()
+    for i in range(count):
+        symbol = f"SYM{i}"
+        cache_key = f"{symbol}_stock_data_legacy{i:06d}"
+        data_file = cache.us_stock_dir / f"{cache_key}.txt"
+        data_file.write_text(f"data {symbol}", encoding='utf-8')
+        metadata = {
+            'symbol': symbol,
+            'data_type': 'stock_data',
+            'market_type': 'us',
+            'start_date': '2025-01-01',
+            'end_date': '2025-01-31',
+            'data_source': 'yfinance',
+            'file_path': str(data_file),
+            'file_format': 'txt',
+            'cached_at': cached_at,
+        }
+        with open(cache.metadata_dir / f"{cache_key}_meta.json", 'w', encoding='utf-8') as f:
+            json.dump(metadata, f)
+
+
+def test_rebuild_from_legacy_metadata():
+    """测试首次运行时从已有元数据文件重建索引"""
+    print("🧪 测试索引自动重建")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        seeding = StockDataCache(temp_dir)
+        seeding.catalog.close()
+        (Path(temp_dir) / "metadata_catalog.db").unlink()
+        _write_legacy_metadata(seeding, 500)
+
+        cache = StockDataCache(temp_dir)
+        assert cache.catalog.count() == 500, "应从旧元数据文件重建全部条目"
+
+        start = time.perf_counter()
+        cache_key = cache.find_cached_stock_data("SYM123", data_source="yfinance")
+        elapsed = time.perf_counter() - start
+        assert cache_key == "SYM123_stock_data_legacy000123"
+        assert cache.load_stock_data(cache_key) == "data SYM123"
+        print(f"✅ 索引重建完成，查找耗时: {elapsed * 1000:.2f}ms")
+
+
+def test_lookup_respects_ttl():
+    """测试新写入的缓存进入索引，且过期条目不会被返回"""
+    print("🧪 测试TTL查找")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = StockDataCache(temp_dir)
+        _write_legacy_metadata(cache, 3, hours_ago=5)
+        cache.catalog.rebuild()
+
+        assert cache.find_cached_stock_data("SYM1") is None, "超过美股2小时TTL的缓存不应命中"
+        assert cache.find_cached_stock_data("SYM1", max_age_hours=6) == "SYM1_stock_data_legacy000001"
+
+        data = pd.DataFrame({'close': [1.0, 2.0]})
+        saved_key = cache.save_stock_data("AAPL", data, "2025-01-01", "2025-01-31", "yfinance")
+        assert cache.catalog.get(saved_key)['data_source'] == "yfinance", "新缓存应写入索引"
+        assert cache.find_cached_stock_data("AAPL", "2025-01-01", "2025-01-31", "yfinance") == saved_key
+        assert cache.find_cached_stock_data("AAPL", "2024-01-01", "2024-01-31") == saved_key, "应找到部分匹配"
+        print("✅ TTL查找测试通过")
+
+
+def test_clear_and_external_delete():
+    """测试过期清理使用索引，且外部删除的元数据不会被返回"""
+    print("🧪 测试清理与索引同步")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = StockDataCache(temp_dir)
+        _write_legacy_metadata(cache, 4, hours_ago=24 * 10)
+        cache.catalog.rebuild()
+        fresh_key = cache.save_stock_data("MSFT", "fresh", data_source="yfinance")
+
+        cache.clear_old_cache(max_age_days=7)
+        assert cache.catalog.count() == 1, "过期条目应从索引中删除"
+        assert not list(cache.us_stock_dir.glob("*legacy*")), "过期数据文件应被删除"
+
+        (cache.metadata_dir / f"{fresh_key}_meta.json").unlink()
+        assert cache.find_cached_stock_data("MSFT") is None, "外部删除的元数据不应命中"
+        assert cache.catalog.count() == 0, "索引应同步删除失效条目"
+        print("✅ 清理与索引同步测试通过")
+
+
+def main():
+    """主测试函数"""
+    try:
+        test_rebuild_from_legacy_metadata()
+        test_lookup_respects_ttl()
+        test_clear_and_external_delete()
+
+        print("\n🎉 所有测试通过！")
+        return True
+
+    except Exception as e:
+        print(f"\n❌ 测试失败: {e}")
+        import traceback
+        print(f"错误详情: {traceback.format_exc()}")
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
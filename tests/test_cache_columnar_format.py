@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+列式缓存格式测试
+验证Feather/Parquet缓存保留索引和列类型，以及CSV缓存迁移
+"""
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from tradingagents.dataflows.cache_manager import StockDataCache
+
+
+def _make_prices(days: int = 2000) -> pd.DataFrame:
+    dates = pd.bdate_range('2015-01-01', periods=days, name='Date')
+    rng = np.random.default_rng(3)
+    close = 100 + np.cumsum(rng.normal(0, 1, days))
+    return pd.DataFrame({
+        'Open': close, 'High': close + 1, 'Low': close - 1, 'Close': close,
+        'Volume': np.arange(days, dtype='int64') + 1000,
+    }, index=dates)
+
+
+def _make_cache(temp_dir: str, file_format: str) -> StockDataCache:
+    os.environ['CACHE_DATAFRAME_FORMAT'] = file_format
+    try:
+        return StockDataCache(temp_dir)
+    finally:
+        os.environ.pop('CACHE_DATAFRAME_FORMAT', None)
+
+
+def test_columnar_round_trip():
+    """测试列式格式读写保留DatetimeIndex和数值类型"""
+    print("🧪 测试列式格式往返")
+
+    data = _make_prices()
+    for file_format in ('feather', 'parquet'):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache = _make_cache(temp_dir, file_format)
+            cache_key = cache.save_stock_data("AAPL", data, "2015-01-01", "2022-08-31", "yfinance")
+
+            assert list(cache.us_stock_dir.glob(f"*.{file_format}")), f"应生成{file_format}文件"
+            assert cache.catalog.get(cache_key)['file_format'] == file_format
+
+            start = time.perf_counter()
+            loaded = cache.load_stock_data(cache_key)
+            elapsed = time.perf_counter() - start
+            pd.testing.assert_frame_equal(loaded, data, check_freq=False)
+            print(f"✅ {file_format} 往返一致，读取耗时 {elapsed * 1000:.2f}ms")
+
+
+def test_migrate_csv_cache():
+    """测试把已有CSV缓存迁移为feather，缓存键和缓存时间不变"""
+    print("🧪 测试CSV缓存迁移")
+
+    data = _make_prices(50)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        csv_cache = _make_cache(temp_dir, 'csv')
+        cache_key = csv_cache.save_stock_data("000001", data, "2015-01-01", "2015-03-12", "tdx")
+        text_key = csv_cache.save_stock_data("000002", "text report", data_source="tdx")
+        cached_at = csv_cache.catalog.get(cache_key)['cached_at']
+        expected = csv_cache.load_stock_data(cache_key)
+
+        cache = _make_cache(temp_dir, 'feather')
+        assert cache.migrate_dataframe_cache() == 1, "只应迁移DataFrame缓存"
+        assert not list(cache.china_stock_dir.glob("*.csv")), "原CSV文件应被删除"
+
+        entry = cache.catalog.get(cache_key)
+        assert entry['file_format'] == 'feather' and entry['cached_at'] == cached_at
+        pd.testing.assert_frame_equal(cache.load_stock_data(cache_key), expected)
+        assert cache.load_stock_data(text_key) == "text report"
+        assert cache.find_cached_stock_data("000001", "2015-01-01", "2015-03-12", "tdx") == cache_key
+        print("✅ CSV缓存迁移测试通过")
+
+
+def main():
+    """主测试函数"""
+    try:
+        test_columnar_round_trip()
+        test_migrate_csv_cache()
+
+        print("\n🎉 所有测试通过！")
+        return True
+
+    except Exception as e:
+        print(f"\n❌ 测试失败: {e}")
+        import traceback
+        print(f"错误详情: {traceback.format_exc()}")
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+数据库缓存批量读写与二进制载荷测试
+验证DataFrame以Arrow IPC压缩保存、旧版JSON缓存仍可读取、
+set_many/get_many 对Redis和MongoDB各只做一次往返，以及MongoDB命中后回填Redis
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from tradingagents.dataflows import db_cache_manager
+from tradingagents.dataflows.db_cache_manager import (
+    DatabaseCacheManager, decode_cache_payload, encode_cache_payload
+)
+
+
+class _FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def setex(self, key, ttl, value):
+        self.commands.append((key, ttl, value))
+
+    def execute(self):
+        self.redis.round_trips += 1
+        for key, ttl, value in self.commands:
+            self.redis.store[key] = (ttl, value)
+        return [True] * len(self.commands)
+
+
+class _FakeRedis:
+    """只记录往返次数的内存Redis"""
+
+    def __init__(self):
+        self.store = {}
+        self.round_trips = 0
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self)
+
+    def mget(self, keys):
+        self.round_trips += 1
+        return [self.store[key][1] if key in self.store else None for key in keys]
+
+    def exists(self, key):
+        self.round_trips += 1
+        return key in self.store
+
+
+class _FakeCollection:
+    def __init__(self, db):
+        self.db = db
+        self.docs = {}
+
+    def bulk_write(self, operations, ordered=True):
+        self.db.round_trips += 1
+        for op in operations:
+            self.docs[op._filter['_id']] = dict(op._doc)
+
+    def find(self, query):
+        self.db.round_trips += 1
+        return [dict(self.docs[key]) for key in query['_id']['$in'] if key in self.docs]
+
+
+class _FakeMongoDB:
+    def __init__(self):
+        self.collections = {}
+        self.round_trips = 0
+
+    def __getitem__(self, name):
+        return self.collections.setdefault(name, _FakeCollection(self))
+
+
+def _make_manager():
+    """不连接真实数据库，替换为内存实现"""
+    saved = db_cache_manager.MONGODB_AVAILABLE, db_cache_manager.REDIS_AVAILABLE
+    db_cache_manager.MONGODB_AVAILABLE = db_cache_manager.REDIS_AVAILABLE = False
+    try:
+        manager = DatabaseCacheManager()
+    finally:
+        db_cache_manager.MONGODB_AVAILABLE, db_cache_manager.REDIS_AVAILABLE = saved
+    manager.mongodb_db = _FakeMongoDB()
+    manager.redis_client = _FakeRedis()
+    return manager
+
+
+def _make_prices(days: int = 500) -> pd.DataFrame:
+    dates = pd.bdate_range('2022-01-03', periods=days, name='date')
+    close = 10 + np.cumsum(np.random.default_rng(5).normal(0, 0.1, days))
+    return pd.DataFrame({'open': close - 0.05, 'high': close + 0.1, 'low': close - 0.1,
+                         'close': close, 'volume': np.arange(days, dtype='int64') + 10000}, index=dates)
+
+
+def test_payload_codec():
+    """测试DataFrame和文本载荷往返，以及旧版格式读取"""
+    print("🧪 测试载荷编解码")
+
+    prices = _make_prices()
+    payload, data_format = encode_cache_payload(prices)
+    assert data_format == 'arrow_ipc'
+    pd.testing.assert_frame_equal(decode_cache_payload(payload, data_format), prices, check_freq=False)
+    json_size = len(prices.to_json(orient='records', date_format='iso'))
+    assert len(payload) < json_size, (len(payload), json_size)
+
+    text = "📰 新闻标题\n" * 500
+    payload, data_format = encode_cache_payload(text)
+    assert data_format == 'text_zlib' and len(payload) < len(text.encode('utf-8')) / 10
+    assert decode_cache_payload(payload, data_format) == text
+
+    legacy = pd.DataFrame({'close': [1.0, 2.0]}).to_json(orient='records')
+    assert list(decode_cache_payload(legacy, 'dataframe_json')['close']) == [1.0, 2.0]
+    assert decode_cache_payload("旧版文本", 'text') == "旧版文本"
+    print(f"✅ 载荷编解码测试通过（Arrow {len(encode_cache_payload(prices)[0])}字节 / JSON {json_size}字节）")
+
+
+def test_set_many_get_many_round_trips():
+    """测试批量读写各只做一次往返，MongoDB命中后一次pipeline回填Redis"""
+    print("🧪 测试批量读写")
+
+    manager = _make_manager()
+    prices = _make_prices(60)
+    items = [{'symbol': symbol, 'data': prices, 'start_date': '2022-01-03', 'end_date': '2022-03-25',
+              'data_source': 'tushare'} for symbol in ('000001', '600000', '300750')]
+    items.append({'data_type': 'news', 'symbol': '000001', 'news_data': '📰 新闻', 'data_source': 'em'})
+
+    keys = manager.set_many(items)
+    assert len(keys) == 4 and keys[-1].startswith('news:')
+    assert manager.mongodb_db.round_trips == 2, "每个集合一次bulk_write"
+    assert manager.redis_client.round_trips == 1, "Redis一次pipeline"
+    assert manager.redis_client.store[keys[0]][0] == 6 * 3600 and manager.redis_client.store[keys[-1]][0] == 24 * 3600
+
+    manager.redis_client.round_trips = 0
+    loaded = manager.get_many(keys + ['stock:missing:0'])
+    assert manager.redis_client.round_trips == 1, "一次MGET"
+    assert manager.mongodb_db.round_trips == 3, "只有未命中的键查询MongoDB"
+    pd.testing.assert_frame_equal(loaded[keys[1]], prices, check_freq=False)
+    assert loaded[keys[-1]] == '📰 新闻' and 'stock:missing:0' not in loaded
+
+    # Redis过期后从MongoDB读取并回填
+    manager.redis_client.store.clear()
+    manager.redis_client.round_trips = 0
+    loaded = manager.get_many(keys)
+    assert len(loaded) == 4 and manager.mongodb_db.round_trips == 5, "每个集合一次查询"
+    assert manager.redis_client.round_trips == 2 and len(manager.redis_client.store) == 4, "一次MGET + 一次回填"
+    print("✅ 批量读写测试通过")
+
+
+def test_single_item_api_and_legacy_redis_value():
+    """测试单条保存/加载接口，以及旧版JSON格式的Redis值和MongoDB文档"""
+    print("🧪 测试单条接口与旧版缓存")
+
+    manager = _make_manager()
+    prices = _make_prices(30)
+    cache_key = manager.save_stock_data('AAPL', prices, '2022-01-03', '2022-02-11', 'yfinance')
+    assert manager.find_cached_stock_data('AAPL', '2022-01-03', '2022-02-11', 'yfinance') == cache_key
+    pd.testing.assert_frame_equal(manager.load_stock_data(cache_key), prices, check_freq=False)
+
+    legacy_text = {'data': '旧版报告', 'data_format': 'text', 'symbol': 'AAPL', 'data_source': 'old'}
+    manager.redis_client.store['stock:AAPL:legacy'] = (3600, json.dumps(legacy_text, ensure_ascii=False).encode('utf-8'))
+    assert manager.load_stock_data('stock:AAPL:legacy') == '旧版报告'
+
+    manager.mongodb_db['fundamentals_data'].docs['fundamentals:000001:old'] = {
+        '_id': 'fundamentals:000001:old', 'symbol': '000001', 'data_source': 'old', 'data': '旧版基本面',
+        'analysis_date': '2024-01-01',
+    }
+    assert manager.get_many(['fundamentals:000001:old']) == {'fundamentals:000001:old': '旧版基本面'}
+    assert manager.get_many(['fundamentals:000001:old'])['fundamentals:000001:old'] == '旧版基本面', \
+        "回填Redis的旧版数据应重新编码后可读"
+    print("✅ 单条接口与旧版缓存测试通过")
+
+
+def main():
+    """主测试函数"""
+    try:
+        test_payload_codec()
+        test_set_many_get_many_round_trips()
+        test_single_item_api_and_legacy_redis_value()
+
+        print("\n🎉 所有测试通过！")
+        return True
+
+    except Exception as e:
+        print(f"\n❌ 测试失败: {e}")
+        import traceback
+        print(f"错误详情: {traceback.format_exc()}")
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+共享向量缓存测试
+验证多个记忆实例对同一文本只请求一次embedding、降级结果不缓存、LRU淘汰和磁盘层复用
+"""
+
+import os
+import sys
+import tempfile
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from tradingagents.agents.utils import memory as memory_module
+from tradingagents.agents.utils.memory import EmbeddingCache, FinancialSituationMemory
+
+
+class _FakeEmbeddingClient:
+    """记录调用次数的OpenAI兼容embedding客户端"""
+
+    def __init__(self, fail: bool = False):
+        self.calls = []
+        self.fail = fail
+        self.embeddings = self
+        self._lock = threading.Lock()
+
+    def create(self, model, input):
+        with self._lock:
+            self.calls.append(input)
+        if self.fail:
+            raise ConnectionError("connection refused")
+        vector = [float(len(input) % 7 + 1), 0.5, 0.25]
+        return SimpleNamespace(data=[SimpleNamespace(embedding=vector)])
+
+
+def _make_memory(name: str, client) -> FinancialSituationMemory:
+    original_key = os.environ.get("OPENAI_API_KEY")
+    os.environ["OPENAI_API_KEY"] = "test-key"
+    try:
+        memory = FinancialSituationMemory(name, {"llm_provider": "ollama", "backend_url": "http://localhost:11434/v1"})
+    finally:
+        if original_key is None:
+            os.environ.pop("OPENAI_API_KEY")
+        else:
+            os.environ["OPENAI_API_KEY"] = original_key
+    memory.client = client
+    return memory
+
+
+def test_shared_across_instances():
+    """测试五个角色的记忆实例对同一情况描述只请求一次embedding"""
+    print("🧪 测试跨实例共享向量缓存")
+
+    memory_module._embedding_cache = EmbeddingCache(max_items=16)
+    client = _FakeEmbeddingClient()
+    memories = [_make_memory(f"embedding_cache_{role}", client)
+                for role in ("bull", "bear", "trader", "judge", "risk")]
+    memories[0].add_situations([("past situation", "past advice")])
+
+    curr_situation = "market report\n\nsentiment report\n\nnews report\n\nfundamentals report" * 500
+    threads = [threading.Thread(target=m.get_memories, args=(curr_situation,)) for m in memories]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert client.calls.count(curr_situation) == 1, f"同一文本应只请求一次，实际{client.calls.count(curr_situation)}次"
+    assert memories[0].get_memories(curr_situation)[0]["recommendation"] == "past advice"
+    stats = memories[0].get_cache_info()["embedding_cache"]
+    assert stats["misses"] == 2 and stats["hits"] >= 5, f"命中统计异常: {stats}"
+    assert len(memory_module._embedding_cache._key_locks) == 0, "计算完成后不应保留按文本的锁"
+    print(f"✅ 共享向量缓存测试通过: {stats}")
+
+
+def test_failures_not_cached():
+    """测试降级返回的零向量不会被缓存"""
+    print("🧪 测试降级结果不缓存")
+
+    memory_module._embedding_cache = EmbeddingCache(max_items=16)
+    client = _FakeEmbeddingClient(fail=True)
+    memory = _make_memory("embedding_cache_failure", client)
+
+    assert memory.get_embedding("some text") == [0.0] * 1024
+    client.fail = False
+    assert memory.get_embedding("some text") != [0.0] * 1024, "恢复后应重新请求"
+    assert len(client.calls) == 2
+    print("✅ 降级结果不缓存测试通过")
+
+
+def test_lru_and_disk_layer():
+    """测试LRU淘汰以及磁盘层在新实例中复用"""
+    print("🧪 测试LRU淘汰与磁盘层")
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = EmbeddingCache(max_items=2, cache_dir=cache_dir)
+        keys = [cache.make_key("openai", "model", f"text {i}") for i in range(3)]
+        for i, key in enumerate(keys):
+            cache.put(key, [float(i + 1)])
+        assert cache.get_stats()["size"] == 2, "内存中应只保留2条"
+
+        fresh = EmbeddingCache(max_items=2, cache_dir=cache_dir)
+        assert fresh.get(keys[0]) == [1.0], "磁盘层应可在新实例中读取"
+        assert fresh.get_stats()["disk_hits"] == 1
+
+        computed = []
+        assert fresh.get_or_compute(keys[2], lambda: computed.append(1) or [9.0]) == [3.0]
+        assert not computed, "磁盘命中时不应重新计算"
+        print("✅ LRU淘汰与磁盘层测试通过")
+
+
+def main():
+    """主测试函数"""
+    original_cache = memory_module._embedding_cache
+    try:
+        test_shared_across_instances()
+        test_failures_not_cached()
+        test_lru_and_disk_layer()
+
+        print("\n🎉 所有测试通过！")
+        return True
+
+    except Exception as e:
+        print(f"\n❌ 测试失败: {e}")
+        import traceback
+        print(f"错误详情: {traceback.format_exc()}")
+        return False
+    finally:
+        memory_module._embedding_cache = original_cache
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+离线Finnhub数据存储测试
+验证日期区间二分查找与原逐键过滤结果一致、文件只解析一次、按大小淘汰和文件更新后的重新加载
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from tradingagents.dataflows import finnhub_utils
+from tradingagents.dataflows.finnhub_utils import FinnhubDataStore, get_data_in_range
+
+
+def _reference_range(data_path: str, start_date: str, end_date: str) -> dict:
+    """原实现：每次读取整个文件后逐键比较"""
+    with open(data_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return {k: v for k, v in data.items() if start_date <= k <= end_date and len(v) > 0}
+
+
+def _write_news(data_dir: str, ticker: str, days: int = 1500) -> str:
+    news_dir = Path(data_dir) / "finnhub_data" / "news_data"
+    news_dir.mkdir(parents=True, exist_ok=True)
+    data = {}
+    for i, day in enumerate(pd.date_range("2020-01-01", periods=days).strftime("%Y-%m-%d")):
+        data[day] = [] if i % 7 == 0 else [
+            {"headline": f"{ticker} headline {day} #{j}", "summary": "summary " * 20} for j in range(3)
+        ]
+    data_path = news_dir / f"{ticker}_data_formatted.json"
+    data_path.write_text(json.dumps(data), encoding="utf-8")
+    return str(data_path)
+
+
+def test_range_matches_reference():
+    """测试二分查找与原实现结果及键顺序一致"""
+    print("🧪 测试日期区间查找一致性")
+
+    original_store = finnhub_utils._finnhub_store
+    finnhub_utils._finnhub_store = FinnhubDataStore()
+    try:
+        with tempfile.TemporaryDirectory() as data_dir:
+            data_path = _write_news(data_dir, "AAPL")
+            ranges = [("2020-01-01", "2020-01-31"), ("2021-06-10", "2021-06-17"),
+                      ("2019-01-01", "2019-12-31"), ("2023-12-01", "2030-01-01"), ("2022-01-05", "2022-01-01")]
+
+            start = time.perf_counter()
+            expected = [_reference_range(data_path, s, e) for s, e in ranges]
+            reference_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            actual = [get_data_in_range("AAPL", s, e, "news_data", data_dir) for s, e in ranges]
+            store_time = time.perf_counter() - start
+
+            for exp, act in zip(expected, actual):
+                assert act == exp and list(act) == list(exp), "结果及顺序应与原实现一致"
+
+            stats = finnhub_utils.get_finnhub_store().get_stats()
+            assert stats["file_loads"] == 1, f"文件应只解析一次: {stats}"
+            assert get_data_in_range("MISSING", "2020-01-01", "2020-02-01", "news_data", data_dir) == {}
+            print(f"✅ 结果一致 (原实现 {reference_time:.3f}s, 索引存储 {store_time:.4f}s)")
+    finally:
+        finnhub_utils._finnhub_store = original_store
+
+
+def test_eviction_and_reload():
+    """测试超过大小上限时淘汰最久未用的文件，文件更新后重新加载"""
+    print("🧪 测试大小淘汰与重新加载")
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        paths = [_write_news(data_dir, ticker, days=200) for ticker in ("AAA", "BBB", "CCC")]
+        store = FinnhubDataStore(max_bytes=int(os.path.getsize(paths[0]) * 2.5))
+
+        for path in paths:
+            store.get_index(path)
+        stats = store.get_stats()
+        assert stats["cached_files"] == 2 and stats["evictions"] == 1, f"应淘汰最早的文件: {stats}"
+
+        store.get_index(paths[0])
+        assert store.get_stats()["file_loads"] == 4, "被淘汰的文件应重新解析"
+
+        with open(paths[2], "w", encoding="utf-8") as f:
+            json.dump({"2020-01-01": [{"headline": "updated"}]}, f)
+        future = time.time() + 5
+        os.utime(paths[2], (future, future))
+        assert store.get_index(paths[2]).range("2020-01-01", "2020-01-01")["2020-01-01"][0]["headline"] == "updated"
+        print("✅ 大小淘汰与重新加载测试通过")
+
+
+def main():
+    """主测试函数"""
+    try:
+        test_range_matches_reference()
+        test_eviction_and_reload()
+
+        print("\n🎉 所有测试通过！")
+        return True
+
+    except Exception as e:
+        print(f"\n❌ 测试失败: {e}")
+        import traceback
+        print(f"错误详情: {traceback.format_exc()}")
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
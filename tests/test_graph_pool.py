@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+分析引擎池测试
+验证相同配置复用实例、不同配置隔离、运行状态重置、并发借出互不共享以及空闲淘汰
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from tradingagents.graph.graph_pool import TradingAgentsGraphPool
+
+
+class _FakeGraph:
+    """记录构建次数的假分析引擎"""
+
+    builds = 0
+
+    def __init__(self, selected_analysts, debug=False, config=None):
+        type(self).builds += 1
+        self.selected_analysts = selected_analysts
+        self.config = config
+        self.curr_state = None
+        self.ticker = None
+        self.log_states_dict = {}
+        self.resets = 0
+
+    def reset_state(self):
+        self.curr_state = None
+        self.ticker = None
+        self.log_states_dict = {}
+        self.resets += 1
+
+    def propagate(self, ticker, trade_date):
+        self.ticker = ticker
+        self.curr_state = {"company_of_interest": ticker}
+        self.log_states_dict[trade_date] = self.curr_state
+        return self.curr_state, "BUY"
+
+
+CONFIG = {"llm_provider": "dashscope", "deep_think_llm": "qwen-max", "quick_think_llm": "qwen-plus",
+          "max_debate_rounds": 1, "max_risk_discuss_rounds": 2}
+
+
+def test_reuse_by_key():
+    """测试相同配置复用、不同配置或分析师组合新建"""
+    print("🧪 测试按配置复用")
+
+    _FakeGraph.builds = 0
+    pool = TradingAgentsGraphPool(max_idle=4, idle_ttl=0, graph_factory=_FakeGraph)
+
+    with pool.lease(["market", "news"], dict(CONFIG)) as graph:
+        graph.propagate("AAPL", "2025-01-02")
+    assert graph.curr_state is None and graph.log_states_dict == {}, "归还时应清空运行状态"
+
+    with pool.lease(["market", "news"], dict(CONFIG)) as reused:
+        assert reused is graph, "相同配置应复用实例"
+        assert reused.ticker is None
+
+    deeper = dict(CONFIG, max_debate_rounds=3)
+    with pool.lease(["market", "news"], deeper) as other:
+        assert other is not graph, "辩论轮数不同应新建实例"
+    with pool.lease(["news", "market"], dict(CONFIG)) as reordered:
+        assert reordered is not graph, "分析师顺序不同应新建实例"
+
+    stats = pool.get_stats()
+    assert _FakeGraph.builds == 3 and stats["hits"] == 1 and stats["misses"] == 3, f"统计异常: {stats}"
+    print(f"✅ 按配置复用测试通过: {stats}")
+
+
+def test_concurrent_leases_are_exclusive():
+    """测试并发分析不会共用同一个实例"""
+    print("🧪 测试并发借出")
+
+    _FakeGraph.builds = 0
+    pool = TradingAgentsGraphPool(max_idle=4, idle_ttl=0, graph_factory=_FakeGraph)
+    in_use = set()
+    conflicts = []
+    lock = threading.Lock()
+
+    def run(ticker):
+        for _ in range(20):
+            with pool.lease(["market"], dict(CONFIG)) as graph:
+                with lock:
+                    if id(graph) in in_use:
+                        conflicts.append(ticker)
+                    in_use.add(id(graph))
+                graph.propagate(ticker, "2025-01-02")
+                time.sleep(0.001)
+                with lock:
+                    if graph.ticker != ticker:
+                        conflicts.append(ticker)
+                    in_use.discard(id(graph))
+
+    threads = [threading.Thread(target=run, args=(f"T{i}",)) for i in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not conflicts, "同一实例不应同时借给两个分析"
+    assert _FakeGraph.builds <= 3, f"实例数不应超过并发数: {_FakeGraph.builds}"
+    print(f"✅ 并发借出测试通过: 共构建 {_FakeGraph.builds} 个实例")
+
+
+def test_idle_eviction():
+    """测试空闲超时和数量上限淘汰"""
+    print("🧪 测试空闲淘汰")
+
+    pool = TradingAgentsGraphPool(max_idle=2, idle_ttl=0.05, graph_factory=_FakeGraph)
+    for provider in ("a", "b", "c"):
+        pool.warm(["market"], dict(CONFIG, llm_provider=provider))
+    assert pool.get_stats()["idle"] == 2, "超过上限时应淘汰最早归还的实例"
+
+    time.sleep(0.1)
+    assert pool.evict_idle() == 2 and pool.get_stats()["idle"] == 0
+
+    disabled = TradingAgentsGraphPool(max_idle=0, graph_factory=_FakeGraph)
+    disabled.warm(["market"], dict(CONFIG))
+    assert disabled.get_stats()["idle"] == 0, "max_idle为0时不保留实例"
+    print("✅ 空闲淘汰测试通过")
+
+
+def main():
+    """主测试函数"""
+    try:
+        test_reuse_by_key()
+        test_concurrent_leases_are_exclusive()
+        test_idle_eviction()
+
+        print("\n🎉 所有测试通过！")
+        return True
+
+    except Exception as e:
+        print(f"\n❌ 测试失败: {e}")
+        import traceback
+        print(f"错误详情: {traceback.format_exc()}")
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
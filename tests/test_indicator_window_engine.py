@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+技术指标窗口引擎测试
+验证向量化窗口计算与逐日计算结果一致，并对比两者耗时
+"""
+
+import os
+import sys
+import time
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from tradingagents.dataflows import interface
+
+
+def _write_price_fixture(data_dir: str, symbol: str = "TEST") -> str:
+    """生成一份与离线YFin数据同名的合成行情CSV（仅交易日）"""
+    price_dir = os.path.join(data_dir, "market_data", "price_data")
+    os.makedirs(price_dir, exist_ok=True)
+
+    rng = np.random.default_rng(42)
+    dates = pd.bdate_range("2015-01-02", "2025-03-25")
+    close = 100 + np.cumsum(rng.normal(0, 1, len(dates)))
+    data = pd.DataFrame({
+        "Date": dates.strftime("%Y-%m-%d"),
+        "Open": close + rng.normal(0, 0.5, len(dates)),
+        "High": close + 1,
+        "Low": close - 1,
+        "Close": close,
+        "Volume": rng.integers(1_000, 100_000, len(dates)),
+    })
+    data.to_csv(
+        os.path.join(price_dir, f"{symbol}-YFin-data-2015-01-01-2025-03-25.csv"),
+        index=False,
+    )
+    return symbol
+
+
+def _window_by_day(symbol: str, indicator: str, curr_date: str, look_back_days: int) -> str:
+    """原始的逐日实现（离线模式）：每个交易日调用一次 get_stockstats_indicator，作为对照和性能基准"""
+    end_date = curr_date
+    curr_date = datetime.strptime(curr_date, "%Y-%m-%d")
+    before = curr_date - relativedelta(days=look_back_days)
+
+    data = pd.read_csv(
+        os.path.join(
+            interface.DATA_DIR,
+            f"market_data/price_data/{symbol}-YFin-data-2015-01-01-2025-03-25.csv",
+        )
+    )
+    data["Date"] = pd.to_datetime(data["Date"], utc=True)
+    dates_in_df = data["Date"].astype(str).str[:10]
+
+    ind_string = ""
+    while curr_date >= before:
+        # only do the trading dates
+        if curr_date.strftime("%Y-%m-%d") in dates_in_df.values:
+            indicator_value = interface.get_stockstats_indicator(
+                symbol, indicator, curr_date.strftime("%Y-%m-%d"), False
+            )
+            ind_string += f"{curr_date.strftime('%Y-%m-%d')}: {indicator_value}\n"
+        curr_date = curr_date - relativedelta(days=1)
+
+    return (
+        f"## {indicator} values from {before.strftime('%Y-%m-%d')} to {end_date}:\n\n"
+        + ind_string
+        + "\n\n"
+        + interface.STOCKSTATS_INDICATOR_DESCRIPTIONS.get(indicator, "No description available.")
+    )
+
+
+def test_window_matches_by_day():
+    """测试窗口引擎与逐日实现输出完全一致"""
+    print("🧪 测试指标窗口引擎一致性")
+    print("=" * 50)
+
+    original_data_dir = interface.DATA_DIR
+    with tempfile.TemporaryDirectory() as temp_dir:
+        interface.DATA_DIR = temp_dir
+        try:
+            symbol = _write_price_fixture(temp_dir)
+
+            for indicator in ["close_50_sma", "macd", "rsi", "boll_ub", "atr", "mfi"]:
+                expected = _window_by_day(symbol, indicator, "2024-06-14", 30)
+                actual = interface.get_stock_stats_indicators_window(
+                    symbol, indicator, "2024-06-14", 30, False
+                )
+                assert actual == expected, f"{indicator} 窗口输出不一致"
+                print(f"✅ {indicator} 输出一致")
+
+            # 窗口结束日为周末时也应只包含交易日
+            report = interface.get_stock_stats_indicators_window(
+                symbol, "rsi", "2024-06-16", 5, False
+            )
+            assert "\n2024-06-16: " not in report, "周末不应出现在离线窗口中"
+            assert "\n2024-06-14: " in report, "应包含最近的交易日"
+        finally:
+            interface.DATA_DIR = original_data_dir
+
+
+def test_window_benchmark():
+    """对比窗口引擎与逐日实现的耗时"""
+    print("\n⏱️ 指标窗口性能对比")
+    print("=" * 50)
+
+    original_data_dir = interface.DATA_DIR
+    with tempfile.TemporaryDirectory() as temp_dir:
+        interface.DATA_DIR = temp_dir
+        try:
+            symbol = _write_price_fixture(temp_dir)
+
+            start = time.perf_counter()
+            _window_by_day(symbol, "close_50_sma", "2024-06-14", 60)
+            by_day_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            interface.get_stock_stats_indicators_window(
+                symbol, "close_50_sma", "2024-06-14", 60, False
+            )
+            window_time = time.perf_counter() - start
+
+            print(f"📊 逐日计算: {by_day_time:.3f}s")
+            print(f"📊 窗口引擎: {window_time:.3f}s")
+            print(f"🚀 加速比: {by_day_time / max(window_time, 1e-9):.1f}x")
+
+            assert window_time < by_day_time, "窗口引擎应快于逐日计算"
+        finally:
+            interface.DATA_DIR = original_data_dir
+
+
+def main():
+    """主测试函数"""
+    try:
+        test_window_matches_by_day()
+        test_window_benchmark()
+
+        print("\n🎉 所有测试通过！")
+        return True
+
+    except Exception as e:
+        print(f"\n❌ 测试失败: {e}")
+        import traceback
+        print(f"错误详情: {traceback.format_exc()}")
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
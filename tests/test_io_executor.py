@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+共享I/O线程池测试
+验证并发和排队上限、超时后排队调用被取消/执行中调用被标记放弃、
+工作线程中的HTTP请求自动带超时，以及嵌套调用不占用额外线程
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import requests
+from requests.adapters import BaseAdapter
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from tradingagents.dataflows.io_executor import IOExecutor, IOExecutorBusy, IOTimeoutError
+
+
+def _wait_until(predicate, limit: float = 2.0):
+    end = time.monotonic() + limit
+    while not predicate() and time.monotonic() < end:
+        time.sleep(0.005)
+    assert predicate(), "等待条件超时"
+
+
+def test_bounded_admission_and_metrics():
+    """测试同时执行数和排队数受限，满了之后在截止时间内拒绝"""
+    print("🧪 测试有界提交")
+
+    executor = IOExecutor(max_workers=2, max_queue=1)
+    release = threading.Event()
+    results = []
+    callers = [threading.Thread(target=lambda: results.append(executor.run(release.wait, 2)))
+               for _ in range(3)]
+    try:
+        for caller in callers:
+            caller.start()
+        _wait_until(lambda: executor.get_stats()['queue_depth'] == 1)
+        stats = executor.get_stats()
+        assert stats['in_flight'] == 2 and stats['submitted'] == 3, stats
+
+        try:
+            executor.run(lambda: "late", timeout=0.05)
+            assert False, "线程池已满时应拒绝"
+        except IOExecutorBusy:
+            pass
+    finally:
+        release.set()
+        for caller in callers:
+            caller.join()
+
+    stats = executor.get_stats()
+    assert results == [True] * 3
+    assert stats['completed'] == 3 and stats['rejected'] == 1 and stats['in_flight'] == 0, stats
+    executor.shutdown()
+    print("✅ 有界提交测试通过")
+
+
+def test_timeout_cancels_queued_and_abandons_running():
+    """测试超时后排队中的调用被取消、执行中的调用被标记放弃直到结束"""
+    print("🧪 测试超时处理")
+
+    executor = IOExecutor(max_workers=1, max_queue=4)
+    release = threading.Event()
+    started = []
+
+    def slow(tag):
+        started.append(tag)
+        release.wait(2)
+        return tag
+
+    try:
+        executor.run(slow, 'running', timeout=0.05)
+        assert False, "应超时"
+    except IOTimeoutError:
+        pass
+    try:
+        executor.run(slow, 'queued', timeout=0.05)
+        assert False, "应超时"
+    except IOTimeoutError:
+        pass
+
+    stats = executor.get_stats()
+    assert stats['timeouts'] == 2 and stats['cancelled'] == 1, stats
+    assert stats['abandoned'] == 1 and stats['queue_depth'] == 0, stats
+
+    release.set()
+    _wait_until(lambda: executor.get_stats()['in_flight'] == 0)
+    assert started == ['running'], "被取消的排队调用不应执行"
+    assert executor.get_stats()['abandoned'] == 0
+    assert executor.run(lambda: 'ok', timeout=1) == 'ok', "放弃的调用结束后应释放空位"
+    executor.shutdown()
+    print("✅ 超时处理测试通过")
+
+
+class _RecordingAdapter(BaseAdapter):
+    """记录请求超时参数，不发出真实请求"""
+
+    def __init__(self):
+        super().__init__()
+        self.timeouts = []
+
+    def send(self, request, timeout=None, **kwargs):
+        self.timeouts.append(timeout)
+        response = requests.Response()
+        response.status_code = 200
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+def test_http_timeout_in_workers():
+    """测试工作线程中未指定超时的请求自动带超时，截止时间过后缩短为1秒"""
+    print("🧪 测试HTTP超时")
+
+    executor = IOExecutor(max_workers=2, max_queue=2, socket_timeout=7)
+    session = requests.Session()
+    adapter = _RecordingAdapter()
+    session.mount('http://', adapter)
+
+    session.get('http://example.invalid/outside')
+    executor.run(session.get, 'http://example.invalid/default')
+    executor.run(session.get, 'http://example.invalid/deadline', timeout=2)
+    executor.run(session.get, 'http://example.invalid/explicit', timeout=2.5)
+
+    release = threading.Event()
+
+    def abandoned_call():
+        release.wait(2)
+        session.get('http://example.invalid/after-deadline')
+
+    try:
+        executor.run(abandoned_call, timeout=0.05)
+    except IOTimeoutError:
+        pass
+    release.set()
+    _wait_until(lambda: executor.get_stats()['in_flight'] == 0)
+
+    outside, default, deadline, explicit, after = adapter.timeouts
+    assert outside is None, "线程池之外的请求不受影响"
+    assert default == 7 and 1 < deadline <= 2 and explicit <= 2.5, adapter.timeouts
+    assert after == 1.0, "截止时间过后的请求应使用最短超时"
+    executor.shutdown()
+    print("✅ HTTP超时测试通过")
+
+
+def test_nested_run_is_inline():
+    """测试工作线程中的嵌套调用直接执行，不会因线程池占满而死锁"""
+    print("🧪 测试嵌套调用")
+
+    executor = IOExecutor(max_workers=1, max_queue=0)
+
+    def outer():
+        return executor.run(lambda: threading.current_thread().name, timeout=1)
+
+    assert executor.run(outer, timeout=1).startswith('data-io')
+    assert executor.get_stats()['submitted'] == 1
+    executor.shutdown()
+    print("✅ 嵌套调用测试通过")
+
+
+def main():
+    """主测试函数"""
+    try:
+        test_bounded_admission_and_metrics()
+        test_timeout_cancels_queued_and_abandons_running()
+        test_http_timeout_in_workers()
+        test_nested_run_is_inline()
+
+        print("\n🎉 所有测试通过！")
+        return True
+
+    except Exception as e:
+        print(f"\n❌ 测试失败: {e}")
+        import traceback
+        print(f"错误详情: {traceback.format_exc()}")
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
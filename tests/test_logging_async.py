@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+异步日志与追踪日志采样测试
+验证异步模式下写日志在后台线程完成、不可变参数惰性格式化、队列满时丢弃低级别日志，
+以及按分类标签/日志器名称的采样和限流
+"""
+
+import logging
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from tradingagents.utils.logging_manager import (
+    AsyncQueueHandler, LazyArg, SamplingFilter, TradingAgentsLogger
+)
+
+
+class _CaptureHandler(logging.Handler):
+    """记录写日志的线程、到达时的参数和格式化后的消息"""
+
+    def __init__(self, gate: threading.Event = None):
+        super().__init__()
+        self.gate = gate
+        self.records = []
+
+    def emit(self, record):
+        if self.gate is not None:
+            self.gate.wait(2)
+        self.records.append((threading.current_thread().name, record.args, self.format(record)))
+
+
+def _make_record(name: str, level: int, msg: str, *args) -> logging.LogRecord:
+    return logging.LogRecord(name, level, __file__, 0, msg, args or None, None)
+
+
+def test_async_handler_writes_in_background():
+    """测试日志在后台线程写出，不可变参数留到后台格式化，LazyArg在入队前求值"""
+    print("🧪 测试异步处理器")
+
+    capture = _CaptureHandler()
+    handler = AsyncQueueHandler([capture])
+    logger = logging.getLogger('test_logging_async.background')
+    logger.propagate = False
+    logger.addHandler(handler)
+    calls = []
+    try:
+        logger.info("股票 %s 耗时 %.1f秒", '000001', 1.25)
+        logger.info("数据列名: %s", LazyArg(lambda: calls.append(1) or ['open', 'close']))
+        handler.stop()
+    finally:
+        logger.removeHandler(handler)
+
+    (thread1, args1, msg1), (thread2, args2, msg2) = capture.records
+    assert thread1 != threading.current_thread().name, "应在后台线程写日志"
+    assert args1 == ('000001', 1.25) and msg1 == "股票 000001 耗时 1.2秒"
+    assert args2 is None and msg2 == "数据列名: ['open', 'close']" and calls == [1]
+    print("✅ 异步处理器测试通过")
+
+
+def test_queue_full_drops_low_levels():
+    """测试队列满时丢弃INFO日志并计数，WARNING不丢弃"""
+    print("🧪 测试队列满")
+
+    release = threading.Event()
+    capture = _CaptureHandler(release)
+    handler = AsyncQueueHandler([capture], queue_size=2)
+    try:
+        for i in range(20):
+            handler.handle(_make_record('test', logging.INFO, "trace %d", i))
+        assert handler.dropped >= 17, handler.dropped
+        release.set()
+        handler.handle(_make_record('test', logging.WARNING, "warning kept"))
+        handler.stop()
+    finally:
+        release.set()
+
+    messages = [msg for _, _, msg in capture.records]
+    assert messages[-1] == "warning kept" and len(messages) == 20 - handler.dropped + 1
+    print(f"✅ 队列满测试通过（丢弃{handler.dropped}条）")
+
+
+def test_queue_full_warning_written_synchronously():
+    """测试队列满且1秒内腾不出空位时，WARNING在调用线程直接写出而不是丢弃"""
+    print("🧪 测试队列满时WARNING同步写出")
+
+    gate = threading.Event()
+    capture = _CaptureHandler(gate)
+    handler = AsyncQueueHandler([capture], queue_size=1)
+    caller = threading.Thread(name='warning-caller', target=lambda: handler.handle(
+        _make_record('test', logging.WARNING, "warning under pressure")))
+    try:
+        handler.handle(_make_record('test', logging.INFO, "blocking"))
+        while handler.queue.qsize():
+            time.sleep(0.005)
+        handler.handle(_make_record('test', logging.INFO, "queued"))
+        caller.start()
+        time.sleep(1.2)
+        gate.set()
+        caller.join(2)
+        handler.stop()
+    finally:
+        gate.set()
+
+    by_message = {msg: thread for thread, _, msg in capture.records}
+    assert handler.dropped == 0 and handler.sync_fallbacks == 1
+    assert by_message["warning under pressure"] == 'warning-caller', "应在调用线程写出"
+    assert set(by_message) == {"blocking", "queued", "warning under pressure"}
+    print("✅ 队列满时WARNING同步写出测试通过")
+
+
+def test_sampling_rules():
+    """测试分类标签限流、日志器采样、WARNING始终保留，以及多个处理器只判断一次"""
+    print("🧪 测试采样与限流")
+
+    sampling = SamplingFilter(categories={'股票代码追踪': {'rate': 1, 'burst': 5}},
+                              loggers={'dataflows': {'sample': 0.25}})
+
+    passed = [sampling.filter(_make_record('agents', logging.INFO, "🔍 [股票代码追踪] %s", i)) for i in range(100)]
+    assert sum(passed) == 5, "超过突发上限后应被限流"
+    assert sampling.filter(_make_record('agents', logging.WARNING, "🔍 [股票代码追踪] 警告"))
+
+    passed = [sampling.filter(_make_record('dataflows.tushare', logging.INFO, "msg")) for _ in range(100)]
+    assert sum(passed) == 25, "子日志器应按比例采样"
+    assert all(sampling.filter(_make_record('web', logging.INFO, "msg")) for _ in range(10)), "无规则的日志不受影响"
+
+    record = _make_record('dataflows', logging.INFO, "msg")
+    decisions = {sampling.filter(record) for _ in range(4)}
+    assert len(decisions) == 1 and sampling.get_stats()['dataflows']['passed'] + \
+        sampling.get_stats()['dataflows']['dropped'] == 101
+
+    stats = sampling.get_stats()
+    assert stats['[股票代码追踪]'] == {'passed': 5, 'dropped': 95}, stats
+    print("✅ 采样与限流测试通过")
+
+
+def test_manager_async_mode():
+    """测试 TradingAgentsLogger 异步模式写文件并按配置采样追踪日志"""
+    print("🧪 测试日志管理器异步模式")
+
+    root = logging.getLogger()
+    saved_handlers, saved_level = root.handlers[:], root.level
+    with tempfile.TemporaryDirectory() as temp_dir:
+        config = {
+            'level': 'INFO',
+            'format': {'console': '%(message)s', 'file': '%(levelname)s | %(message)s'},
+            'handlers': {
+                'console': {'enabled': False, 'colored': False, 'level': 'INFO'},
+                'file': {'enabled': True, 'level': 'INFO', 'max_size': '10MB',
+                         'backup_count': 1, 'directory': temp_dir},
+                'structured': {'enabled': False, 'level': 'INFO', 'directory': temp_dir},
+            },
+            'loggers': {},
+            'docker': {'enabled': False, 'stdout_only': True},
+            'async': {'enabled': True, 'queue_size': 1000},
+            'sampling': {'categories': {'Tushare详细日志': {'rate': 1, 'burst': 10}}},
+        }
+        try:
+            manager = TradingAgentsLogger(config)
+            logger = manager.get_logger('test_logging_async.manager')
+            for i in range(200):
+                logger.info("🔍 [Tushare详细日志] 第%d次调用", i)
+            logger.info("✅ 获取数据成功: %s", '000001')
+            stats = manager.get_logging_stats()
+            manager.async_handler.stop()
+        finally:
+            for handler in root.handlers:
+                handler.close()
+            root.handlers[:] = saved_handlers
+            root.setLevel(saved_level)
+
+        lines = (Path(temp_dir) / 'tradingagents.log').read_text(encoding='utf-8').splitlines()
+    assert stats['async'] and stats['sampling']['[Tushare详细日志]']['dropped'] == 190, stats
+    assert len(lines) == 11 and lines[-1] == "INFO | ✅ 获取数据成功: 000001", lines[-3:]
+    print("✅ 日志管理器异步模式测试通过")
+
+
+def main():
+    """主测试函数"""
+    try:
+        test_async_handler_writes_in_background()
+        test_queue_full_drops_low_levels()
+        test_queue_full_warning_written_synchronously()
+        test_sampling_rules()
+        test_manager_async_mode()
+
+        print("\n🎉 所有测试通过！")
+        return True
+
+    except Exception as e:
+        print(f"\n❌ 测试失败: {e}")
+        import traceback
+        print(f"错误详情: {traceback.format_exc()}")
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+结构化行情结果测试
+验证各数据源日线整理为标准列、报价字段、错误作为字段携带、子区间截取，
+以及二进制载荷缓存往返
+"""
+
+import pickle
+import sys
+import tempfile
+import zlib
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from tradingagents.dataflows.db_cache_manager import unpack_cache_value
+from tradingagents.dataflows.market_data import StockDataResult, normalize_ohlcv
+
+
+def _make_akshare_frame(days: int = 120) -> pd.DataFrame:
+    dates = pd.bdate_range('2024-01-02', periods=days)
+    close = 10 + np.cumsum(np.random.default_rng(7).normal(0, 0.1, days))
+    return pd.DataFrame({
+        '日期': dates.strftime('%Y-%m-%d'), '开盘': close - 0.05, '收盘': close,
+        '最高': close + 0.1, '最低': close - 0.1, '成交量': np.arange(days) + 10000,
+    })
+
+
+def test_normalize_sources():
+    """测试AKShare中文列、Tushare列和日期索引都整理为标准列"""
+    print("🧪 测试日线列标准化")
+
+    akshare = normalize_ohlcv(_make_akshare_frame(5))
+    assert list(akshare.columns) == ['date', 'open', 'high', 'low', 'close', 'volume']
+    assert pd.api.types.is_datetime64_any_dtype(akshare['date'])
+
+    tushare = normalize_ohlcv(pd.DataFrame({
+        'trade_date': ['20240103', '20240102'], 'open': [1, 2], 'high': [2, 3], 'low': [0, 1],
+        'close': [1.5, 2.5], 'vol': [100, 200], 'pct_chg': [1.0, -1.0],
+    }))
+    assert list(tushare['close']) == [2.5, 1.5], "应按日期升序"
+    assert 'pct_change' in tushare.columns and tushare['volume'].dtype == float
+
+    indexed = pd.DataFrame({'Open': [1.0], 'High': [1.0], 'Low': [1.0], 'Close': [1.0]},
+                           index=pd.DatetimeIndex(['2024-01-02']))
+    indexed.columns = [c.lower() for c in indexed.columns]
+    normalized = normalize_ohlcv(indexed)
+    assert normalized['date'].iloc[0] == pd.Timestamp('2024-01-02')
+    assert list(normalized['volume']) == [0.0], "缺少成交量时补0"
+    print("✅ 日线列标准化测试通过")
+
+
+def test_quote_render_and_failure():
+    """测试报价字段直接可读，失败结果渲染为错误文本"""
+    print("🧪 测试报价与渲染")
+
+    result = StockDataResult.from_ohlcv('000001', '2024-01-02', '2024-06-14', _make_akshare_frame(),
+                                        'akshare', name='平安银行', fallback_from='tushare')
+    closes = result.ohlcv['close']
+    assert result.ok and result.quote.price == closes.iloc[-1]
+    assert abs(result.quote.change - (closes.iloc[-1] - closes.iloc[-2])) < 1e-9
+
+    text = result.render()
+    assert text.startswith('📊 平安银行(000001) - AKShare数据')
+    assert f"💰 最新价格: ¥{result.quote.price:.2f}" in text and '最新5天数据:' in text
+    assert 'tushare不可用' in text
+
+    failed = StockDataResult.from_ohlcv('000001', '2024-01-02', '2024-06-14', pd.DataFrame(), 'akshare')
+    assert not failed.ok and failed.quote is None
+    assert failed.render().startswith('❌ ')
+    print("✅ 报价与渲染测试通过")
+
+
+def test_subset_and_payload():
+    """测试子区间截取和二进制载荷往返"""
+    print("🧪 测试子区间与载荷")
+
+    result = StockDataResult.from_ohlcv('000001', '2024-01-02', '2024-06-14', _make_akshare_frame(),
+                                        'akshare', name='平安银行')
+    part = result.subset('2024-03-01', '2024-03-29')
+    assert part.ohlcv['date'].min() >= pd.Timestamp('2024-03-01') and len(part.ohlcv) == 21
+    assert part.quote.price == part.ohlcv['close'].iloc[-1]
+    assert result.subset('2023-12-01', '2024-03-29') is None, "超出覆盖范围应返回None"
+
+    payload = result.to_payload()
+    meta, _ = unpack_cache_value(payload)
+    assert meta['ohlcv_format'] == 'arrow_ipc' and meta['quote']['price'] == result.quote.price
+    restored = StockDataResult.from_payload(payload)
+    pd.testing.assert_frame_equal(restored.ohlcv, result.ohlcv)
+    assert restored.quote == result.quote and restored.provenance.cached
+    assert restored.render() == result.render()
+
+    # 旧版pickle载荷不反序列化，按读取失败处理
+    legacy = zlib.compress(pickle.dumps({'version': 1, 'symbol': '000001'}))
+    try:
+        StockDataResult.from_payload(legacy)
+        assert False, "旧版pickle载荷应读取失败"
+    except (ValueError, UnicodeDecodeError):
+        pass
+    print(f"✅ 子区间与载荷测试通过（载荷{len(payload)}字节）")
+
+
+def test_tdx_indicators_rendered():
+    """测试TDX的首字母大写列可以标准化，技术指标和实时行情随结果保留并渲染"""
+    print("🧪 测试TDX技术指标")
+
+    from tradingagents.dataflows import tdx_utils
+    from tradingagents.dataflows.data_source_manager import ChinaDataSource, DataSourceManager
+
+    bars = _make_akshare_frame(30)
+    bars = pd.DataFrame({'Open': bars['开盘'].values, 'High': bars['最高'].values, 'Low': bars['最低'].values,
+                         'Close': bars['收盘'].values, 'Volume': bars['成交量'].values},
+                        index=pd.DatetimeIndex(bars['日期'], name='datetime'))
+
+    class _FakeTdx:
+        calls = []
+
+        def get_history_with_indicators(self, symbol, start_date, end_date):
+            self.calls.append('bars')
+            return bars, {'MA5': np.float64(10.5), 'RSI': 55.0, 'MACD': 0.01234, 'MA20': None}
+
+        def get_real_time_data(self, symbol):
+            return {'price': 10.8, 'change_percent': 1.5, 'volume': 12345, 'update_time': '2024-02-09 15:00:00'}
+
+    fake = _FakeTdx()
+    original = tdx_utils.get_tdx_provider
+    tdx_utils.get_tdx_provider = lambda: fake
+    try:
+        manager = object.__new__(DataSourceManager)  # 不做数据源检测
+        data, extras = manager._fetch_ohlcv(ChinaDataSource.TDX, '000001', '2024-01-02', '2024-02-09')
+    finally:
+        tdx_utils.get_tdx_provider = original
+
+    assert fake.calls == ['bars'], "历史数据和技术指标应只请求一次K线"
+    result = StockDataResult.from_ohlcv('000001', '2024-01-02', '2024-02-09', data, 'tdx')
+    result.fundamentals.update(extras)
+    assert result.ok and result.quote.price == bars['Close'].iloc[-1]
+    assert extras['technical_indicators'] == {'MA5': 10.5, 'RSI': 55.0, 'MACD': 0.01234}
+
+    text = result.render()
+    assert '🔍 技术指标:' in text and 'MA5: 10.50' in text and 'MACD: 0.0123' in text
+    assert '当前价格: ¥10.80' in text
+    restored = StockDataResult.from_payload(result.to_payload())
+    assert restored.render() == text, "技术指标应随载荷缓存保留"
+    print("✅ TDX技术指标测试通过")
+
+
+def test_cache_payload_round_trip():
+    """测试StockDataCache以二进制载荷保存和读取结构化结果"""
+    print("🧪 测试载荷缓存")
+
+    from tradingagents.dataflows.cache_manager import StockDataCache
+
+    result = StockDataResult.from_ohlcv('600000', '2024-01-02', '2024-06-14', _make_akshare_frame(),
+                                        'tushare', name='浦发银行')
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = StockDataCache(temp_dir)
+        cache_key = cache.save_stock_data('600000', result, '2024-01-02', '2024-06-14', 'unified')
+        assert list(cache.china_stock_dir.glob('*.payload')), "应生成载荷文件"
+        assert cache.catalog.get(cache_key)['file_format'] == 'payload'
+
+        loaded = cache.load_stock_data(cache_key)
+        assert isinstance(loaded, StockDataResult) and loaded.name == '浦发银行'
+        pd.testing.assert_frame_equal(loaded.ohlcv, result.ohlcv)
+        assert cache.find_cached_stock_data('600000', '2024-01-02', '2024-06-14', 'unified') == cache_key
+    print("✅ 载荷缓存测试通过")
+
+
+def main():
+    """主测试函数"""
+    try:
+        test_normalize_sources()
+        test_quote_render_and_failure()
+        test_subset_and_payload()
+        test_tdx_indicators_rendered()
+        test_cache_payload_round_trip()
+
+        print("\n🎉 所有测试通过！")
+        return True
+
+    except Exception as e:
+        print(f"\n❌ 测试失败: {e}")
+        import traceback
+        print(f"错误详情: {traceback.format_exc()}")
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
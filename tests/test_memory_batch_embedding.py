@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+批量写入记忆测试
+验证add_situations按批请求embedding、批次失败时逐条降级，以及分块写入Chroma
+"""
+
+import os
+import sys
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from tradingagents.agents.utils import memory as memory_module
+from tradingagents.agents.utils.memory import EmbeddingCache, FinancialSituationMemory, _EmbeddingRateLimiter
+
+
+class _FakeBatchClient:
+    """支持列表输入的OpenAI兼容embedding客户端，记录每次请求的文本条数"""
+
+    def __init__(self, fail_batches: bool = False):
+        self.requests = []
+        self.fail_batches = fail_batches
+        self.embeddings = self
+        self._lock = threading.Lock()
+
+    def create(self, model, input):
+        texts = input if isinstance(input, list) else [input]
+        with self._lock:
+            self.requests.append(len(texts))
+        if self.fail_batches and isinstance(input, list):
+            raise RuntimeError("batch not supported")
+        # 乱序返回，验证按index还原顺序
+        data = [SimpleNamespace(index=i, embedding=[float(int(t.split()[-1])), 1.0]) for i, t in enumerate(texts)]
+        return SimpleNamespace(data=list(reversed(data)))
+
+
+def _make_memory(name: str, client) -> FinancialSituationMemory:
+    original_key = os.environ.get("OPENAI_API_KEY")
+    os.environ["OPENAI_API_KEY"] = "test-key"
+    try:
+        memory = FinancialSituationMemory(name, {"llm_provider": "ollama", "backend_url": "http://localhost:11434/v1"})
+    finally:
+        if original_key is None:
+            os.environ.pop("OPENAI_API_KEY")
+        else:
+            os.environ["OPENAI_API_KEY"] = original_key
+    memory.client = client
+    return memory
+
+
+def test_batched_add_situations():
+    """测试批量请求embedding并分块写入Chroma"""
+    print("🧪 测试批量写入记忆")
+
+    memory_module._embedding_cache = EmbeddingCache(max_items=4096)
+    memory_module._embedding_rate_limiter = _EmbeddingRateLimiter(0)
+    client = _FakeBatchClient()
+    memory = _make_memory("batch_embedding_add", client)
+    memory.CHROMA_ADD_BATCH_SIZE = 300
+
+    situations = [(f"situation {i}", f"advice {i}") for i in range(1050)]
+    # 重复文本只请求一次
+    situations.append(("situation 7", "advice again"))
+    memory.add_situations(situations)
+
+    assert sum(client.requests) == 1050, f"去重后应请求1050条，实际{sum(client.requests)}"
+    assert max(client.requests) == memory.OPENAI_BATCH_SIZE and len(client.requests) == 11, f"批次异常: {client.requests}"
+    assert memory.situation_collection.count() == 1051, "全部情况应写入Chroma"
+
+    stored = memory.situation_collection.get(ids=["0", "1049"], include=["embeddings", "metadatas"])
+    by_id = dict(zip(stored["ids"], stored["embeddings"]))
+    assert list(by_id["1049"]) == [1049.0, 1.0], "embedding应与文本一一对应"
+
+    matches = memory.get_memories("situation 1049", n_matches=1)
+    assert matches[0]["recommendation"] == "advice 1049"
+    assert len(client.requests) == 11, "已写入的文本查询时应命中缓存"
+    print(f"✅ 批量写入测试通过: {len(client.requests)}次请求")
+
+
+def test_batch_failure_falls_back():
+    """测试批量请求失败时逐条请求"""
+    print("🧪 测试批量失败降级")
+
+    memory_module._embedding_cache = EmbeddingCache(max_items=64)
+    memory_module._embedding_rate_limiter = _EmbeddingRateLimiter(0)
+    client = _FakeBatchClient(fail_batches=True)
+    memory = _make_memory("batch_embedding_fallback", client)
+
+    embeddings = memory.get_embeddings([f"text {i}" for i in range(5)])
+    assert [e[0] for e in embeddings] == [0.0, 1.0, 2.0, 3.0, 4.0]
+    assert client.requests == [5, 1, 1, 1, 1, 1], f"应先批量后逐条: {client.requests}"
+
+    # 逐条降级的请求同样经过限流器
+    class _CountingLimiter(_EmbeddingRateLimiter):
+        def __init__(self):
+            super().__init__(0)
+            self.waits = 0
+
+        def wait(self):
+            self.waits += 1
+
+    limiter = memory_module._embedding_rate_limiter = _CountingLimiter()
+    memory.get_embeddings([f"text {i}" for i in range(10, 14)])
+    assert limiter.waits == 1 + 4, f"批量1次 + 逐条4次，实际{limiter.waits}次"
+    print("✅ 批量失败降级测试通过")
+
+
+def main():
+    """主测试函数"""
+    original_cache = memory_module._embedding_cache
+    original_limiter = memory_module._embedding_rate_limiter
+    try:
+        test_batched_add_situations()
+        test_batch_failure_falls_back()
+
+        print("\n🎉 所有测试通过！")
+        return True
+
+    except Exception as e:
+        print(f"\n❌ 测试失败: {e}")
+        import traceback
+        print(f"错误详情: {traceback.format_exc()}")
+        return False
+    finally:
+        memory_module._embedding_cache = original_cache
+        memory_module._embedding_rate_limiter = original_limiter
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
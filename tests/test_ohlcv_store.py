@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+OHLCV行情存储测试
+验证规范历史文件、尾部增量追加、旧版缓存迁移和内存LRU缓存
+"""
+
+import os
+import sys
+import time
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from tradingagents.dataflows import ohlcv_store
+from tradingagents.dataflows.ohlcv_store import OHLCVStore
+
+
+def _make_history(end: pd.Timestamp) -> pd.DataFrame:
+    """生成截至 end（不含）的合成日线，模拟 yf.download 的返回格式"""
+    dates = pd.bdate_range(end - pd.DateOffset(years=16), end - pd.Timedelta(days=1))
+    close = 100 + np.cumsum(np.random.default_rng(7).normal(0, 1, len(dates)))
+    data = pd.DataFrame({
+        "Open": close, "High": close + 1, "Low": close - 1, "Close": close,
+        "Volume": np.arange(len(dates)) + 1000,
+    }, index=pd.DatetimeIndex(dates, name="Date"))
+    return data
+
+
+class _FakeDownloader:
+    """记录调用参数的 yf.download 替身"""
+
+    def __init__(self, history: pd.DataFrame):
+        self.history = history
+        self.calls = []
+
+    def __call__(self, symbol, start, end, **kwargs):
+        self.calls.append((start, end))
+        mask = (self.history.index >= pd.Timestamp(start)) & (self.history.index < pd.Timestamp(end))
+        return self.history[mask].copy()
+
+
+def _with_fake_download(history: pd.DataFrame):
+    fake = _FakeDownloader(history)
+    original = ohlcv_store.yf.download
+    ohlcv_store.yf.download = fake
+    return fake, original
+
+
+def test_full_download_then_memory_hit():
+    """测试首次全量下载并写入规范历史，重复调用命中内存缓存"""
+    print("🧪 测试首次下载与内存缓存")
+
+    today = pd.Timestamp.today().normalize()
+    fake, original = _with_fake_download(_make_history(today))
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            store = OHLCVStore(cache_dir=temp_dir)
+
+            first = store.get_indicator("TEST", "rsi", temp_dir, online=True)
+            second = store.get_indicator("TEST", "close_10_ema", temp_dir, online=True)
+
+            assert len(fake.calls) == 1, "同一天内只应下载一次"
+            assert (Path(temp_dir) / "TEST-YFin-data.csv").exists(), "应生成规范历史文件"
+            assert len(list(Path(temp_dir).glob("*.csv"))) == 1, "不应生成按日期命名的重复文件"
+            assert store.get_stats()["memory_hits"] == 1, "第二次调用应命中内存缓存"
+            assert list(first.columns) == ["Date", "rsi"]
+            assert list(second.columns) == ["Date", "close_10_ema"]
+            print("✅ 首次下载与内存缓存测试通过")
+    finally:
+        ohlcv_store.yf.download = original
+
+
+def test_incremental_tail_append():
+    """测试次日刷新只下载尾部K线"""
+    print("🧪 测试尾部增量追加")
+
+    today = pd.Timestamp.today().normalize()
+    full_history = _make_history(today)
+    fake, original = _with_fake_download(full_history)
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # 预先写入缺少最后5根K线的规范历史，并把修改时间设为昨天
+            stale = full_history.iloc[:-5].reset_index()
+            history_file = Path(temp_dir) / "TEST-YFin-data.csv"
+            stale.to_csv(history_file, index=False)
+            yesterday = time.time() - 86400
+            os.utime(history_file, (yesterday, yesterday))
+
+            store = OHLCVStore(cache_dir=temp_dir)
+            data = store.load_history("TEST")
+
+            assert len(fake.calls) == 1, "应只发起一次尾部请求"
+            tail_start = pd.Timestamp(fake.calls[0][0])
+            assert tail_start == stale["Date"].max(), "尾部请求应从最后一根已存K线开始"
+            assert data["Date"].iloc[-1] == full_history.index[-1].strftime("%Y-%m-%d"), "应追加缺失K线"
+            assert store.get_stats()["tail_appends"] == 1
+
+            # 当天再次加载不应再请求
+            store.load_history("TEST")
+            assert len(fake.calls) == 1, "当天已刷新过，不应再请求"
+            print("✅ 尾部增量追加测试通过")
+    finally:
+        ohlcv_store.yf.download = original
+
+
+def test_legacy_files_migrated():
+    """测试旧版按日期命名的缓存文件被合并，更早的K线不丢失，复权基准不同的文件保留"""
+    print("🧪 测试旧版缓存迁移")
+
+    today = pd.Timestamp.today().normalize()
+    full_history = _make_history(today)
+    fake, original = _with_fake_download(full_history)
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            def write_legacy(start, end, data):
+                legacy = data[(data.index >= start) & (data.index < end)].reset_index()
+                legacy.to_csv(Path(temp_dir) / f"TEST-YFin-data-{start}-{end}.csv", index=False)
+
+            first_date = full_history.index[0].strftime("%Y-%m-%d")
+            write_legacy("2015-01-01", "2025-01-02", full_history)
+            write_legacy("2015-01-01", "2025-01-01", full_history)
+            write_legacy(first_date, "2016-01-01", full_history)  # 更早的历史，需并入
+            # 含更早K线但重叠日期收盘价不一致（复权基准不同），不合并
+            shifted = full_history * 0.5
+            shifted.index = shifted.index - pd.DateOffset(years=1)
+            write_legacy("2000-01-01", "2015-06-01", shifted)
+
+            store = OHLCVStore(cache_dir=temp_dir)
+            store.load_history("TEST")
+
+            remaining = sorted(p.name for p in Path(temp_dir).glob("*.csv"))
+            assert remaining == ["TEST-YFin-data-2000-01-01-2015-06-01.csv", "TEST-YFin-data.csv"], \
+                f"已合并的旧版文件应删除，基准不同的保留: {remaining}"
+            assert pd.Timestamp(fake.calls[0][0]) == pd.Timestamp("2025-01-01"), "应从最新旧版文件的末尾开始追加"
+
+            history = pd.read_csv(Path(temp_dir) / "TEST-YFin-data.csv", parse_dates=["Date"])
+            expected = full_history[full_history.index < "2025-01-02"]
+            assert history["Date"].iloc[0] == full_history.index[0], "更早文件中的K线应被合并"
+            assert history["Date"].is_unique and len(history) >= len(expected)
+            assert np.allclose(history.set_index("Date").loc[expected.index, "Close"], expected["Close"])
+            print("✅ 旧版缓存迁移测试通过")
+    finally:
+        ohlcv_store.yf.download = original
+
+
+def main():
+    """主测试函数"""
+    try:
+        test_full_download_then_memory_hit()
+        test_incremental_tail_append()
+        test_legacy_files_migrated()
+
+        print("\n🎉 所有测试通过！")
+        return True
+
+    except Exception as e:
+        print(f"\n❌ 测试失败: {e}")
+        import traceback
+        print(f"错误详情: {traceback.format_exc()}")
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
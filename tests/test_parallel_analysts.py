@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+并行分析师模式测试
+验证分析师并行执行、消息通道隔离，并在Bull Researcher前汇合
+"""
+
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from langchain_core.messages import AIMessage
+from langchain_core.tools import tool
+from langgraph.prebuilt import ToolNode
+
+from tradingagents.graph import setup as graph_setup
+from tradingagents.graph.setup import GraphSetup, ANALYST_REPORT_KEYS
+from tradingagents.graph.conditional_logic import ConditionalLogic
+from tradingagents.graph.propagation import Propagator
+
+ANALYST_DELAY = 0.5
+
+
+@tool
+def dummy_tool(ticker: str) -> str:
+    """Return placeholder data for a ticker."""
+    return f"data for {ticker}"
+
+
+def _make_stub_analyst(analyst_type, seen_messages):
+    """创建桩分析师：第一次调用发起工具调用，拿到工具结果后写报告"""
+    report_key = ANALYST_REPORT_KEYS[analyst_type]
+
+    def factory(llm, toolkit):
+        def node(state):
+            messages = state["messages"]
+            seen_messages[analyst_type] = [m.content for m in messages]
+            if not any(m.type == "tool" for m in messages):
+                return {"messages": [AIMessage(
+                    content="",
+                    tool_calls=[{"name": "dummy_tool", "args": {"ticker": analyst_type}, "id": f"call_{analyst_type}"}],
+                )]}
+            time.sleep(ANALYST_DELAY)
+            return {"messages": [AIMessage(content=f"{analyst_type} done")], report_key: f"{analyst_type} report"}
+        return node
+    return factory
+
+
+def _patch_downstream_nodes():
+    """用桩节点替换研究员、交易员和风险团队，只保留状态推进逻辑"""
+    def bull(llm, memory):
+        def node(state):
+            debate = dict(state["investment_debate_state"])
+            debate.update(count=debate["count"] + 1, current_response="Bull: ok")
+            debate["reports_seen"] = [state[key] for key in ANALYST_REPORT_KEYS.values()]
+            return {"investment_debate_state": debate}
+        return node
+
+    def bear(llm, memory):
+        def node(state):
+            debate = dict(state["investment_debate_state"])
+            debate.update(count=debate["count"] + 1, current_response="Bear: ok")
+            return {"investment_debate_state": debate}
+        return node
+
+    def manager(llm, memory):
+        return lambda state: {"investment_plan": "plan"}
+
+    def trader(llm, memory):
+        return lambda state: {"trader_investment_plan": "trade"}
+
+    def debator(name):
+        def factory(llm):
+            def node(state):
+                risk = dict(state["risk_debate_state"])
+                risk.update(count=risk["count"] + 1, latest_speaker=name)
+                return {"risk_debate_state": risk}
+            return node
+        return factory
+
+    def risk_manager(llm, memory):
+        return lambda state: {"final_trade_decision": "HOLD"}
+
+    graph_setup.create_bull_researcher = bull
+    graph_setup.create_bear_researcher = bear
+    graph_setup.create_research_manager = manager
+    graph_setup.create_trader = trader
+    graph_setup.create_risky_debator = debator("Risky")
+    graph_setup.create_safe_debator = debator("Safe")
+    graph_setup.create_neutral_debator = debator("Neutral")
+    graph_setup.create_risk_manager = risk_manager
+
+
+def _build_graph(parallel: bool, seen_messages: dict):
+    graph_setup.create_market_analyst = _make_stub_analyst("market", seen_messages)
+    graph_setup.create_social_media_analyst = _make_stub_analyst("social", seen_messages)
+    graph_setup.create_news_analyst = _make_stub_analyst("news", seen_messages)
+    graph_setup.create_fundamentals_analyst = _make_stub_analyst("fundamentals", seen_messages)
+    _patch_downstream_nodes()
+
+    tool_nodes = {name: ToolNode([dummy_tool]) for name in ANALYST_REPORT_KEYS}
+    setup = GraphSetup(
+        None, None, None, tool_nodes,
+        None, None, None, None, None,
+        ConditionalLogic(),
+        {"parallel_analysts": parallel},
+    )
+    return setup.setup_graph(["market", "social", "news", "fundamentals"])
+
+
+def _run(graph):
+    propagator = Propagator()
+    state = propagator.create_initial_state("TEST", "2025-01-02")
+    start = time.perf_counter()
+    final_state = graph.invoke(state, **propagator.get_graph_args())
+    return final_state, time.perf_counter() - start
+
+
+def test_parallel_analysts():
+    """测试并行模式：报告齐全、消息隔离、耗时接近最慢分析师"""
+    print("🧪 测试并行分析师模式")
+    print("=" * 50)
+
+    originals = dict(vars(graph_setup))
+    try:
+        seen_messages = {}
+        graph = _build_graph(True, seen_messages)
+        final_state, elapsed = _run(graph)
+
+        for analyst_type, report_key in ANALYST_REPORT_KEYS.items():
+            assert final_state[report_key] == f"{analyst_type} report", f"缺少{report_key}"
+            # 每个分析师只能看到自己的工具调用
+            assert f"data for {analyst_type}" in seen_messages[analyst_type]
+            others = [t for t in ANALYST_REPORT_KEYS if t != analyst_type]
+            assert not any(f"data for {t}" in seen_messages[analyst_type] for t in others), "消息通道未隔离"
+
+        assert all(final_state["investment_debate_state"]["reports_seen"]), "Bull Researcher应在所有报告完成后运行"
+        assert final_state["final_trade_decision"] == "HOLD"
+        assert elapsed < ANALYST_DELAY * 2.5, f"并行模式耗时过长: {elapsed:.2f}s"
+        print(f"✅ 并行模式耗时: {elapsed:.2f}s")
+
+        seen_messages = {}
+        graph = _build_graph(False, seen_messages)
+        sequential_state, sequential_elapsed = _run(graph)
+        for report_key in ANALYST_REPORT_KEYS.values():
+            assert sequential_state[report_key] == final_state[report_key], "两种模式的报告应一致"
+        print(f"✅ 串行模式耗时: {sequential_elapsed:.2f}s")
+    finally:
+        vars(graph_setup).update(originals)
+
+
+def main():
+    """主测试函数"""
+    try:
+        test_parallel_analysts()
+
+        print("\n🎉 所有测试通过！")
+        return True
+
+    except Exception as e:
+        print(f"\n❌ 测试失败: {e}")
+        import traceback
+        print(f"错误详情: {traceback.format_exc()}")
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+定价表缓存测试
+验证定价只在文件变化时重新解析、批量成本计算与逐条计算一致
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from tradingagents.config.config_manager import ConfigManager
+
+
+def test_pricing_table_invalidated_by_mtime():
+    """测试定价表缓存复用，以及定价文件被外部修改后重新加载"""
+    print("🧪 测试定价表缓存")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        config_manager = ConfigManager(temp_dir)
+        table = config_manager.get_pricing_table()
+        assert config_manager.get_pricing_table() is table, "定价文件未变化时应复用定价表"
+        assert ("dashscope", "qwen-turbo") in table
+
+        with open(config_manager.pricing_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        data.append({"provider": "test_provider", "model_name": "test_model",
+                     "input_price_per_1k": 0.01, "output_price_per_1k": 0.02, "currency": "CNY"})
+        with open(config_manager.pricing_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        future = time.time() + 5
+        os.utime(config_manager.pricing_file, (future, future))
+
+        assert config_manager.calculate_cost("test_provider", "test_model", 1000, 1000) == 0.03, "应读取外部修改后的定价"
+        assert config_manager.calculate_cost("unknown", "model", 1000, 1000) == 0.0
+        print("✅ 定价表缓存测试通过")
+
+
+def test_bulk_cost_matches_single():
+    """测试批量成本计算与逐条计算一致"""
+    print("🧪 测试批量成本计算")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        config_manager = ConfigManager(temp_dir)
+        usage = pd.DataFrame({
+            'provider': ["dashscope", "deepseek", "unknown", "dashscope"],
+            'model_name': ["qwen-turbo", "deepseek-chat", "model", "qwen-plus"],
+            'input_tokens': [1200, 3000, 500, 0],
+            'output_tokens': [800, 1000, 500, 2500],
+        }, index=[10, 11, 12, 13])
+
+        costs = config_manager.calculate_costs(usage)
+        expected = [config_manager.calculate_cost(row.provider, row.model_name, row.input_tokens, row.output_tokens)
+                    for row in usage.itertuples()]
+        assert list(costs.index) == [10, 11, 12, 13], "结果应与输入行对齐"
+        assert all(abs(a - b) < 1e-9 for a, b in zip(costs, expected)), f"{list(costs)} != {expected}"
+        print("✅ 批量成本计算测试通过")
+
+
+def main():
+    """主测试函数"""
+    try:
+        test_pricing_table_invalidated_by_mtime()
+        test_bulk_cost_matches_single()
+
+        print("\n🎉 所有测试通过！")
+        return True
+
+    except Exception as e:
+        print(f"\n❌ 测试失败: {e}")
+        import traceback
+        print(f"错误详情: {traceback.format_exc()}")
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+增量进度事件测试
+验证进度更新只追加增量事件、快照按间隔写入、读取端按游标只读新增事件，以及完成结果的同步
+"""
+
+import json
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from web.utils import async_progress_tracker as tracker_module
+from web.utils.async_progress_tracker import AsyncProgressTracker, ProgressReader, get_progress_by_id, safe_serialize
+
+
+@contextmanager
+def _isolated_progress_dir():
+    """在临时目录中写入进度文件，使用文件存储并关闭定时快照"""
+    original_cwd = os.getcwd()
+    original_interval = tracker_module.SNAPSHOT_INTERVAL
+    original_redis = os.environ.pop("REDIS_ENABLED", None)
+    tracker_module.SNAPSHOT_INTERVAL = 3600
+    try:
+        with tempfile.TemporaryDirectory() as work_dir:
+            os.chdir(work_dir)
+            yield work_dir
+    finally:
+        os.chdir(original_cwd)
+        tracker_module.SNAPSHOT_INTERVAL = original_interval
+        if original_redis is not None:
+            os.environ["REDIS_ENABLED"] = original_redis
+
+
+def _expected(tracker) -> dict:
+    return json.loads(json.dumps(safe_serialize(tracker.progress_data), ensure_ascii=False))
+
+
+def _without_cursor(state: dict) -> dict:
+    return {k: v for k, v in state.items() if k != 'event_cursor'}
+
+
+def test_events_and_snapshots():
+    """测试增量事件追加与快照间隔"""
+    print("🧪 测试增量事件与快照")
+
+    with _isolated_progress_dir():
+        tracker = AsyncProgressTracker("stream_test", ["market", "news"], 2, "dashscope")
+        store = tracker.store
+        snapshot_path = Path(store.snapshot_path("stream_test"))
+        events_path = Path(store.events_path("stream_test"))
+        snapshot_mtime = snapshot_path.stat().st_mtime_ns
+
+        reader = ProgressReader()
+        assert _without_cursor(reader.read("stream_test")) == _expected(tracker)
+
+        for i in range(30):
+            tracker.update_progress(f"📊 处理中 {i}")
+        assert snapshot_path.stat().st_mtime_ns == snapshot_mtime, "快照间隔内不应重写快照"
+
+        lines = events_path.read_text(encoding="utf-8").splitlines()
+        assert all("steps" not in json.loads(line).get("data", {}) for line in lines), "步骤列表不应进入增量事件"
+        assert max(len(line) for line in lines[2:]) < len(snapshot_path.read_text(encoding="utf-8")), "增量事件应小于快照"
+
+        assert _without_cursor(reader.read("stream_test")) == _expected(tracker), "快照加增量应还原最新状态"
+        assert _without_cursor(ProgressReader().read("stream_test")) == _expected(tracker), "新读取端应得到相同状态"
+        print(f"✅ 增量事件测试通过: {len(lines)} 条事件, 快照 {snapshot_path.stat().st_size} 字节")
+
+
+def test_cursor_reads_only_new_events():
+    """测试按游标只读取新增事件，写了一半的行不被消费"""
+    print("🧪 测试游标读取")
+
+    with _isolated_progress_dir():
+        tracker = AsyncProgressTracker("cursor_test", ["market"], 1, "dashscope")
+        reader = ProgressReader()
+        _, cursor = reader.read_events("cursor_test")
+
+        tracker.update_progress("🔍 新消息 A")
+        tracker.update_progress("🔍 新消息 B")
+        events, new_cursor = reader.read_events("cursor_test", cursor)
+        assert [e["data"]["last_message"] for e in events] == ["🔍 新消息 A", "🔍 新消息 B"]
+
+        with open(tracker.store.events_path("cursor_test"), "ab") as f:
+            f.write(b'{"data": {"last_message": "half')
+        events, partial_cursor = reader.read_events("cursor_test", new_cursor)
+        assert events == [] and partial_cursor == new_cursor, "不完整的行应留到下次读取"
+        print("✅ 游标读取测试通过")
+
+
+def test_completion_reaches_cached_reader():
+    """测试已缓存状态的读取端能拿到完成结果"""
+    print("🧪 测试完成结果同步")
+
+    with _isolated_progress_dir():
+        tracker = AsyncProgressTracker("complete_test", ["market"], 1, "dashscope")
+        reader = ProgressReader()
+        assert reader.read("complete_test")["status"] == "running"
+
+        tracker.mark_completed("✅ 分析成功完成！", results={"decision": {"action": "买入"}})
+        state = reader.read("complete_test")
+        assert state["status"] == "completed" and state["raw_results"]["decision"]["action"] == "买入"
+        assert get_progress_by_id("complete_test")["raw_results"] == state["raw_results"]
+        print("✅ 完成结果同步测试通过")
+
+
+def main():
+    """主测试函数"""
+    try:
+        test_events_and_snapshots()
+        test_cursor_reads_only_new_events()
+        test_completion_reaches_cached_reader()
+
+        print("\n🎉 所有测试通过！")
+        return True
+
+    except Exception as e:
+        print(f"\n❌ 测试失败: {e}")
+        import traceback
+        print(f"错误详情: {traceback.format_exc()}")
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+实时新闻聚合器并发测试
+验证新闻源并发查询、单源截止时间、总预算到期返回部分结果以及耗时记录
+"""
+
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from tradingagents.dataflows import realtime_news_utils
+from tradingagents.dataflows.realtime_news_utils import RealtimeNewsAggregator, NewsItem
+
+
+def _make_source(name: str, delay: float, count: int = 2, fail: bool = False):
+    """创建延迟返回的桩新闻源"""
+    def fetch(ticker, hours_back):
+        time.sleep(delay)
+        if fail:
+            raise RuntimeError(f"{name} unavailable")
+        return [
+            NewsItem(
+                title=f"{name} headline number {i} for {ticker}",
+                content="content",
+                source=name,
+                publish_time=datetime.now(),
+                url="",
+                urgency="low",
+                relevance_score=0.5,
+            )
+            for i in range(count)
+        ]
+    return fetch
+
+
+def _make_aggregator(**kwargs) -> RealtimeNewsAggregator:
+    aggregator = RealtimeNewsAggregator(**kwargs)
+    aggregator.newsapi_key = "test"
+    return aggregator
+
+
+def test_sources_run_concurrently():
+    """测试多个新闻源并发执行，总耗时接近最慢的源"""
+    print("🧪 测试新闻源并发查询")
+
+    aggregator = _make_aggregator()
+    aggregator._get_finnhub_realtime_news = _make_source("FinnHub", 0.4)
+    aggregator._get_alpha_vantage_news = _make_source("AlphaVantage", 0.4)
+    aggregator._get_newsapi_news = _make_source("NewsAPI", 0.4)
+    aggregator._get_chinese_finance_news = _make_source("Chinese", 0.4)
+
+    start = time.perf_counter()
+    news = aggregator.get_realtime_stock_news("AAPL", max_news=100)
+    elapsed = time.perf_counter() - start
+
+    assert len(news) == 8, f"应返回全部8条新闻，实际{len(news)}条"
+    assert elapsed < 1.0, f"并发查询耗时过长: {elapsed:.2f}s"
+    assert set(aggregator.last_source_stats) == {"FinnHub", "Alpha Vantage", "NewsAPI", "中文财经"}
+    assert all(stat["status"] == "ok" for stat in aggregator.last_source_stats.values())
+    print(f"✅ 并发查询耗时: {elapsed:.2f}s")
+
+
+def test_slow_source_does_not_block():
+    """测试慢源超过自身截止时间后被放弃，其他源结果正常返回"""
+    print("🧪 测试单源截止时间")
+
+    aggregator = _make_aggregator(source_timeouts={"中文财经": 0.3})
+    aggregator._get_finnhub_realtime_news = _make_source("FinnHub", 0.05)
+    aggregator._get_alpha_vantage_news = _make_source("AlphaVantage", 0.05, fail=True)
+    aggregator._get_newsapi_news = _make_source("NewsAPI", 0.05, count=0)
+    aggregator._get_chinese_finance_news = _make_source("Chinese", 2.0)
+
+    start = time.perf_counter()
+    news = aggregator.get_realtime_stock_news("AAPL", max_news=100)
+    elapsed = time.perf_counter() - start
+
+    stats = aggregator.last_source_stats
+    assert elapsed < 1.0, f"慢源不应拖慢整体: {elapsed:.2f}s"
+    assert [item.source for item in news].count("FinnHub") == 2
+    assert stats["中文财经"]["status"] == "timeout"
+    assert stats["Alpha Vantage"]["status"] == "error"
+    assert stats["NewsAPI"]["status"] == "empty"
+    assert stats["FinnHub"]["status"] == "ok"
+    print(f"✅ 慢源已放弃，耗时: {elapsed:.2f}s")
+
+
+def test_total_budget_returns_partial_results():
+    """测试总预算到期后返回部分结果，并记录耗时历史"""
+    print("🧪 测试总时间预算")
+
+    aggregator = _make_aggregator(total_timeout=0.3)
+    aggregator._get_finnhub_realtime_news = _make_source("FinnHub", 0.05)
+    aggregator._get_alpha_vantage_news = _make_source("AlphaVantage", 1.0)
+    aggregator._get_newsapi_news = _make_source("NewsAPI", 1.0)
+    aggregator._get_chinese_finance_news = _make_source("Chinese", 1.0)
+
+    start = time.perf_counter()
+    news = aggregator.get_realtime_stock_news("AAPL", max_news=100)
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 0.8, f"应在总预算到期后返回: {elapsed:.2f}s"
+    assert {item.source for item in news} == {"FinnHub"}
+    source_stats = aggregator.get_source_stats()
+    assert source_stats["FinnHub"]["samples"] == 1
+    assert source_stats["NewsAPI"]["last"]["status"] == "timeout"
+    print(f"✅ 部分结果已返回，耗时: {elapsed:.2f}s")
+
+
+def test_shared_executor_and_concurrent_callers():
+    """测试多次聚合共用同一线程池，多个线程同时聚合时耗时记录完整"""
+    print("🧪 测试共享线程池")
+
+    aggregator = _make_aggregator()
+    aggregator._get_finnhub_realtime_news = _make_source("FinnHub", 0.01)
+    aggregator._get_alpha_vantage_news = _make_source("AlphaVantage", 0.01)
+    aggregator._get_newsapi_news = _make_source("NewsAPI", 0.01)
+    aggregator._get_chinese_finance_news = _make_source("Chinese", 0.01)
+
+    aggregator.get_realtime_stock_news("AAPL", max_news=100)
+    executor = realtime_news_utils._news_executor
+    threads = [threading.Thread(target=aggregator.get_realtime_stock_news, args=("AAPL",)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert realtime_news_utils._news_executor is executor, "不应每次聚合新建线程池"
+    assert all(stat["samples"] == 9 for stat in aggregator.get_source_stats().values())
+    print("✅ 共享线程池测试通过")
+
+
+def main():
+    """主测试函数"""
+    try:
+        test_sources_run_concurrently()
+        test_slow_source_does_not_block()
+        test_total_budget_returns_partial_results()
+        test_shared_executor_and_concurrent_callers()
+
+        print("\n🎉 所有测试通过！")
+        return True
+
+    except Exception as e:
+        print(f"\n❌ 测试失败: {e}")
+        import traceback
+        print(f"错误详情: {traceback.format_exc()}")
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Reddit按日偏移索引测试
+验证索引读取与原全量扫描实现结果一致、索引落盘复用，以及源文件更新后重建
+"""
+
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from tradingagents.dataflows import reddit_utils
+from tradingagents.dataflows.reddit_utils import fetch_top_from_category, ticker_to_company
+
+
+def _reference_fetch(category, date, max_limit, query=None, data_path="reddit_data"):
+    """原实现：每次逐行解析全部文件"""
+    base_path = data_path
+    all_content = []
+    limit_per_subreddit = max_limit // len(os.listdir(os.path.join(base_path, category)))
+    for data_file in os.listdir(os.path.join(base_path, category)):
+        if not data_file.endswith(".jsonl"):
+            continue
+        current = []
+        with open(os.path.join(base_path, category, data_file), "rb") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                parsed_line = json.loads(line)
+                post_date = datetime.utcfromtimestamp(parsed_line["created_utc"]).strftime("%Y-%m-%d")
+                if post_date != date:
+                    continue
+                if "company" in category and query:
+                    terms = ticker_to_company[query].split(" OR ") if "OR" in ticker_to_company[query] else [ticker_to_company[query]]
+                    terms.append(query)
+                    if not any(re.search(t, parsed_line["title"], re.IGNORECASE)
+                               or re.search(t, parsed_line["selftext"], re.IGNORECASE) for t in terms):
+                        continue
+                current.append({
+                    "title": parsed_line["title"], "content": parsed_line["selftext"],
+                    "url": parsed_line["url"], "upvotes": parsed_line["ups"], "posted_date": post_date,
+                })
+        current.sort(key=lambda x: x["upvotes"], reverse=True)
+        all_content.extend(current[:limit_per_subreddit])
+    return all_content
+
+
+def _write_category(base_path: str, category: str, days: int = 60, posts_per_day: int = 40):
+    """生成两个subreddit的JSONL文件，帖子按时间交错并夹杂空行"""
+    names = ["Apple", "Meta", "facebook", "MSFT", "nothing"]
+    start = datetime(2024, 1, 1)
+    os.makedirs(os.path.join(base_path, category), exist_ok=True)
+    for sub in ("stocks", "investing"):
+        with open(os.path.join(base_path, category, f"{sub}.jsonl"), "w", encoding="utf-8") as f:
+            for i in range(days * posts_per_day):
+                created = start + timedelta(minutes=36 * i + (7 if sub == "stocks" else 0))
+                f.write(json.dumps({
+                    "created_utc": (created - datetime(1970, 1, 1)).total_seconds(),
+                    "title": f"{names[i % 5]} post {i}", "selftext": f"body {names[(i * 3) % 5]}",
+                    "url": f"https://reddit.com/{sub}/{i}", "ups": (i * 37) % 101,
+                }) + "\n")
+                if i % 11 == 0:
+                    f.write("\n")
+
+
+def test_matches_reference():
+    """测试按日索引读取与原实现逐项一致"""
+    print("🧪 测试按日索引一致性")
+
+    with tempfile.TemporaryDirectory() as base_path:
+        _write_category(base_path, "global_news")
+        _write_category(base_path, "company_news")
+        dates = [(datetime(2024, 1, 1) + timedelta(days=d)).strftime("%Y-%m-%d") for d in range(0, 62, 3)]
+
+        start = time.perf_counter()
+        expected = [_reference_fetch("global_news", d, 10, data_path=base_path) for d in dates]
+        expected += [_reference_fetch("company_news", d, 10, q, data_path=base_path)
+                     for d in dates for q in ("AAPL", "META")]
+        reference_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        actual = [fetch_top_from_category("global_news", d, 10, data_path=base_path) for d in dates]
+        actual += [fetch_top_from_category("company_news", d, 10, q, data_path=base_path)
+                   for d in dates for q in ("AAPL", "META")]
+        index_time = time.perf_counter() - start
+
+        assert actual == expected, "结果应与原实现一致"
+        assert any(expected), "测试数据应包含匹配的帖子"
+        assert sorted(os.listdir(os.path.join(base_path, "global_news"))) == ["investing.jsonl", "stocks.jsonl"], \
+            "索引不应写入类别目录"
+        print(f"✅ 结果一致 (原实现 {reference_time:.3f}s, 按日索引 {index_time:.3f}s)")
+
+
+def test_index_persisted_and_rebuilt():
+    """测试索引落盘后被新进程复用，源文件更新后重建"""
+    print("🧪 测试索引落盘与重建")
+
+    with tempfile.TemporaryDirectory() as base_path:
+        _write_category(base_path, "global_news", days=5)
+        fetch_top_from_category("global_news", "2024-01-02", 10, data_path=base_path)
+        index_file = Path(base_path) / reddit_utils.DAY_INDEX_DIR / "global_news" / "stocks.jsonl.json"
+        assert index_file.exists(), "索引应落盘"
+
+        # 模拟新进程：清空内存索引后不应重新扫描
+        reddit_utils._day_indexes.clear()
+        original_build = reddit_utils._build_day_index
+        builds = []
+        reddit_utils._build_day_index = lambda path: builds.append(path) or original_build(path)
+        try:
+            fetch_top_from_category("global_news", "2024-01-02", 10, data_path=base_path)
+            assert builds == [], "应复用落盘的索引"
+
+            data_file = Path(base_path) / "global_news" / "stocks.jsonl"
+            with open(data_file, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"created_utc": (datetime(2024, 1, 2, 12) - datetime(1970, 1, 1)).total_seconds(),
+                                    "title": "appended", "selftext": "", "url": "", "ups": 1000}) + "\n")
+            posts = fetch_top_from_category("global_news", "2024-01-02", 10, data_path=base_path)
+            assert len(builds) == 1, "源文件更新后应重建索引"
+            assert posts == _reference_fetch("global_news", "2024-01-02", 10, data_path=base_path)
+        finally:
+            reddit_utils._build_day_index = original_build
+        print("✅ 索引落盘与重建测试通过")
+
+
+def main():
+    """主测试函数"""
+    try:
+        test_matches_reference()
+        test_index_persisted_and_rebuilt()
+
+        print("\n🎉 所有测试通过！")
+        return True
+
+    except Exception as e:
+        print(f"\n❌ 测试失败: {e}")
+        import traceback
+        print(f"错误详情: {traceback.format_exc()}")
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
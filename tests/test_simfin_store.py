@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+SimFin基本面存储测试
+验证as-of查找与原逐次解析实现结果一致，以及报表只解析一次、Feather转换和源文件更新后的重新加载
+"""
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from tradingagents.dataflows.simfin_store import SimFinStore
+
+
+def _reference_latest(csv_path: Path, ticker: str, curr_date: str):
+    """原实现：每次调用完整解析CSV后过滤"""
+    df = pd.read_csv(csv_path, sep=";")
+    df["Report Date"] = pd.to_datetime(df["Report Date"], utc=True).dt.normalize()
+    df["Publish Date"] = pd.to_datetime(df["Publish Date"], utc=True).dt.normalize()
+    curr_date_dt = pd.to_datetime(curr_date, utc=True).normalize()
+    filtered_df = df[(df["Ticker"] == ticker) & (df["Publish Date"] <= curr_date_dt)]
+    if filtered_df.empty:
+        return None
+    return filtered_df.loc[filtered_df["Publish Date"].idxmax()]
+
+
+def _write_fixture(data_dir: str, tickers: int = 300) -> Path:
+    """生成SimFin格式（分号分隔）的资产负债表文件，行顺序打乱且包含同日重复发布"""
+    rng = np.random.default_rng(11)
+    rows = []
+    for t in range(tickers):
+        for q in range(12):
+            report = pd.Timestamp("2021-03-31") + pd.DateOffset(months=3 * q)
+            publish = report + pd.Timedelta(days=int(rng.integers(20, 60)))
+            rows.append({
+                "Ticker": f"T{t:03d}", "SimFinId": t, "Currency": "USD",
+                "Fiscal Year": report.year, "Report Date": report.strftime("%Y-%m-%d"),
+                "Publish Date": publish.strftime("%Y-%m-%d"),
+                "Total Assets": float(rng.integers(1e6, 1e9)),
+            })
+    # 同一天发布的两份报表（更正版），原实现取文件中先出现的一行
+    duplicate = dict(rows[11], **{"Total Assets": -1.0})
+    df = pd.DataFrame(rows).sample(frac=1, random_state=3)
+    df = pd.concat([pd.DataFrame([duplicate]), df], ignore_index=True)
+
+    csv_path = SimFinStore.statement_path(data_dir, "balance_sheet", "quarterly")
+    csv_path.parent.mkdir(parents=True, exist_ok=True)
+    df.to_csv(csv_path, sep=";", index=False)
+    return csv_path
+
+
+def test_asof_matches_reference():
+    """测试as-of查找与原实现逐项一致"""
+    print("🧪 测试as-of查找一致性")
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        csv_path = _write_fixture(data_dir)
+        store = SimFinStore()
+
+        cases = [(f"T{t:03d}", date) for t in (0, 1, 57, 299)
+                 for date in ("2020-01-01", "2021-05-15", "2022-02-10", "2023-12-31", "2030-01-01")]
+        cases.append(("MISSING", "2023-01-01"))
+
+        start = time.perf_counter()
+        expected = [_reference_latest(csv_path, ticker, date) for ticker, date in cases]
+        reference_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        actual = [store.get_latest_statement(data_dir, "balance_sheet", "quarterly", ticker, date)
+                  for ticker, date in cases]
+        store_time = time.perf_counter() - start
+
+        for (ticker, date), exp, act in zip(cases, expected, actual):
+            if exp is None:
+                assert act is None, f"{ticker}@{date} 应无报表"
+            else:
+                pd.testing.assert_series_equal(act, exp, obj=f"{ticker}@{date}")
+                assert str(act.drop("SimFinId")) == str(exp.drop("SimFinId")), "输出文本应与原实现一致"
+
+        stats = store.get_stats()
+        assert stats["csv_loads"] == 1 and stats["memory_hits"] == len(cases) - 1, f"报表应只解析一次: {stats}"
+        print(f"✅ 结果一致 (原实现 {reference_time:.3f}s, 索引存储 {store_time:.4f}s)")
+
+
+def test_feather_reload_and_refresh():
+    """测试新进程从Feather加载，CSV更新后重新解析"""
+    print("🧪 测试Feather转换与源文件刷新")
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        csv_path = _write_fixture(data_dir, tickers=20)
+        SimFinStore().get_latest_statement(data_dir, "balance_sheet", "quarterly", "T001", "2022-06-30")
+        assert csv_path.with_suffix(".feather").exists(), "应生成Feather文件"
+
+        store = SimFinStore()
+        from_feather = store.get_latest_statement(data_dir, "balance_sheet", "quarterly", "T001", "2022-06-30")
+        assert store.get_stats()["feather_loads"] == 1, "新实例应从Feather加载"
+        pd.testing.assert_series_equal(from_feather, _reference_latest(csv_path, "T001", "2022-06-30"))
+
+        # 源文件更新后应重新解析
+        df = pd.read_csv(csv_path, sep=";")
+        df.loc[df["Ticker"] == "T001", "Total Assets"] = 42.0
+        df.to_csv(csv_path, sep=";", index=False)
+        future = time.time() + 5
+        os.utime(csv_path, (future, future))
+
+        refreshed = store.get_latest_statement(data_dir, "balance_sheet", "quarterly", "T001", "2022-06-30")
+        assert refreshed["Total Assets"] == 42.0, "源文件更新后应重新加载"
+        assert store.get_stats()["resident_tables"] == 1, "同一文件只应保留最新版本"
+        print("✅ Feather转换与源文件刷新测试通过")
+
+
+def main():
+    """主测试函数"""
+    try:
+        test_asof_matches_reference()
+        test_feather_reload_and_refresh()
+
+        print("\n🎉 所有测试通过！")
+        return True
+
+    except Exception as e:
+        print(f"\n❌ 测试失败: {e}")
+        import traceback
+        print(f"错误详情: {traceback.format_exc()}")
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+数据请求单飞合并测试
+验证并发相同请求只调用一次上游、成功结果在有效期内复用、失败结果不保留，
+以及统一A股数据接口的重复请求被合并
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from tradingagents.dataflows.single_flight import SingleFlight
+
+
+def test_concurrent_requests_share_one_call():
+    """测试并发的相同请求只发起一次上游调用"""
+    print("🧪 测试并发请求合并")
+
+    flight = SingleFlight(ttl=0)
+    calls = []
+    release = threading.Event()
+
+    def fetch():
+        calls.append(1)
+        release.wait(2)
+        return "data"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do('k', fetch))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    while flight.get_stats()['coalesced'] < 7:
+        time.sleep(0.005)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    stats = flight.get_stats()
+    assert len(calls) == 1 and results == ["data"] * 8
+    assert stats['upstream_calls'] == 1 and stats['saved'] == 7, stats
+    assert stats['entries'] == 0, "ttl=0 时不应保留结果"
+    print("✅ 并发请求合并测试通过")
+
+
+def test_memo_ttl_and_failures():
+    """测试成功结果在有效期内复用，失败和不可保留的结果不复用"""
+    print("🧪 测试结果保留")
+
+    flight = SingleFlight(ttl=0.2)
+    calls = []
+
+    def fetch(value):
+        calls.append(value)
+        return value
+
+    assert flight.do('a', lambda: fetch("ok")) == "ok"
+    assert flight.do('a', lambda: fetch("new")) == "ok", "有效期内应复用结果"
+    time.sleep(0.25)
+    assert flight.do('a', lambda: fetch("new")) == "new", "过期后应重新获取"
+
+    flight.do('b', lambda: fetch("❌ 失败"), cacheable=lambda data: "❌" not in data)
+    flight.do('b', lambda: fetch("❌ 失败"), cacheable=lambda data: "❌" not in data)
+
+    def boom():
+        raise RuntimeError("upstream down")
+
+    for _ in range(2):
+        try:
+            flight.do('c', boom)
+            assert False, "异常应传递给调用方"
+        except RuntimeError:
+            pass
+
+    stats = flight.get_stats()
+    assert calls == ["ok", "new", "❌ 失败", "❌ 失败"]
+    assert stats['upstream_calls'] == 6 and stats['memo_hits'] == 1, stats
+    print("✅ 结果保留测试通过")
+
+
+def test_cacheable_error_releases_waiters():
+    """测试判断能否保留结果时出错，等待中的请求仍被唤醒并拿到结果"""
+    print("🧪 测试保留判断出错")
+
+    flight = SingleFlight(ttl=10)
+    release = threading.Event()
+
+    def fetch():
+        release.wait(2)
+        return "plain text"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(
+        flight.do('k', fetch, cacheable=lambda data: data.get('ok'))))
+    leader.start()
+    while flight.get_stats()['inflight'] < 1:
+        time.sleep(0.005)
+    waiter = threading.Thread(target=lambda: results.append(flight.do('k', fetch)))
+    waiter.start()
+    while flight.get_stats()['coalesced'] < 1:
+        time.sleep(0.005)
+    release.set()
+    leader.join(2)
+    waiter.join(2)
+
+    assert not waiter.is_alive(), "等待者不应一直阻塞"
+    assert results == ["plain text"] * 2
+    assert flight.get_stats()['entries'] == 0, "判断出错的结果不保留"
+    print("✅ 保留判断出错测试通过")
+
+
+def test_unified_china_data_is_coalesced():
+    """测试统一A股数据接口对相同股票和区间只调用一次数据源"""
+    print("🧪 测试统一接口请求合并")
+
+    from tradingagents.dataflows import data_source_manager, single_flight
+    from tradingagents.dataflows.market_data import StockDataResult
+
+    class _FakeManager:
+        current_source = data_source_manager.ChinaDataSource.AKSHARE
+
+        def __init__(self):
+            self.calls = 0
+
+        def get_stock_data_result(self, symbol, start_date, end_date):
+            self.calls += 1
+            time.sleep(0.02)
+            data = pd.DataFrame({'date': [start_date, end_date], 'open': [9.8, 9.9], 'high': [10.2, 10.3],
+                                 'low': [9.7, 9.8], 'close': [9.9, 10.0], 'volume': [1000, 1200]})
+            return StockDataResult.from_ohlcv(symbol, start_date, end_date, data, 'akshare')
+
+        def get_stock_info(self, symbol):
+            self.calls += 1
+            return {'symbol': symbol, 'name': '平安银行', 'source': 'akshare'}
+
+    original_manager = data_source_manager._data_source_manager
+    original_flight = single_flight._single_flight
+    fake = _FakeManager()
+    data_source_manager._data_source_manager = fake
+    single_flight._single_flight = SingleFlight(ttl=60)
+    try:
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(
+            data_source_manager.get_china_stock_data_unified('000001', '2024-01-01', '2024-06-30')))
+            for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        data_source_manager.get_china_stock_data_unified('000001', '2024-01-01', '2024-06-30')
+        assert fake.calls == 1 and len(set(results)) == 1, "相同请求应只调用一次数据源"
+
+        data_source_manager.get_china_stock_data_unified('000001', '2024-06-01', '2024-06-30')
+        assert fake.calls == 2, "不同区间应单独获取"
+
+        info = data_source_manager.get_china_stock_info_unified('000001')
+        info['name'] = 'changed'
+        assert data_source_manager.get_china_stock_info_unified('000001')['name'] == '平安银行'
+        assert fake.calls == 3
+        assert single_flight.get_single_flight().get_stats()['saved'] == 4
+        print("✅ 统一接口请求合并测试通过")
+    finally:
+        data_source_manager._data_source_manager = original_manager
+        single_flight._single_flight = original_flight
+
+
+def main():
+    """主测试函数"""
+    try:
+        test_concurrent_requests_share_one_call()
+        test_memo_ttl_and_failures()
+        test_cacheable_error_releases_waiters()
+        test_unified_china_data_is_coalesced()
+
+        print("\n🎉 所有测试通过！")
+        return True
+
+    except Exception as e:
+        print(f"\n❌ 测试失败: {e}")
+        import traceback
+        print(f"错误详情: {traceback.format_exc()}")
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+通达信连接池测试
+验证连接复用与数量上限、坏连接丢弃重试、服务器按延迟和失败率排序并持久化，
+以及历史数据和技术指标共用一次K线请求
+"""
+
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from tradingagents.dataflows.tdx_connection_pool import TdxConnectionPool
+
+SERVERS = [{'ip': 'slow', 'port': 7709}, {'ip': 'down', 'port': 7709}, {'ip': 'fast', 'port': 7709}]
+
+
+class _FakeApi:
+    """模拟 TdxHq_API：按服务器名模拟延迟和故障，记录请求次数"""
+
+    connects = []
+    calls = []
+    fail_next_call = False
+
+    def __init__(self):
+        self.server = None
+
+    def connect(self, ip, port, time_out=5.0):
+        type(self).connects.append(ip)
+        if ip == 'down':
+            raise ConnectionError("connection refused")
+        time.sleep(0.03 if ip == 'slow' else 0.001)
+        self.server = ip
+        return self
+
+    def disconnect(self):
+        self.server = None
+
+    def get_security_count(self, market):
+        return 1000
+
+    def get_security_bars(self, category, market, code, start, count):
+        type(self).calls.append(('bars', count))
+        if type(self).fail_next_call:
+            type(self).fail_next_call = False
+            raise ConnectionResetError("socket closed")
+        today = datetime.now()
+        return [{'datetime': (today - timedelta(days=count - 1 - i)).strftime('%Y-%m-%d 15:00'),
+                 'open': 10.0 + i * 0.1, 'high': 10.5 + i * 0.1, 'low': 9.5 + i * 0.1,
+                 'close': 10.0 + i * 0.1, 'vol': 1000.0, 'amount': 10000.0} for i in range(count)]
+
+
+def _reset_fake():
+    _FakeApi.connects = []
+    _FakeApi.calls = []
+    _FakeApi.fail_next_call = False
+
+
+def test_reuse_and_bound():
+    """测试连接复用且并发请求不超过连接上限"""
+    print("🧪 测试连接复用和上限")
+
+    _reset_fake()
+    pool = TdxConnectionPool(servers=[SERVERS[2]], max_connections=2, api_factory=_FakeApi)
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def run():
+        for _ in range(10):
+            with pool.connection():
+                with lock:
+                    active.append(1)
+                    peak.append(len(active))
+                time.sleep(0.002)
+                with lock:
+                    active.pop()
+
+    threads = [threading.Thread(target=run) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = pool.get_stats()
+    assert max(peak) <= 2, "同时借出的连接不应超过上限"
+    assert stats['created'] <= 2 and stats['reused'] >= 48, f"连接应被复用: {stats}"
+    print(f"✅ 连接复用测试通过: {stats['created']} 个连接服务 50 次请求")
+
+
+def test_ranking_and_persistence():
+    """测试按延迟和失败率排序，统计在重启后保留"""
+    print("🧪 测试服务器排序和持久化")
+
+    _reset_fake()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        stats_file = Path(temp_dir) / "tdx_server_stats.json"
+        pool = TdxConnectionPool(servers=SERVERS, stats_file=stats_file, api_factory=_FakeApi)
+        pool.warm()
+        assert _FakeApi.connects == ['slow'], "首次按配置顺序连接"
+
+        # 让 down 和 fast 也有测量数据
+        pool.ranking.record_failure(SERVERS[1])
+        pool.ranking.record_success(SERVERS[2], 0.001)
+        assert [s['ip'] for s in pool.ranking.rank(SERVERS)] == ['fast', 'slow', 'down']
+
+        _reset_fake()
+        restarted = TdxConnectionPool(servers=SERVERS, stats_file=stats_file, api_factory=_FakeApi)
+        restarted.warm()
+        assert _FakeApi.connects == ['fast'], "重启后应优先连接最快的服务器"
+        print("✅ 服务器排序和持久化测试通过")
+
+
+def test_broken_connection_is_replaced():
+    """测试请求出错的连接被丢弃并换连接重试"""
+    print("🧪 测试坏连接替换")
+
+    _reset_fake()
+    pool = TdxConnectionPool(servers=[SERVERS[2]], api_factory=_FakeApi)
+    pool.warm()
+    _FakeApi.fail_next_call = True
+    bars = pool.call('get_security_bars', 9, 0, '000001', 0, 5)
+    assert len(bars) == 5
+    stats = pool.get_stats()
+    assert stats['discarded'] == 1 and stats['created'] == 2, f"坏连接应被丢弃重建: {stats}"
+    print("✅ 坏连接替换测试通过")
+
+
+def test_history_and_indicators_share_one_request():
+    """测试历史数据和技术指标只发一次K线请求"""
+    print("🧪 测试历史数据与指标共用请求")
+
+    from tradingagents.dataflows.tdx_utils import TongDaXinDataProvider
+
+    _reset_fake()
+    provider = TongDaXinDataProvider()
+    provider.pool = TdxConnectionPool(servers=[SERVERS[2]], api_factory=_FakeApi)
+
+    start_date = (datetime.now() - timedelta(days=10)).strftime('%Y-%m-%d')
+    end_date = datetime.now().strftime('%Y-%m-%d')
+    df, indicators = provider.get_history_with_indicators('000001', start_date, end_date)
+
+    assert len([c for c in _FakeApi.calls if c[0] == 'bars']) == 1, "应只请求一次K线"
+    assert df.index.min() >= datetime.strptime(start_date, '%Y-%m-%d') and len(df) == 11
+    expected = provider.calculate_technical_indicators(
+        provider.get_stock_history_data('000001', (datetime.now() - timedelta(days=40)).strftime('%Y-%m-%d'), end_date))
+    assert indicators['MA20'] is not None and abs(indicators['MA20'] - expected['MA20']) < 1e-9
+
+    # 兼容旧代码的 provider.api 访问，调用经连接池执行
+    assert provider.api.get_security_count(0) == 1000
+    assert provider.pool.get_stats()['created'] == 1, "provider.api 应复用池中连接"
+    print("✅ 历史数据与指标共用请求测试通过")
+
+
+def main():
+    """主测试函数"""
+    try:
+        test_reuse_and_bound()
+        test_ranking_and_persistence()
+        test_broken_connection_is_replaced()
+        test_history_and_indicators_share_one_request()
+
+        print("\n🎉 所有测试通过！")
+        return True
+
+    except Exception as e:
+        print(f"\n❌ 测试失败: {e}")
+        import traceback
+        print(f"错误详情: {traceback.format_exc()}")
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Tushare按交易日批量入库测试
+验证每个交易日只调用一次接口、按股票拆分读取、已入库交易日不重复拉取，
+以及区间覆盖判断和 get_stock_daily 走本地日线库
+"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from tradingagents.dataflows.tushare_daily_store import TushareDailyStore
+
+SYMBOLS = ['000001.SZ', '600000.SH', '300750.SZ']
+CALENDAR = {  # 2024-01-05 ~ 2024-01-10，中间是周末
+    '20240105': 1, '20240106': 0, '20240107': 0, '20240108': 1, '20240109': 1, '20240110': 1,
+}
+
+
+class _FakePro:
+    """模拟 tushare pro_api：按交易日返回全市场日线，记录调用"""
+
+    def __init__(self, fail_on=None):
+        self.calls = []
+        self.fail_on = fail_on
+
+    def trade_cal(self, exchange, start_date, end_date):
+        rows = [{'cal_date': d, 'is_open': o} for d, o in CALENDAR.items() if start_date <= d <= end_date]
+        return pd.DataFrame(rows)
+
+    def daily(self, trade_date=None, ts_code=None, start_date=None, end_date=None):
+        self.calls.append(('daily', trade_date or ts_code))
+        if trade_date == self.fail_on:
+            raise RuntimeError("rate limited")
+        day = int(trade_date[-2:])
+        return pd.DataFrame([{
+            'ts_code': code, 'trade_date': trade_date, 'open': 10.0 + i + day, 'high': 11.0 + i + day,
+            'low': 9.0 + i + day, 'close': 10.5 + i + day, 'pre_close': 9.5 + i + day,
+            'change': 1.0, 'pct_chg': 1.0, 'vol': 1000.0, 'amount': 10000.0,
+        } for i, code in enumerate(SYMBOLS)])
+
+
+def test_ingest_and_read_per_symbol():
+    """测试按交易日入库后按股票读取，且已入库交易日不再请求"""
+    print("🧪 测试按交易日入库")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = TushareDailyStore(Path(temp_dir), file_format='csv')
+        pro = _FakePro()
+        assert store.get_history('000001.SZ', '20240105', '20240110') is None, "未入库的区间应返回None"
+
+        summary = store.ingest(pro, '20240105', '20240109', min_interval=0)
+        assert summary == {'trade_dates': 3, 'skipped': 0, 'symbols': 3, 'complete': True}, summary
+        assert len(pro.calls) == 3, "每个交易日只应调用一次daily"
+
+        history = store.get_history('600000.SH', '2024-01-05', '2024-01-09')
+        assert list(history['trade_date']) == ['20240105', '20240108', '20240109']
+        assert list(history['close']) == [16.5, 19.5, 20.5]
+        assert store.get_history('688981.SH', '20240105', '20240109').empty, "库中没有的股票应为空"
+
+        # 扩展区间只拉取新增交易日，与已有区间合并后整体覆盖
+        summary = store.ingest(pro, '20240108', '20240110', min_interval=0)
+        assert summary['trade_dates'] == 1 and summary['skipped'] == 2
+        assert store.covers('20240105', '20240110')
+        assert len(store.get_history('300750.SZ', '20240105', '20240110')) == 4
+
+        # 重新打开后从清单恢复覆盖范围
+        reopened = TushareDailyStore(Path(temp_dir), file_format='csv')
+        assert reopened.covers('20240106', '20240110') and not reopened.covers('20240101', '20240110')
+        print("✅ 按交易日入库测试通过")
+
+
+def test_failed_day_resumes():
+    """测试某个交易日失败时只记录此前的区间，重试从失败的交易日继续"""
+    print("🧪 测试失败后续传")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = TushareDailyStore(Path(temp_dir), file_format='csv')
+        summary = store.ingest(_FakePro(fail_on='20240109'), '20240105', '20240110', min_interval=0)
+        assert not summary['complete'] and summary['trade_dates'] == 2
+        assert store.covers('20240105', '20240108') and not store.covers('20240105', '20240109')
+
+        pro = _FakePro()
+        summary = store.ingest(pro, '20240105', '20240110', min_interval=0)
+        assert summary['complete'] and [c[1] for c in pro.calls] == ['20240109', '20240110']
+        assert store.covers('20240105', '20240110')
+        print("✅ 失败后续传测试通过")
+
+
+class _FakeProToday(_FakePro):
+    """日历为昨天、今天两个交易日，今天的收盘数据可设置为尚未发布"""
+
+    def __init__(self, published: bool):
+        super().__init__()
+        now = datetime.now()
+        self.yesterday = (now - timedelta(days=1)).strftime('%Y%m%d')
+        self.today = now.strftime('%Y%m%d')
+        self.published = published
+
+    def trade_cal(self, exchange, start_date, end_date):
+        return pd.DataFrame([{'cal_date': d, 'is_open': 1} for d in (self.yesterday, self.today)
+                             if start_date <= d <= end_date])
+
+    def daily(self, trade_date=None, **kwargs):
+        if trade_date == self.today and not self.published:
+            self.calls.append(('daily', trade_date))
+            return pd.DataFrame()
+        return super().daily(trade_date=trade_date, **kwargs)
+
+
+def test_unpublished_today_not_covered():
+    """测试今天收盘数据未发布时覆盖范围只到昨天，结束日期在未来时不超过今天"""
+    print("🧪 测试当日数据未发布")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = TushareDailyStore(Path(temp_dir), file_format='csv')
+        pro = _FakeProToday(published=False)
+        tomorrow = (datetime.now() + timedelta(days=1)).strftime('%Y%m%d')
+
+        summary = store.ingest(pro, pro.yesterday, tomorrow, min_interval=0)
+        assert summary['complete'] and summary['trade_dates'] == 1, summary
+        assert store.covers(pro.yesterday, pro.yesterday)
+        assert not store.covers(pro.yesterday, pro.today), "未发布的今天不应算作已覆盖"
+        assert store.get_history('000001.SZ', pro.yesterday, pro.today) is None, "应回退到逐股接口"
+
+        pro.published = True
+        store.ingest(pro, pro.yesterday, tomorrow, min_interval=0)
+        assert store.covers(pro.yesterday, pro.today) and not store.covers(pro.yesterday, tomorrow)
+        assert len(store.get_history('000001.SZ', pro.yesterday, pro.today)) == 2
+        print("✅ 当日数据未发布测试通过")
+
+
+def test_provider_reads_local_store():
+    """测试 get_stock_daily 在区间已入库时不调用逐股接口"""
+    print("🧪 测试Provider读取本地日线库")
+
+    from tradingagents.dataflows.tushare_utils import TushareProvider
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # 不创建全局日线库，使用临时目录中的日线库
+        os.environ['TUSHARE_DAILY_STORE_ENABLED'] = 'false'
+        try:
+            provider = TushareProvider(token='test', enable_cache=False)
+        finally:
+            os.environ.pop('TUSHARE_DAILY_STORE_ENABLED', None)
+        provider.connected = True
+        provider.api = _FakePro()
+        provider.daily_store = TushareDailyStore(Path(temp_dir), file_format='csv')
+
+        results = provider.get_stocks_daily(['000001', '600000'], '2024-01-05', '2024-01-10')
+        assert [c[1] for c in provider.api.calls] == ['20240105', '20240108', '20240109', '20240110'], \
+            "批量获取应只按交易日调用接口"
+        data = results['000001']
+        assert len(data) == 4 and 'close_raw' in data.columns
+        assert pd.api.types.is_datetime64_any_dtype(data['trade_date'])
+        assert provider.daily_store.get_stats()['local_hits'] == 2
+        print("✅ Provider读取本地日线库测试通过")
+
+
+def main():
+    """主测试函数"""
+    try:
+        test_ingest_and_read_per_symbol()
+        test_failed_day_resumes()
+        test_unpublished_today_not_covered()
+        test_provider_reads_local_store()
+
+        print("\n🎉 所有测试通过！")
+        return True
+
+    except Exception as e:
+        print(f"\n❌ 测试失败: {e}")
+        import traceback
+        print(f"错误详情: {traceback.format_exc()}")
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Tushare前复权计算回归测试
+验证向量化前复权与原逐行实现结果完全一致，并验证adj_factor复权因子路径
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from tradingagents.dataflows.tushare_utils import TushareProvider
+
+
+def _reference_forward_adjust(data: pd.DataFrame) -> pd.DataFrame:
+    """原逐行实现（O(n²)），作为回归基准"""
+    adjusted_data = data.copy().sort_values('trade_date').reset_index(drop=True)
+    for column in ['close', 'open', 'high', 'low']:
+        adjusted_data[f'{column}_raw'] = adjusted_data[column].copy()
+
+    adjusted_closes = [float(adjusted_data.iloc[-1]['close'])]
+    for i in range(len(adjusted_data) - 2, -1, -1):
+        pct_change = float(adjusted_data.iloc[i + 1]['pct_chg']) / 100.0
+        adjusted_closes.insert(0, adjusted_closes[0] / (1 + pct_change))
+    adjusted_data['close'] = adjusted_closes
+
+    for i in range(len(adjusted_data)):
+        if adjusted_data.iloc[i]['close_raw'] != 0:
+            ratio = adjusted_data.iloc[i]['close'] / adjusted_data.iloc[i]['close_raw']
+            for column in ['open', 'high', 'low']:
+                adjusted_data.iloc[i, adjusted_data.columns.get_loc(column)] = adjusted_data.iloc[i][f'{column}_raw'] * ratio
+
+    adjusted_data['price_type'] = 'forward_adjusted'
+    return adjusted_data
+
+
+def _make_fixture(days: int = 750) -> pd.DataFrame:
+    """生成带一次除权跳空的合成日线（与Tushare daily接口字段一致）"""
+    rng = np.random.default_rng(2024)
+    dates = pd.bdate_range('2022-01-04', periods=days)
+    pct_chg = np.round(rng.normal(0, 1.5, days), 4)
+    close = 20 * np.cumprod(1 + pct_chg / 100)
+    # 第300天除权：除权价下跌10%，但涨跌幅按除权后前收盘计算
+    close[300:] *= 0.9
+    data = pd.DataFrame({
+        'ts_code': '000001.SZ',
+        'trade_date': dates,
+        'open': np.round(close * (1 + rng.normal(0, 0.005, days)), 2),
+        'high': np.round(close * 1.01, 2),
+        'low': np.round(close * 0.99, 2),
+        'close': np.round(close, 2),
+        'pct_chg': pct_chg,
+    })
+    # 停牌日收盘价为0，应保持原值
+    data.loc[10, 'close'] = 0.0
+    # 打乱顺序，验证内部排序
+    return data.sample(frac=1, random_state=1)
+
+
+def test_matches_reference():
+    """测试向量化前复权与原实现逐位一致"""
+    print("🧪 测试前复权回归一致性")
+    print("=" * 50)
+
+    provider = TushareProvider(enable_cache=False)
+    data = _make_fixture()
+
+    start = time.perf_counter()
+    expected = _reference_forward_adjust(data)
+    reference_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = provider._calculate_forward_adjusted_prices(data)
+    vectorized_time = time.perf_counter() - start
+
+    pd.testing.assert_frame_equal(actual, expected, check_exact=True)
+    print(f"✅ 结果一致 (原实现 {reference_time:.3f}s, 向量化 {vectorized_time:.4f}s)")
+
+
+def test_adj_factor_path():
+    """测试使用adj_factor复权因子计算前复权价格"""
+    print("🧪 测试复权因子路径")
+
+    provider = TushareProvider(enable_cache=False)
+    data = _make_fixture(20).sort_values('trade_date')
+    factors = pd.DataFrame({
+        'ts_code': '000001.SZ',
+        'trade_date': data['trade_date'].dt.strftime('%Y%m%d'),
+        'adj_factor': [1.0] * 10 + [1.25] * 10,
+    })
+
+    actual = provider._calculate_forward_adjusted_prices(data, factors)
+
+    expected_close = data['close'].to_numpy() * np.array([0.8] * 10 + [1.0] * 10)
+    np.testing.assert_allclose(actual['close'].to_numpy(), expected_close)
+    np.testing.assert_allclose(actual['open'].to_numpy()[11:], data['open'].to_numpy()[11:])
+    assert (actual['close_raw'].to_numpy() == data['close'].to_numpy()).all(), "应保留原始收盘价"
+
+    # 因子无法对齐时回退到pct_chg递推
+    fallback = provider._calculate_forward_adjusted_prices(data, factors.iloc[5:])
+    pd.testing.assert_frame_equal(fallback, provider._calculate_forward_adjusted_prices(data))
+    print("✅ 复权因子路径测试通过")
+
+
+def main():
+    """主测试函数"""
+    try:
+        test_matches_reference()
+        test_adj_factor_path()
+
+        print("\n🎉 所有测试通过！")
+        return True
+
+    except Exception as e:
+        print(f"\n❌ 测试失败: {e}")
+        import traceback
+        print(f"错误详情: {traceback.format_exc()}")
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
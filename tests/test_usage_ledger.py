@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+使用记录账本测试
+验证追加写入不丢记录、增量统计与逐条统计一致、定期压缩，以及旧版 usage.json 的迁移
+"""
+
+import json
+import sys
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from tradingagents.config.config_manager import ConfigManager, PricingConfig, TokenTracker
+from tradingagents.config.usage_ledger import UsageLedger
+
+
+def _record(timestamp: datetime, provider: str, cost: float, session_id: str = "s1") -> dict:
+    return {
+        'timestamp': timestamp.isoformat(),
+        'provider': provider,
+        'model_name': 'm',
+        'input_tokens': 100,
+        'output_tokens': 50,
+        'cost': cost,
+        'session_id': session_id,
+        'analysis_type': 'stock_analysis',
+    }
+
+
+def test_concurrent_appends_are_not_lost():
+    """测试多个账本实例（模拟多进程）并发追加时不丢记录，并能看到彼此的记录"""
+    print("🧪 测试并发追加")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        ledger_file = Path(temp_dir) / "usage.jsonl"
+        ledgers = [UsageLedger(ledger_file, max_records=100000) for _ in range(2)]
+
+        def run(ledger, provider):
+            for i in range(200):
+                ledger.append(_record(datetime.now(), provider, 0.01, session_id=provider))
+
+        threads = [threading.Thread(target=run, args=(ledgers[i % 2], f"p{i}")) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(ledgers[0].read_all()) == 800, "并发追加不应丢失记录"
+        stats = ledgers[1].get_statistics(datetime.now() - timedelta(days=1))
+        assert stats["requests"] == 800 and set(stats["provider_stats"]) == {"p0", "p1", "p2", "p3"}
+        assert abs(ledgers[0].get_session_cost("p2") - 2.0) < 1e-9
+        print("✅ 并发追加测试通过")
+
+
+def test_incremental_statistics_and_compaction():
+    """测试增量统计与时间窗口，以及超过保留条数后的压缩"""
+    print("🧪 测试增量统计和压缩")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        ledger = UsageLedger(Path(temp_dir) / "usage.jsonl", max_records=50)
+        now = datetime.now()
+        for i in range(40):
+            ledger.append(_record(now - timedelta(days=40 - i), "dashscope" if i % 2 else "deepseek", 1.0))
+
+        week = ledger.get_statistics(now - timedelta(days=7))
+        assert week["requests"] == 7 and week["cost"] == 7.0, f"窗口统计异常: {week}"
+        assert week["input_tokens"] == 700 and week["output_tokens"] == 350
+        assert week["provider_stats"]["dashscope"]["requests"] + week["provider_stats"]["deepseek"]["requests"] == 7
+
+        for _ in range(21):
+            ledger.append(_record(datetime.now(), "dashscope", 0.5))
+        assert len(ledger.read_all()) == 50, "超过保留条数的1.2倍后应压缩到最近的记录"
+        total = ledger.get_statistics(now - timedelta(days=365))
+        assert total["requests"] == 50 and abs(total["cost"] - (29 + 10.5)) < 1e-9
+        print("✅ 增量统计和压缩测试通过")
+
+
+def test_config_manager_ledger():
+    """测试ConfigManager使用账本记录并迁移旧版记录文件"""
+    print("🧪 测试ConfigManager账本集成")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        legacy = [_record(datetime.now() - timedelta(hours=1), "dashscope", 0.2, session_id="old")]
+        with open(Path(temp_dir) / "usage.json", 'w', encoding='utf-8') as f:
+            json.dump(legacy, f)
+
+        config_manager = ConfigManager(temp_dir)
+        assert not (Path(temp_dir) / "usage.json").exists(), "旧版记录文件应已迁移"
+        assert len(config_manager.load_usage_records()) == 1
+
+        pricing = config_manager.load_pricing()
+        pricing.append(PricingConfig("test_provider", "test_model", 0.001, 0.002))
+        config_manager.save_pricing(pricing)
+
+        tracker = TokenTracker(config_manager)
+        for _ in range(5):
+            tracker.track_usage("test_provider", "test_model", 1000, 500, session_id="new")
+
+        stats = config_manager.get_usage_statistics(1)
+        assert stats["total_requests"] == 6 and stats["provider_stats"]["test_provider"]["requests"] == 5
+        assert abs(tracker.get_session_cost("new") - 5 * 0.002) < 1e-9
+
+        config_manager.save_usage_records([])
+        assert config_manager.get_usage_statistics(30)["total_requests"] == 0, "清空记录后统计应归零"
+        print("✅ ConfigManager账本集成测试通过")
+
+
+def main():
+    """主测试函数"""
+    try:
+        test_concurrent_appends_are_not_lost()
+        test_incremental_statistics_and_compaction()
+        test_config_manager_ledger()
+
+        print("\n🎉 所有测试通过！")
+        return True
+
+    except Exception as e:
+        print(f"\n❌ 测试失败: {e}")
+        import traceback
+        print(f"错误详情: {traceback.format_exc()}")
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -19,7 +19,7 @@ from tradingagents.utils.logging_init import get_logger
 from tradingagents.utils.tool_logging import log_tool_call, log_analysis_step
 
 # 导入日志模块
-from tradingagents.utils.logging_manager import get_logger
+from tradingagents.utils.logging_manager import LazyArg, get_logger
 logger = get_logger('agents')
 
 
@@ -615,7 +615,7 @@ class Toolkit:
 
         try:
             # 使用统一数据源接口获取股票数据（默认Tushare，支持备用数据源）
-            from tradingagents.dataflows.interface import get_china_stock_data_unified
+            from tradingagents.dataflows.data_source_manager import get_china_stock_data_result
             logger.debug(f"📊 [DEBUG] 正在获取 {ticker} 的股票数据...")
 
             # 获取最近30天的数据用于基本面分析
@@ -623,16 +623,16 @@ class Toolkit:
             end_date = datetime.strptime(curr_date, '%Y-%m-%d')
             start_date = end_date - timedelta(days=30)
 
-            stock_data = get_china_stock_data_unified(
+            stock_result = get_china_stock_data_result(
                 ticker,
                 start_date.strftime('%Y-%m-%d'),
                 end_date.strftime('%Y-%m-%d')
             )
 
-            logger.debug(f"📊 [DEBUG] 股票数据获取完成，长度: {len(stock_data) if stock_data else 0}")
+            logger.debug(f"📊 [DEBUG] 股票数据获取完成，数据条数: {len(stock_result.ohlcv) if stock_result.ok else 0}")
 
-            if not stock_data or "获取失败" in stock_data or "❌" in stock_data:
-                return f"无法获取股票 {ticker} 的基本面数据：{stock_data}"
+            if not stock_result.ok:
+                return f"无法获取股票 {ticker} 的基本面数据：{stock_result.render()}"
 
             # 调用真正的基本面分析
             from tradingagents.dataflows.optimized_china_data import OptimizedChinaDataProvider
@@ -641,7 +641,7 @@ class Toolkit:
             analyzer = OptimizedChinaDataProvider()
 
             # 生成真正的基本面分析报告
-            fundamentals_report = analyzer._generate_fundamentals_report(ticker, stock_data)
+            fundamentals_report = analyzer._generate_fundamentals_report(ticker, stock_result)
 
             logger.debug(f"📊 [DEBUG] 中国基本面分析报告生成完成")
             logger.debug(f"📊 [DEBUG] get_china_fundamentals 结果长度: {len(fundamentals_report)}")
@@ -718,9 +718,8 @@ class Toolkit:
         logger.info(f"📊 [统一基本面工具] 分析股票: {ticker}")
 
         # 添加详细的股票代码追踪日志
-        logger.info(f"🔍 [股票代码追踪] 统一基本面工具接收到的原始股票代码: '{ticker}' (类型: {type(ticker)})")
-        logger.info(f"🔍 [股票代码追踪] 股票代码长度: {len(str(ticker))}")
-        logger.info(f"🔍 [股票代码追踪] 股票代码字符: {list(str(ticker))}")
+        logger.info("🔍 [股票代码追踪] 统一基本面工具接收到的原始股票代码: '%s' (类型: %s)", ticker, type(ticker).__name__)
+        logger.debug("🔍 [股票代码追踪] 股票代码字符: %s", LazyArg(lambda: list(str(ticker))))
 
         # 保存原始ticker用于对比
         original_ticker = ticker
@@ -735,7 +734,7 @@ class Toolkit:
             is_hk = market_info['is_hk']
             is_us = market_info['is_us']
 
-            logger.info(f"🔍 [股票代码追踪] StockUtils.get_market_info 返回的市场信息: {market_info}")
+            logger.info("🔍 [股票代码追踪] StockUtils.get_market_info 返回的市场信息: %s", LazyArg(lambda: market_info))
             logger.info(f"📊 [统一基本面工具] 股票类型: {market_info['market_name']}")
             logger.info(f"📊 [统一基本面工具] 货币: {market_info['currency_name']} ({market_info['currency_symbol']})")
 
@@ -756,26 +755,28 @@ class Toolkit:
             if is_china:
                 # 中国A股：获取股票数据 + 基本面数据
                 logger.info(f"🇨🇳 [统一基本面工具] 处理A股数据...")
-                logger.info(f"🔍 [股票代码追踪] 进入A股处理分支，ticker: '{ticker}'")
+                logger.info("🔍 [股票代码追踪] 进入A股处理分支，ticker: '%s'", ticker)
 
                 try:
                     # 获取股票价格数据
-                    from tradingagents.dataflows.interface import get_china_stock_data_unified
-                    logger.info(f"🔍 [股票代码追踪] 调用 get_china_stock_data_unified，传入参数: ticker='{ticker}', start_date='{start_date}', end_date='{end_date}'")
-                    stock_data = get_china_stock_data_unified(ticker, start_date, end_date)
-                    logger.info(f"🔍 [股票代码追踪] get_china_stock_data_unified 返回结果前200字符: {stock_data[:200] if stock_data else 'None'}")
-                    result_data.append(f"## A股价格数据\n{stock_data}")
+                    from tradingagents.dataflows.data_source_manager import get_china_stock_data_result
+                    logger.info("🔍 [股票代码追踪] 调用 get_china_stock_data_result，传入参数: ticker='%s', start_date='%s', end_date='%s'",
+                                ticker, start_date, end_date)
+                    stock_result = get_china_stock_data_result(ticker, start_date, end_date)
+                    logger.info("🔍 [股票代码追踪] get_china_stock_data_result 返回: ok=%s, error=%s", stock_result.ok, stock_result.error)
+                    result_data.append(f"## A股价格数据\n{stock_result.render()}")
                 except Exception as e:
-                    logger.error(f"🔍 [股票代码追踪] get_china_stock_data_unified 调用失败: {e}")
+                    logger.error(f"🔍 [股票代码追踪] get_china_stock_data_result 调用失败: {e}")
                     result_data.append(f"## A股价格数据\n获取失败: {e}")
 
                 try:
                     # 获取基本面数据
                     from tradingagents.dataflows.optimized_china_data import OptimizedChinaDataProvider
                     analyzer = OptimizedChinaDataProvider()
-                    logger.info(f"🔍 [股票代码追踪] 调用 OptimizedChinaDataProvider._generate_fundamentals_report，传入参数: ticker='{ticker}'")
-                    fundamentals_data = analyzer._generate_fundamentals_report(ticker, stock_data if 'stock_data' in locals() else "")
-                    logger.info(f"🔍 [股票代码追踪] _generate_fundamentals_report 返回结果前200字符: {fundamentals_data[:200] if fundamentals_data else 'None'}")
+                    logger.info("🔍 [股票代码追踪] 调用 OptimizedChinaDataProvider._generate_fundamentals_report，传入参数: ticker='%s'", ticker)
+                    fundamentals_data = analyzer._generate_fundamentals_report(ticker, stock_result if 'stock_result' in locals() else "")
+                    logger.info("🔍 [股票代码追踪] _generate_fundamentals_report 返回结果前200字符: %s",
+                                LazyArg(lambda: fundamentals_data[:200] if fundamentals_data else 'None'))
                     result_data.append(f"## A股基本面数据\n{fundamentals_data}")
                 except Exception as e:
                     logger.error(f"🔍 [股票代码追踪] _generate_fundamentals_report 调用失败: {e}")
@@ -4,9 +4,16 @@ from openai import OpenAI
 import dashscope
 from dashscope import TextEmbedding
 import os
+import json
+import time
 import threading
 import hashlib
-from typing import Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from tradingagents.utils.keyed_lock import KeyedLock
 
 # 导入统一日志系统
 from tradingagents.utils.logging_init import get_logger
@@ -107,7 +114,160 @@ class ChromaDBManager:
             return collection
 
 
+class EmbeddingCache:
+    """按内容哈希缓存的向量缓存 - 所有记忆实例共享，内存LRU + 可选磁盘层"""
+
+    def __init__(self, max_items: int = 1024, cache_dir: Optional[str] = None):
+        """
+        Args:
+            max_items: 内存中最多保留的向量数量
+            cache_dir: 磁盘缓存目录，None表示只使用内存缓存
+        """
+        self.max_items = max_items
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        self._items: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = KeyedLock()
+        self._stats = {'hits': 0, 'disk_hits': 0, 'misses': 0}
+
+    @staticmethod
+    def make_key(provider: str, model: str, text: str) -> str:
+        """生成缓存键：同一提供商、模型和文本内容得到同一个键"""
+        return hashlib.sha256(f"{provider}|{model}|{text}".encode('utf-8')).hexdigest()
+
+    def _remember(self, key: str, embedding: List[float]):
+        with self._lock:
+            self._items[key] = embedding
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def get(self, key: str) -> Optional[List[float]]:
+        """查找缓存的向量，内存未命中时查磁盘层"""
+        with self._lock:
+            embedding = self._items.get(key)
+            if embedding is not None:
+                self._items.move_to_end(key)
+                self._stats['hits'] += 1
+                return embedding
+
+        if self.cache_dir:
+            path = self.cache_dir / f"{key}.json"
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    embedding = json.load(f)
+            except (OSError, ValueError):
+                embedding = None
+            if embedding is not None:
+                self._remember(key, embedding)
+                with self._lock:
+                    self._stats['disk_hits'] += 1
+                return embedding
+        return None
+
+    def put(self, key: str, embedding: List[float]):
+        """写入向量（全零向量表示降级结果，不缓存）"""
+        if not embedding or all(x == 0.0 for x in embedding):
+            return
+        embedding = list(embedding)
+        self._remember(key, embedding)
+        if self.cache_dir:
+            try:
+                tmp_path = self.cache_dir / f"{key}.json.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(embedding, f)
+                os.replace(tmp_path, self.cache_dir / f"{key}.json")
+            except OSError as e:
+                logger.warning(f"⚠️ 向量缓存写入磁盘失败: {e}")
+
+    def get_or_compute(self, key: str, compute: Callable[[], List[float]]) -> List[float]:
+        """命中则直接返回，否则计算并缓存；同一文本的并发请求只计算一次"""
+        embedding = self.get(key)
+        if embedding is not None:
+            return embedding
+
+        with self._key_locks.hold(key):
+            embedding = self.get(key)
+            if embedding is not None:
+                return embedding
+            with self._lock:
+                self._stats['misses'] += 1
+            embedding = compute()
+            self.put(key, embedding)
+            return embedding
+
+    def record_miss(self, count: int = 1):
+        """记录批量请求路径上的未命中次数"""
+        with self._lock:
+            self._stats['misses'] += count
+
+    def clear(self):
+        """清空内存缓存"""
+        with self._lock:
+            self._items.clear()
+
+    def get_stats(self) -> Dict[str, int]:
+        """获取命中统计"""
+        with self._lock:
+            return dict(self._stats, size=len(self._items), max_items=self.max_items)
+
+
+# 全局向量缓存实例
+_embedding_cache = None
+_embedding_cache_lock = threading.Lock()
+
+def get_embedding_cache() -> EmbeddingCache:
+    """获取全局向量缓存实例"""
+    global _embedding_cache
+    with _embedding_cache_lock:
+        if _embedding_cache is None:
+            _embedding_cache = EmbeddingCache(
+                max_items=int(os.getenv('EMBEDDING_CACHE_MAX_ITEMS', '1024')),
+                cache_dir=os.getenv('EMBEDDING_CACHE_DIR') or None,
+            )
+        return _embedding_cache
+
+
+class _EmbeddingRateLimiter:
+    """embedding请求的最小间隔限流（多线程共享，按顺序预约请求时间）"""
+
+    def __init__(self, requests_per_second: float):
+        self.min_interval = 1.0 / requests_per_second if requests_per_second > 0 else 0.0
+        self._next_time = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            scheduled = max(now, self._next_time)
+            self._next_time = scheduled + self.min_interval
+        if scheduled > now:
+            time.sleep(scheduled - now)
+
+
+# 全局embedding限流器，所有记忆实例共享
+_embedding_rate_limiter = None
+
+def get_embedding_rate_limiter() -> _EmbeddingRateLimiter:
+    """获取全局embedding限流器"""
+    global _embedding_rate_limiter
+    with _embedding_cache_lock:
+        if _embedding_rate_limiter is None:
+            _embedding_rate_limiter = _EmbeddingRateLimiter(
+                float(os.getenv('EMBEDDING_REQUESTS_PER_SECOND', '5')))
+        return _embedding_rate_limiter
+
+
 class FinancialSituationMemory:
+    # 单次embedding请求的文本条数上限（DashScope text-embedding-v3 每批最多10条）
+    DASHSCOPE_BATCH_SIZE = 10
+    OPENAI_BATCH_SIZE = 100
+    # 单次写入Chroma的条数上限
+    CHROMA_ADD_BATCH_SIZE = 1000
+
     def __init__(self, name, config):
         self.config = config
         self.llm_provider = config.get("llm_provider", "openai").lower()
@@ -360,7 +520,32 @@ class FinancialSituationMemory:
         return truncated, True
 
     def get_embedding(self, text):
-        """Get embedding for a text using the configured provider"""
+        """Get embedding for a text using the configured provider (cached by content hash)"""
+
+        # 禁用、无效输入和超长文本不经过缓存
+        if (self.client == "DISABLED" or not text or not isinstance(text, str) or
+                (self.enable_embedding_length_check and len(text) > self.max_embedding_length)):
+            return self._get_embedding_uncached(text)
+
+        # 各研究员/交易员基于同一份报告构造相同的情况描述，同一文本只向提供商请求一次
+        cache = get_embedding_cache()
+        key = cache.make_key(self.llm_provider, self.embedding, text)
+        embedding = cache.get(key)
+        if embedding is not None:
+            logger.debug(f"⚡ 向量缓存命中: {len(text)}字符")
+            self._last_text_info = {
+                'original_length': len(text),
+                'processed_length': len(text),
+                'was_truncated': False,
+                'was_skipped': False,
+                'provider': self.llm_provider,
+                'strategy': 'embedding_cache_hit'
+            }
+            return embedding
+        return cache.get_or_compute(key, lambda: self._get_embedding_uncached(text))
+
+    def _get_embedding_uncached(self, text):
+        """Request an embedding from the configured provider"""
 
         # 检查记忆功能是否被禁用
         if self.client == "DISABLED":
@@ -407,12 +592,7 @@ class FinancialSituationMemory:
             'strategy': 'no_truncation_with_fallback'  # 标记策略
         }
 
-        if (self.llm_provider == "dashscope" or
-            self.llm_provider == "alibaba" or
-            self.llm_provider == "qianfan" or
-            (self.llm_provider == "google" and self.client is None) or
-            (self.llm_provider == "deepseek" and self.client is None) or
-            (self.llm_provider == "openrouter" and self.client is None)):
+        if self._uses_dashscope_embedding():
             # 使用阿里百炼的嵌入模型
             try:
                 # 导入DashScope模块
@@ -553,6 +733,91 @@ class FinancialSituationMemory:
                 logger.warning(f"⚠️ 记忆功能降级，返回空向量")
                 return [0.0] * 1024
 
+    def _uses_dashscope_embedding(self) -> bool:
+        """当前配置是否使用阿里百炼嵌入服务"""
+        return (self.llm_provider == "dashscope" or
+                self.llm_provider == "alibaba" or
+                self.llm_provider == "qianfan" or
+                (self.llm_provider == "google" and self.client is None) or
+                (self.llm_provider == "deepseek" and self.client is None) or
+                (self.llm_provider == "openrouter" and self.client is None))
+
+    def _request_embedding_batch(self, texts: List[str]) -> List[List[float]]:
+        """一次请求多条文本的embedding，失败时抛出异常（由调用方逐条降级）"""
+        if self._uses_dashscope_embedding():
+            if not hasattr(dashscope, 'api_key') or not dashscope.api_key:
+                raise RuntimeError("DashScope API密钥未设置")
+            response = TextEmbedding.call(model=self.embedding, input=texts)
+            if response.status_code != 200:
+                raise RuntimeError(f"{response.code} - {response.message}")
+            items = sorted(response.output['embeddings'], key=lambda item: item['text_index'])
+            return [item['embedding'] for item in items]
+
+        if self.client is None:
+            raise RuntimeError("嵌入客户端未初始化")
+        response = self.client.embeddings.create(model=self.embedding, input=texts)
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+    def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """
+        批量获取embedding
+
+        已缓存的文本直接返回，其余去重后按提供商批量上限分批请求，
+        多个批次在限流器控制下并发执行；某一批失败时对该批逐条走 get_embedding 的降级逻辑（逐条请求同样限流）。
+        """
+        results: List[Optional[List[float]]] = [None] * len(texts)
+        cache = get_embedding_cache()
+        pending: "OrderedDict[str, tuple]" = OrderedDict()
+
+        for i, text in enumerate(texts):
+            cacheable = (self.client != "DISABLED" and text and isinstance(text, str) and
+                         not (self.enable_embedding_length_check and len(text) > self.max_embedding_length))
+            if not cacheable:
+                results[i] = self.get_embedding(text)
+                continue
+
+            key = cache.make_key(self.llm_provider, self.embedding, text)
+            embedding = cache.get(key)
+            if embedding is not None:
+                results[i] = embedding
+            else:
+                pending.setdefault(key, (text, []))[1].append(i)
+
+        if pending:
+            cache.record_miss(len(pending))
+            default_batch_size = self.DASHSCOPE_BATCH_SIZE if self._uses_dashscope_embedding() else self.OPENAI_BATCH_SIZE
+            batch_size = max(1, int(os.getenv('EMBEDDING_BATCH_SIZE', str(default_batch_size))))
+            items = list(pending.items())
+            batches = [items[start:start + batch_size] for start in range(0, len(items), batch_size)]
+            limiter = get_embedding_rate_limiter()
+
+            def run_batch(batch):
+                batch_texts = [text for _, (text, _) in batch]
+                limiter.wait()
+                try:
+                    embeddings = self._request_embedding_batch(batch_texts)
+                    if len(embeddings) != len(batch_texts):
+                        raise RuntimeError(f"返回数量不匹配: {len(embeddings)}/{len(batch_texts)}")
+                except Exception as e:
+                    logger.warning(f"⚠️ 批量embedding失败，逐条处理{len(batch_texts)}条文本: {e}")
+                    # 批量失败多半是被限流，逐条请求同样要经过限流器
+                    embeddings = []
+                    for text in batch_texts:
+                        limiter.wait()
+                        embeddings.append(self._get_embedding_uncached(text))
+
+                for (key, (_, indices)), embedding in zip(batch, embeddings):
+                    cache.put(key, embedding)
+                    for i in indices:
+                        results[i] = embedding
+
+            max_workers = max(1, int(os.getenv('EMBEDDING_MAX_CONCURRENCY', '4')))
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(batches))) as executor:
+                list(executor.map(run_batch, batches))
+            logger.info(f"📦 批量embedding完成: {len(items)}条文本，{len(batches)}个请求")
+
+        return results
+
     def get_embedding_config_status(self):
         """获取向量缓存配置状态"""
         return {
@@ -573,7 +838,6 @@ class FinancialSituationMemory:
         situations = []
         advice = []
         ids = []
-        embeddings = []
 
         offset = self.situation_collection.count()
 
@@ -581,14 +845,24 @@ class FinancialSituationMemory:
             situations.append(situation)
             advice.append(recommendation)
             ids.append(str(offset + i))
-            embeddings.append(self.get_embedding(situation))
 
-        self.situation_collection.add(
-            documents=situations,
-            metadatas=[{"recommendation": rec} for rec in advice],
-            embeddings=embeddings,
-            ids=ids,
-        )
+        # 批量请求embedding，避免每条情况一次HTTP往返
+        embeddings = self.get_embeddings(situations)
+
+        # 分块写入Chroma，不超过客户端允许的单次写入上限
+        chunk_size = self.CHROMA_ADD_BATCH_SIZE
+        client = getattr(self.chroma_manager, '_client', None)
+        if hasattr(client, 'get_max_batch_size'):
+            chunk_size = min(chunk_size, client.get_max_batch_size())
+
+        for start in range(0, len(situations), chunk_size):
+            end = start + chunk_size
+            self.situation_collection.add(
+                documents=situations[start:end],
+                metadatas=[{"recommendation": rec} for rec in advice[start:end]],
+                embeddings=embeddings[start:end],
+                ids=ids[start:end],
+            )
 
     def get_memories(self, current_situation, n_matches=1):
         """Find matching recommendations using embeddings with smart truncation handling"""
@@ -656,7 +930,8 @@ class FinancialSituationMemory:
             'collection_count': self.situation_collection.count(),
             'client_status': 'enabled' if self.client != "DISABLED" else 'disabled',
             'embedding_model': self.embedding,
-            'provider': self.llm_provider
+            'provider': self.llm_provider,
+            'embedding_cache': get_embedding_cache().get_stats()
         }
         
         # 添加最后一次文本处理信息
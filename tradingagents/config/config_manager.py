@@ -4,6 +4,7 @@
 管理API密钥、模型配置、费率设置等
 """
 
+import copy
 import json
 import os
 import re
@@ -27,6 +28,8 @@ except ImportError:
     MONGODB_AVAILABLE = False
     MongoDBStorage = None
 
+from .usage_ledger import UsageLedger
+
 
 @dataclass
 class ModelConfig:
@@ -73,8 +76,14 @@ class ConfigManager:
         self.models_file = self.config_dir / "models.json"
         self.pricing_file = self.config_dir / "pricing.json"
         self.usage_file = self.config_dir / "usage.json"
+        self.usage_ledger_file = self.config_dir / "usage.jsonl"
         self.settings_file = self.config_dir / "settings.json"
 
+        # 配置文件内容缓存: 路径 -> ((修改时间, 大小), 解析后的数据)
+        self._json_cache: Dict[Path, tuple] = {}
+        # 定价表: (定价文件解析结果, {(供应商, 模型): (输入单价, 输出单价)})
+        self._pricing_table: Optional[tuple] = None
+
         # 加载.env文件（保持向后兼容）
         self._load_env_file()
 
@@ -84,6 +93,25 @@ class ConfigManager:
 
         self._init_default_configs()
 
+        # 使用记录账本（MongoDB不可用时的本地存储）
+        self.usage_ledger = UsageLedger(
+            self.usage_ledger_file,
+            max_records=self.load_settings().get("max_usage_records", 10000),
+            legacy_file=self.usage_file
+        )
+
+    def _read_json_cached(self, path: Path):
+        """读取JSON配置文件，文件未变化时直接返回缓存的解析结果（调用方不得修改返回值）"""
+        stat = path.stat()
+        signature = (stat.st_mtime_ns, stat.st_size)
+        cached = self._json_cache.get(path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self._json_cache[path] = (signature, data)
+        return data
+
     def _load_env_file(self):
         """加载.env文件（保持向后兼容）"""
         # 尝试从项目根目录加载.env文件
@@ -329,8 +357,7 @@ class ConfigManager:
     def load_pricing(self) -> List[PricingConfig]:
         """加载定价配置"""
         try:
-            with open(self.pricing_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            data = self._read_json_cached(self.pricing_file)
             return [PricingConfig(**item) for item in data]
         except Exception as e:
             logger.error(f"加载定价配置失败: {e}")
@@ -342,27 +369,22 @@ class ConfigManager:
             data = [asdict(price) for price in pricing]
             with open(self.pricing_file, 'w', encoding='utf-8') as f:
                 json.dump(data, f, ensure_ascii=False, indent=2)
+            self._json_cache.pop(self.pricing_file, None)
         except Exception as e:
             logger.error(f"保存定价配置失败: {e}")
     
     def load_usage_records(self) -> List[UsageRecord]:
         """加载使用记录"""
         try:
-            if not self.usage_file.exists():
-                return []
-            with open(self.usage_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return [UsageRecord(**item) for item in data]
+            return [UsageRecord(**item) for item in self.usage_ledger.read_all()]
         except Exception as e:
             logger.error(f"加载使用记录失败: {e}")
             return []
     
     def save_usage_records(self, records: List[UsageRecord]):
-        """保存使用记录"""
+        """保存使用记录（整体替换账本）"""
         try:
-            data = [asdict(record) for record in records]
-            with open(self.usage_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            self.usage_ledger.rewrite([asdict(record) for record in records])
         except Exception as e:
             logger.error(f"保存使用记录失败: {e}")
     
@@ -391,44 +413,80 @@ class ConfigManager:
             else:
                 logger.error(f"⚠️ MongoDB保存失败，回退到JSON文件存储")
         
-        # 回退到JSON文件存储
-        records = self.load_usage_records()
-        records.append(record)
-        
-        # 限制记录数量
-        settings = self.load_settings()
-        max_records = settings.get("max_usage_records", 10000)
-        if len(records) > max_records:
-            records = records[-max_records:]
-        
-        self.save_usage_records(records)
+        # 回退到本地账本：只追加一行，超出保留条数时由账本定期压缩
+        try:
+            self.usage_ledger.max_records = self.load_settings().get("max_usage_records", 10000)
+            self.usage_ledger.append(asdict(record))
+        except Exception as e:
+            logger.error(f"保存使用记录失败: {e}")
         return record
     
+    def get_pricing_table(self) -> Dict[tuple, tuple]:
+        """获取定价表 {(供应商, 模型): (输入单价, 输出单价)}，定价文件变化后自动重建"""
+        try:
+            data = self._read_json_cached(self.pricing_file)
+        except Exception as e:
+            logger.error(f"加载定价配置失败: {e}")
+            return {}
+
+        if self._pricing_table is None or self._pricing_table[0] is not data:
+            table = {}
+            for item in data:
+                # 与逐条查找保持一致：同一模型有多条定价时以第一条为准
+                table.setdefault((item['provider'], item['model_name']),
+                                 (item['input_price_per_1k'], item['output_price_per_1k']))
+            self._pricing_table = (data, table)
+        return self._pricing_table[1]
+
     def calculate_cost(self, provider: str, model_name: str, input_tokens: int, output_tokens: int) -> float:
         """计算使用成本"""
-        pricing_configs = self.load_pricing()
+        pricing_table = self.get_pricing_table()
 
-        for pricing in pricing_configs:
-            if pricing.provider == provider and pricing.model_name == model_name:
-                input_cost = (input_tokens / 1000) * pricing.input_price_per_1k
-                output_cost = (output_tokens / 1000) * pricing.output_price_per_1k
-                total_cost = input_cost + output_cost
-                return round(total_cost, 6)
+        prices = pricing_table.get((provider, model_name))
+        if prices is not None:
+            input_cost = (input_tokens / 1000) * prices[0]
+            output_cost = (output_tokens / 1000) * prices[1]
+            total_cost = input_cost + output_cost
+            return round(total_cost, 6)
 
         # 只在找不到配置时输出调试信息
         logger.warning(f"⚠️ [calculate_cost] 未找到匹配的定价配置: {provider}/{model_name}")
         logger.debug(f"⚠️ [calculate_cost] 可用的配置:")
-        for pricing in pricing_configs:
-            logger.debug(f"⚠️ [calculate_cost]   - {pricing.provider}/{pricing.model_name}")
+        for pricing_provider, pricing_model in pricing_table:
+            logger.debug(f"⚠️ [calculate_cost]   - {pricing_provider}/{pricing_model}")
 
         return 0.0
+
+    def calculate_costs(self, usage):
+        """
+        批量计算使用成本（按当前定价）
+
+        Args:
+            usage: 包含 provider, model_name, input_tokens, output_tokens 列的DataFrame
+
+        Returns:
+            pd.Series: 与 usage 行对应的成本，没有定价的模型为0
+        """
+        import pandas as pd
+
+        pricing_table = self.get_pricing_table()
+        pricing_df = pd.DataFrame(
+            [(provider, model_name, prices[0], prices[1])
+             for (provider, model_name), prices in pricing_table.items()],
+            columns=['provider', 'model_name', 'input_price_per_1k', 'output_price_per_1k']
+        )
+        prices = usage[['provider', 'model_name']].merge(pricing_df, on=['provider', 'model_name'], how='left')
+        input_prices = prices['input_price_per_1k'].fillna(0).to_numpy(dtype=float)
+        output_prices = prices['output_price_per_1k'].fillna(0).to_numpy(dtype=float)
+        costs = (usage['input_tokens'].to_numpy(dtype=float) / 1000 * input_prices
+                 + usage['output_tokens'].to_numpy(dtype=float) / 1000 * output_prices)
+        return pd.Series(costs, index=usage.index).round(6)
     
     def load_settings(self) -> Dict[str, Any]:
         """加载设置，合并.env中的配置"""
         try:
             if self.settings_file.exists():
-                with open(self.settings_file, 'r', encoding='utf-8') as f:
-                    settings = json.load(f)
+                settings = copy.deepcopy(self._read_json_cached(self.settings_file))
             else:
                 # 如果设置文件不存在，创建默认设置
                 settings = {
@@ -501,6 +559,7 @@ class ConfigManager:
         try:
             with open(self.settings_file, 'w', encoding='utf-8') as f:
                 json.dump(settings, f, ensure_ascii=False, indent=2)
+            self._json_cache.pop(self.settings_file, None)
         except Exception as e:
             logger.error(f"保存设置失败: {e}")
     
@@ -534,51 +593,20 @@ class ConfigManager:
             except Exception as e:
                 logger.error(f"⚠️ MongoDB统计获取失败，回退到JSON文件: {e}")
         
-        # 回退到JSON文件统计
-        records = self.load_usage_records()
-        
-        # 过滤最近N天的记录
-        from datetime import datetime, timedelta
+        # 回退到本地账本的增量统计
+        from datetime import timedelta
 
         cutoff_date = datetime.now() - timedelta(days=days)
-        
-        recent_records = []
-        for record in records:
-            try:
-                record_date = datetime.fromisoformat(record.timestamp)
-                if record_date >= cutoff_date:
-                    recent_records.append(record)
-            except:
-                continue
-        
-        # 统计数据
-        total_cost = sum(record.cost for record in recent_records)
-        total_input_tokens = sum(record.input_tokens for record in recent_records)
-        total_output_tokens = sum(record.output_tokens for record in recent_records)
-        
-        # 按供应商统计
-        provider_stats = {}
-        for record in recent_records:
-            if record.provider not in provider_stats:
-                provider_stats[record.provider] = {
-                    "cost": 0,
-                    "input_tokens": 0,
-                    "output_tokens": 0,
-                    "requests": 0
-                }
-            provider_stats[record.provider]["cost"] += record.cost
-            provider_stats[record.provider]["input_tokens"] += record.input_tokens
-            provider_stats[record.provider]["output_tokens"] += record.output_tokens
-            provider_stats[record.provider]["requests"] += 1
+        stats = self.usage_ledger.get_statistics(cutoff_date)
         
         return {
             "period_days": days,
-            "total_cost": round(total_cost, 4),
-            "total_input_tokens": total_input_tokens,
-            "total_output_tokens": total_output_tokens,
-            "total_requests": len(recent_records),
-            "provider_stats": provider_stats,
-            "records_count": len(recent_records)
+            "total_cost": round(stats["cost"], 4),
+            "total_input_tokens": stats["input_tokens"],
+            "total_output_tokens": stats["output_tokens"],
+            "total_requests": stats["requests"],
+            "provider_stats": stats["provider_stats"],
+            "records_count": stats["requests"]
         }
     
     def get_data_dir(self) -> str:
@@ -700,9 +728,7 @@ class TokenTracker:
 
     def get_session_cost(self, session_id: str) -> float:
         """获取会话成本"""
-        records = self.config_manager.load_usage_records()
-        session_cost = sum(record.cost for record in records if record.session_id == session_id)
-        return session_cost
+        return self.config_manager.usage_ledger.get_session_cost(session_id)
 
     def estimate_cost(self, provider: str, model_name: str, estimated_input_tokens: int,
                      estimated_output_tokens: int) -> float:
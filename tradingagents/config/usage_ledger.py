@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Token使用记录账本
+每条使用记录以一行JSON追加到 usage.jsonl，写入和压缩通过文件锁互斥（多进程安全），
+统计数据在内存中按增量维护，不再每次调用都读写整个记录文件
+"""
+
+import bisect
+import json
+import os
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+
+@contextmanager
+def _file_lock(lock_path: Path):
+    """跨进程文件锁"""
+    with open(lock_path, 'a+') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class _UsageSeries:
+    """单个分组（全部或某个供应商）的使用记录前缀和，按时间窗口求和为O(log n)"""
+
+    __slots__ = ('timestamps', 'cost', 'input_tokens', 'output_tokens')
+
+    def __init__(self):
+        self.timestamps: List[float] = []
+        self.cost: List[float] = [0.0]
+        self.input_tokens: List[int] = [0]
+        self.output_tokens: List[int] = [0]
+
+    def add(self, timestamp: float, cost: float, input_tokens: int, output_tokens: int):
+        # 并发写入的记录可能有毫秒级乱序，按已有最大时间计入以保持有序
+        if self.timestamps and timestamp < self.timestamps[-1]:
+            timestamp = self.timestamps[-1]
+        self.timestamps.append(timestamp)
+        self.cost.append(self.cost[-1] + cost)
+        self.input_tokens.append(self.input_tokens[-1] + input_tokens)
+        self.output_tokens.append(self.output_tokens[-1] + output_tokens)
+
+    def since(self, cutoff: float) -> Dict[str, Any]:
+        start = bisect.bisect_left(self.timestamps, cutoff)
+        return {
+            "cost": self.cost[-1] - self.cost[start],
+            "input_tokens": self.input_tokens[-1] - self.input_tokens[start],
+            "output_tokens": self.output_tokens[-1] - self.output_tokens[start],
+            "requests": len(self.timestamps) - start,
+        }
+
+
+class UsageLedger:
+    """追加写入的使用记录账本
+
+    - 追加一条记录只写一行，成本与记录总数无关
+    - 记录数超过 max_records * COMPACT_RATIO 时压缩为最近 max_records 条
+    - 内存中的统计从上次读取位置继续读取新增行，其他进程追加的记录也会被计入
+    """
+
+    # 超过保留条数的该倍数时触发压缩
+    COMPACT_RATIO = 1.2
+
+    def __init__(self, ledger_file: Path, max_records: int = 10000, legacy_file: Optional[Path] = None):
+        """
+        初始化使用记录账本
+
+        Args:
+            ledger_file: JSONL账本文件路径
+            max_records: 压缩后保留的记录数
+            legacy_file: 旧版 usage.json，账本不存在时从中迁移
+        """
+        self.ledger_file = Path(ledger_file)
+        self.lock_file = self.ledger_file.with_name(self.ledger_file.name + ".lock")
+        self.max_records = max_records
+        self._lock = threading.RLock()
+        self._reset_state()
+
+        if legacy_file is not None and not self.ledger_file.exists() and Path(legacy_file).exists():
+            self._migrate_legacy(Path(legacy_file))
+
+    def _reset_state(self):
+        self._offset = 0
+        self._file_id = None
+        self._line_count = 0
+        self._total = _UsageSeries()
+        self._providers: Dict[str, _UsageSeries] = defaultdict(_UsageSeries)
+        self._session_costs: Dict[str, float] = defaultdict(float)
+
+    def _migrate_legacy(self, legacy_file: Path):
+        """把旧版 usage.json 迁移为JSONL账本"""
+        try:
+            with open(legacy_file, 'r', encoding='utf-8') as f:
+                records = json.load(f)
+            self.rewrite(records)
+            legacy_file.replace(legacy_file.with_name(legacy_file.name + ".migrated"))
+            logger.info(f"📒 已将 {len(records)} 条使用记录迁移到 {self.ledger_file.name}")
+        except Exception as e:
+            logger.error(f"迁移旧版使用记录失败: {e}")
+
+    # ------------------------------------------------------------------
+    # 增量读取
+    # ------------------------------------------------------------------
+
+    def _index(self, record: Dict[str, Any]):
+        try:
+            timestamp = datetime.fromisoformat(record['timestamp']).timestamp()
+        except (KeyError, TypeError, ValueError):
+            return
+        cost = record.get('cost', 0.0)
+        input_tokens = record.get('input_tokens', 0)
+        output_tokens = record.get('output_tokens', 0)
+        self._total.add(timestamp, cost, input_tokens, output_tokens)
+        self._providers[record.get('provider', '')].add(timestamp, cost, input_tokens, output_tokens)
+        self._session_costs[record.get('session_id', '')] += cost
+
+    def _refresh(self):
+        """读取上次位置之后新增的完整行；文件被压缩或替换时重新读取"""
+        try:
+            stat = self.ledger_file.stat()
+        except FileNotFoundError:
+            if self._file_id is not None:
+                self._reset_state()
+            return
+
+        file_id = (stat.st_dev, stat.st_ino)
+        if file_id != self._file_id or stat.st_size < self._offset:
+            self._reset_state()
+            self._file_id = file_id
+        if stat.st_size == self._offset:
+            return
+
+        with open(self.ledger_file, 'rb') as f:
+            f.seek(self._offset)
+            data = f.read()
+        end = data.rfind(b'\n') + 1
+        for line in data[:end].splitlines():
+            if not line.strip():
+                continue
+            self._line_count += 1
+            try:
+                self._index(json.loads(line))
+            except ValueError:
+                logger.warning("⚠️ 跳过无法解析的使用记录行")
+        self._offset += end
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+
+    def append(self, record: Dict[str, Any]):
+        """追加一条使用记录"""
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode('utf-8')
+        with self._lock, _file_lock(self.lock_file):
+            with open(self.ledger_file, 'ab') as f:
+                f.write(line)
+            self._refresh()
+            if self._line_count > self.max_records * self.COMPACT_RATIO:
+                self._compact_locked()
+
+    def rewrite(self, records: List[Dict[str, Any]]):
+        """用给定记录整体替换账本（清空记录或迁移时使用）"""
+        tmp_file = self.ledger_file.with_name(self.ledger_file.name + ".tmp")
+        with self._lock, _file_lock(self.lock_file):
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            os.replace(tmp_file, self.ledger_file)
+            self._reset_state()
+
+    def _compact_locked(self):
+        """只保留最近 max_records 条记录，调用方需持有文件锁"""
+        with open(self.ledger_file, 'rb') as f:
+            lines = [line for line in f.read().splitlines() if line.strip()]
+        kept = lines[-self.max_records:] if self.max_records > 0 else []
+        tmp_file = self.ledger_file.with_name(self.ledger_file.name + ".tmp")
+        with open(tmp_file, 'wb') as f:
+            f.write(b"".join(line + b"\n" for line in kept))
+        os.replace(tmp_file, self.ledger_file)
+        self._reset_state()
+        self._refresh()
+        logger.info(f"📒 使用记录已压缩: {len(lines)} -> {len(kept)} 条")
+
+    # ------------------------------------------------------------------
+    # 读取
+    # ------------------------------------------------------------------
+
+    def read_all(self) -> List[Dict[str, Any]]:
+        """读取全部使用记录"""
+        records = []
+        with self._lock:
+            try:
+                with open(self.ledger_file, 'rb') as f:
+                    data = f.read()
+            except FileNotFoundError:
+                return []
+        for line in data[:data.rfind(b'\n') + 1].splitlines():
+            if line.strip():
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+        return records
+
+    def get_statistics(self, cutoff: datetime) -> Dict[str, Any]:
+        """统计 cutoff 之后的使用量，返回总计和按供应商的分组"""
+        cutoff_ts = cutoff.timestamp()
+        with self._lock:
+            self._refresh()
+            totals = self._total.since(cutoff_ts)
+            provider_stats = {}
+            for provider, series in self._providers.items():
+                stats = series.since(cutoff_ts)
+                if stats["requests"]:
+                    provider_stats[provider] = stats
+        totals["provider_stats"] = provider_stats
+        return totals
+
+    def get_session_cost(self, session_id: str) -> float:
+        """获取会话累计成本"""
+        with self._lock:
+            self._refresh()
+            return self._session_costs.get(session_id, 0.0)
@@ -9,6 +9,8 @@ from typing import Optional, Dict, Any
 import warnings
 from datetime import datetime
 
+from .io_executor import IOTimeoutError, get_io_executor
+
 # 导入日志模块
 from tradingagents.utils.logging_manager import get_logger
 logger = get_logger('agents')
@@ -142,42 +144,17 @@ class AKShareProvider:
             start_date_formatted = start_date.replace('-', '') if start_date else "20240101"
             end_date_formatted = end_date.replace('-', '') if end_date else "20241231"
 
-            # 使用AKShare获取港股历史数据（带超时保护）
-            import threading
-
-            result = [None]
-            exception = [None]
-
-            def fetch_hist_data():
-                try:
-                    result[0] = self.ak.stock_hk_hist(
-                        symbol=hk_symbol,
-                        period="daily",
-                        start_date=start_date_formatted,
-                        end_date=end_date_formatted,
-                        adjust=""
-                    )
-                except Exception as e:
-                    exception[0] = e
-
-            # 启动线程
-            thread = threading.Thread(target=fetch_hist_data)
-            thread.daemon = True
-            thread.start()
-
-            # 等待60秒
-            thread.join(timeout=60)
-
-            if thread.is_alive():
-                # 超时了
-                logger.warning(f"⚠️ AKShare港股历史数据获取超时（60秒）: {symbol}")
-                raise Exception(f"AKShare港股历史数据获取超时（60秒）: {symbol}")
-            elif exception[0]:
-                # 有异常
-                raise exception[0]
-            else:
-                # 成功
-                data = result[0]
+            # 使用AKShare获取港股历史数据（共享I/O线程池，带超时保护）
+            data = get_io_executor().run(
+                self.ak.stock_hk_hist,
+                symbol=hk_symbol,
+                period="daily",
+                start_date=start_date_formatted,
+                end_date=end_date_formatted,
+                adjust="",
+                timeout=60,
+                name=f"AKShare港股历史数据 {symbol}",
+            )
 
             if not data.empty:
                 # 数据预处理
@@ -233,39 +210,12 @@ class AKShareProvider:
 
             logger.info(f"🇭🇰 AKShare获取港股信息: {hk_symbol}")
 
-            # 尝试获取港股实时行情数据来获取基本信息
-            # 使用线程超时包装（兼容Windows）
-            import threading
-            import time
-
-
-            result = [None]
-            exception = [None]
-
-            def fetch_data():
-                try:
-                    result[0] = self.ak.stock_hk_spot_em()
-                except Exception as e:
-                    exception[0] = e
-
-            # 启动线程
-            thread = threading.Thread(target=fetch_data)
-            thread.daemon = True
-            thread.start()
-
-            # 等待60秒
-            thread.join(timeout=60)
-
-            if thread.is_alive():
-                # 超时了
+            # 尝试获取港股实时行情数据来获取基本信息（共享I/O线程池，带超时保护）
+            try:
+                spot_data = get_io_executor().run(self.ak.stock_hk_spot_em, timeout=60, name="AKShare港股实时行情")
+            except IOTimeoutError:
                 logger.warning(f"⚠️ AKShare港股信息获取超时（60秒），使用备用方案")
-                raise Exception("AKShare港股信息获取超时（60秒）")
-            elif exception[0]:
-                # 有异常
-                raise exception[0]
-            else:
-                # 成功
-                spot_data = result[0]
+                raise
 
             # 查找对应的股票信息
             if not spot_data.empty:
@@ -563,47 +513,18 @@ def get_stock_news_em(symbol: str, max_news: int = 10) -> pd.DataFrame:
 
         logger.info(f"[东方财富新闻] 📰 准备调用AKShare API获取个股新闻: {symbol}")
 
-        # 使用线程超时包装（兼容Windows）
-        import threading
-        import time
-
-        result = [None]
-        exception = [None]
-
-        def fetch_news():
-            try:
-                logger.debug(f"[东方财富新闻] 线程开始执行 stock_news_em API调用: {symbol}")
-                thread_start = time.time()
-                result[0] = provider.ak.stock_news_em(symbol=symbol)
-                thread_end = time.time()
-                logger.debug(f"[东方财富新闻] 线程执行完成，耗时: {thread_end - thread_start:.2f}秒")
-            except Exception as e:
-                logger.error(f"[东方财富新闻] 线程执行异常: {e}")
-                exception[0] = e
-
-        # 启动线程
-        thread = threading.Thread(target=fetch_news)
-        thread.daemon = True
-        logger.debug(f"[东方财富新闻] 启动线程获取新闻数据")
-        thread.start()
-
-        # 等待30秒
-        logger.debug(f"[东方财富新闻] 等待线程完成，最长等待30秒")
-        thread.join(timeout=30)
-
-        if thread.is_alive():
-            # 超时了
+        # 共享I/O线程池执行，超时后不再占用线程（兼容Windows）
+        try:
+            news_df = get_io_executor().run(provider.ak.stock_news_em, symbol=symbol,
+                                            timeout=30, name=f"东方财富个股新闻 {symbol}")
+        except IOTimeoutError:
             elapsed_time = (datetime.now() - start_time).total_seconds()
             logger.warning(f"[东方财富新闻] ⚠️ 获取超时（30秒）: {symbol}，总耗时: {elapsed_time:.2f}秒")
-            raise Exception(f"东方财富个股新闻获取超时（30秒）: {symbol}")
-        elif exception[0]:
-            # 有异常
+            raise
+        except Exception as e:
             elapsed_time = (datetime.now() - start_time).total_seconds()
-            logger.error(f"[东方财富新闻] ❌ API调用异常: {exception[0]}，总耗时: {elapsed_time:.2f}秒")
-            raise exception[0]
-        else:
-            # 成功
-            news_df = result[0]
+            logger.error(f"[东方财富新闻] ❌ API调用异常: {e}，总耗时: {elapsed_time:.2f}秒")
+            raise
 
         if news_df is not None and not news_df.empty:
             # 限制新闻数量为最新的max_news条
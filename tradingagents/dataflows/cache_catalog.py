@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+缓存元数据目录索引
+用SQLite为 StockDataCache 的 *_meta.json 建立持久化索引，
+按股票代码、数据类型、数据源、日期范围和缓存时间查找，避免每次查找都扫描整个元数据目录
+"""
+
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+
+class CacheCatalog:
+    """缓存元数据索引 - 元数据JSON文件仍是权威数据，索引可随时从中重建"""
+
+    SCHEMA_VERSION = 1
+
+    # 索引中保存的元数据字段（均可用于查找）
+    COLUMNS = ('cache_key', 'symbol', 'data_type', 'market_type', 'data_source',
+               'start_date', 'end_date', 'file_path', 'file_format', 'cached_at', 'cached_ts')
+
+    def __init__(self, db_path: Path, metadata_dir: Path):
+        """
+        初始化缓存索引
+
+        Args:
+            db_path: SQLite索引文件路径
+            metadata_dir: *_meta.json 元数据目录，首次运行时从这里重建索引
+        """
+        self.db_path = Path(db_path)
+        self.metadata_dir = Path(metadata_dir)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    cache_key TEXT PRIMARY KEY,
+                    symbol TEXT,
+                    data_type TEXT,
+                    market_type TEXT,
+                    data_source TEXT,
+                    start_date TEXT,
+                    end_date TEXT,
+                    file_path TEXT,
+                    file_format TEXT,
+                    cached_at TEXT,
+                    cached_ts REAL
+                )
+            """)
+            self._conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_cache_lookup
+                ON cache_entries (symbol, data_type, market_type, data_source, cached_ts)
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_age ON cache_entries (cached_ts)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS catalog_info (key TEXT PRIMARY KEY, value TEXT)")
+
+        if self._get_info('schema_version') != str(self.SCHEMA_VERSION):
+            self.rebuild()
+
+    def _get_info(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM catalog_info WHERE key = ?", (key,)).fetchone()
+        return row['value'] if row else None
+
+    @staticmethod
+    def _to_row(cache_key: str, metadata: Dict[str, Any]) -> tuple:
+        cached_at = metadata.get('cached_at')
+        cached_ts = datetime.fromisoformat(cached_at).timestamp() if cached_at else 0.0
+        return (
+            cache_key,
+            metadata.get('symbol'),
+            metadata.get('data_type'),
+            metadata.get('market_type'),
+            metadata.get('data_source'),
+            metadata.get('start_date'),
+            metadata.get('end_date'),
+            metadata.get('file_path'),
+            metadata.get('file_format'),
+            cached_at,
+            cached_ts,
+        )
+
+    def rebuild(self) -> int:
+        """从元数据目录中的 *_meta.json 全量重建索引"""
+        rows = []
+        for metadata_file in self.metadata_dir.glob("*_meta.json"):
+            try:
+                with open(metadata_file, 'r', encoding='utf-8') as f:
+                    metadata = json.load(f)
+                rows.append(self._to_row(metadata_file.stem.replace('_meta', ''), metadata))
+            except Exception as e:
+                logger.warning(f"⚠️ 跳过无法解析的元数据文件 {metadata_file.name}: {e}")
+
+        placeholders = ", ".join("?" for _ in self.COLUMNS)
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM cache_entries")
+            self._conn.executemany(f"INSERT OR REPLACE INTO cache_entries VALUES ({placeholders})", rows)
+            self._conn.execute("INSERT OR REPLACE INTO catalog_info VALUES ('schema_version', ?)",
+                               (str(self.SCHEMA_VERSION),))
+
+        logger.info(f"🗂️ 缓存索引已重建: {len(rows)} 条元数据")
+        return len(rows)
+
+    def upsert(self, cache_key: str, metadata: Dict[str, Any]):
+        """写入或更新一条元数据"""
+        placeholders = ", ".join("?" for _ in self.COLUMNS)
+        with self._lock, self._conn:
+            self._conn.execute(f"INSERT OR REPLACE INTO cache_entries VALUES ({placeholders})",
+                               self._to_row(cache_key, metadata))
+
+    def remove(self, cache_key: str):
+        """删除一条元数据"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM cache_entries WHERE cache_key = ?", (cache_key,))
+
+    def get(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """按缓存键获取元数据"""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM cache_entries WHERE cache_key = ?", (cache_key,)).fetchone()
+        return dict(row) if row else None
+
+    def find(self, symbol: str, data_type: str, market_type: str = None,
+             data_source: str = None, start_date: str = None, end_date: str = None,
+             min_cached_at: datetime = None) -> List[Dict[str, Any]]:
+        """
+        查找匹配的元数据，按缓存时间从新到旧排序
+
+        Args:
+            symbol: 股票代码
+            data_type: 数据类型
+            market_type: 市场类型，None表示不限
+            data_source: 数据源，None表示不限
+            start_date: 开始日期，None表示不限
+            end_date: 结束日期，None表示不限
+            min_cached_at: 只返回在此时间之后缓存的条目（用于TTL过滤）
+        """
+        conditions = ["symbol = ?", "data_type = ?"]
+        params: List[Any] = [symbol, data_type]
+        for column, value in (('market_type', market_type), ('data_source', data_source),
+                              ('start_date', start_date), ('end_date', end_date)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        if min_cached_at is not None:
+            conditions.append("cached_ts >= ?")
+            params.append(min_cached_at.timestamp())
+
+        query = f"SELECT * FROM cache_entries WHERE {' AND '.join(conditions)} ORDER BY cached_ts DESC"
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def find_older_than(self, cutoff: datetime) -> List[Dict[str, Any]]:
+        """查找在 cutoff 之前缓存的条目"""
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM cache_entries WHERE cached_ts < ?",
+                                      (cutoff.timestamp(),)).fetchall()
+        return [dict(row) for row in rows]
+
+    def count(self) -> int:
+        """索引中的条目数"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+
+    def close(self):
+        """关闭索引连接"""
+        with self._lock:
+            self._conn.close()
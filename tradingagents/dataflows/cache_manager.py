@@ -17,6 +17,23 @@ import hashlib
 from tradingagents.utils.logging_manager import get_logger
 logger = get_logger('agents')
 
+from .cache_catalog import CacheCatalog
+from .market_data import StockDataResult
+
+# 列式存储依赖（可选）- streamlit 已依赖 pyarrow，缺失时回退到CSV
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# 行情DataFrame支持的缓存格式
+DATAFRAME_CACHE_FORMATS = ('csv', 'feather', 'parquet')
+# 结构化行情结果（StockDataResult）的压缩二进制载荷
+PAYLOAD_CACHE_FORMAT = 'payload'
+
 
 class StockDataCache:
     """股票数据缓存管理器 - 支持美股和A股数据缓存优化"""
@@ -51,6 +68,13 @@ class StockDataCache:
                         self.china_fundamentals_dir, self.metadata_dir]:
             dir_path.mkdir(exist_ok=True)
 
+        # 元数据索引 - 查找和TTL检查走SQLite索引，首次运行时从 *_meta.json 重建
+        try:
+            self.catalog = CacheCatalog(self.cache_dir / "metadata_catalog.db", self.metadata_dir)
+        except Exception as e:
+            logger.warning(f"⚠️ 缓存索引不可用，回退到扫描元数据目录: {e}")
+            self.catalog = None
+
         # 缓存配置 - 针对不同市场设置不同的TTL
         self.cache_config = {
             'us_stock_data': {
@@ -92,11 +116,49 @@ class StockDataCache:
             'enable_length_check': os.getenv('ENABLE_CACHE_LENGTH_CHECK', 'false').lower() == 'true'  # 文件缓存默认不限制
         }
 
+        # 行情DataFrame存储格式：csv（默认）、feather（Arrow IPC，可内存映射）或 parquet
+        self.dataframe_format = self._resolve_dataframe_format(os.getenv('CACHE_DATAFRAME_FORMAT', 'csv'))
+
         logger.info(f"📁 缓存管理器初始化完成，缓存目录: {self.cache_dir}")
         logger.info(f"🗄️ 数据库缓存管理器初始化完成")
         logger.info(f"   美股数据: ✅ 已配置")
         logger.info(f"   A股数据: ✅ 已配置")
 
+    @staticmethod
+    def _resolve_dataframe_format(file_format: str) -> str:
+        """校验DataFrame缓存格式，列式格式在缺少pyarrow时回退到CSV"""
+        file_format = (file_format or 'csv').strip().lower()
+        if file_format not in DATAFRAME_CACHE_FORMATS:
+            logger.warning(f"⚠️ 未知的缓存格式 {file_format}，使用csv")
+            return 'csv'
+        if file_format != 'csv' and not PYARROW_AVAILABLE:
+            logger.warning(f"⚠️ 未安装pyarrow，无法使用{file_format}缓存格式，回退到csv")
+            return 'csv'
+        return file_format
+
+    @staticmethod
+    def _write_dataframe(data: pd.DataFrame, path: Path, file_format: str):
+        """按指定格式写入DataFrame，列式格式保留索引和列类型"""
+        if file_format == 'csv':
+            data.to_csv(path, index=True)
+            return
+
+        table = pa.Table.from_pandas(data, preserve_index=True)
+        if file_format == 'feather':
+            # 不压缩，读取时可直接内存映射
+            feather.write_feather(table, path, compression='uncompressed')
+        else:
+            pq.write_table(table, path)
+
+    @staticmethod
+    def _read_dataframe(path: Path, file_format: str) -> pd.DataFrame:
+        """按指定格式读取DataFrame"""
+        if file_format == 'csv':
+            return pd.read_csv(path, index_col=0)
+        if file_format == 'feather':
+            return feather.read_table(path, memory_map=True).to_pandas()
+        return pq.read_table(path, memory_map=True).to_pandas()
+
     def _determine_market_type(self, symbol: str) -> str:
         """根据股票代码确定市场类型"""
         import re
@@ -210,12 +272,19 @@ class StockDataCache:
     
     def _save_metadata(self, cache_key: str, metadata: Dict[str, Any]):
         """保存元数据"""
+        metadata['cached_at'] = datetime.now().isoformat()
+        self._write_metadata(cache_key, metadata)
+
+    def _write_metadata(self, cache_key: str, metadata: Dict[str, Any]):
+        """写入元数据文件并同步索引（不修改缓存时间）"""
         metadata_path = self._get_metadata_path(cache_key)
         metadata_path.parent.mkdir(parents=True, exist_ok=True)  # 确保目录存在
-        metadata['cached_at'] = datetime.now().isoformat()
-        
+
         with open(metadata_path, 'w', encoding='utf-8') as f:
             json.dump(metadata, f, ensure_ascii=False, indent=2)
+
+        if self.catalog:
+            self.catalog.upsert(cache_key, metadata)
     
     def _load_metadata(self, cache_key: str) -> Optional[Dict[str, Any]]:
         """加载元数据"""
@@ -229,10 +298,77 @@ class StockDataCache:
         except Exception as e:
             logger.error(f"⚠️ 加载元数据失败: {e}")
             return None
+
+    def _get_indexed_metadata(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """优先从索引获取元数据，索引缺失时读取JSON并补录索引"""
+        if self.catalog:
+            entry = self.catalog.get(cache_key)
+            if entry:
+                if self._get_metadata_path(cache_key).exists():
+                    return entry
+                # 元数据文件已被外部删除，同步清理索引
+                self.catalog.remove(cache_key)
+                return None
+
+        metadata = self._load_metadata(cache_key)
+        if metadata and self.catalog:
+            self.catalog.upsert(cache_key, metadata)
+        return metadata
+
+    def find_cache_entries(self, symbol: str, data_type: str, market_type: str = None,
+                           data_source: str = None, max_age_hours: float = None) -> List[Dict[str, Any]]:
+        """
+        查找匹配的缓存条目，按缓存时间从新到旧排序
+
+        Args:
+            symbol: 股票代码
+            data_type: 数据类型（stock_data/news/fundamentals）
+            market_type: 市场类型，None表示不限
+            data_source: 数据源，None表示不限
+            max_age_hours: 最大缓存时间（小时），None表示不检查TTL
+
+        Returns:
+            元数据列表，每项包含 cache_key 字段
+        """
+        min_cached_at = None
+        if max_age_hours is not None:
+            min_cached_at = datetime.now() - timedelta(hours=max_age_hours)
+
+        if self.catalog:
+            entries = []
+            for entry in self.catalog.find(symbol, data_type, market_type=market_type,
+                                           data_source=data_source, min_cached_at=min_cached_at):
+                if self._get_metadata_path(entry['cache_key']).exists():
+                    entries.append(entry)
+                else:
+                    self.catalog.remove(entry['cache_key'])
+            return entries
+
+        # 索引不可用时回退到扫描元数据目录
+        entries = []
+        for metadata_file in self.metadata_dir.glob("*_meta.json"):
+            try:
+                with open(metadata_file, 'r', encoding='utf-8') as f:
+                    metadata = json.load(f)
+
+                if (metadata.get('symbol') == symbol and
+                    metadata.get('data_type') == data_type and
+                    (market_type is None or metadata.get('market_type') == market_type) and
+                    (data_source is None or metadata.get('data_source') == data_source)):
+
+                    cached_at = datetime.fromisoformat(metadata['cached_at'])
+                    if min_cached_at is None or cached_at >= min_cached_at:
+                        metadata['cache_key'] = metadata_file.stem.replace('_meta', '')
+                        entries.append(metadata)
+            except Exception:
+                continue
+
+        entries.sort(key=lambda m: m['cached_at'], reverse=True)
+        return entries
     
     def is_cache_valid(self, cache_key: str, max_age_hours: int = None, symbol: str = None, data_type: str = None) -> bool:
         """检查缓存是否有效 - 支持智能TTL配置"""
-        metadata = self._load_metadata(cache_key)
+        metadata = self._get_indexed_metadata(cache_key)
         if not metadata:
             return False
 
@@ -263,7 +399,7 @@ class StockDataCache:
 
         return is_valid
     
-    def save_stock_data(self, symbol: str, data: Union[pd.DataFrame, str],
+    def save_stock_data(self, symbol: str, data: Union[pd.DataFrame, str, StockDataResult],
                        start_date: str = None, end_date: str = None,
                        data_source: str = "unknown") -> str:
         """
@@ -271,7 +407,7 @@ class StockDataCache:
 
         Args:
             symbol: 股票代码
-            data: 股票数据（DataFrame或字符串）
+            data: 股票数据（DataFrame、字符串或结构化结果StockDataResult）
             start_date: 开始日期
             end_date: 结束日期
             data_source: 数据源（如 "tdx", "yfinance", "finnhub"）
@@ -279,9 +415,12 @@ class StockDataCache:
         Returns:
             cache_key: 缓存键
         """
+        # 结构化结果保存为二进制载荷，不是LLM文本，无需长度检查
+        payload = data.to_payload() if isinstance(data, StockDataResult) else None
+
         # 检查内容长度是否需要跳过缓存
-        content_to_check = str(data)
-        if self.should_skip_cache_for_content(content_to_check, "股票数据"):
+        content_to_check = str(data) if payload is None else ''
+        if payload is None and self.should_skip_cache_for_content(content_to_check, "股票数据"):
             # 生成一个虚拟的缓存键，但不实际保存
             market_type = self._determine_market_type(symbol)
             cache_key = self._generate_cache_key("stock_data", symbol,
@@ -301,11 +440,29 @@ class StockDataCache:
                                            market=market_type)
 
         # 保存数据
-        if isinstance(data, pd.DataFrame):
-            cache_path = self._get_cache_path("stock_data", cache_key, "csv", symbol)
+        if payload is not None:
+            file_format = PAYLOAD_CACHE_FORMAT
+            cache_path = self._get_cache_path("stock_data", cache_key, file_format, symbol)
+            cache_path.parent.mkdir(parents=True, exist_ok=True)  # 确保目录存在
+            with open(cache_path, 'wb') as f:
+                f.write(payload)
+        elif isinstance(data, pd.DataFrame):
+            file_format = self.dataframe_format
+            cache_path = self._get_cache_path("stock_data", cache_key, file_format, symbol)
             cache_path.parent.mkdir(parents=True, exist_ok=True)  # 确保目录存在
-            data.to_csv(cache_path, index=True)
+            try:
+                self._write_dataframe(data, cache_path, file_format)
+            except Exception as e:
+                if file_format == 'csv':
+                    raise
+                # 列式格式不支持的列类型（如混合object列）回退到CSV
+                logger.warning(f"⚠️ {file_format}格式写入失败，回退到csv: {e}")
+                cache_path.unlink(missing_ok=True)
+                file_format = 'csv'
+                cache_path = self._get_cache_path("stock_data", cache_key, file_format, symbol)
+                self._write_dataframe(data, cache_path, file_format)
         else:
+            file_format = 'txt'
             cache_path = self._get_cache_path("stock_data", cache_key, "txt", symbol)
             cache_path.parent.mkdir(parents=True, exist_ok=True)  # 确保目录存在
             with open(cache_path, 'w', encoding='utf-8') as f:
@@ -320,8 +477,8 @@ class StockDataCache:
             'end_date': end_date,
             'data_source': data_source,
             'file_path': str(cache_path),
-            'file_format': 'csv' if isinstance(data, pd.DataFrame) else 'txt',
-            'content_length': len(content_to_check)
+            'file_format': file_format,
+            'content_length': len(payload) if payload is not None else len(content_to_check)
         }
         self._save_metadata(cache_key, metadata)
 
@@ -331,7 +488,7 @@ class StockDataCache:
         logger.info(f"💾 {desc}已缓存: {symbol} ({data_source}) -> {cache_key}")
         return cache_key
     
-    def load_stock_data(self, cache_key: str) -> Optional[Union[pd.DataFrame, str]]:
+    def load_stock_data(self, cache_key: str) -> Optional[Union[pd.DataFrame, str, StockDataResult]]:
         """从缓存加载股票数据"""
         metadata = self._load_metadata(cache_key)
         if not metadata:
@@ -342,8 +499,11 @@ class StockDataCache:
             return None
         
         try:
-            if metadata['file_format'] == 'csv':
-                return pd.read_csv(cache_path, index_col=0)
+            if metadata['file_format'] in DATAFRAME_CACHE_FORMATS:
+                return self._read_dataframe(cache_path, metadata['file_format'])
+            elif metadata['file_format'] == PAYLOAD_CACHE_FORMAT:
+                with open(cache_path, 'rb') as f:
+                    return StockDataResult.from_payload(f.read())
             else:
                 with open(cache_path, 'r', encoding='utf-8') as f:
                     return f.read()
@@ -351,6 +511,54 @@ class StockDataCache:
             logger.error(f"⚠️ 加载缓存数据失败: {e}")
             return None
     
+    def migrate_dataframe_cache(self, target_format: str = None) -> int:
+        """
+        将已有的CSV行情缓存转换为列式格式
+
+        缓存键和缓存时间保持不变，转换成功后删除原CSV文件。
+
+        Args:
+            target_format: 目标格式（feather/parquet），默认使用 CACHE_DATAFRAME_FORMAT 配置
+
+        Returns:
+            转换的缓存条目数
+        """
+        target_format = self._resolve_dataframe_format(target_format or self.dataframe_format)
+        if target_format == 'csv':
+            logger.warning("⚠️ 目标格式为csv，无需迁移")
+            return 0
+
+        migrated = 0
+        for metadata_file in self.metadata_dir.glob("*_meta.json"):
+            try:
+                with open(metadata_file, 'r', encoding='utf-8') as f:
+                    metadata = json.load(f)
+                if metadata.get('data_type') != 'stock_data' or metadata.get('file_format') != 'csv':
+                    continue
+
+                csv_path = Path(metadata['file_path'])
+                if not csv_path.exists():
+                    continue
+
+                cache_key = metadata_file.stem.replace('_meta', '')
+                target_path = csv_path.with_suffix(f".{target_format}")
+                try:
+                    self._write_dataframe(self._read_dataframe(csv_path, 'csv'), target_path, target_format)
+                except Exception:
+                    target_path.unlink(missing_ok=True)
+                    raise
+
+                metadata['file_path'] = str(target_path)
+                metadata['file_format'] = target_format
+                self._write_metadata(cache_key, metadata)
+                csv_path.unlink()
+                migrated += 1
+            except Exception as e:
+                logger.warning(f"⚠️ 迁移缓存失败 {metadata_file.name}: {e}")
+
+        logger.info(f"📦 已将 {migrated} 个CSV行情缓存转换为{target_format}格式")
+        return migrated
+
     def find_cached_stock_data(self, symbol: str, start_date: str = None,
                               end_date: str = None, data_source: str = None,
                               max_age_hours: int = None) -> Optional[str]:
@@ -387,24 +595,14 @@ class StockDataCache:
             logger.info(f"🎯 找到精确匹配的{desc}: {symbol} -> {search_key}")
             return search_key
 
-        # 如果没有精确匹配，查找部分匹配（相同股票代码的其他缓存）
-        for metadata_file in self.metadata_dir.glob(f"*_meta.json"):
-            try:
-                with open(metadata_file, 'r', encoding='utf-8') as f:
-                    metadata = json.load(f)
-
-                if (metadata.get('symbol') == symbol and
-                    metadata.get('data_type') == 'stock_data' and
-                    metadata.get('market_type') == market_type and
-                    (data_source is None or metadata.get('data_source') == data_source)):
-
-                    cache_key = metadata_file.stem.replace('_meta', '')
-                    if self.is_cache_valid(cache_key, max_age_hours, symbol, 'stock_data'):
-                        desc = self.cache_config.get(f"{market_type}_stock_data", {}).get('description', '数据')
-                        logger.info(f"📋 找到部分匹配的{desc}: {symbol} -> {cache_key}")
-                        return cache_key
-            except Exception:
-                continue
+        # 如果没有精确匹配，查找部分匹配（相同股票代码的其他缓存，取最新的一条）
+        entries = self.find_cache_entries(symbol, 'stock_data', market_type=market_type,
+                                          data_source=data_source, max_age_hours=max_age_hours)
+        if entries:
+            cache_key = entries[0]['cache_key']
+            desc = self.cache_config.get(f"{market_type}_stock_data", {}).get('description', '数据')
+            logger.info(f"📋 找到部分匹配的{desc}: {symbol} -> {cache_key}")
+            return cache_key
 
         desc = self.cache_config.get(f"{market_type}_stock_data", {}).get('description', '数据')
         logger.error(f"❌ 未找到有效的{desc}缓存: {symbol}")
@@ -529,23 +727,13 @@ class StockDataCache:
             max_age_hours = self.cache_config.get(cache_type, {}).get('ttl_hours', 24)
         
         # 查找匹配的缓存
-        for metadata_file in self.metadata_dir.glob(f"*_meta.json"):
-            try:
-                with open(metadata_file, 'r', encoding='utf-8') as f:
-                    metadata = json.load(f)
-                
-                if (metadata.get('symbol') == symbol and
-                    metadata.get('data_type') == 'fundamentals' and
-                    metadata.get('market_type') == market_type and
-                    (data_source is None or metadata.get('data_source') == data_source)):
-                    
-                    cache_key = metadata_file.stem.replace('_meta', '')
-                    if self.is_cache_valid(cache_key, max_age_hours, symbol, 'fundamentals'):
-                        desc = self.cache_config.get(f"{market_type}_fundamentals", {}).get('description', '基本面数据')
-                        logger.info(f"🎯 找到匹配的{desc}缓存: {symbol} ({data_source}) -> {cache_key}")
-                        return cache_key
-            except Exception:
-                continue
+        entries = self.find_cache_entries(symbol, 'fundamentals', market_type=market_type,
+                                          data_source=data_source, max_age_hours=max_age_hours)
+        if entries:
+            cache_key = entries[0]['cache_key']
+            desc = self.cache_config.get(f"{market_type}_fundamentals", {}).get('description', '基本面数据')
+            logger.info(f"🎯 找到匹配的{desc}缓存: {symbol} ({data_source}) -> {cache_key}")
+            return cache_key
         
         desc = self.cache_config.get(f"{market_type}_fundamentals", {}).get('description', '基本面数据')
         logger.error(f"❌ 未找到有效的{desc}缓存: {symbol} ({data_source})")
@@ -555,6 +743,24 @@ class StockDataCache:
         """清理过期缓存"""
         cutoff_time = datetime.now() - timedelta(days=max_age_days)
         cleared_count = 0
+
+        if self.catalog:
+            for entry in self.catalog.find_older_than(cutoff_time):
+                try:
+                    data_file = Path(entry['file_path'] or '')
+                    if entry['file_path'] and data_file.exists():
+                        data_file.unlink()
+
+                    metadata_file = self._get_metadata_path(entry['cache_key'])
+                    if metadata_file.exists():
+                        metadata_file.unlink()
+                    self.catalog.remove(entry['cache_key'])
+                    cleared_count += 1
+                except Exception as e:
+                    logger.warning(f"⚠️ 清理缓存时出错: {e}")
+
+            logger.info(f"🧹 已清理 {cleared_count} 个过期缓存文件")
+            return
         
         for metadata_file in self.metadata_dir.glob("*_meta.json"):
             try:
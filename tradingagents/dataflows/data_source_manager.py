@@ -6,13 +6,16 @@
 
 import os
 import time
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from enum import Enum
 import warnings
 import pandas as pd
 
+from .io_executor import get_io_executor
+from .market_data import StockDataResult
+
 # 导入日志模块
-from tradingagents.utils.logging_manager import get_logger
+from tradingagents.utils.logging_manager import LazyArg, get_logger
 logger = get_logger('agents')
 warnings.filterwarnings('ignore')
 
@@ -35,6 +38,16 @@ class ChinaDataSource(Enum):
 class DataSourceManager:
     """数据源管理器"""
 
+    # 备用数据源优先级: AKShare > Tushare > BaoStock > TDX
+    FALLBACK_ORDER = [
+        ChinaDataSource.AKSHARE,
+        ChinaDataSource.TUSHARE,
+        ChinaDataSource.BAOSTOCK,
+        ChinaDataSource.TDX
+    ]
+    # 单个数据源获取日线的截止时间（秒），超时后尝试下一个数据源
+    FETCH_TIMEOUT = 60
+
     def __init__(self):
         """初始化数据源管理器"""
         self.default_source = self._get_default_source()
@@ -306,6 +319,20 @@ class DataSourceManager:
         Returns:
             str: 格式化的股票数据
         """
+        return self.get_stock_data_result(symbol, start_date, end_date).render()
+
+    def get_stock_data_result(self, symbol: str, start_date: str = None, end_date: str = None) -> StockDataResult:
+        """
+        获取结构化的股票数据，当前数据源失败时按降级顺序尝试备用数据源
+
+        Args:
+            symbol: 股票代码
+            start_date: 开始日期
+            end_date: 结束日期
+
+        Returns:
+            StockDataResult: 结构化结果，所有数据源都失败时 error 非空
+        """
         # 记录详细的输入参数
         logger.info(f"📊 [数据获取] 开始获取股票数据",
                    extra={
@@ -316,99 +343,127 @@ class DataSourceManager:
                        'event_type': 'data_fetch_start'
                    })
 
-        # 添加详细的股票代码追踪日志
-        logger.info(f"🔍 [股票代码追踪] DataSourceManager.get_stock_data 接收到的股票代码: '{symbol}' (类型: {type(symbol)})")
-        logger.info(f"🔍 [股票代码追踪] 股票代码长度: {len(str(symbol))}")
-        logger.info(f"🔍 [股票代码追踪] 股票代码字符: {list(str(symbol))}")
-        logger.info(f"🔍 [股票代码追踪] 当前数据源: {self.current_source.value}")
-
         start_time = time.time()
+        sources = [self.current_source] + [source for source in self.FALLBACK_ORDER
+                                           if source != self.current_source and source in self.available_sources]
+        errors = []
+        for source in sources:
+            fallback_from = None if source == self.current_source else self.current_source.value
+            if fallback_from:
+                logger.info(f"🔄 尝试备用数据源: {source.value}")
+            try:
+                data, extras = get_io_executor().run(self._fetch_ohlcv, source, symbol, start_date, end_date,
+                                                     timeout=self.FETCH_TIMEOUT, name=f"{source.value}日线 {symbol}")
+                result = StockDataResult.from_ohlcv(symbol, start_date, end_date, data, source.value,
+                                                    fallback_from=fallback_from)
+                result.fundamentals.update(extras)
+            except Exception as e:
+                logger.error(f"❌ [数据获取] {source.value}获取失败: {e}", exc_info=True)
+                errors.append(f"{source.value}: {e}")
+                continue
 
-        try:
-            # 根据数据源调用相应的获取方法
-            if self.current_source == ChinaDataSource.TUSHARE:
-                logger.info(f"🔍 [股票代码追踪] 调用 Tushare 数据源，传入参数: symbol='{symbol}'")
-                result = self._get_tushare_data(symbol, start_date, end_date)
-            elif self.current_source == ChinaDataSource.AKSHARE:
-                result = self._get_akshare_data(symbol, start_date, end_date)
-            elif self.current_source == ChinaDataSource.BAOSTOCK:
-                result = self._get_baostock_data(symbol, start_date, end_date)
-            elif self.current_source == ChinaDataSource.TDX:
-                result = self._get_tdx_data(symbol, start_date, end_date)
-            else:
-                result = f"❌ 不支持的数据源: {self.current_source.value}"
-
-            # 记录详细的输出结果
-            duration = time.time() - start_time
-            result_length = len(result) if result else 0
-            is_success = result and "❌" not in result and "错误" not in result
-
-            if is_success:
+            if result.ok:
+                result.name = self._lookup_stock_name(symbol)
+                if result.quote:
+                    result.quote.name = result.name
                 logger.info(f"✅ [数据获取] 成功获取股票数据",
                            extra={
                                'symbol': symbol,
                                'start_date': start_date,
                                'end_date': end_date,
-                               'data_source': self.current_source.value,
-                               'duration': duration,
-                               'result_length': result_length,
-                               'result_preview': result[:200] + '...' if result_length > 200 else result,
+                               'data_source': source.value,
+                               'duration': time.time() - start_time,
+                               'rows': len(result.ohlcv),
                                'event_type': 'data_fetch_success'
                            })
                 return result
-            else:
-                logger.warning(f"⚠️ [数据获取] 数据质量异常，尝试降级到其他数据源",
-                              extra={
-                                  'symbol': symbol,
-                                  'start_date': start_date,
-                                  'end_date': end_date,
-                                  'data_source': self.current_source.value,
-                                  'duration': duration,
-                                  'result_length': result_length,
-                                  'result_preview': result[:200] + '...' if result_length > 200 else result,
-                                  'event_type': 'data_fetch_warning'
-                              })
-
-                # 数据质量异常时也尝试降级到其他数据源
-                fallback_result = self._try_fallback_sources(symbol, start_date, end_date)
-                if fallback_result and "❌" not in fallback_result and "错误" not in fallback_result:
-                    logger.info(f"✅ [数据获取] 降级成功获取数据")
-                    return fallback_result
-                else:
-                    logger.error(f"❌ [数据获取] 所有数据源都无法获取有效数据")
-                    return result  # 返回原始结果（包含错误信息）
 
+            logger.warning(f"⚠️ [数据获取] {source.value}未返回有效数据，尝试降级到其他数据源",
+                          extra={
+                              'symbol': symbol,
+                              'data_source': source.value,
+                              'duration': time.time() - start_time,
+                              'event_type': 'data_fetch_warning'
+                          })
+            errors.append(f"{source.value}: {result.error}")
+
+        logger.error(f"❌ [数据获取] 所有数据源都无法获取有效数据")
+        return StockDataResult.failure(symbol, start_date, end_date,
+                                       f"所有数据源都无法获取{symbol}的数据（{'; '.join(errors)}）",
+                                       source=self.current_source.value)
+
+    def _fetch_ohlcv(self, source: ChinaDataSource, symbol: str, start_date: str,
+                     end_date: str) -> Tuple[Optional[pd.DataFrame], Dict[str, Any]]:
+        """
+        从指定数据源获取日线DataFrame
+
+        Returns:
+            (日线, 附加字段)：附加字段并入 StockDataResult.fundamentals，目前只有TDX提供技术指标和实时行情
+        """
+        if source == ChinaDataSource.TDX:
+            return self._fetch_tdx_ohlcv(symbol, start_date, end_date)
+        if source == ChinaDataSource.TUSHARE:
+            from .tushare_adapter import get_tushare_adapter
+            data = get_tushare_adapter().get_stock_data(symbol, start_date, end_date)
+        elif source == ChinaDataSource.AKSHARE:
+            from .akshare_utils import get_akshare_provider
+            data = get_akshare_provider().get_stock_data(symbol, start_date, end_date)
+        elif source == ChinaDataSource.BAOSTOCK:
+            from .baostock_utils import get_baostock_provider
+            data = get_baostock_provider().get_stock_data(symbol, start_date, end_date)
+        else:
+            raise ValueError(f"不支持的数据源: {source.value}")
+        # 旧版缓存中可能是格式化文本，无法结构化，按未获取处理
+        return (data if isinstance(data, pd.DataFrame) else None), {}
+
+    @staticmethod
+    def _fetch_tdx_ohlcv(symbol: str, start_date: str, end_date: str) -> Tuple[Optional[pd.DataFrame], Dict[str, Any]]:
+        """TDX：历史数据和技术指标共用一次K线请求，另取实时行情"""
+        logger.warning(f"⚠️ 警告: 正在使用已弃用的TDX数据源")
+        from .tdx_utils import get_tdx_provider
+        provider = get_tdx_provider()
+        data, indicators = provider.get_history_with_indicators(symbol, start_date, end_date)
+        if data is None or data.empty:
+            return data, {}
+
+        extras: Dict[str, Any] = {
+            'technical_indicators': {name: float(value) for name, value in indicators.items()
+                                     if value is not None and pd.notna(value)},
+        }
+        realtime = provider.get_real_time_data(symbol)
+        if realtime:
+            extras['realtime_quote'] = {
+                'price': float(realtime.get('price', 0)),
+                'change_percent': float(realtime.get('change_percent', 0)),
+                'volume': float(realtime.get('volume', 0)),
+                'update_time': realtime.get('update_time', ''),
+            }
+        return data, extras
+
+    def _lookup_stock_name(self, symbol: str) -> str:
+        """查询股票名称（经过单飞合并，同一分析内只查询一次），失败时返回空字符串"""
+        try:
+            info = get_china_stock_info_unified(symbol)
         except Exception as e:
-            duration = time.time() - start_time
-            logger.error(f"❌ [数据获取] 异常失败: {e}",
-                        extra={
-                            'symbol': symbol,
-                            'start_date': start_date,
-                            'end_date': end_date,
-                            'data_source': self.current_source.value,
-                            'duration': duration,
-                            'error': str(e),
-                            'event_type': 'data_fetch_exception'
-                        }, exc_info=True)
-            return self._try_fallback_sources(symbol, start_date, end_date)
+            logger.debug(f"获取{symbol}股票名称失败: {e}")
+            return ''
+        name = (info or {}).get('name', '')
+        return '' if not name or name == f'股票{symbol}' else name
     
     def _get_tushare_data(self, symbol: str, start_date: str, end_date: str) -> str:
         """使用Tushare获取数据 - 直接调用适配器，避免循环调用"""
         logger.debug(f"📊 [Tushare] 调用参数: symbol={symbol}, start_date={start_date}, end_date={end_date}")
 
         # 添加详细的股票代码追踪日志
-        logger.info(f"🔍 [股票代码追踪] _get_tushare_data 接收到的股票代码: '{symbol}' (类型: {type(symbol)})")
-        logger.info(f"🔍 [股票代码追踪] 股票代码长度: {len(str(symbol))}")
-        logger.info(f"🔍 [股票代码追踪] 股票代码字符: {list(str(symbol))}")
-        logger.info(f"🔍 [DataSourceManager详细日志] _get_tushare_data 开始执行")
-        logger.info(f"🔍 [DataSourceManager详细日志] 当前数据源: {self.current_source.value}")
+        logger.info("🔍 [股票代码追踪] _get_tushare_data 接收到的股票代码: '%s' (类型: %s)", symbol, type(symbol).__name__)
+        logger.debug("🔍 [股票代码追踪] 股票代码字符: %s", LazyArg(lambda: list(str(symbol))))
+        logger.info("🔍 [DataSourceManager详细日志] _get_tushare_data 开始执行，当前数据源: %s", self.current_source.value)
 
         start_time = time.time()
         try:
             # 直接调用适配器，避免循环调用interface
             from .tushare_adapter import get_tushare_adapter
-            logger.info(f"🔍 [股票代码追踪] 调用 tushare_adapter，传入参数: symbol='{symbol}'")
-            logger.info(f"🔍 [DataSourceManager详细日志] 开始调用tushare_adapter...")
+            logger.info("🔍 [股票代码追踪] 调用 tushare_adapter，传入参数: symbol='%s'", symbol)
 
             adapter = get_tushare_adapter()
             data = adapter.get_stock_data(symbol, start_date, end_date)
@@ -447,10 +502,10 @@ class DataSourceManager:
                 result = f"❌ 未获取到{symbol}的有效数据"
 
             duration = time.time() - start_time
-            logger.info(f"🔍 [DataSourceManager详细日志] interface调用完成，耗时: {duration:.3f}秒")
-            logger.info(f"🔍 [股票代码追踪] get_china_stock_data_tushare 返回结果前200字符: {result[:200] if result else 'None'}")
-            logger.info(f"🔍 [DataSourceManager详细日志] 返回结果类型: {type(result)}")
-            logger.info(f"🔍 [DataSourceManager详细日志] 返回结果长度: {len(result) if result else 0}")
+            logger.info("🔍 [DataSourceManager详细日志] interface调用完成，耗时: %.3f秒", duration)
+            logger.info("🔍 [股票代码追踪] get_china_stock_data_tushare 返回结果前200字符: %s",
+                        LazyArg(lambda: result[:200] if result else 'None'))
+            logger.info("🔍 [DataSourceManager详细日志] 返回结果长度: %d", len(result) if result else 0)
 
             logger.debug(f"📊 [Tushare] 调用完成: 耗时={duration:.2f}s, 结果长度={len(result) if result else 0}")
 
@@ -826,6 +881,29 @@ def get_data_source_manager() -> DataSourceManager:
     return _data_source_manager
 
 
+def get_china_stock_data_result(symbol: str, start_date: str, end_date: str) -> StockDataResult:
+    """
+    统一的中国股票数据获取接口（结构化结果）
+
+    同一数据源、股票和区间的请求合并为一次上游调用（数据准备和各分析师共享），失败结果不保留。
+
+    Args:
+        symbol: 股票代码
+        start_date: 开始日期
+        end_date: 结束日期
+
+    Returns:
+        StockDataResult: 结构化结果
+    """
+    manager = get_data_source_manager()
+    from .single_flight import get_single_flight
+    return get_single_flight().do(
+        ('china_stock_data', manager.current_source.value, str(symbol), start_date, end_date),
+        lambda: manager.get_stock_data_result(symbol, start_date, end_date),
+        cacheable=lambda result: result.ok,
+    )
+
+
 def get_china_stock_data_unified(symbol: str, start_date: str, end_date: str) -> str:
     """
     统一的中国股票数据获取接口
@@ -839,28 +917,18 @@ def get_china_stock_data_unified(symbol: str, start_date: str, end_date: str) ->
     Returns:
         str: 格式化的股票数据
     """
-    from tradingagents.utils.logging_init import get_logger
-
-
     # 添加详细的股票代码追踪日志
-    logger.info(f"🔍 [股票代码追踪] data_source_manager.get_china_stock_data_unified 接收到的股票代码: '{symbol}' (类型: {type(symbol)})")
-    logger.info(f"🔍 [股票代码追踪] 股票代码长度: {len(str(symbol))}")
-    logger.info(f"🔍 [股票代码追踪] 股票代码字符: {list(str(symbol))}")
+    logger.info("🔍 [股票代码追踪] data_source_manager.get_china_stock_data_unified 接收到的股票代码: '%s' (类型: %s)",
+                symbol, type(symbol).__name__)
 
-    manager = get_data_source_manager()
-    logger.info(f"🔍 [股票代码追踪] 调用 manager.get_stock_data，传入参数: symbol='{symbol}', start_date='{start_date}', end_date='{end_date}'")
-    result = manager.get_stock_data(symbol, start_date, end_date)
-    # 分析返回结果的详细信息
-    if result:
-        lines = result.split('\n')
-        data_lines = [line for line in lines if '2025-' in line and symbol in line]
-        logger.info(f"🔍 [股票代码追踪] 返回结果统计: 总行数={len(lines)}, 数据行数={len(data_lines)}, 结果长度={len(result)}字符")
-        logger.info(f"🔍 [股票代码追踪] 返回结果前500字符: {result[:500]}")
-        if len(data_lines) > 0:
-            logger.info(f"🔍 [股票代码追踪] 数据行示例: 第1行='{data_lines[0][:100]}', 最后1行='{data_lines[-1][:100]}'")
+    result = get_china_stock_data_result(symbol, start_date, end_date)
+    if result.ok:
+        logger.info("🔍 [股票代码追踪] 返回结果统计: 数据条数=%d, 数据源=%s, 最新日期=%s",
+                    len(result.ohlcv), result.provenance.source, result.quote.as_of if result.quote else 'N/A')
     else:
-        logger.info(f"🔍 [股票代码追踪] 返回结果: None")
-    return result
+        logger.info("🔍 [股票代码追踪] 获取失败: %s", result.error)
+    # 只在交给LLM工具时渲染为文本
+    return result.render()
 
 
 def get_china_stock_info_unified(symbol: str) -> Dict:
@@ -874,7 +942,14 @@ def get_china_stock_info_unified(symbol: str) -> Dict:
         Dict: 股票基本信息
     """
     manager = get_data_source_manager()
-    return manager.get_stock_info(symbol)
+    from .single_flight import get_single_flight
+    info = get_single_flight().do(
+        ('china_stock_info', manager.current_source.value, str(symbol)),
+        lambda: manager.get_stock_info(symbol),
+        cacheable=lambda result: bool(result) and result.get('name') not in (None, '', f'股票{symbol}'),
+    )
+    # 返回副本，调用方修改不影响共享结果
+    return dict(info) if info else info
 
 
 # 全局数据源管理器实例
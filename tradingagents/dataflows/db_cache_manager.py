@@ -8,8 +8,12 @@ import os
 import json
 import pickle
 import hashlib
+import struct
+import zlib
+from collections import defaultdict
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any, List, Union
+from io import StringIO
+from typing import Optional, Dict, Any, List, Tuple, Union
 import pandas as pd
 
 # 导入日志模块
@@ -18,7 +22,7 @@ logger = get_logger('agents')
 
 # MongoDB
 try:
-    from pymongo import MongoClient
+    from pymongo import MongoClient, ReplaceOne
     from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
     MONGODB_AVAILABLE = True
 except ImportError:
@@ -34,6 +38,101 @@ except ImportError:
     REDIS_AVAILABLE = False
     logger.warning(f"⚠️ redis 未安装，Redis功能不可用")
 
+# Arrow IPC（可选）- streamlit 已依赖 pyarrow，缺失时DataFrame回退到压缩JSON
+try:
+    import pyarrow as pa
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+
+# 缓存载荷格式：新写入的数据都是压缩二进制，旧的 dataframe_json/text 仍可读取
+ARROW_PAYLOAD_FORMAT = 'arrow_ipc'
+JSON_ZLIB_PAYLOAD_FORMAT = 'dataframe_json_zlib'
+TEXT_ZLIB_PAYLOAD_FORMAT = 'text_zlib'
+
+# 打包值 = 魔数 + 4字节头部长度 + JSON头部（元数据）+ 载荷，用于Redis值和行情结果文件；没有魔数的Redis值是旧版JSON字符串
+_CACHE_VALUE_MAGIC = b'TAC1'
+
+# 缓存键前缀 -> MongoDB集合，以及各集合在Redis中的过期时间
+_COLLECTION_BY_PREFIX = {
+    'stock': 'stock_data',
+    'news': 'news_data',
+    'fundamentals': 'fundamentals_data',
+}
+_REDIS_TTL = {
+    'stock_data': 6 * 3600,  # 6小时过期
+    'news_data': 24 * 3600,  # 24小时过期
+    'fundamentals_data': 24 * 3600,
+}
+
+
+def _arrow_compression() -> Optional[str]:
+    for codec in ('zstd', 'lz4'):
+        if pa.Codec.is_available(codec):
+            return codec
+    return None
+
+
+def encode_cache_payload(data: Union[pd.DataFrame, str]) -> Tuple[bytes, str]:
+    """
+    把缓存数据编码为压缩二进制载荷
+
+    DataFrame 优先写为带 zstd/lz4 压缩的 Arrow IPC 流（保留索引和列类型），
+    不可用或列类型不支持时写为 zlib 压缩的JSON；文本为 zlib 压缩的UTF-8。
+
+    Returns:
+        (载荷, 载荷格式)
+    """
+    if isinstance(data, pd.DataFrame):
+        if PYARROW_AVAILABLE:
+            try:
+                table = pa.Table.from_pandas(data, preserve_index=True)
+                sink = pa.BufferOutputStream()
+                options = pa.ipc.IpcWriteOptions(compression=_arrow_compression())
+                with pa.ipc.new_stream(sink, table.schema, options=options) as writer:
+                    writer.write_table(table)
+                return sink.getvalue().to_pybytes(), ARROW_PAYLOAD_FORMAT
+            except Exception as e:
+                logger.debug(f"Arrow编码失败，回退到压缩JSON: {e}")
+        json_text = data.to_json(orient='records', date_format='iso')
+        return zlib.compress(json_text.encode('utf-8')), JSON_ZLIB_PAYLOAD_FORMAT
+    return zlib.compress(str(data).encode('utf-8')), TEXT_ZLIB_PAYLOAD_FORMAT
+
+
+def decode_cache_payload(payload: Union[bytes, str], data_format: str) -> Union[pd.DataFrame, str]:
+    """按载荷格式解码缓存数据（兼容旧版 dataframe_json/text 格式）"""
+    if data_format == ARROW_PAYLOAD_FORMAT:
+        return pa.ipc.open_stream(payload).read_all().to_pandas()
+    if data_format == JSON_ZLIB_PAYLOAD_FORMAT:
+        return pd.read_json(StringIO(zlib.decompress(payload).decode('utf-8')), orient='records')
+    if data_format == TEXT_ZLIB_PAYLOAD_FORMAT:
+        return zlib.decompress(payload).decode('utf-8')
+    if isinstance(payload, bytes):
+        payload = payload.decode('utf-8')
+    if data_format == 'dataframe_json':
+        return pd.read_json(StringIO(payload), orient='records')
+    return payload
+
+
+def pack_cache_value(meta: Dict[str, Any], payload: bytes) -> bytes:
+    """把JSON元数据和二进制载荷打包为一个值"""
+    header = json.dumps(meta, ensure_ascii=False, default=str).encode('utf-8')
+    return _CACHE_VALUE_MAGIC + struct.pack('>I', len(header)) + header + payload
+
+
+def unpack_cache_value(value: bytes) -> Tuple[Dict[str, Any], Union[bytes, str]]:
+    """拆出 pack_cache_value 打包的元数据和载荷（兼容旧版JSON字符串格式的Redis值）"""
+    if value.startswith(_CACHE_VALUE_MAGIC):
+        offset = len(_CACHE_VALUE_MAGIC)
+        (header_length,) = struct.unpack('>I', value[offset:offset + 4])
+        offset += 4
+        meta = json.loads(value[offset:offset + header_length].decode('utf-8'))
+        return meta, value[offset + header_length:]
+    # 旧版：整个值是JSON字符串，data 字段为文本
+    legacy = json.loads(value)
+    return {'data_format': legacy.get('data_format', 'text')}, legacy['data']
+
 
 class DatabaseCacheManager:
     """MongoDB + Redis 数据库缓存管理器"""
@@ -111,7 +210,7 @@ class DatabaseCacheManager:
                 db=self.redis_db,
                 socket_timeout=5,
                 socket_connect_timeout=5,
-                decode_responses=True
+                decode_responses=False  # 缓存值为二进制载荷
             )
             # 测试连接
             self.redis_client.ping()
@@ -170,23 +269,10 @@ class DatabaseCacheManager:
         cache_key = hashlib.md5(params_str.encode()).hexdigest()[:16]
         return f"{data_type}:{symbol}:{cache_key}"
     
-    def save_stock_data(self, symbol: str, data: Union[pd.DataFrame, str],
-                       start_date: str = None, end_date: str = None,
-                       data_source: str = "unknown", market_type: str = None) -> str:
-        """
-        保存股票数据到MongoDB和Redis
-        
-        Args:
-            symbol: 股票代码
-            data: 股票数据
-            start_date: 开始日期
-            end_date: 结束日期
-            data_source: 数据源
-            market_type: 市场类型 (us/china)
-        
-        Returns:
-            cache_key: 缓存键
-        """
+    def _build_stock_doc(self, symbol: str, data: Union[pd.DataFrame, str],
+                         start_date: str = None, end_date: str = None,
+                         data_source: str = "unknown", market_type: str = None) -> Dict[str, Any]:
+        """构建股票数据文档（数据编码为压缩二进制载荷）"""
         cache_key = self._generate_cache_key("stock", symbol,
                                            start_date=start_date,
                                            end_date=end_date,
@@ -202,8 +288,9 @@ class DatabaseCacheManager:
             else:  # 其他格式为美股
                 market_type = "us"
         
-        # 准备文档数据
-        doc = {
+        payload, data_format = encode_cache_payload(data)
+        now = datetime.utcnow()
+        return {
             "_id": cache_key,
             "symbol": symbol,
             "market_type": market_type,
@@ -211,103 +298,232 @@ class DatabaseCacheManager:
             "start_date": start_date,
             "end_date": end_date,
             "data_source": data_source,
-            "created_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow()
+            "data": payload,
+            "data_format": data_format,
+            "created_at": now,
+            "updated_at": now
         }
-        
-        # 处理数据格式
-        if isinstance(data, pd.DataFrame):
-            doc["data"] = data.to_json(orient='records', date_format='iso')
-            doc["data_format"] = "dataframe_json"
-        else:
-            doc["data"] = str(data)
-            doc["data_format"] = "text"
-        
+
+    def _build_news_doc(self, symbol: str, news_data: str,
+                        start_date: str = None, end_date: str = None,
+                        data_source: str = "unknown") -> Dict[str, Any]:
+        """构建新闻数据文档"""
+        cache_key = self._generate_cache_key("news", symbol,
+                                           start_date=start_date,
+                                           end_date=end_date,
+                                           source=data_source)
+        payload, data_format = encode_cache_payload(news_data)
+        now = datetime.utcnow()
+        return {
+            "_id": cache_key,
+            "symbol": symbol,
+            "data_type": "news_data",
+            "date_range": f"{start_date}_{end_date}",
+            "start_date": start_date,
+            "end_date": end_date,
+            "data_source": data_source,
+            "data": payload,
+            "data_format": data_format,
+            "created_at": now,
+            "updated_at": now
+        }
+
+    def _build_fundamentals_doc(self, symbol: str, fundamentals_data: str,
+                                analysis_date: str = None,
+                                data_source: str = "unknown") -> Dict[str, Any]:
+        """构建基本面数据文档"""
+        if not analysis_date:
+            analysis_date = datetime.now().strftime("%Y-%m-%d")
+
+        cache_key = self._generate_cache_key("fundamentals", symbol,
+                                           date=analysis_date,
+                                           source=data_source)
+        payload, data_format = encode_cache_payload(fundamentals_data)
+        now = datetime.utcnow()
+        return {
+            "_id": cache_key,
+            "symbol": symbol,
+            "data_type": "fundamentals_data",
+            "analysis_date": analysis_date,
+            "data_source": data_source,
+            "data": payload,
+            "data_format": data_format,
+            "created_at": now,
+            "updated_at": now
+        }
+
+    @staticmethod
+    def _redis_value(doc: Dict[str, Any]) -> bytes:
+        """文档 -> Redis值（元数据头部 + 载荷）"""
+        meta = {
+            "data_format": doc["data_format"],
+            "symbol": doc["symbol"],
+            "data_source": doc["data_source"],
+            "created_at": doc["created_at"].isoformat()
+        }
+        if "analysis_date" in doc:
+            meta["analysis_date"] = doc["analysis_date"]
+        return pack_cache_value(meta, doc["data"])
+
+    def _write_docs(self, docs: List[Dict[str, Any]]) -> Dict[str, bool]:
+        """
+        批量写入文档：每个MongoDB集合一次 bulk_write，Redis一次 pipeline
+
+        Returns:
+            {'mongodb': 是否写入成功, 'redis': 是否写入成功}
+        """
+        written = {'mongodb': False, 'redis': False}
+        if not docs:
+            return written
+
         # 保存到MongoDB（持久化）
         if self.mongodb_db is not None:
+            operations = defaultdict(list)
+            for doc in docs:
+                operations[doc["data_type"]].append(ReplaceOne({"_id": doc["_id"]}, doc, upsert=True))
             try:
-                collection = self.mongodb_db.stock_data
-                collection.replace_one({"_id": cache_key}, doc, upsert=True)
-                logger.info(f"💾 股票数据已保存到MongoDB: {symbol} -> {cache_key}")
+                for collection_name, ops in operations.items():
+                    self.mongodb_db[collection_name].bulk_write(ops, ordered=False)
+                written['mongodb'] = True
             except Exception as e:
                 logger.error(f"⚠️ MongoDB保存失败: {e}")
-        
-        # 保存到Redis（快速缓存，6小时过期）
+
+        # 保存到Redis（快速缓存）
         if self.redis_client:
             try:
-                redis_data = {
-                    "data": doc["data"],
-                    "data_format": doc["data_format"],
-                    "symbol": symbol,
-                    "data_source": data_source,
-                    "created_at": doc["created_at"].isoformat()
-                }
-                self.redis_client.setex(
-                    cache_key,
-                    6 * 3600,  # 6小时过期
-                    json.dumps(redis_data, ensure_ascii=False)
-                )
-                logger.info(f"⚡ 股票数据已缓存到Redis: {symbol} -> {cache_key}")
+                pipe = self.redis_client.pipeline(transaction=False)
+                for doc in docs:
+                    pipe.setex(doc["_id"], _REDIS_TTL[doc["data_type"]], self._redis_value(doc))
+                pipe.execute()
+                written['redis'] = True
             except Exception as e:
                 logger.error(f"⚠️ Redis缓存失败: {e}")
+
+        return written
+
+    def save_stock_data(self, symbol: str, data: Union[pd.DataFrame, str],
+                       start_date: str = None, end_date: str = None,
+                       data_source: str = "unknown", market_type: str = None) -> str:
+        """
+        保存股票数据到MongoDB和Redis
         
-        return cache_key
-    
-    def load_stock_data(self, cache_key: str) -> Optional[Union[pd.DataFrame, str]]:
-        """从Redis或MongoDB加载股票数据"""
+        Args:
+            symbol: 股票代码
+            data: 股票数据
+            start_date: 开始日期
+            end_date: 结束日期
+            data_source: 数据源
+            market_type: 市场类型 (us/china)
+        
+        Returns:
+            cache_key: 缓存键
+        """
+        doc = self._build_stock_doc(symbol, data, start_date, end_date, data_source, market_type)
+        cache_key = doc["_id"]
+        written = self._write_docs([doc])
+        if written['mongodb']:
+            logger.info(f"💾 股票数据已保存到MongoDB: {symbol} -> {cache_key}")
+        if written['redis']:
+            logger.info(f"⚡ 股票数据已缓存到Redis: {symbol} -> {cache_key} ({len(doc['data'])}字节, {doc['data_format']})")
         
+        return cache_key
+
+    def set_many(self, items: List[Dict[str, Any]]) -> List[str]:
+        """
+        批量保存缓存数据，MongoDB每个集合一次 bulk_write、Redis一次 pipeline
+
+        Args:
+            items: 每项为对应保存方法的参数，data_type 指定类型（stock/news/fundamentals，默认stock），如
+                   {'symbol': '000001', 'data': df, 'start_date': '2024-01-01', 'end_date': '2024-06-30', 'data_source': 'tushare'}
+                   {'data_type': 'news', 'symbol': '000001', 'news_data': '...'}
+
+        Returns:
+            与 items 顺序一致的缓存键列表
+        """
+        builders = {
+            'stock': self._build_stock_doc,
+            'news': self._build_news_doc,
+            'fundamentals': self._build_fundamentals_doc,
+        }
+        docs = []
+        for item in items:
+            params = dict(item)
+            docs.append(builders[params.pop('data_type', 'stock')](**params))
+
+        written = self._write_docs(docs)
+        logger.info(f"💾 批量缓存{len(docs)}条数据: MongoDB{'✅' if written['mongodb'] else '❌'} "
+                    f"Redis{'✅' if written['redis'] else '❌'}")
+        return [doc["_id"] for doc in docs]
+
+    def get_many(self, cache_keys: List[str]) -> Dict[str, Union[pd.DataFrame, str]]:
+        """
+        批量加载缓存数据：Redis一次 MGET，未命中的每个MongoDB集合一次查询，并一次 pipeline 回填Redis
+
+        Returns:
+            {缓存键: 数据}，未找到的键不在结果中
+        """
+        results: Dict[str, Union[pd.DataFrame, str]] = {}
+        missing = list(dict.fromkeys(cache_keys))
+
         # 首先尝试从Redis加载（更快）
-        if self.redis_client:
+        if self.redis_client and missing:
             try:
-                redis_data = self.redis_client.get(cache_key)
-                if redis_data:
-                    data_dict = json.loads(redis_data)
-                    logger.info(f"⚡ 从Redis加载数据: {cache_key}")
-                    
-                    if data_dict["data_format"] == "dataframe_json":
-                        return pd.read_json(data_dict["data"], orient='records')
-                    else:
-                        return data_dict["data"]
+                for cache_key, value in zip(missing, self.redis_client.mget(missing)):
+                    if value is None:
+                        continue
+                    try:
+                        meta, payload = unpack_cache_value(value)
+                        results[cache_key] = decode_cache_payload(payload, meta.get('data_format', 'text'))
+                    except Exception as e:
+                        logger.error(f"⚠️ Redis缓存解码失败: {cache_key}: {e}")
             except Exception as e:
                 logger.error(f"⚠️ Redis加载失败: {e}")
-        
-        # 如果Redis没有，从MongoDB加载
-        if self.mongodb_db is not None:
-            try:
-                collection = self.mongodb_db.stock_data
-                doc = collection.find_one({"_id": cache_key})
-                
-                if doc:
-                    logger.info(f"💾 从MongoDB加载数据: {cache_key}")
-                    
-                    # 同时更新到Redis缓存
-                    if self.redis_client:
-                        try:
-                            redis_data = {
-                                "data": doc["data"],
-                                "data_format": doc["data_format"],
-                                "symbol": doc["symbol"],
-                                "data_source": doc["data_source"],
-                                "created_at": doc["created_at"].isoformat()
-                            }
-                            self.redis_client.setex(
-                                cache_key,
-                                6 * 3600,
-                                json.dumps(redis_data, ensure_ascii=False)
-                            )
-                            logger.info(f"⚡ 数据已同步到Redis缓存")
-                        except Exception as e:
-                            logger.error(f"⚠️ Redis同步失败: {e}")
-                    
-                    if doc["data_format"] == "dataframe_json":
-                        return pd.read_json(doc["data"], orient='records')
-                    else:
-                        return doc["data"]
-                        
-            except Exception as e:
-                logger.error(f"⚠️ MongoDB加载失败: {e}")
-        
-        return None
+            missing = [cache_key for cache_key in missing if cache_key not in results]
+
+        # Redis没有的，从MongoDB加载
+        if self.mongodb_db is not None and missing:
+            keys_by_collection = defaultdict(list)
+            for cache_key in missing:
+                collection_name = _COLLECTION_BY_PREFIX.get(cache_key.split(':', 1)[0])
+                if collection_name:
+                    keys_by_collection[collection_name].append(cache_key)
+
+            backfill = []
+            for collection_name, keys in keys_by_collection.items():
+                try:
+                    for doc in self.mongodb_db[collection_name].find({"_id": {"$in": keys}}):
+                        value = decode_cache_payload(doc["data"], doc.get("data_format", "text"))
+                        results[doc["_id"]] = value
+                        if doc.get("data_format") not in (ARROW_PAYLOAD_FORMAT, JSON_ZLIB_PAYLOAD_FORMAT,
+                                                          TEXT_ZLIB_PAYLOAD_FORMAT):
+                            # 旧版文档重新编码后回填
+                            doc["data"], doc["data_format"] = encode_cache_payload(value)
+                        doc.setdefault("data_source", "unknown")
+                        doc.setdefault("created_at", datetime.utcnow())
+                        doc["data_type"] = collection_name
+                        backfill.append(doc)
+                except Exception as e:
+                    logger.error(f"⚠️ MongoDB加载失败: {e}")
+
+            # 同时更新到Redis缓存
+            if backfill and self.redis_client:
+                try:
+                    pipe = self.redis_client.pipeline(transaction=False)
+                    for doc in backfill:
+                        pipe.setex(doc["_id"], _REDIS_TTL[doc["data_type"]], self._redis_value(doc))
+                    pipe.execute()
+                    logger.info(f"⚡ {len(backfill)}条数据已同步到Redis缓存")
+                except Exception as e:
+                    logger.error(f"⚠️ Redis同步失败: {e}")
+
+        return results
+
+    def load_stock_data(self, cache_key: str) -> Optional[Union[pd.DataFrame, str]]:
+        """从Redis或MongoDB加载股票数据"""
+        data = self.get_many([cache_key]).get(cache_key)
+        if data is not None:
+            logger.info(f"⚡ 加载缓存数据: {cache_key}")
+        return data
     
     def find_cached_stock_data(self, symbol: str, start_date: str = None,
                               end_date: str = None, data_source: str = None,
@@ -360,50 +576,13 @@ class DatabaseCacheManager:
                       start_date: str = None, end_date: str = None,
                       data_source: str = "unknown") -> str:
         """保存新闻数据到MongoDB和Redis"""
-        cache_key = self._generate_cache_key("news", symbol,
-                                           start_date=start_date,
-                                           end_date=end_date,
-                                           source=data_source)
-
-        doc = {
-            "_id": cache_key,
-            "symbol": symbol,
-            "data_type": "news_data",
-            "date_range": f"{start_date}_{end_date}",
-            "start_date": start_date,
-            "end_date": end_date,
-            "data_source": data_source,
-            "data": news_data,
-            "created_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow()
-        }
-
-        # 保存到MongoDB
-        if self.mongodb_db is not None:
-            try:
-                collection = self.mongodb_db.news_data
-                collection.replace_one({"_id": cache_key}, doc, upsert=True)
-                logger.info(f"📰 新闻数据已保存到MongoDB: {symbol} -> {cache_key}")
-            except Exception as e:
-                logger.error(f"⚠️ MongoDB保存失败: {e}")
-
-        # 保存到Redis（24小时过期）
-        if self.redis_client:
-            try:
-                redis_data = {
-                    "data": news_data,
-                    "symbol": symbol,
-                    "data_source": data_source,
-                    "created_at": doc["created_at"].isoformat()
-                }
-                self.redis_client.setex(
-                    cache_key,
-                    24 * 3600,  # 24小时过期
-                    json.dumps(redis_data, ensure_ascii=False)
-                )
-                logger.info(f"⚡ 新闻数据已缓存到Redis: {symbol} -> {cache_key}")
-            except Exception as e:
-                logger.error(f"⚠️ Redis缓存失败: {e}")
+        doc = self._build_news_doc(symbol, news_data, start_date, end_date, data_source)
+        cache_key = doc["_id"]
+        written = self._write_docs([doc])
+        if written['mongodb']:
+            logger.info(f"📰 新闻数据已保存到MongoDB: {symbol} -> {cache_key}")
+        if written['redis']:
+            logger.info(f"⚡ 新闻数据已缓存到Redis: {symbol} -> {cache_key}")
 
         return cache_key
 
@@ -411,51 +590,13 @@ class DatabaseCacheManager:
                               analysis_date: str = None,
                               data_source: str = "unknown") -> str:
         """保存基本面数据到MongoDB和Redis"""
-        if not analysis_date:
-            analysis_date = datetime.now().strftime("%Y-%m-%d")
-
-        cache_key = self._generate_cache_key("fundamentals", symbol,
-                                           date=analysis_date,
-                                           source=data_source)
-
-        doc = {
-            "_id": cache_key,
-            "symbol": symbol,
-            "data_type": "fundamentals_data",
-            "analysis_date": analysis_date,
-            "data_source": data_source,
-            "data": fundamentals_data,
-            "created_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow()
-        }
-
-        # 保存到MongoDB
-        if self.mongodb_db is not None:
-            try:
-                collection = self.mongodb_db.fundamentals_data
-                collection.replace_one({"_id": cache_key}, doc, upsert=True)
-                logger.info(f"💼 基本面数据已保存到MongoDB: {symbol} -> {cache_key}")
-            except Exception as e:
-                logger.error(f"⚠️ MongoDB保存失败: {e}")
-
-        # 保存到Redis（24小时过期）
-        if self.redis_client:
-            try:
-                redis_data = {
-                    "data": fundamentals_data,
-                    "symbol": symbol,
-                    "data_source": data_source,
-                    "analysis_date": analysis_date,
-                    "created_at": doc["created_at"].isoformat()
-                }
-                self.redis_client.setex(
-                    cache_key,
-                    24 * 3600,  # 24小时过期
-                    json.dumps(redis_data, ensure_ascii=False)
-                )
-                logger.info(f"⚡ 基本面数据已缓存到Redis: {symbol} -> {cache_key}")
-            except Exception as e:
-                logger.error(f"⚠️ Redis缓存失败: {e}")
+        doc = self._build_fundamentals_doc(symbol, fundamentals_data, analysis_date, data_source)
+        cache_key = doc["_id"]
+        written = self._write_docs([doc])
+        if written['mongodb']:
+            logger.info(f"💼 基本面数据已保存到MongoDB: {symbol} -> {cache_key}")
+        if written['redis']:
+            logger.info(f"⚡ 基本面数据已缓存到Redis: {symbol} -> {cache_key}")
 
         return cache_key
 
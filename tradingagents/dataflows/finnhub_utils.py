@@ -1,11 +1,96 @@
 import json
 import os
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
 
 # 导入日志模块
 from tradingagents.utils.logging_manager import get_logger
 logger = get_logger('agents')
 
 
+class _FinnhubDateIndex:
+    """单个Finnhub数据文件的日期索引：有序日期键 + 原文件中的顺序"""
+
+    def __init__(self, data: dict):
+        self.data = data
+        # 空记录永远不会被返回，建索引时直接剔除
+        order = {key: i for i, key in enumerate(data) if len(data[key]) > 0}
+        self.keys = sorted(order)
+        self.order = order
+
+    def range(self, start_date: str, end_date: str) -> dict:
+        """二分查找 [start_date, end_date] 内的日期，结果保持原文件中的键顺序"""
+        lo = bisect_left(self.keys, start_date)
+        hi = bisect_right(self.keys, end_date)
+        selected = sorted(self.keys[lo:hi], key=self.order.__getitem__)
+        return {key: self.data[key] for key in selected}
+
+
+class FinnhubDataStore:
+    """离线Finnhub数据存储 - 解析后的文件按字节大小做LRU淘汰"""
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        """
+        Args:
+            max_bytes: 内存中保留的数据文件总大小上限（按磁盘文件大小估算）
+        """
+        self.max_bytes = max_bytes
+        self._indexes: "OrderedDict[str, tuple]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {'memory_hits': 0, 'file_loads': 0, 'evictions': 0}
+
+    def get_index(self, data_path: str) -> _FinnhubDateIndex:
+        """获取数据文件的日期索引，文件修改后自动重新加载"""
+        stat = os.stat(data_path)
+        with self._lock:
+            cached = self._indexes.get(data_path)
+            if cached is not None and cached[0] == stat.st_mtime:
+                self._indexes.move_to_end(data_path)
+                self._stats['memory_hits'] += 1
+                return cached[2]
+
+        with open(data_path, "r", encoding="utf-8") as f:
+            index = _FinnhubDateIndex(json.load(f))
+
+        with self._lock:
+            self._stats['file_loads'] += 1
+            previous = self._indexes.pop(data_path, None)
+            if previous is not None:
+                self._total_bytes -= previous[1]
+            # 超过上限的单个文件不缓存
+            if stat.st_size <= self.max_bytes:
+                self._indexes[data_path] = (stat.st_mtime, stat.st_size, index)
+                self._total_bytes += stat.st_size
+                while self._total_bytes > self.max_bytes:
+                    _, (_, size, _) = self._indexes.popitem(last=False)
+                    self._total_bytes -= size
+                    self._stats['evictions'] += 1
+        return index
+
+    def clear(self):
+        """清空内存缓存"""
+        with self._lock:
+            self._indexes.clear()
+            self._total_bytes = 0
+
+    def get_stats(self) -> dict:
+        """获取缓存统计"""
+        with self._lock:
+            return dict(self._stats, cached_files=len(self._indexes), cached_bytes=self._total_bytes)
+
+
+# 全局Finnhub数据存储实例
+_finnhub_store = None
+
+def get_finnhub_store() -> FinnhubDataStore:
+    """获取全局Finnhub数据存储实例"""
+    global _finnhub_store
+    if _finnhub_store is None:
+        _finnhub_store = FinnhubDataStore()
+    return _finnhub_store
+
 
 def get_data_in_range(ticker, start_date, end_date, data_type, data_dir, period=None):
     """
@@ -35,9 +120,9 @@ def get_data_in_range(ticker, start_date, end_date, data_type, data_dir, period=
             logger.warning(f"⚠️ [DEBUG] 数据文件不存在: {data_path}")
             logger.warning(f"⚠️ [DEBUG] 请确保已下载相关数据或检查数据目录配置")
             return {}
-        
-        with open(data_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+
+        # 解析结果和日期索引缓存在内存中，重复查询不再读取文件
+        index = get_finnhub_store().get_index(data_path)
     except FileNotFoundError:
         logger.error(f"❌ [ERROR] 文件未找到: {data_path}")
         return {}
@@ -49,8 +134,4 @@ def get_data_in_range(ticker, start_date, end_date, data_type, data_dir, period=
         return {}
 
     # filter keys (date, str in format YYYY-MM-DD) by the date range (str, str in format YYYY-MM-DD)
-    filtered_data = {}
-    for key, value in data.items():
-        if start_date <= key <= end_date and len(value) > 0:
-            filtered_data[key] = value
-    return filtered_data
+    return index.range(start_date, end_date)
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+共享数据I/O线程池
+AKShare/Tushare/TDX/yfinance 等阻塞调用统一提交到有界线程池执行，每次调用有截止时间；
+超时后排队中的调用直接取消，已在执行的调用由HTTP超时让其尽快结束，不再无限期占用线程和连接
+"""
+
+import functools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Optional
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+
+class IOTimeoutError(TimeoutError):
+    """调用超过截止时间未完成"""
+
+
+class IOExecutorBusy(RuntimeError):
+    """线程池和等待队列都已满，截止时间内无法提交"""
+
+
+# 工作线程上下文：当前调用的截止时间和HTTP超时上限
+_worker_context = threading.local()
+
+# 截止时间已过的调用后续HTTP请求使用的超时（秒），让被放弃的调用尽快结束
+_MIN_HTTP_TIMEOUT = 1.0
+
+# requests.Session.request 中 timeout 的位置参数下标 (method, url, params, data, headers, cookies, files, auth, timeout)
+_TIMEOUT_ARG_INDEX = 8
+
+
+def _current_http_timeout() -> Optional[float]:
+    """工作线程中HTTP请求应使用的超时，非工作线程返回None"""
+    limit = getattr(_worker_context, 'socket_timeout', None)
+    if limit is None:
+        return None
+    deadline = getattr(_worker_context, 'deadline', None)
+    if deadline is not None:
+        limit = min(limit, max(deadline - time.monotonic(), _MIN_HTTP_TIMEOUT))
+    return limit
+
+
+def _install_requests_timeout():
+    """为工作线程中未指定超时的 requests 请求补上超时（AKShare等库调用requests时大多不传timeout）"""
+    try:
+        import requests
+    except ImportError:
+        return
+
+    original = requests.Session.request
+    if getattr(original, '_io_executor_timeout', False):
+        return
+
+    @functools.wraps(original)
+    def request(self, *args, **kwargs):
+        if kwargs.get('timeout') is None and len(args) <= _TIMEOUT_ARG_INDEX:
+            timeout = _current_http_timeout()
+            if timeout is not None:
+                kwargs['timeout'] = timeout
+        return original(self, *args, **kwargs)
+
+    request._io_executor_timeout = True
+    requests.Session.request = request
+
+
+class IOExecutor:
+    """有界I/O线程池
+
+    - 最多 max_workers 个调用同时执行，另有 max_queue 个排队；都满时在截止时间内等待空位
+    - run() 到期未完成时抛出 IOTimeoutError：排队中的调用被取消，执行中的调用被标记为放弃，
+      其后续HTTP请求的超时缩短为1秒
+    - 工作线程内再次调用 run() 时直接在当前线程执行，避免嵌套提交占满线程池
+    """
+
+    def __init__(self, max_workers: int = 8, max_queue: int = 32, socket_timeout: float = 30.0):
+        """
+        Args:
+            max_workers: 同时执行的最大调用数
+            max_queue: 等待执行的最大调用数
+            socket_timeout: 工作线程中HTTP请求的默认超时（秒）
+        """
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.socket_timeout = socket_timeout
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="data-io")
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._lock = threading.Lock()
+        self._stats = {'submitted': 0, 'completed': 0, 'failed': 0, 'timeouts': 0,
+                       'cancelled': 0, 'rejected': 0}
+        self._queued = 0
+        self._running = 0
+        self._abandoned = 0
+        _install_requests_timeout()
+
+    def run(self, fn: Callable[..., Any], *args, timeout: Optional[float] = None,
+            name: Optional[str] = None, **kwargs) -> Any:
+        """
+        在线程池中执行 fn(*args, **kwargs) 并等待结果
+
+        Args:
+            fn: 阻塞的I/O调用
+            timeout: 截止时间（秒），None表示不限
+            name: 日志和异常中使用的调用名称
+
+        Raises:
+            IOTimeoutError: 截止时间内未完成
+            IOExecutorBusy: 截止时间内线程池没有空位
+        """
+        label = name or getattr(fn, '__name__', 'io_call')
+        if getattr(_worker_context, 'active', False):
+            return fn(*args, **kwargs)
+
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        if not self._slots.acquire(timeout=timeout):
+            with self._lock:
+                self._stats['rejected'] += 1
+            raise IOExecutorBusy(f"{label}: I/O线程池已满（{self.max_workers}执行 + {self.max_queue}排队）")
+
+        state = {'finished': False, 'abandoned': False}
+
+        def task():
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+            _worker_context.active = True
+            _worker_context.deadline = deadline
+            _worker_context.socket_timeout = self.socket_timeout
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _worker_context.active = False
+                _worker_context.deadline = None
+                _worker_context.socket_timeout = None
+                with self._lock:
+                    self._running -= 1
+                    state['finished'] = True
+                    if state['abandoned']:
+                        self._abandoned -= 1
+                        logger.debug(f"🧵 [I/O线程池] 已放弃的调用结束: {label}")
+
+        with self._lock:
+            self._stats['submitted'] += 1
+            self._queued += 1
+        try:
+            future = self._pool.submit(task)
+        except BaseException:
+            with self._lock:
+                self._queued -= 1
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+
+        try:
+            result = future.result(timeout=None if deadline is None else max(deadline - time.monotonic(), 0))
+        except FutureTimeoutError:
+            if future.cancel():
+                with self._lock:
+                    self._queued -= 1
+                    self._stats['cancelled'] += 1
+                    self._stats['timeouts'] += 1
+                logger.warning(f"⏰ [I/O线程池] {label} 排队超过{timeout}秒，已取消")
+            else:
+                with self._lock:
+                    self._stats['timeouts'] += 1
+                    if not state['finished']:
+                        state['abandoned'] = True
+                        self._abandoned += 1
+                logger.warning(f"⏰ [I/O线程池] {label} 超过{timeout}秒未完成，已放弃")
+            raise IOTimeoutError(f"{label} 超时（{timeout}秒）")
+        except Exception:
+            with self._lock:
+                self._stats['failed'] += 1
+            raise
+
+        with self._lock:
+            self._stats['completed'] += 1
+        return result
+
+    def get_stats(self) -> Dict[str, int]:
+        """调用计数，以及排队数、执行数和已放弃但仍在执行的调用数"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['queue_depth'] = self._queued
+            stats['in_flight'] = self._running
+            stats['abandoned'] = self._abandoned
+        stats['max_workers'] = self.max_workers
+        stats['max_queue'] = self.max_queue
+        return stats
+
+    def shutdown(self, wait: bool = False):
+        """关闭线程池，取消排队中的调用"""
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+
+# 全局I/O线程池实例
+_io_executor = None
+_io_executor_lock = threading.Lock()
+
+def get_io_executor() -> IOExecutor:
+    """获取全局数据I/O线程池"""
+    global _io_executor
+    if _io_executor is None:
+        with _io_executor_lock:
+            if _io_executor is None:
+                _io_executor = IOExecutor(
+                    max_workers=int(os.getenv('DATA_IO_MAX_WORKERS', '8')),
+                    max_queue=int(os.getenv('DATA_IO_MAX_QUEUE', '32')),
+                    socket_timeout=float(os.getenv('DATA_IO_SOCKET_TIMEOUT', '30')),
+                )
+    return _io_executor
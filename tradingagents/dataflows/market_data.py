@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+结构化行情结果
+数据源返回统一的 StockDataResult（K线、最新报价、基本面字段、数据来源，错误也作为字段携带），
+下游直接读取字段而不是解析文本；只在交给LLM工具时才渲染为文本，
+缓存保存二进制载荷（K线为压缩的Arrow IPC，其余字段为JSON头部）
+"""
+
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import pandas as pd
+
+from .db_cache_manager import decode_cache_payload, encode_cache_payload, pack_cache_value, unpack_cache_value
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+
+# 标准列 -> 各数据源可能使用的列名
+OHLCV_COLUMN_ALIASES = {
+    'date': ['date', 'trade_date', 'datetime', '日期'],
+    'open': ['open', '开盘'],
+    'high': ['high', '最高'],
+    'low': ['low', '最低'],
+    'close': ['close', '收盘'],
+    'volume': ['volume', 'vol', '成交量'],
+    'amount': ['amount', '成交额'],
+    'pct_change': ['pct_change', 'pct_chg', '涨跌幅'],
+}
+
+# 渲染文本时使用的数据源名称
+SOURCE_LABELS = {
+    'tushare': 'Tushare',
+    'akshare': 'AKShare',
+    'baostock': 'BaoStock',
+    'tdx': '通达信',
+}
+
+# 载荷格式版本，结构变化时递增，旧载荷读取失败后按缓存未命中处理
+PAYLOAD_VERSION = 2
+
+
+def normalize_ohlcv(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    把各数据源的日线整理为标准列（date/open/high/low/close/volume，可选 amount/pct_change）
+
+    日期在索引中时移到 date 列；结果按日期升序，数值列为float。
+    """
+    if data is None or data.empty:
+        return pd.DataFrame(columns=['date', 'open', 'high', 'low', 'close', 'volume'])
+
+    if not any(str(column).lower() in OHLCV_COLUMN_ALIASES['date'] for column in data.columns) \
+            and isinstance(data.index, pd.DatetimeIndex):
+        data = data.rename_axis('date').reset_index()
+
+    # 列名不区分大小写（TDX/yfinance 使用 Open/Close 等首字母大写的列名）
+    columns = {str(column).lower(): column for column in data.columns}
+    normalized = pd.DataFrame(index=data.index)
+    for column, aliases in OHLCV_COLUMN_ALIASES.items():
+        source = next((columns[alias] for alias in aliases if alias in columns), None)
+        if source is not None:
+            normalized[column] = data[source]
+
+    if 'date' in normalized.columns:
+        normalized['date'] = pd.to_datetime(normalized['date'].astype(str), errors='coerce')
+        normalized = normalized.sort_values('date')
+    for column in normalized.columns:
+        if column != 'date':
+            normalized[column] = pd.to_numeric(normalized[column], errors='coerce').astype(float)
+    if 'volume' not in normalized.columns:
+        normalized['volume'] = 0.0
+    return normalized.reset_index(drop=True)
+
+
+@dataclass
+class Quote:
+    """最新报价（取自区间内最后一根K线）"""
+    symbol: str
+    name: str
+    price: float
+    prev_close: float
+    change: float
+    change_pct: float
+    volume: float
+    as_of: str
+
+    @classmethod
+    def from_ohlcv(cls, symbol: str, name: str, ohlcv: pd.DataFrame) -> Optional["Quote"]:
+        if ohlcv is None or ohlcv.empty or 'close' not in ohlcv.columns:
+            return None
+        latest = ohlcv.iloc[-1]
+        price = float(latest['close'])
+        prev_close = float(ohlcv.iloc[-2]['close']) if len(ohlcv) > 1 else price
+        change = price - prev_close
+        as_of = latest['date'].strftime('%Y-%m-%d') if 'date' in ohlcv.columns and pd.notna(latest['date']) else ''
+        return cls(
+            symbol=symbol,
+            name=name,
+            price=price,
+            prev_close=prev_close,
+            change=change,
+            change_pct=(change / prev_close * 100) if prev_close else 0.0,
+            volume=float(latest.get('volume', 0.0)),
+            as_of=as_of,
+        )
+
+
+@dataclass
+class Provenance:
+    """数据来源"""
+    source: str
+    fetched_at: str = field(default_factory=lambda: datetime.now().isoformat(timespec='seconds'))
+    fallback_from: Optional[str] = None  # 降级前的数据源
+    cached: bool = False  # 是否读取自缓存
+
+
+@dataclass
+class StockDataResult:
+    """一次行情请求的结构化结果，失败时 error 非空"""
+    symbol: str
+    start_date: Optional[str]
+    end_date: Optional[str]
+    market: str = 'china'
+    name: str = ''
+    ohlcv: Optional[pd.DataFrame] = None
+    quote: Optional[Quote] = None
+    fundamentals: Dict[str, Any] = field(default_factory=dict)
+    provenance: Optional[Provenance] = None
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.ohlcv is not None and not self.ohlcv.empty
+
+    @classmethod
+    def failure(cls, symbol: str, start_date: Optional[str], end_date: Optional[str], error: str,
+                source: str = 'unknown', market: str = 'china') -> "StockDataResult":
+        return cls(symbol=symbol, start_date=start_date, end_date=end_date, market=market,
+                   provenance=Provenance(source=source), error=error)
+
+    @classmethod
+    def from_ohlcv(cls, symbol: str, start_date: Optional[str], end_date: Optional[str],
+                   data: Optional[pd.DataFrame], source: str, name: str = '',
+                   market: str = 'china', fallback_from: Optional[str] = None) -> "StockDataResult":
+        """由数据源返回的日线构建结果，数据为空时返回失败结果"""
+        ohlcv = normalize_ohlcv(data)
+        if ohlcv.empty:
+            return cls.failure(symbol, start_date, end_date, f"未获取到{symbol}的有效数据",
+                               source=source, market=market)
+        return cls(
+            symbol=symbol,
+            start_date=start_date,
+            end_date=end_date,
+            market=market,
+            name=name,
+            ohlcv=ohlcv,
+            quote=Quote.from_ohlcv(symbol, name, ohlcv),
+            provenance=Provenance(source=source, fallback_from=fallback_from),
+        )
+
+    def subset(self, start_date: str, end_date: str) -> Optional["StockDataResult"]:
+        """
+        截取 [start_date, end_date] 的子区间
+
+        Returns:
+            本结果覆盖该区间时返回截取后的新结果，否则返回None
+        """
+        if not self.ok or not (self.start_date and self.end_date and start_date and end_date):
+            return None
+        if not (self.start_date <= start_date and end_date <= self.end_date):
+            return None
+        if (self.start_date, self.end_date) == (start_date, end_date):
+            return self
+        dates = self.ohlcv['date']
+        ohlcv = self.ohlcv[(dates >= pd.Timestamp(start_date)) & (dates <= pd.Timestamp(end_date))]
+        if ohlcv.empty:
+            return None
+        ohlcv = ohlcv.reset_index(drop=True)
+        return StockDataResult(
+            symbol=self.symbol,
+            start_date=start_date,
+            end_date=end_date,
+            market=self.market,
+            name=self.name,
+            ohlcv=ohlcv,
+            quote=Quote.from_ohlcv(self.symbol, self.name, ohlcv),
+            fundamentals=self.fundamentals,
+            provenance=self.provenance,
+        )
+
+    # ------------------------------------------------------------------
+    # 文本渲染（仅在LLM工具边界调用）
+    # ------------------------------------------------------------------
+
+    def render(self, recent_rows: int = 5) -> str:
+        """渲染为交给LLM的文本报告"""
+        if not self.ok:
+            return f"❌ {self.error or f'未获取到{self.symbol}的有效数据'}"
+
+        data = self.ohlcv
+        source = self.provenance.source if self.provenance else 'unknown'
+        currency = '¥' if self.market == 'china' else ('HK$' if self.market == 'hk' else '$')
+        title = f"{self.name}({self.symbol})" if self.name else self.symbol
+
+        lines = [
+            f"📊 {title} - {SOURCE_LABELS.get(source, source)}数据",
+            f"股票代码: {self.symbol}",
+        ]
+        if self.name:
+            lines.append(f"股票名称: {self.name}")
+        lines += [
+            f"数据期间: {self.start_date} 至 {self.end_date}",
+            f"数据条数: {len(data)}条",
+            "",
+        ]
+        if self.quote:
+            lines += [
+                f"💰 最新价格: {currency}{self.quote.price:.2f}",
+                f"📈 涨跌额: {self.quote.change:+.2f} ({self.quote.change_pct:+.2f}%)",
+                "",
+            ]
+        lines += [
+            "📊 价格统计:",
+            f"   最高价: {currency}{data['high'].max():.2f}",
+            f"   最低价: {currency}{data['low'].min():.2f}",
+            f"   平均价: {currency}{data['close'].mean():.2f}",
+            f"   成交量: {data['volume'].sum():,.0f}股",
+        ]
+
+        realtime = self.fundamentals.get('realtime_quote')
+        if realtime:
+            lines += [
+                "",
+                "📡 实时行情:",
+                f"   当前价格: {currency}{realtime['price']:.2f}",
+                f"   涨跌幅: {realtime['change_percent']:+.2f}%",
+                f"   成交量: {realtime['volume']:,.0f}手",
+                f"   更新时间: {realtime['update_time']}",
+            ]
+        indicators = self.fundamentals.get('technical_indicators')
+        if indicators:
+            lines += ["", "🔍 技术指标:"]
+            lines += [f"   {name}: {value:.4f}" if name.startswith('MACD') else f"   {name}: {value:.2f}"
+                      for name, value in indicators.items()]
+
+        display_rows = min(recent_rows, len(data))
+        recent = data.tail(display_rows).copy()
+        recent['date'] = recent['date'].dt.strftime('%Y-%m-%d')
+        # 直接传格式参数，不修改pandas全局选项（多线程同时渲染时保持一致）
+        lines += ["", f"最新{display_rows}天数据:", recent.to_string(index=False, float_format='{:.2f}'.format)]
+
+        if self.provenance and self.provenance.fallback_from:
+            lines += ["", f"⚠️ 注意: {self.provenance.fallback_from}不可用，数据来自备用数据源"]
+        return "\n".join(lines)
+
+    # ------------------------------------------------------------------
+    # 二进制载荷（缓存用）
+    # ------------------------------------------------------------------
+
+    def to_payload(self) -> bytes:
+        """序列化为二进制载荷：K线编码为压缩的Arrow IPC，报价、来源等字段放在JSON头部"""
+        meta = {
+            'version': PAYLOAD_VERSION,
+            'symbol': self.symbol,
+            'start_date': self.start_date,
+            'end_date': self.end_date,
+            'market': self.market,
+            'name': self.name,
+            'ohlcv_format': None,
+            'quote': asdict(self.quote) if self.quote else None,
+            'fundamentals': self.fundamentals,
+            'provenance': asdict(self.provenance) if self.provenance else None,
+            'error': self.error,
+        }
+        payload = b''
+        if self.ohlcv is not None:
+            payload, meta['ohlcv_format'] = encode_cache_payload(self.ohlcv)
+        return pack_cache_value(meta, payload)
+
+    @classmethod
+    def from_payload(cls, payload: bytes) -> "StockDataResult":
+        meta, data = unpack_cache_value(payload)
+        if meta.get('version') != PAYLOAD_VERSION:
+            raise ValueError(f"不支持的载荷版本: {meta.get('version')}")
+        ohlcv = None
+        if meta['ohlcv_format'] is not None:
+            ohlcv = decode_cache_payload(data, meta['ohlcv_format'])
+            if 'date' in ohlcv.columns:
+                # 压缩JSON回退格式中日期为ISO字符串
+                ohlcv['date'] = pd.to_datetime(ohlcv['date'])
+        provenance = Provenance(**meta['provenance']) if meta['provenance'] else None
+        if provenance is not None:
+            provenance.cached = True
+        return cls(
+            symbol=meta['symbol'],
+            start_date=meta['start_date'],
+            end_date=meta['end_date'],
+            market=meta['market'],
+            name=meta['name'],
+            ohlcv=ohlcv,
+            quote=Quote(**meta['quote']) if meta['quote'] else None,
+            fundamentals=meta['fundamentals'],
+            provenance=provenance,
+            error=meta['error'],
+        )
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+OHLCV行情存储
+每只股票在磁盘上只保留一份规范历史，刷新时仅追加缺失的尾部K线；
+解析并包装好的 stockstats DataFrame 保存在进程内LRU缓存中，同一分析内重复调用无需再次读取或下载
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from stockstats import wrap
+
+from .config import get_config
+from tradingagents.utils.keyed_lock import KeyedLock
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+
+class OHLCVStore:
+    """按股票维护单一规范历史的OHLCV存储 - 增量追加 + 内存LRU缓存"""
+
+    def __init__(self, cache_dir: str = None, max_memory_items: int = 32, history_years: int = 15):
+        """
+        初始化行情存储
+
+        Args:
+            cache_dir: 规范历史文件所在目录，默认为配置中的 data_cache_dir
+            max_memory_items: 内存中最多保留的已包装DataFrame数量
+            history_years: 在线模式下保留的历史年数
+        """
+        if cache_dir is None:
+            cache_dir = get_config()["data_cache_dir"]
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        self.max_memory_items = max_memory_items
+        self.history_years = history_years
+
+        self._frames: "OrderedDict[Tuple, pd.DataFrame]" = OrderedDict()
+        self._lock = threading.Lock()
+        # 保证同一股票不会被并发下载或并发计算指标
+        self._key_locks = KeyedLock()
+        self._stats = {'memory_hits': 0, 'memory_misses': 0, 'downloads': 0, 'tail_appends': 0}
+
+        logger.info(f"📦 OHLCV行情存储初始化完成: {self.cache_dir}")
+
+    # ------------------------------------------------------------------
+    # 内存LRU缓存
+    # ------------------------------------------------------------------
+
+    def _memory_key(self, symbol: str, data_dir: str, online: bool) -> Tuple:
+        if online:
+            # 在线数据按自然日失效，第二天首次访问时会触发尾部刷新
+            return ("online", symbol, datetime.now().strftime("%Y-%m-%d"))
+        return ("offline", data_dir, symbol)
+
+    def _get_wrapped_frame(self, key: Tuple, symbol: str, data_dir: str, online: bool) -> pd.DataFrame:
+        """从LRU缓存获取已包装的DataFrame，未命中时加载（调用方需持有该键的锁）"""
+        with self._lock:
+            frame = self._frames.get(key)
+            if frame is not None:
+                self._frames.move_to_end(key)
+                self._stats['memory_hits'] += 1
+                return frame
+            self._stats['memory_misses'] += 1
+
+        data = self.load_history(symbol) if online else self._load_offline(symbol, data_dir)
+        frame = wrap(data)
+
+        with self._lock:
+            self._frames[key] = frame
+            self._frames.move_to_end(key)
+            while len(self._frames) > self.max_memory_items:
+                self._frames.popitem(last=False)
+        return frame
+
+    def get_indicator(self, symbol: str, indicator: str, data_dir: str, online: bool = False) -> pd.DataFrame:
+        """
+        获取指定指标的完整历史
+
+        指标列只在首次请求时计算一次，并保留在缓存的DataFrame上。
+
+        Returns:
+            包含 Date 和指标两列的 DataFrame（副本，可安全修改）
+        """
+        key = self._memory_key(symbol, data_dir, online)
+        with self._key_locks.hold(key):
+            frame = self._get_wrapped_frame(key, symbol, data_dir, online)
+            frame[indicator]  # trigger stockstats to calculate the indicator
+            return pd.DataFrame({"Date": frame["Date"].values, indicator: frame[indicator].values})
+
+    def clear_memory(self):
+        """清空内存缓存"""
+        with self._lock:
+            self._frames.clear()
+
+    def get_stats(self) -> Dict[str, int]:
+        """获取缓存命中与下载统计"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['memory_items'] = len(self._frames)
+            return stats
+
+    # ------------------------------------------------------------------
+    # 磁盘规范历史
+    # ------------------------------------------------------------------
+
+    def _history_file(self, symbol: str) -> Path:
+        return self.cache_dir / f"{symbol}-YFin-data.csv"
+
+    @staticmethod
+    def _parse_dates(data: pd.DataFrame) -> pd.DataFrame:
+        """Date 列统一为不带时区的 datetime，便于与当天日期比较"""
+        dates = pd.to_datetime(data["Date"])
+        if dates.dt.tz is not None:
+            dates = dates.dt.tz_localize(None)
+        data["Date"] = dates
+        return data
+
+    def _load_offline(self, symbol: str, data_dir: str) -> pd.DataFrame:
+        try:
+            return pd.read_csv(
+                os.path.join(data_dir, f"{symbol}-YFin-data-2015-01-01-2025-03-25.csv")
+            )
+        except FileNotFoundError:
+            raise Exception("Stockstats fail: Yahoo Finance data not fetched yet!")
+
+    def _download(self, symbol: str, start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+        """从yfinance下载 [start, end) 区间的前复权日线"""
+        with self._lock:
+            self._stats['downloads'] += 1
+        data = yf.download(
+            symbol,
+            start=start.strftime("%Y-%m-%d"),
+            end=end.strftime("%Y-%m-%d"),
+            multi_level_index=False,
+            progress=False,
+            auto_adjust=True,
+        )
+        data = data.reset_index()
+        if not data.empty:
+            data = self._parse_dates(data)
+        return data
+
+    def _seed_from_legacy_files(self, symbol: str) -> Optional[pd.DataFrame]:
+        """
+        迁移旧版按日期命名的缓存文件（{symbol}-YFin-data-{start}-{end}.csv）
+
+        以结束日期最新的一份为基础，依次并入其他文件中更早的K线：重叠日期的收盘价一致
+        （复权基准相同）时合并，被完全覆盖的文件直接删除；无法校验或基准不同的文件保留不删。
+        """
+        # 文件名末尾是 {start}-{end}.csv，按结束日期从新到旧排列
+        legacy_files = sorted(self.cache_dir.glob(f"{symbol}-YFin-data-*-*.csv"),
+                              key=lambda path: path.stem[-10:], reverse=True)
+        frames = []
+        for legacy_file in legacy_files:
+            try:
+                frames.append((legacy_file, self._parse_dates(pd.read_csv(legacy_file))))
+            except Exception as e:
+                logger.warning(f"⚠️ 旧版缓存文件读取失败，忽略: {legacy_file} - {e}")
+        frames = [(path, frame) for path, frame in frames if not frame.empty]
+        if not frames:
+            return None
+
+        data = frames[0][1]
+        merged, kept = [frames[0][0]], []
+        for legacy_file, frame in frames[1:]:
+            earlier = frame[frame["Date"] < data["Date"].min()]
+            if earlier.empty:
+                merged.append(legacy_file)
+                continue
+            overlap = frame.merge(data[["Date", "Close"]], on="Date", suffixes=("", "_kept"))
+            if overlap.empty or not np.allclose(overlap["Close"], overlap["Close_kept"], rtol=1e-6):
+                logger.warning(f"⚠️ 旧版缓存文件与规范历史不连续或复权基准不同，保留未合并: {legacy_file}")
+                kept.append(legacy_file)
+                continue
+            data = pd.concat([earlier, data], ignore_index=True)
+            merged.append(legacy_file)
+
+        data = data.drop_duplicates(subset="Date", keep="last").sort_values("Date").reset_index(drop=True)
+        data.to_csv(self._history_file(symbol), index=False)
+        for legacy_file in merged:
+            try:
+                legacy_file.unlink()
+            except OSError as e:
+                logger.warning(f"⚠️ 删除旧版缓存文件失败: {legacy_file} - {e}")
+
+        logger.info(f"📦 已将{len(merged)}个旧版缓存文件合并为规范历史: {symbol}"
+                    + (f"，{len(kept)}个未合并已保留" if kept else ""))
+        return data
+
+    def _append_tail(self, symbol: str, data: pd.DataFrame, today: pd.Timestamp) -> pd.DataFrame:
+        """仅下载并追加缺失的尾部K线"""
+        last_date = data["Date"].max()
+        try:
+            # 从最后一根已存K线开始下载，用重叠的那根K线校验复权基准是否变化
+            tail = self._download(symbol, last_date, today)
+        except Exception as e:
+            logger.warning(f"⚠️ {symbol} 尾部K线刷新失败，使用已有历史: {e}")
+            return data
+
+        if not tail.empty:
+            stored_close = data.loc[data["Date"] == last_date, "Close"].iloc[-1]
+            overlap = tail.loc[tail["Date"] == last_date, "Close"]
+
+            if not overlap.empty and not np.isclose(overlap.iloc[0], stored_close, rtol=1e-6):
+                # 分红或拆股导致复权价整体变化，只能重新下载完整历史
+                logger.info(f"🔄 {symbol} 复权基准已变化，重新下载完整历史")
+                full_history = self._download(symbol, today - pd.DateOffset(years=self.history_years), today)
+                if full_history.empty:
+                    return data
+                data = full_history
+            else:
+                new_rows = tail[tail["Date"] > last_date]
+                if not new_rows.empty:
+                    data = pd.concat([data, new_rows], ignore_index=True)
+                    with self._lock:
+                        self._stats['tail_appends'] += 1
+                    logger.debug(f"📈 {symbol} 追加{len(new_rows)}根K线")
+
+        data.to_csv(self._history_file(symbol), index=False)
+        return data
+
+    def load_history(self, symbol: str) -> pd.DataFrame:
+        """
+        获取股票的规范历史，必要时增量刷新
+
+        Returns:
+            最近 history_years 年的OHLCV数据，Date 为 YYYY-mm-dd 字符串
+        """
+        today = pd.Timestamp.today().normalize()
+        history_file = self._history_file(symbol)
+
+        if history_file.exists():
+            data = self._parse_dates(pd.read_csv(history_file))
+            # 今天尚未刷新过才请求尾部数据
+            needs_refresh = datetime.fromtimestamp(history_file.stat().st_mtime).date() < today.date()
+        else:
+            data = self._seed_from_legacy_files(symbol)
+            needs_refresh = True
+
+        if data is None or data.empty:
+            data = self._download(symbol, today - pd.DateOffset(years=self.history_years), today)
+            if data.empty:
+                raise Exception(f"Stockstats fail: no Yahoo Finance data for {symbol}")
+            data.to_csv(history_file, index=False)
+        elif needs_refresh:
+            data = self._append_tail(symbol, data, today)
+
+        start = today - pd.DateOffset(years=self.history_years)
+        data = data[data["Date"] >= start].reset_index(drop=True)
+        data["Date"] = data["Date"].dt.strftime("%Y-%m-%d")
+        return data
+
+
+# 全局行情存储实例
+_ohlcv_store = None
+
+def get_ohlcv_store() -> OHLCVStore:
+    """获取全局OHLCV行情存储实例"""
+    global _ohlcv_store
+    if _ohlcv_store is None:
+        _ohlcv_store = OHLCVStore()
+    return _ohlcv_store
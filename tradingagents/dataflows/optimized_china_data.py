@@ -8,9 +8,10 @@ import os
 import time
 import random
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Union
 from .cache_manager import get_cache
 from .config import get_config
+from .market_data import StockDataResult
 
 # 导入日志模块
 from tradingagents.utils.logging_manager import get_logger
@@ -38,90 +39,129 @@ class OptimizedChinaDataProvider:
             time.sleep(wait_time)
         
         self.last_api_call = time.time()
+
+    def _served_by_daily_store(self, start_date: str, end_date: str) -> bool:
+        """当前数据源为Tushare且区间已批量入库时，数据从本地日线库读取，无需限流等待"""
+        try:
+            from .data_source_manager import get_data_source_manager, ChinaDataSource
+            if get_data_source_manager().get_current_source() != ChinaDataSource.TUSHARE:
+                return False
+            from .tushare_utils import get_tushare_provider
+            store = get_tushare_provider().daily_store
+            return store is not None and store.covers(start_date, end_date)
+        except Exception:
+            return False
+
+    def prefetch_watchlist(self, symbols: list, start_date: str, end_date: str) -> Dict[str, Any]:
+        """
+        自选股批量分析前预取行情：按交易日批量拉取全市场日线到本地日线库
+
+        之后对这些股票的 get_stock_data 直接读取本地数据，不再逐只调用接口和限流等待。
+
+        Args:
+            symbols: 自选股代码列表（仅用于日志）
+            start_date: 开始日期 (YYYY-MM-DD)
+            end_date: 结束日期 (YYYY-MM-DD)
+
+        Returns:
+            入库摘要，Tushare不可用时为空
+        """
+        from .tushare_utils import get_tushare_provider
+
+        logger.info(f"📥 预取自选股行情: {len(symbols)}只股票 ({start_date} 到 {end_date})")
+        return get_tushare_provider().ingest_trade_dates(start_date, end_date)
     
-    def get_stock_data(self, symbol: str, start_date: str, end_date: str, 
-                      force_refresh: bool = False) -> str:
+    def get_stock_data_result(self, symbol: str, start_date: str, end_date: str,
+                              force_refresh: bool = False) -> StockDataResult:
         """
-        获取A股数据 - 优先使用缓存
-        
+        获取结构化的A股数据 - 优先使用缓存
+
+        缓存保存结构化结果的二进制载荷；缓存区间覆盖请求区间时直接截取子区间。
+
         Args:
             symbol: 股票代码（6位数字）
             start_date: 开始日期 (YYYY-MM-DD)
             end_date: 结束日期 (YYYY-MM-DD)
             force_refresh: 是否强制刷新缓存
-        
+
         Returns:
-            格式化的股票数据字符串
+            StockDataResult: 结构化结果，获取失败时 error 非空
         """
         logger.info(f"📈 获取A股数据: {symbol} ({start_date} 到 {end_date})")
-        
+
         # 检查缓存（除非强制刷新）
         if not force_refresh:
             cache_key = self.cache.find_cached_stock_data(
                 symbol=symbol,
                 start_date=start_date,
                 end_date=end_date,
-                data_source="tdx"
+                data_source="unified"
             )
-            
+
             if cache_key:
                 cached_data = self.cache.load_stock_data(cache_key)
-                if cached_data:
-                    logger.info(f"⚡ 从缓存加载A股数据: {symbol}")
-                    return cached_data
-        
-        # 缓存未命中，从Tushare数据接口获取
-        logger.info(f"🌐 从Tushare数据接口获取数据: {symbol}")
-        
+                if isinstance(cached_data, StockDataResult):
+                    cached_result = cached_data.subset(start_date, end_date)
+                    if cached_result is not None:
+                        logger.info(f"⚡ 从缓存加载A股数据: {symbol}")
+                        return cached_result
+
+        # 缓存未命中，从统一数据源接口获取
+        logger.info(f"🌐 从数据源接口获取数据: {symbol}")
+
         try:
-            # API限制处理
-            self._wait_for_rate_limit()
-            
+            # API限制处理（本地日线库可直接提供数据时跳过）
+            if not self._served_by_daily_store(start_date, end_date):
+                self._wait_for_rate_limit()
+
             # 调用统一数据源接口（默认Tushare，支持备用数据源）
-            from .data_source_manager import get_china_stock_data_unified
+            from .data_source_manager import get_china_stock_data_result
 
-            formatted_data = get_china_stock_data_unified(
-                symbol=symbol,
-                start_date=start_date,
-                end_date=end_date
-            )
+            result = get_china_stock_data_result(symbol, start_date, end_date)
+        except Exception as e:
+            logger.error(f"❌ 数据源接口调用异常: {e}")
+            return StockDataResult.failure(symbol, start_date, end_date, f"数据源接口调用异常: {e}")
 
-            # 检查是否获取成功
-            if "❌" in formatted_data or "错误" in formatted_data:
-                logger.error(f"❌ 数据源API调用失败: {symbol}")
-                # 尝试从旧缓存获取数据
-                old_cache = self._try_get_old_cache(symbol, start_date, end_date)
-                if old_cache:
-                    logger.info(f"📁 使用过期缓存数据: {symbol}")
-                    return old_cache
-
-                # 生成备用数据
-                return self._generate_fallback_data(symbol, start_date, end_date, "数据源API调用失败")
-            
+        if result.ok:
             # 保存到缓存
             self.cache.save_stock_data(
                 symbol=symbol,
-                data=formatted_data,
+                data=result,
                 start_date=start_date,
                 end_date=end_date,
                 data_source="unified"  # 使用统一数据源标识
             )
-            
             logger.info(f"✅ A股数据获取成功: {symbol}")
-            return formatted_data
-            
-        except Exception as e:
-            error_msg = f"Tushare数据接口调用异常: {str(e)}"
-            logger.error(f"❌ {error_msg}")
-            
-            # 尝试从旧缓存获取数据
-            old_cache = self._try_get_old_cache(symbol, start_date, end_date)
-            if old_cache:
-                logger.info(f"📁 使用过期缓存数据: {symbol}")
-                return old_cache
-            
-            # 生成备用数据
-            return self._generate_fallback_data(symbol, start_date, end_date, error_msg)
+        else:
+            logger.error(f"❌ 数据源API调用失败: {symbol} - {result.error}")
+        return result
+
+    def get_stock_data(self, symbol: str, start_date: str, end_date: str, 
+                      force_refresh: bool = False) -> str:
+        """
+        获取A股数据 - 优先使用缓存
+        
+        Args:
+            symbol: 股票代码（6位数字）
+            start_date: 开始日期 (YYYY-MM-DD)
+            end_date: 结束日期 (YYYY-MM-DD)
+            force_refresh: 是否强制刷新缓存
+        
+        Returns:
+            格式化的股票数据字符串
+        """
+        result = self.get_stock_data_result(symbol, start_date, end_date, force_refresh)
+        if result.ok:
+            return result.render()
+
+        # 尝试从旧缓存获取数据
+        old_cache = self._try_get_old_cache(symbol, start_date, end_date)
+        if old_cache:
+            logger.info(f"📁 使用过期缓存数据: {symbol}")
+            return old_cache
+
+        # 生成备用数据
+        return self._generate_fallback_data(symbol, start_date, end_date, result.error)
     
     def get_fundamentals_data(self, symbol: str, force_refresh: bool = False) -> str:
         """
@@ -139,22 +179,13 @@ class OptimizedChinaDataProvider:
         # 检查缓存（除非强制刷新）
         if not force_refresh:
             # 查找基本面数据缓存
-            for metadata_file in self.cache.metadata_dir.glob(f"*_meta.json"):
+            for entry in self.cache.find_cache_entries(symbol, 'fundamentals', market_type='china'):
                 try:
-                    import json
-                    with open(metadata_file, 'r', encoding='utf-8') as f:
-                        metadata = json.load(f)
-                    
-                    if (metadata.get('symbol') == symbol and 
-                        metadata.get('data_type') == 'fundamentals' and
-                        metadata.get('market_type') == 'china'):
-                        
-                        cache_key = metadata_file.stem.replace('_meta', '')
-                        if self.cache.is_cache_valid(cache_key, symbol=symbol, data_type='fundamentals'):
-                            cached_data = self.cache.load_stock_data(cache_key)
-                            if cached_data:
-                                logger.info(f"⚡ 从缓存加载A股基本面数据: {symbol}")
-                                return cached_data
+                    if self.cache.is_cache_valid(entry['cache_key'], symbol=symbol, data_type='fundamentals'):
+                        cached_data = self.cache.load_stock_data(entry['cache_key'])
+                        if cached_data:
+                            logger.info(f"⚡ 从缓存加载A股基本面数据: {symbol}")
+                            return cached_data
                 except Exception:
                     continue
         
@@ -166,7 +197,7 @@ class OptimizedChinaDataProvider:
             current_date = datetime.now().strftime('%Y-%m-%d')
             start_date = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
             
-            stock_data = self.get_stock_data(symbol, start_date, current_date)
+            stock_data = self.get_stock_data_result(symbol, start_date, current_date)
             
             # 生成基本面分析报告
             fundamentals_data = self._generate_fundamentals_report(symbol, stock_data)
@@ -186,14 +217,11 @@ class OptimizedChinaDataProvider:
             logger.error(f"❌ {error_msg}")
             return self._generate_fallback_fundamentals(symbol, error_msg)
     
-    def _generate_fundamentals_report(self, symbol: str, stock_data: str) -> str:
-        """基于股票数据生成真实的基本面分析报告"""
+    def _generate_fundamentals_report(self, symbol: str, stock_data: Union[StockDataResult, str]) -> str:
+        """基于股票数据（结构化结果，或旧版格式化文本）生成真实的基本面分析报告"""
 
         # 添加详细的股票代码追踪日志
         logger.debug(f"🔍 [股票代码追踪] _generate_fundamentals_report 接收到的股票代码: '{symbol}' (类型: {type(symbol)})")
-        logger.debug(f"🔍 [股票代码追踪] 股票代码长度: {len(str(symbol))}")
-        logger.debug(f"🔍 [股票代码追踪] 股票代码字符: {list(str(symbol))}")
-        logger.debug(f"🔍 [股票代码追踪] 接收到的股票数据前200字符: {stock_data[:200] if stock_data else 'None'}")
 
         # 从股票数据中提取信息
         company_name = "未知公司"
@@ -201,24 +229,31 @@ class OptimizedChinaDataProvider:
         volume = "N/A"
         change_pct = "N/A"
 
-        # 首先尝试从统一接口获取股票基本信息
-        try:
-            logger.debug(f"🔍 [股票代码追踪] 尝试获取{symbol}的基本信息...")
-            from .interface import get_china_stock_info_unified
-            stock_info = get_china_stock_info_unified(symbol)
-            logger.debug(f"🔍 [股票代码追踪] 获取到的股票信息: {stock_info}")
-
-            if "股票名称:" in stock_info:
-                lines = stock_info.split('\n')
-                for line in lines:
-                    if "股票名称:" in line:
-                        company_name = line.split(':')[1].strip()
-                        logger.debug(f"🔍 [股票代码追踪] 从统一接口获取到股票名称: {company_name}")
-                        break
-        except Exception as e:
-            logger.warning(f"⚠️ 获取股票基本信息失败: {e}")
+        # 结构化结果直接读取字段
+        if isinstance(stock_data, StockDataResult):
+            if stock_data.ok and stock_data.quote:
+                quote = stock_data.quote
+                current_price = f"¥{quote.price:.2f}"
+                change_pct = f"{quote.change_pct:+.2f}%"
+                volume = f"{quote.volume:,.0f}股"
+            if stock_data.name:
+                company_name = stock_data.name
+            stock_data = ""
+
+        # 结构化结果没有名称时查询股票基本信息（经过单飞合并）
+        if company_name == "未知公司":
+            try:
+                logger.debug(f"🔍 [股票代码追踪] 尝试获取{symbol}的基本信息...")
+                from .data_source_manager import get_china_stock_info_unified
+                stock_info = get_china_stock_info_unified(symbol) or {}
+                name = stock_info.get('name')
+                if name and name != f'股票{symbol}':
+                    company_name = name
+                    logger.debug(f"🔍 [股票代码追踪] 从统一接口获取到股票名称: {company_name}")
+            except Exception as e:
+                logger.warning(f"⚠️ 获取股票基本信息失败: {e}")
 
-        # 然后从股票数据中提取价格信息
+        # 旧版格式化文本：从文本中提取价格信息
         if "股票名称:" in stock_data:
             lines = stock_data.split('\n')
             for line in lines:
@@ -1063,22 +1098,14 @@ class OptimizedChinaDataProvider:
     def _try_get_old_cache(self, symbol: str, start_date: str, end_date: str) -> Optional[str]:
         """尝试获取过期的缓存数据作为备用"""
         try:
-            # 查找任何相关的缓存，不考虑TTL
-            for metadata_file in self.cache.metadata_dir.glob(f"*_meta.json"):
+            # 查找任何相关的缓存，不考虑TTL（按缓存时间从新到旧）
+            for entry in self.cache.find_cache_entries(symbol, 'stock_data', market_type='china'):
                 try:
-                    import json
-
-                    with open(metadata_file, 'r', encoding='utf-8') as f:
-                        metadata = json.load(f)
-                    
-                    if (metadata.get('symbol') == symbol and 
-                        metadata.get('data_type') == 'stock_data' and
-                        metadata.get('market_type') == 'china'):
-                        
-                        cache_key = metadata_file.stem.replace('_meta', '')
-                        cached_data = self.cache.load_stock_data(cache_key)
-                        if cached_data:
-                            return cached_data + "\n\n⚠️ 注意: 使用的是过期缓存数据"
+                    cached_data = self.cache.load_stock_data(entry['cache_key'])
+                    if isinstance(cached_data, StockDataResult):
+                        cached_data = cached_data.render() if cached_data.ok else None
+                    if isinstance(cached_data, str) and cached_data:
+                        return cached_data + "\n\n⚠️ 注意: 使用的是过期缓存数据"
                 except Exception:
                     continue
         except Exception:
@@ -13,6 +13,7 @@ import yfinance as yf
 import pandas as pd
 from .cache_manager import get_cache
 from .config import get_config
+from .io_executor import get_io_executor
 
 # 导入日志模块
 from tradingagents.utils.logging_manager import get_logger
@@ -132,7 +133,8 @@ class OptimizedUSDataProvider:
 
                         self._wait_for_rate_limit()
                         ticker = yf.Ticker(symbol)  # 港股代码保持原格式
-                        data = ticker.history(start=start_date, end=end_date)
+                        data = get_io_executor().run(ticker.history, start=start_date, end=end_date,
+                                                     timeout=60, name=f"Yahoo Finance港股数据 {symbol}")
 
                         if not data.empty:
                             formatted_data = self._format_stock_data(symbol, data, start_date, end_date)
@@ -147,7 +149,8 @@ class OptimizedUSDataProvider:
 
                     # 获取数据
                     ticker = yf.Ticker(symbol.upper())
-                    data = ticker.history(start=start_date, end=end_date)
+                    data = get_io_executor().run(ticker.history, start=start_date, end=end_date,
+                                                 timeout=60, name=f"Yahoo Finance美股数据 {symbol}")
 
                     if data.empty:
                         error_msg = f"未找到股票 '{symbol}' 在 {start_date} 到 {end_date} 期间的数据"
@@ -243,21 +246,12 @@ class OptimizedUSDataProvider:
     def _try_get_old_cache(self, symbol: str, start_date: str, end_date: str) -> Optional[str]:
         """尝试获取过期的缓存数据作为备用"""
         try:
-            # 查找任何相关的缓存，不考虑TTL
-            for metadata_file in self.cache.metadata_dir.glob(f"*_meta.json"):
+            # 查找任何相关的缓存，不考虑TTL（按缓存时间从新到旧）
+            for entry in self.cache.find_cache_entries(symbol, 'stock_data', market_type='us'):
                 try:
-                    import json
-                    with open(metadata_file, 'r', encoding='utf-8') as f:
-                        metadata = json.load(f)
-                    
-                    if (metadata.get('symbol') == symbol and 
-                        metadata.get('data_type') == 'stock_data' and
-                        metadata.get('market_type') == 'us'):
-                        
-                        cache_key = metadata_file.stem.replace('_meta', '')
-                        cached_data = self.cache.load_stock_data(cache_key)
-                        if cached_data:
-                            return cached_data + "\n\n⚠️ 注意: 使用的是过期缓存数据"
+                    cached_data = self.cache.load_stock_data(entry['cache_key'])
+                    if cached_data:
+                        return cached_data + "\n\n⚠️ 注意: 使用的是过期缓存数据"
                 except Exception:
                     continue
         except Exception:
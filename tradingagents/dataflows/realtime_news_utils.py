@@ -6,10 +6,13 @@
 
 import requests
 import json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Callable, Tuple
 import time
 import os
+import threading
 from dataclasses import dataclass
 
 # 导入日志模块
@@ -17,6 +20,21 @@ from tradingagents.utils.logging_manager import get_logger
 logger = get_logger('agents')
 
 
+# 新闻源查询共用的线程池（进程内所有聚合器共享，不再每次聚合新建线程池）
+_news_executor = None
+_news_executor_lock = threading.Lock()
+
+def _get_news_executor() -> ThreadPoolExecutor:
+    """获取新闻源查询线程池"""
+    global _news_executor
+    if _news_executor is None:
+        with _news_executor_lock:
+            if _news_executor is None:
+                _news_executor = ThreadPoolExecutor(
+                    max_workers=int(os.getenv('NEWS_SOURCE_MAX_WORKERS', '16')),
+                    thread_name_prefix="news-source")
+    return _news_executor
+
 
 @dataclass
 class NewsItem:
@@ -32,8 +50,23 @@ class NewsItem:
 
 class RealtimeNewsAggregator:
     """实时新闻聚合器"""
-    
-    def __init__(self):
+
+    # 各新闻源的默认截止时间（秒），中文财经包含东方财富和多个RSS源，给得更宽
+    DEFAULT_SOURCE_TIMEOUTS = {
+        'FinnHub': 10.0,
+        'Alpha Vantage': 10.0,
+        'NewsAPI': 10.0,
+        '中文财经': 20.0,
+    }
+    DEFAULT_TOTAL_TIMEOUT = 25.0
+
+    def __init__(self, source_timeouts: Optional[Dict[str, float]] = None,
+                 total_timeout: Optional[float] = None):
+        """
+        Args:
+            source_timeouts: 各新闻源的截止时间（秒），未提供的源使用默认值
+            total_timeout: 整次聚合的总时间预算（秒），到期后返回已获取的部分结果
+        """
         self.headers = {
             'User-Agent': 'TradingAgents-CN/1.0'
         }
@@ -42,6 +75,17 @@ class RealtimeNewsAggregator:
         self.finnhub_key = os.getenv('FINNHUB_API_KEY')
         self.alpha_vantage_key = os.getenv('ALPHA_VANTAGE_API_KEY')
         self.newsapi_key = os.getenv('NEWSAPI_KEY')
+
+        # 超时配置
+        self.source_timeouts = dict(self.DEFAULT_SOURCE_TIMEOUTS)
+        if source_timeouts:
+            self.source_timeouts.update(source_timeouts)
+        self.total_timeout = total_timeout or self.DEFAULT_TOTAL_TIMEOUT
+
+        # 各新闻源耗时记录：最近一次聚合的明细 + 每个源最近100次的耗时
+        self.last_source_stats: Dict[str, Dict] = {}
+        self.source_latency_history: Dict[str, deque] = {}
+        self._stats_lock = threading.Lock()  # 多个分析线程可能共用同一聚合器
         
     def get_realtime_stock_news(self, ticker: str, hours_back: int = 6, max_news: int = 10) -> List[NewsItem]:
         """
@@ -55,62 +99,19 @@ class RealtimeNewsAggregator:
         """
         logger.info(f"[新闻聚合器] 开始获取 {ticker} 的实时新闻，回溯时间: {hours_back}小时")
         start_time = datetime.now()
-        all_news = []
-        
-        # 1. FinnHub实时新闻 (最高优先级)
-        logger.info(f"[新闻聚合器] 尝试从 FinnHub 获取 {ticker} 的新闻")
-        finnhub_start = datetime.now()
-        finnhub_news = self._get_finnhub_realtime_news(ticker, hours_back)
-        finnhub_time = (datetime.now() - finnhub_start).total_seconds()
-        
-        if finnhub_news:
-            logger.info(f"[新闻聚合器] 成功从 FinnHub 获取 {len(finnhub_news)} 条新闻，耗时: {finnhub_time:.2f}秒")
-        else:
-            logger.info(f"[新闻聚合器] FinnHub 未返回新闻，耗时: {finnhub_time:.2f}秒")
-            
-        all_news.extend(finnhub_news)
-        
-        # 2. Alpha Vantage新闻
-        logger.info(f"[新闻聚合器] 尝试从 Alpha Vantage 获取 {ticker} 的新闻")
-        av_start = datetime.now()
-        av_news = self._get_alpha_vantage_news(ticker, hours_back)
-        av_time = (datetime.now() - av_start).total_seconds()
-        
-        if av_news:
-            logger.info(f"[新闻聚合器] 成功从 Alpha Vantage 获取 {len(av_news)} 条新闻，耗时: {av_time:.2f}秒")
-        else:
-            logger.info(f"[新闻聚合器] Alpha Vantage 未返回新闻，耗时: {av_time:.2f}秒")
-            
-        all_news.extend(av_news)
-        
-        # 3. NewsAPI (如果配置了)
+        # 按优先级排列的新闻源：专业API > 新闻API > 中文财经
+        sources = [
+            ('FinnHub', self._get_finnhub_realtime_news),
+            ('Alpha Vantage', self._get_alpha_vantage_news),
+        ]
         if self.newsapi_key:
-            logger.info(f"[新闻聚合器] 尝试从 NewsAPI 获取 {ticker} 的新闻")
-            newsapi_start = datetime.now()
-            newsapi_news = self._get_newsapi_news(ticker, hours_back)
-            newsapi_time = (datetime.now() - newsapi_start).total_seconds()
-            
-            if newsapi_news:
-                logger.info(f"[新闻聚合器] 成功从 NewsAPI 获取 {len(newsapi_news)} 条新闻，耗时: {newsapi_time:.2f}秒")
-            else:
-                logger.info(f"[新闻聚合器] NewsAPI 未返回新闻，耗时: {newsapi_time:.2f}秒")
-                
-            all_news.extend(newsapi_news)
+            sources.append(('NewsAPI', self._get_newsapi_news))
         else:
             logger.info(f"[新闻聚合器] NewsAPI 密钥未配置，跳过此新闻源")
-        
-        # 4. 中文财经新闻源
-        logger.info(f"[新闻聚合器] 尝试获取 {ticker} 的中文财经新闻")
-        chinese_start = datetime.now()
-        chinese_news = self._get_chinese_finance_news(ticker, hours_back)
-        chinese_time = (datetime.now() - chinese_start).total_seconds()
-        
-        if chinese_news:
-            logger.info(f"[新闻聚合器] 成功获取 {len(chinese_news)} 条中文财经新闻，耗时: {chinese_time:.2f}秒")
-        else:
-            logger.info(f"[新闻聚合器] 未获取到中文财经新闻，耗时: {chinese_time:.2f}秒")
-            
-        all_news.extend(chinese_news)
+        sources.append(('中文财经', self._get_chinese_finance_news))
+
+        # 所有新闻源并发查询，慢源或失效源不会拖住其他源
+        all_news = self._fetch_sources_concurrently(sources, ticker, hours_back)
         
         # 去重和排序
         logger.info(f"[新闻聚合器] 开始对 {len(all_news)} 条新闻进行去重和排序")
@@ -140,6 +141,99 @@ class RealtimeNewsAggregator:
         
         return sorted_news
     
+    def _fetch_sources_concurrently(self, sources: List[Tuple[str, Callable]],
+                                    ticker: str, hours_back: int) -> List[NewsItem]:
+        """
+        并发查询所有新闻源
+
+        每个源有自己的截止时间，整体受 total_timeout 约束；到期未返回的源记为超时并被放弃，
+        已返回的结果按源优先级顺序合并。每个源的耗时和状态记录在 last_source_stats 中。
+        """
+        def timed_fetch(fetch: Callable) -> Tuple[List[NewsItem], float]:
+            fetch_start = time.monotonic()
+            items = fetch(ticker, hours_back)
+            return items, time.monotonic() - fetch_start
+
+        executor = _get_news_executor()
+        started = time.monotonic()
+        futures = {executor.submit(timed_fetch, fetch): name for name, fetch in sources}
+        deadlines = {
+            future: started + min(self.source_timeouts.get(name, self.total_timeout), self.total_timeout)
+            for future, name in futures.items()
+        }
+
+        results: Dict[str, List[NewsItem]] = {}
+        stats: Dict[str, Dict] = {}
+        pending = set(futures)
+        try:
+            while pending:
+                now = time.monotonic()
+                # 放弃已超过自身截止时间的源
+                for future in [f for f in pending if deadlines[f] <= now]:
+                    pending.discard(future)
+                    future.cancel()  # 仍在排队的直接取消，已在执行的HTTP请求带有超时，会在后台自行结束
+                    name = futures[future]
+                    stats[name] = {'status': 'timeout', 'latency': now - started, 'count': 0}
+                    logger.warning(f"[新闻聚合器] {name} 超时未返回，已放弃，耗时: {now - started:.2f}秒")
+                if not pending:
+                    break
+
+                next_deadline = min(deadlines[f] for f in pending)
+                done, pending = wait(pending, timeout=max(next_deadline - now, 0), return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    name = futures[future]
+                    try:
+                        items, latency = future.result()
+                    except Exception as e:
+                        latency = time.monotonic() - started
+                        stats[name] = {'status': 'error', 'latency': latency, 'count': 0, 'error': str(e)}
+                        logger.error(f"[新闻聚合器] {name} 获取新闻失败: {e}，耗时: {latency:.2f}秒")
+                        continue
+
+                    items = items or []
+                    results[name] = items
+                    stats[name] = {'status': 'ok' if items else 'empty', 'latency': latency, 'count': len(items)}
+                    if items:
+                        logger.info(f"[新闻聚合器] 成功从 {name} 获取 {len(items)} 条新闻，耗时: {latency:.2f}秒")
+                    else:
+                        logger.info(f"[新闻聚合器] {name} 未返回新闻，耗时: {latency:.2f}秒")
+        finally:
+            # 异常退出时取消尚未开始的查询；不等待被放弃的源
+            for future in pending:
+                future.cancel()
+
+        with self._stats_lock:
+            for name, stat in stats.items():
+                self.source_latency_history.setdefault(name, deque(maxlen=100)).append(stat['latency'])
+            self.last_source_stats = stats
+
+        all_news = []
+        for name, _ in sources:
+            all_news.extend(results.get(name, []))
+        return all_news
+
+    def get_source_stats(self) -> Dict[str, Dict]:
+        """
+        获取各新闻源的耗时统计
+
+        Returns:
+            {源名称: {'last': 最近一次的状态明细, 'avg_latency': 平均耗时, 'max_latency': 最大耗时, 'samples': 样本数}}
+        """
+        with self._stats_lock:
+            history = {name: list(latencies) for name, latencies in self.source_latency_history.items()}
+            last_stats = dict(self.last_source_stats)
+
+        source_stats = {}
+        for name, latencies in history.items():
+            source_stats[name] = {
+                'last': last_stats.get(name),
+                'avg_latency': sum(latencies) / len(latencies),
+                'max_latency': max(latencies),
+                'samples': len(latencies),
+            }
+        return source_stats
+
     def _get_finnhub_realtime_news(self, ticker: str, hours_back: int) -> List[NewsItem]:
         """获取FinnHub实时新闻"""
         if not self.finnhub_key:
@@ -159,7 +253,8 @@ class RealtimeNewsAggregator:
                 'token': self.finnhub_key
             }
             
-            response = requests.get(url, params=params, headers=self.headers)
+            response = requests.get(url, params=params, headers=self.headers,
+                                    timeout=self.source_timeouts['FinnHub'])
             response.raise_for_status()
             
             news_data = response.json()
@@ -204,7 +299,8 @@ class RealtimeNewsAggregator:
                 'limit': 50
             }
             
-            response = requests.get(url, params=params, headers=self.headers)
+            response = requests.get(url, params=params, headers=self.headers,
+                                    timeout=self.source_timeouts['Alpha Vantage'])
             response.raise_for_status()
             
             data = response.json()
@@ -264,7 +360,8 @@ class RealtimeNewsAggregator:
                 'apiKey': self.newsapi_key
             }
             
-            response = requests.get(url, params=params, headers=self.headers)
+            response = requests.get(url, params=params, headers=self.headers,
+                                    timeout=self.source_timeouts['NewsAPI'])
             response.raise_for_status()
             
             data = response.json()
@@ -436,7 +533,10 @@ class RealtimeNewsAggregator:
             import feedparser
             
             logger.info(f"[RSS解析] 尝试获取RSS源内容")
-            feed = feedparser.parse(rss_url)
+            # 先用带超时的requests下载，避免feedparser内部请求无限阻塞
+            response = requests.get(rss_url, headers=self.headers, timeout=self.source_timeouts['中文财经'])
+            response.raise_for_status()
+            feed = feedparser.parse(response.content)
             
             if not feed or not feed.entries:
                 logger.warning(f"[RSS解析] RSS源未返回有效内容")
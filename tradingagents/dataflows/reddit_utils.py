@@ -6,6 +6,12 @@ from contextlib import contextmanager
 from typing import Annotated
 import os
 import re
+import threading
+from functools import lru_cache
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
 
 ticker_to_company = {
     "AAPL": "Apple",
@@ -49,6 +55,82 @@ ticker_to_company = {
 }
 
 
+# 每个subreddit文件的按日偏移索引：{文件路径: (大小, 修改时间, {日期: [(偏移, 长度), ...]})}
+_day_indexes = {}
+_day_index_lock = threading.Lock()
+
+# 按日偏移索引的落盘目录（位于数据目录下，不影响类别目录中的文件计数）
+DAY_INDEX_DIR = ".day_index"
+
+
+def _build_day_index(file_path: str) -> dict:
+    """扫描一次JSONL文件，记录每个发帖日期对应各行的字节偏移和长度（保持文件中的顺序）"""
+    days = {}
+    offset = 0
+    with open(file_path, "rb") as f:
+        for line in f:
+            if line.strip():
+                post_date = datetime.utcfromtimestamp(
+                    json.loads(line)["created_utc"]
+                ).strftime("%Y-%m-%d")
+                days.setdefault(post_date, []).append((offset, len(line)))
+            offset += len(line)
+    return days
+
+
+def get_day_index(base_path: str, category: str, data_file: str) -> dict:
+    """
+    获取subreddit文件的按日偏移索引
+
+    首次访问时扫描文件建立索引并写入 {base_path}/.day_index/{category}/，
+    之后的进程直接读取；源文件大小或修改时间变化时重建。
+    """
+    file_path = os.path.join(base_path, category, data_file)
+    stat = os.stat(file_path)
+    signature = (stat.st_size, stat.st_mtime)
+
+    with _day_index_lock:
+        cached = _day_indexes.get(file_path)
+    if cached is not None and cached[:2] == signature:
+        return cached[2]
+
+    index_path = os.path.join(base_path, DAY_INDEX_DIR, category, f"{data_file}.json")
+    days = None
+    try:
+        with open(index_path, "r", encoding="utf-8") as f:
+            stored = json.load(f)
+        if (stored["size"], stored["mtime"]) == signature:
+            days = {day: [tuple(span) for span in spans] for day, spans in stored["days"].items()}
+    except (OSError, ValueError, KeyError):
+        pass
+
+    if days is None:
+        days = _build_day_index(file_path)
+        try:
+            os.makedirs(os.path.dirname(index_path), exist_ok=True)
+            with open(index_path, "w", encoding="utf-8") as f:
+                json.dump({"size": signature[0], "mtime": signature[1], "days": days}, f)
+        except OSError as e:
+            # 数据目录只读时仅保留内存索引
+            logger.debug(f"Reddit日期索引未落盘: {e}")
+
+    with _day_index_lock:
+        _day_indexes[file_path] = (signature[0], signature[1], days)
+    return days
+
+
+@lru_cache(maxsize=None)
+def _company_pattern(query: str):
+    """预编译公司名称/代码的搜索模式（各检索词按正则匹配，忽略大小写）"""
+    if "OR" in ticker_to_company[query]:
+        search_terms = ticker_to_company[query].split(" OR ")
+    else:
+        search_terms = [ticker_to_company[query]]
+
+    search_terms.append(query)
+    return re.compile("|".join(f"(?:{term})" for term in search_terms), re.IGNORECASE)
+
+
 def fetch_top_from_category(
     category: Annotated[
         str, "Category to fetch top post from. Collection of subreddits."
@@ -81,48 +163,28 @@ def fetch_top_from_category(
 
         all_content_curr_subreddit = []
 
-        with open(os.path.join(base_path, category, data_file), "rb") as f:
-            for i, line in enumerate(f):
-                # skip empty lines
-                if not line.strip():
-                    continue
+        # 只读取当天帖子所在的字节区间
+        spans = get_day_index(base_path, category, data_file).get(date, [])
+        pattern = _company_pattern(query) if "company" in category and query else None
 
-                parsed_line = json.loads(line)
-
-                # select only lines that are from the date
-                post_date = datetime.utcfromtimestamp(
-                    parsed_line["created_utc"]
-                ).strftime("%Y-%m-%d")
-                if post_date != date:
-                    continue
+        with open(os.path.join(base_path, category, data_file), "rb") as f:
+            for offset, length in spans:
+                f.seek(offset)
+                parsed_line = json.loads(f.read(length))
 
                 # if is company_news, check that the title or the content has the company's name (query) mentioned
-                if "company" in category and query:
-                    search_terms = []
-                    if "OR" in ticker_to_company[query]:
-                        search_terms = ticker_to_company[query].split(" OR ")
-                    else:
-                        search_terms = [ticker_to_company[query]]
-
-                    search_terms.append(query)
-
-                    found = False
-                    for term in search_terms:
-                        if re.search(
-                            term, parsed_line["title"], re.IGNORECASE
-                        ) or re.search(term, parsed_line["selftext"], re.IGNORECASE):
-                            found = True
-                            break
-
-                    if not found:
-                        continue
+                if pattern is not None and not (
+                    pattern.search(parsed_line["title"])
+                    or pattern.search(parsed_line["selftext"])
+                ):
+                    continue
 
                 post = {
                     "title": parsed_line["title"],
                     "content": parsed_line["selftext"],
                     "url": parsed_line["url"],
                     "upvotes": parsed_line["ups"],
-                    "posted_date": post_date,
+                    "posted_date": date,
                 }
 
                 all_content_curr_subreddit.append(post)
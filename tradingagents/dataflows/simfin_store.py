@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+SimFin基本面数据存储
+每个SimFin报表文件只解析一次，按 (Ticker, Publish Date) 排序后常驻内存，
+并可转换为Feather文件供下次进程启动时内存映射读取；"某日期之前最新的报表"通过二分查找回答
+"""
+
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from tradingagents.utils.keyed_lock import KeyedLock
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+# 列式存储依赖（可选）- 缺失时每个进程首次访问仍需解析CSV
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+
+# 报表类型 -> (目录名, 文件名前缀)
+SIMFIN_STATEMENTS = {
+    "balance_sheet": ("balance_sheet", "us-balance"),
+    "cash_flow": ("cash_flow", "us-cashflow"),
+    "income_statements": ("income_statements", "us-income"),
+}
+
+
+class _SimFinTable:
+    """单个SimFin报表：按 (Ticker, Publish Date) 稳定排序的DataFrame + 每个股票的行范围"""
+
+    def __init__(self, frame: pd.DataFrame):
+        self.frame = frame
+        self.publish_dates = frame["Publish Date"].dt.tz_convert(None).to_numpy()
+
+        tickers = frame["Ticker"].to_numpy()
+        boundaries = np.flatnonzero(tickers[1:] != tickers[:-1]) + 1
+        starts = np.concatenate(([0], boundaries)) if len(tickers) else np.array([], dtype=int)
+        ends = np.concatenate((boundaries, [len(tickers)])) if len(tickers) else np.array([], dtype=int)
+        self.ticker_ranges: Dict[str, Tuple[int, int]] = {
+            tickers[start]: (int(start), int(end)) for start, end in zip(starts, ends)
+        }
+
+    def asof(self, ticker: str, curr_date: pd.Timestamp) -> Optional[pd.Series]:
+        """返回在 curr_date 当天或之前发布的最新报表，不存在时返回 None"""
+        span = self.ticker_ranges.get(ticker)
+        if span is None:
+            return None
+
+        start, end = span
+        dates = self.publish_dates[start:end]
+        target = np.datetime64(curr_date.tz_convert(None))
+        pos = int(np.searchsorted(dates, target, side="right")) - 1
+        if pos < 0:
+            return None
+        # 同一发布日有多份报表时取文件中最早出现的一行（与 idxmax 一致）
+        pos = int(np.searchsorted(dates, dates[pos], side="left"))
+        return self.frame.iloc[start + pos]
+
+
+class SimFinStore:
+    """SimFin基本面数据存储 - 每个报表文件解析一次并常驻内存"""
+
+    def __init__(self, convert_to_feather: bool = True):
+        """
+        初始化SimFin存储
+
+        Args:
+            convert_to_feather: 是否在CSV旁生成Feather文件，后续进程直接内存映射读取
+        """
+        self.convert_to_feather = convert_to_feather and PYARROW_AVAILABLE
+        self._tables: Dict[Tuple[str, float], _SimFinTable] = {}
+        self._lock = threading.Lock()
+        self._key_locks = KeyedLock()
+        self._stats = {'memory_hits': 0, 'csv_loads': 0, 'feather_loads': 0}
+
+    @staticmethod
+    def statement_path(data_dir: str, statement: str, freq: str) -> Path:
+        """获取SimFin报表CSV路径"""
+        folder, prefix = SIMFIN_STATEMENTS[statement]
+        return Path(data_dir) / "fundamental_data" / "simfin_data_all" / folder / "companies" / "us" / f"{prefix}-{freq}.csv"
+
+    @staticmethod
+    def _parse_csv(csv_path: Path) -> pd.DataFrame:
+        """解析SimFin CSV：日期列转为UTC零点，按 (Ticker, Publish Date) 稳定排序并保留原行号"""
+        df = pd.read_csv(csv_path, sep=";")
+        df["Report Date"] = pd.to_datetime(df["Report Date"], utc=True).dt.normalize()
+        df["Publish Date"] = pd.to_datetime(df["Publish Date"], utc=True).dt.normalize()
+        return df.sort_values(["Ticker", "Publish Date"], kind="mergesort")
+
+    def _load_frame(self, csv_path: Path) -> pd.DataFrame:
+        """优先内存映射读取已转换的Feather文件，否则解析CSV并尝试转换"""
+        feather_path = csv_path.with_suffix(".feather")
+        if self.convert_to_feather and feather_path.exists() \
+                and feather_path.stat().st_mtime >= csv_path.stat().st_mtime:
+            try:
+                frame = feather.read_table(feather_path, memory_map=True).to_pandas()
+                self._stats['feather_loads'] += 1
+                return frame
+            except Exception as e:
+                logger.warning(f"⚠️ 读取SimFin Feather文件失败，重新解析CSV: {e}")
+
+        frame = self._parse_csv(csv_path)
+        self._stats['csv_loads'] += 1
+
+        if self.convert_to_feather:
+            try:
+                table = pa.Table.from_pandas(frame, preserve_index=True)
+                feather.write_feather(table, feather_path, compression='uncompressed')
+                logger.info(f"📦 SimFin报表已转换为Feather: {feather_path.name}")
+            except Exception as e:
+                # 数据目录可能只读，转换失败不影响本次查询
+                logger.debug(f"SimFin Feather转换跳过: {e}")
+        return frame
+
+    def get_table(self, data_dir: str, statement: str, freq: str) -> _SimFinTable:
+        """获取已索引的SimFin报表，源文件修改后自动重新加载"""
+        csv_path = self.statement_path(data_dir, statement, freq)
+        key = (str(csv_path), os.path.getmtime(csv_path))
+
+        with self._key_locks.hold(str(csv_path)):
+            with self._lock:
+                table = self._tables.get(key)
+                if table is not None:
+                    self._stats['memory_hits'] += 1
+                    return table
+
+            table = _SimFinTable(self._load_frame(csv_path))
+            with self._lock:
+                # 同一文件只保留最新版本
+                for stale in [k for k in self._tables if k[0] == key[0]]:
+                    del self._tables[stale]
+                self._tables[key] = table
+            return table
+
+    def get_latest_statement(self, data_dir: str, statement: str, freq: str,
+                             ticker: str, curr_date: str) -> Optional[pd.Series]:
+        """
+        获取 curr_date 当天或之前发布的最新报表
+
+        Args:
+            data_dir: 数据目录
+            statement: 报表类型（balance_sheet/cash_flow/income_statements）
+            freq: 报表频率（annual/quarterly）
+            ticker: 股票代码
+            curr_date: 当前日期 yyyy-mm-dd
+
+        Returns:
+            最新报表（Series），不存在时返回 None
+        """
+        curr_date_dt = pd.to_datetime(curr_date, utc=True).normalize()
+        return self.get_table(data_dir, statement, freq).asof(ticker, curr_date_dt)
+
+    def clear_memory(self):
+        """清空内存中的报表"""
+        with self._lock:
+            self._tables.clear()
+
+    def get_stats(self) -> Dict[str, int]:
+        """获取加载统计"""
+        with self._lock:
+            return dict(self._stats, resident_tables=len(self._tables))
+
+
+# 全局SimFin存储实例
+_simfin_store = None
+
+def get_simfin_store() -> SimFinStore:
+    """获取全局SimFin存储实例"""
+    global _simfin_store
+    if _simfin_store is None:
+        _simfin_store = SimFinStore()
+    return _simfin_store
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+数据请求单飞合并
+同一个键（数据源、股票代码、日期区间、数据类型）的并发请求只发起一次上游调用，其余请求等待并共享结果；
+成功结果在进程内短期保留，同一次分析中数据准备、市场分析师和基本面分析师的重复请求直接复用
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+
+class _Call:
+    """一次进行中的上游调用"""
+
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """按键合并上游请求
+
+    - 同一键已有进行中的调用时，后来的请求等待它完成并共享结果（或异常）
+    - 调用成功且 cacheable(result) 为真时结果保留 ttl 秒，期间同一键直接返回
+    - 失败结果只共享给同时等待的请求，不会被保留
+    """
+
+    def __init__(self, ttl: float = 600.0, max_entries: int = 256):
+        """
+        Args:
+            ttl: 成功结果的保留时间（秒），0表示只合并并发请求、不保留结果
+            max_entries: 最多保留的结果数，超出时淘汰最久未使用的
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._inflight: Dict[Hashable, _Call] = {}
+        self._memo: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (expires_at, result)
+        self._stats = {'upstream_calls': 0, 'memo_hits': 0, 'coalesced': 0}
+
+    def do(self, key: Hashable, fn: Callable[[], Any],
+           cacheable: Optional[Callable[[Any], bool]] = None) -> Any:
+        """
+        执行 fn 或复用同一键的进行中调用/已保留结果
+
+        Args:
+            key: 请求键，如 ('china_stock_data', 'tushare', '000001', '2024-01-01', '2024-06-30')
+            fn: 实际的上游调用
+            cacheable: 判断结果能否保留的函数，默认全部保留
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memo.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memo.move_to_end(key)
+                    self._stats['memo_hits'] += 1
+                    logger.debug(f"♻️ [单飞] 复用已获取的结果: {key}")
+                    return entry[1]
+                del self._memo[key]
+
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _Call()
+                self._stats['upstream_calls'] += 1
+            else:
+                self._stats['coalesced'] += 1
+
+        if not leader:
+            logger.debug(f"♻️ [单飞] 等待进行中的相同请求: {key}")
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            try:
+                keep = call.error is None and self.ttl > 0 and self._is_cacheable(key, call.result, cacheable)
+                with self._lock:
+                    self._inflight.pop(key, None)
+                    if keep:
+                        self._memo[key] = (time.time() + self.ttl, call.result)
+                        self._memo.move_to_end(key)
+                        while len(self._memo) > self.max_entries:
+                            self._memo.popitem(last=False)
+            finally:
+                # 无论保留结果是否出错都要唤醒等待者，否则合并的请求会一直阻塞
+                call.event.set()
+        return call.result
+
+    @staticmethod
+    def _is_cacheable(key: Hashable, result: Any, cacheable: Optional[Callable[[Any], bool]]) -> bool:
+        if cacheable is None:
+            return True
+        try:
+            return bool(cacheable(result))
+        except Exception as e:
+            logger.warning(f"⚠️ [单飞] 判断结果能否保留时出错，不保留: {key}: {e}")
+            return False
+
+    def invalidate(self, key: Hashable):
+        """丢弃某个键保留的结果"""
+        with self._lock:
+            self._memo.pop(key, None)
+
+    def clear(self):
+        """丢弃全部保留的结果"""
+        with self._lock:
+            self._memo.clear()
+
+    def get_stats(self) -> Dict[str, int]:
+        """上游调用次数与节省的调用次数（saved = memo_hits + coalesced）"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['saved'] = stats['memo_hits'] + stats['coalesced']
+            stats['entries'] = len(self._memo)
+            stats['inflight'] = len(self._inflight)
+        return stats
+
+
+# 全局单飞实例
+_single_flight = None
+_single_flight_lock = threading.Lock()
+
+def get_single_flight() -> SingleFlight:
+    """获取全局数据请求单飞实例"""
+    global _single_flight
+    if _single_flight is None:
+        with _single_flight_lock:
+            if _single_flight is None:
+                _single_flight = SingleFlight(ttl=float(os.getenv('DATA_SINGLE_FLIGHT_TTL', '600')))
+    return _single_flight
@@ -1,9 +1,9 @@
 import pandas as pd
-import yfinance as yf
-from stockstats import wrap
-from typing import Annotated
-import os
-from .config import get_config
+from typing import Annotated, List, Tuple
+from .ohlcv_store import get_ohlcv_store
+
+
+NOT_TRADING_DAY = "N/A: Not a trading day (weekend or holiday)"
 
 
 class StockstatsUtils:
@@ -25,63 +25,65 @@ class StockstatsUtils:
             "whether to use online tools to fetch data or offline tools. If True, will use online tools.",
         ] = False,
     ):
-        df = None
-        data = None
+        # 行情和指标列由OHLCV存储缓存，重复调用不会再次读取CSV或重新计算
+        df = get_ohlcv_store().get_indicator(symbol, indicator, data_dir, online)
+        if online:
+            curr_date = pd.to_datetime(curr_date).strftime("%Y-%m-%d")
 
-        if not online:
-            try:
-                data = pd.read_csv(
-                    os.path.join(
-                        data_dir,
-                        f"{symbol}-YFin-data-2015-01-01-2025-03-25.csv",
-                    )
-                )
-                df = wrap(data)
-            except FileNotFoundError:
-                raise Exception("Stockstats fail: Yahoo Finance data not fetched yet!")
-        else:
-            # Get today's date as YYYY-mm-dd to add to cache
-            today_date = pd.Timestamp.today()
-            curr_date = pd.to_datetime(curr_date)
+        matching_rows = df[df["Date"].str.startswith(curr_date)]
 
-            end_date = today_date
-            start_date = today_date - pd.DateOffset(years=15)
-            start_date = start_date.strftime("%Y-%m-%d")
-            end_date = end_date.strftime("%Y-%m-%d")
+        if not matching_rows.empty:
+            indicator_value = matching_rows[indicator].values[0]
+            return indicator_value
+        else:
+            return NOT_TRADING_DAY
 
-            # Get config and ensure cache directory exists
-            config = get_config()
-            os.makedirs(config["data_cache_dir"], exist_ok=True)
+    @staticmethod
+    def get_stock_stats_window(
+        symbol: Annotated[str, "ticker symbol for the company"],
+        indicator: Annotated[
+            str, "quantitative indicators based off of the stock data for the company"
+        ],
+        curr_date: Annotated[
+            str, "curr date for retrieving stock price data, YYYY-mm-dd"
+        ],
+        look_back_days: Annotated[int, "how many days to look back"],
+        data_dir: Annotated[
+            str,
+            "directory where the stock data is stored.",
+        ],
+        online: Annotated[
+            bool,
+            "whether to use online tools to fetch data or offline tools. If True, will use online tools.",
+        ] = False,
+    ) -> List[Tuple[str, object]]:
+        """
+        一次性计算整个回看窗口的指标值
 
-            data_file = os.path.join(
-                config["data_cache_dir"],
-                f"{symbol}-YFin-data-{start_date}-{end_date}.csv",
-            )
+        行情只加载一次，指标在完整历史上向量化计算一次，再按日期索引切出窗口，
+        结果与逐日调用 get_stock_stats 完全一致。
 
-            if os.path.exists(data_file):
-                data = pd.read_csv(data_file)
-                data["Date"] = pd.to_datetime(data["Date"])
-            else:
-                data = yf.download(
-                    symbol,
-                    start=start_date,
-                    end=end_date,
-                    multi_level_index=False,
-                    progress=False,
-                    auto_adjust=True,
-                )
-                data = data.reset_index()
-                data.to_csv(data_file, index=False)
+        Returns:
+            按日期倒序排列的 [(YYYY-mm-dd, 指标值), ...]。离线模式只包含交易日；
+            在线模式包含窗口内每个自然日，非交易日的值为 NOT_TRADING_DAY。
+        """
+        df = get_ohlcv_store().get_indicator(symbol, indicator, data_dir, online)
 
-            df = wrap(data)
-            df["Date"] = df["Date"].dt.strftime("%Y-%m-%d")
-            curr_date = curr_date.strftime("%Y-%m-%d")
+        # 与 get_stock_stats 一致：同一日期有多行时取第一行
+        dates = df["Date"].astype(str).str[:10]
+        values = pd.Series(df[indicator].values, index=dates.values)
+        values = values[~values.index.duplicated(keep="first")]
 
-        df[indicator]  # trigger stockstats to calculate the indicator
-        matching_rows = df[df["Date"].str.startswith(curr_date)]
+        end = pd.to_datetime(curr_date)
+        calendar = pd.date_range(
+            start=end - pd.Timedelta(days=look_back_days), end=end, freq="D"
+        )[::-1].strftime("%Y-%m-%d")
 
-        if not matching_rows.empty:
-            indicator_value = matching_rows[indicator].values[0]
-            return indicator_value
-        else:
-            return "N/A: Not a trading day (weekend or holiday)"
+        is_trading_day = calendar.isin(values.index)
+        window = []
+        for date_str, trading in zip(calendar, is_trading_day):
+            if trading:
+                window.append((date_str, values[date_str]))
+            elif online:
+                window.append((date_str, NOT_TRADING_DAY))
+        return window
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+通达信行情连接池
+保持多个长连接供并发请求复用，按实测连接延迟和失败率给服务器排序，
+服务器统计持久化到文件，下次启动时优先连接最快最稳定的服务器
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+
+# 默认服务器列表（没有 tdx_servers_config.json 时使用）
+DEFAULT_TDX_SERVERS = [
+    {'ip': '115.238.56.198', 'port': 7709},
+    {'ip': '115.238.90.165', 'port': 7709},
+    {'ip': '180.153.18.170', 'port': 7709},
+    {'ip': '119.147.212.81', 'port': 7709},  # 备用
+]
+
+
+class TdxConnectionError(Exception):
+    """没有可用的通达信服务器"""
+
+
+class TdxServerRanking:
+    """服务器健康度排名
+
+    每台服务器记录连接延迟的指数移动平均和成功/失败次数，
+    得分 = 平均延迟 × (1 + 失败惩罚 × 失败率)，得分越低越优先；
+    最近失败过的服务器在冷却期内排到最后。
+    """
+
+    # 延迟移动平均的平滑系数
+    LATENCY_ALPHA = 0.3
+    # 没有测量数据时假定的延迟（秒）
+    DEFAULT_LATENCY = 0.5
+    # 失败率对得分的放大倍数
+    FAILURE_PENALTY = 4.0
+    # 失败后的冷却时间（秒）
+    FAILURE_COOLDOWN = 60.0
+
+    def __init__(self, stats_file: Optional[Path] = None):
+        self.stats_file = Path(stats_file) if stats_file else None
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._load()
+
+    @staticmethod
+    def server_key(server: Dict[str, Any]) -> str:
+        return f"{server['ip']}:{server['port']}"
+
+    def _load(self):
+        if not self.stats_file or not self.stats_file.exists():
+            return
+        try:
+            with open(self.stats_file, 'r', encoding='utf-8') as f:
+                self._stats = json.load(f)
+        except Exception as e:
+            logger.warning(f"⚠️ [TDX连接池] 读取服务器统计失败: {e}")
+
+    def _save_locked(self):
+        if not self.stats_file:
+            return
+        try:
+            self.stats_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.stats_file.with_name(self.stats_file.name + ".tmp")
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(self._stats, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_file, self.stats_file)
+        except Exception as e:
+            logger.warning(f"⚠️ [TDX连接池] 保存服务器统计失败: {e}")
+
+    def _entry_locked(self, key: str) -> Dict[str, float]:
+        return self._stats.setdefault(key, {'latency': self.DEFAULT_LATENCY, 'successes': 0,
+                                            'failures': 0, 'last_failure': 0.0})
+
+    def record_success(self, server: Dict[str, Any], latency: float):
+        """记录一次成功连接及其耗时"""
+        with self._lock:
+            entry = self._entry_locked(self.server_key(server))
+            if entry['successes'] or entry['failures']:
+                entry['latency'] = (1 - self.LATENCY_ALPHA) * entry['latency'] + self.LATENCY_ALPHA * latency
+            else:
+                entry['latency'] = latency
+            entry['successes'] += 1
+            self._save_locked()
+
+    def record_failure(self, server: Dict[str, Any]):
+        """记录一次连接或请求失败"""
+        with self._lock:
+            entry = self._entry_locked(self.server_key(server))
+            entry['failures'] += 1
+            entry['last_failure'] = time.time()
+            self._save_locked()
+
+    def score(self, server: Dict[str, Any]) -> float:
+        """服务器得分，越低越好"""
+        with self._lock:
+            entry = self._stats.get(self.server_key(server))
+        if not entry:
+            return self.DEFAULT_LATENCY
+        attempts = entry['successes'] + entry['failures']
+        failure_rate = entry['failures'] / attempts if attempts else 0.0
+        return entry['latency'] * (1 + self.FAILURE_PENALTY * failure_rate)
+
+    def rank(self, servers: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """按健康度排序，冷却期内失败过的服务器排在最后"""
+        now = time.time()
+
+        def sort_key(server):
+            with self._lock:
+                entry = self._stats.get(self.server_key(server), {})
+            cooling = now - entry.get('last_failure', 0.0) < self.FAILURE_COOLDOWN
+            return (cooling, self.score(server))
+
+        return sorted(servers, key=sort_key)
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {key: dict(entry) for key, entry in self._stats.items()}
+
+
+class TdxConnectionPool:
+    """通达信行情连接池
+
+    最多保持 max_connections 个连接；空闲连接放回池中供下一个请求复用，
+    请求出错的连接直接丢弃并记入服务器失败次数。
+    """
+
+    def __init__(self, servers: Optional[List[Dict[str, Any]]] = None, max_connections: int = 3,
+                 stats_file: Optional[Path] = None, connect_timeout: float = 3.0,
+                 acquire_timeout: float = 30.0, api_factory: Optional[Callable[[], Any]] = None):
+        """
+        Args:
+            servers: 服务器列表 [{'ip': ..., 'port': ...}]，默认使用 DEFAULT_TDX_SERVERS
+            max_connections: 同时保持的最大连接数
+            stats_file: 服务器统计持久化文件，None表示不持久化
+            connect_timeout: 单台服务器的连接超时（秒）
+            acquire_timeout: 连接全部被占用时等待空闲连接的最长时间（秒）
+            api_factory: 创建行情API实例的函数，默认 TdxHq_API(heartbeat=True, raise_exception=True)
+        """
+        self.servers = list(servers or DEFAULT_TDX_SERVERS)
+        self.max_connections = max(1, max_connections)
+        self.connect_timeout = connect_timeout
+        self.acquire_timeout = acquire_timeout
+        self.ranking = TdxServerRanking(stats_file)
+        self._api_factory = api_factory
+        self._idle: deque = deque()  # (api, server)
+        self._in_use = 0
+        self._cond = threading.Condition()
+        self._stats = {'created': 0, 'reused': 0, 'discarded': 0}
+
+    def _new_api(self):
+        if self._api_factory is not None:
+            return self._api_factory()
+        from pytdx.hq import TdxHq_API
+        # 心跳保持空闲连接不被服务器断开；出错时抛异常，以便识别并丢弃坏连接
+        return TdxHq_API(heartbeat=True, raise_exception=True)
+
+    def _open(self):
+        """按排名依次尝试服务器，返回 (api, server)"""
+        for server in self.ranking.rank(self.servers):
+            api = self._new_api()
+            start = time.time()
+            try:
+                if api.connect(server['ip'], server['port'], time_out=self.connect_timeout):
+                    self.ranking.record_success(server, time.time() - start)
+                    logger.info(f"✅ [TDX连接池] 连接成功: {server['ip']}:{server['port']} "
+                                f"({(time.time() - start) * 1000:.0f}ms)")
+                    return api, server
+            except Exception as e:
+                logger.warning(f"⚠️ [TDX连接池] 服务器 {server['ip']}:{server['port']} 连接失败: {e}")
+            self.ranking.record_failure(server)
+            self._close(api)
+        raise TdxConnectionError("所有通达信服务器连接失败")
+
+    @staticmethod
+    def _close(api):
+        try:
+            api.disconnect()
+        except Exception:
+            pass
+
+    def acquire(self):
+        """借出一个连接，返回 (api, server)"""
+        deadline = time.time() + self.acquire_timeout
+        with self._cond:
+            while True:
+                if self._idle:
+                    self._in_use += 1
+                    self._stats['reused'] += 1
+                    return self._idle.pop()
+                if self._in_use < self.max_connections:
+                    self._in_use += 1
+                    break
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise TdxConnectionError(f"等待通达信连接超时（{self.acquire_timeout}秒）")
+                self._cond.wait(remaining)
+
+        try:
+            connection = self._open()
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._stats['created'] += 1
+        return connection
+
+    def release(self, connection, healthy: bool = True):
+        """归还连接；不健康的连接断开丢弃"""
+        api, server = connection
+        if not healthy:
+            self.ranking.record_failure(server)
+            self._close(api)
+        with self._cond:
+            self._in_use -= 1
+            if healthy:
+                self._idle.append(connection)
+            else:
+                self._stats['discarded'] += 1
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """借出连接的上下文管理器，块内抛出异常时丢弃该连接"""
+        connection = self.acquire()
+        try:
+            yield connection[0]
+        except Exception:
+            self.release(connection, healthy=False)
+            raise
+        self.release(connection)
+
+    def call(self, method: str, *args, retries: int = 1, **kwargs):
+        """
+        在池中连接上调用行情API方法，连接出错时换一个连接重试
+
+        Args:
+            method: TdxHq_API 方法名，如 'get_security_bars'
+            retries: 出错后的重试次数
+        """
+        for attempt in range(retries + 1):
+            try:
+                with self.connection() as api:
+                    return getattr(api, method)(*args, **kwargs)
+            except TdxConnectionError:
+                raise
+            except Exception as e:
+                if attempt >= retries:
+                    raise
+                logger.warning(f"⚠️ [TDX连接池] {method} 调用失败，换连接重试: {e}")
+
+    def warm(self) -> bool:
+        """预先建立一个连接，返回是否成功"""
+        try:
+            self.release(self.acquire())
+            return True
+        except Exception as e:
+            logger.error(f"❌ [TDX连接池] 预连接失败: {e}")
+            return False
+
+    def close(self):
+        """断开所有空闲连接"""
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+        for api, _ in idle:
+            self._close(api)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """连接池统计"""
+        with self._cond:
+            stats = dict(self._stats, idle=len(self._idle), in_use=self._in_use,
+                         max_connections=self.max_connections)
+        stats['servers'] = self.ranking.get_stats()
+        return stats
+
+
+def _load_configured_servers() -> List[Dict[str, Any]]:
+    """从 tdx_servers_config.json 加载可用服务器"""
+    config_file = 'tdx_servers_config.json'
+    try:
+        if os.path.exists(config_file):
+            with open(config_file, 'r', encoding='utf-8') as f:
+                return json.load(f).get('working_servers', [])
+    except Exception:
+        pass
+    return []
+
+
+# 全局连接池实例
+_tdx_connection_pool = None
+_tdx_connection_pool_lock = threading.Lock()
+
+def get_tdx_connection_pool() -> TdxConnectionPool:
+    """获取全局通达信连接池"""
+    global _tdx_connection_pool
+    if _tdx_connection_pool is None:
+        with _tdx_connection_pool_lock:
+            if _tdx_connection_pool is None:
+                default_stats_file = Path(__file__).parent / "data_cache" / "tdx_server_stats.json"
+                _tdx_connection_pool = TdxConnectionPool(
+                    servers=_load_configured_servers() or None,
+                    max_connections=int(os.getenv('TDX_POOL_SIZE', '3')),
+                    stats_file=Path(os.getenv('TDX_SERVER_STATS_FILE', str(default_stats_file))),
+                )
+    return _tdx_connection_pool
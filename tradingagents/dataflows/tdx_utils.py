@@ -50,14 +50,28 @@ except ImportError:
     logger.warning(f"⚠️ pytdx库未安装，无法使用Tushare数据接口")
     logger.info(f"💡 安装命令: pip install pytdx")
 
+from .tdx_connection_pool import get_tdx_connection_pool
+
+
+class _PooledTdxApi:
+    """兼容旧代码的 provider.api：每次方法调用都从连接池借出连接执行"""
+
+    def __init__(self, pool):
+        self._pool = pool
+
+    def __getattr__(self, method: str):
+        def call(*args, **kwargs):
+            return self._pool.call(method, *args, **kwargs)
+        call.__name__ = method
+        return call
+
 
 class TongDaXinDataProvider:
     """通达信数据提供器"""
     
     def __init__(self):
         logger.debug(f"🔍 [DEBUG] 初始化通达信数据提供器...")
-        self.api = None
-        self.exapi = None  # 扩展行情API
+        self.pool = None  # 共享的通达信连接池
         self.connected = False
 
         logger.debug(f"🔍 [DEBUG] 检查pytdx库可用性: {TDX_AVAILABLE}")
@@ -66,76 +80,25 @@ class TongDaXinDataProvider:
             logger.error(f"❌ [DEBUG] {error_msg}")
             raise ImportError(error_msg)
         logger.debug(f"✅ [DEBUG] pytdx库检查通过")
-    
-    def connect(self):
-        """连接数据服务器"""
-        logger.debug(f"🔍 [DEBUG] 开始连接数据服务器...")
-        try:
-            # 尝试从配置文件加载可用服务器
-            logger.debug(f"🔍 [DEBUG] 加载服务器配置...")
-            working_servers = self._load_working_servers()
-
-            # 如果没有配置文件，使用默认服务器列表
-            if not working_servers:
-                logger.debug(f"🔍 [DEBUG] 未找到配置文件，使用默认服务器列表")
-                working_servers = [
-                    {'ip': '115.238.56.198', 'port': 7709},
-                    {'ip': '115.238.90.165', 'port': 7709},
-                    {'ip': '180.153.18.170', 'port': 7709},
-                    {'ip': '119.147.212.81', 'port': 7709},  # 备用
-                ]
-            else:
-                logger.debug(f"🔍 [DEBUG] 从配置文件加载了 {len(working_servers)} 个服务器")
-
-            # 尝试连接可用服务器
-            logger.debug(f"🔍 [DEBUG] 创建Tushare数据接口实例...")
-            self.api = TdxHq_API()
-            logger.debug(f"🔍 [DEBUG] 开始尝试连接服务器...")
+        self.pool = get_tdx_connection_pool()
 
-            for i, server in enumerate(working_servers):
-                try:
-                    logger.debug(f"🔍 [DEBUG] 尝试连接服务器 {i+1}/{len(working_servers)}: {server['ip']}:{server['port']}")
-                    result = self.api.connect(server['ip'], server['port'])
-                    logger.debug(f"🔍 [DEBUG] 连接结果: {result}")
-                    if result:
-                        logger.info(f"✅ Tushare数据接口连接成功: {server['ip']}:{server['port']}")
-                        self.connected = True
-                        return True
-                except Exception as e:
-                    logger.error(f"⚠️ 服务器 {server['ip']}:{server['port']} 连接失败: {e}")
-                    continue
+    @property
+    def api(self):
+        """行情API（兼容旧接口，方法调用委托给连接池）"""
+        return _PooledTdxApi(self.pool) if self.pool is not None else None
 
+    def connect(self):
+        """连接数据服务器（在连接池中预先建立一个连接，服务器按健康度排序尝试）"""
+        logger.debug(f"🔍 [DEBUG] 开始连接数据服务器...")
+        self.connected = self.pool.warm()
+        if not self.connected:
             logger.error(f"❌ 所有数据服务器连接失败")
-            self.connected = False
-            return False
+        return self.connected
 
-        except Exception as e:
-            logger.error(f"❌ Tushare数据接口连接失败: {e}")
-            self.connected = False
-            return False
-
-    def _load_working_servers(self):
-        """加载可用服务器配置"""
-        try:
-            import json
-            import os
-
-            config_file = 'tdx_servers_config.json'
-            if os.path.exists(config_file):
-                with open(config_file, 'r', encoding='utf-8') as f:
-                    config = json.load(f)
-                    return config.get('working_servers', [])
-        except Exception:
-            pass
-        return []
-    
     def disconnect(self):
         """断开连接"""
         try:
-            if self.api:
-                self.api.disconnect()
-            if self.exapi:
-                self.exapi.disconnect()
+            self.pool.close()
             self.connected = False
             logger.info(f"✅ Tushare数据接口连接已断开")
         except:
@@ -143,18 +106,15 @@ class TongDaXinDataProvider:
 
     def is_connected(self):
         """检查连接状态"""
-        if not self.connected or not self.api:
-            return False
-
-        # 尝试简单的API调用来验证连接是否有效
+        # 尝试简单的API调用来验证连接是否有效（连接池会替换失效的连接）
         try:
             # 获取市场信息作为连接测试
-            result = self.api.get_security_count(0)  # 获取深圳市场股票数量
-            return result is not None and result > 0
+            result = self.pool.call('get_security_count', 0)  # 获取深圳市场股票数量
+            self.connected = result is not None and result > 0
         except Exception as e:
             logger.error(f"🔍 [DEBUG] 连接测试失败: {e}")
             self.connected = False
-            return False
+        return self.connected
     
     def _get_stock_name(self, stock_code: str) -> str:
         """
@@ -183,20 +143,13 @@ class TongDaXinDataProvider:
             _stock_name_cache[stock_code] = name
             return name
         
-        # 如果API不可用，直接返回默认格式
-        if not self.connected:
-            if not self.connect():
-                default_name = f'股票{stock_code}'
-                _stock_name_cache[stock_code] = default_name
-                return default_name
-        
         try:
             # 仅对深圳市场尝试从API获取（上海市场的get_security_list不可用）
             market = self._get_market_code(stock_code)
             if market == 0:  # 深圳市场
                 try:
                     for start_pos in range(0, 2000, 1000):  # 分批获取
-                        stock_list = self.api.get_security_list(market, start_pos)
+                        stock_list = self.pool.call('get_security_list', market, start_pos)
                         if stock_list:
                             for stock_info in stock_list:
                                 if stock_info.get('code') == stock_code:
@@ -226,15 +179,11 @@ class TongDaXinDataProvider:
         Returns:
             Dict: 实时数据
         """
-        if not self.connected:
-            if not self.connect():
-                return {}
-        
         try:
             market = self._get_market_code(stock_code)
             
             # 获取实时数据
-            data = self.api.get_security_quotes([(market, stock_code)])
+            data = self.pool.call('get_security_quotes', [(market, stock_code)])
 
             if not data:
                 return {}
@@ -268,6 +217,64 @@ class TongDaXinDataProvider:
             logger.error(f"获取实时数据失败: {e}")
             return {}
     
+    def _get_stock_bars(self, stock_code: str, start_date: str, period: str = 'D') -> pd.DataFrame:
+        """
+        一次请求获取从 start_date 到最新交易日的K线
+        Args:
+            stock_code: 股票代码
+            start_date: 开始日期 'YYYY-MM-DD'
+            period: 周期 'D'=日线, 'W'=周线, 'M'=月线
+        Returns:
+            DataFrame: 按日期排序的K线，列名与Yahoo Finance格式一致
+        """
+        market = self._get_market_code(stock_code)
+
+        # K线从最新一根往前取，数据量按开始日期到今天计算
+        start_dt = datetime.strptime(start_date, '%Y-%m-%d')
+        days_diff = (datetime.now() - start_dt).days
+
+        # 根据周期调整数据量
+        if period == 'D':
+            count = min(days_diff + 10, 800)  # 日线最多800条
+        elif period == 'W':
+            count = min(days_diff // 7 + 10, 800)
+        elif period == 'M':
+            count = min(days_diff // 30 + 10, 800)
+        else:
+            count = 800
+
+        # 获取K线数据
+        category_map = {'D': 9, 'W': 5, 'M': 6}
+        category = category_map.get(period, 9)
+
+        data = self.pool.call('get_security_bars', category, market, stock_code, 0, count)
+
+        if not data:
+            return pd.DataFrame()
+
+        # 转换为DataFrame
+        df = pd.DataFrame(data)
+
+        # 处理数据格式
+        df['datetime'] = pd.to_datetime(df['datetime'])
+        df = df.set_index('datetime')
+        df = df.sort_index()
+
+        # 重命名列以匹配Yahoo Finance格式
+        df = df.rename(columns={
+            'open': 'Open',
+            'high': 'High', 
+            'low': 'Low',
+            'close': 'Close',
+            'vol': 'Volume',
+            'amount': 'Amount'
+        })
+
+        # 添加股票代码信息
+        df['Symbol'] = stock_code
+
+        return df
+
     def get_stock_history_data(self, stock_code: str, start_date: str, end_date: str, period: str = 'D') -> pd.DataFrame:
         """
         获取股票历史数据
@@ -279,66 +286,40 @@ class TongDaXinDataProvider:
         Returns:
             DataFrame: 历史数据
         """
-        if not self.connected:
-            if not self.connect():
-                return pd.DataFrame()
-        
         try:
-            market = self._get_market_code(stock_code)
-            
-            # 计算需要获取的数据量
-            start_dt = datetime.strptime(start_date, '%Y-%m-%d')
-            end_dt = datetime.strptime(end_date, '%Y-%m-%d')
-            days_diff = (end_dt - start_dt).days
-            
-            # 根据周期调整数据量
-            if period == 'D':
-                count = min(days_diff + 10, 800)  # 日线最多800条
-            elif period == 'W':
-                count = min(days_diff // 7 + 10, 800)
-            elif period == 'M':
-                count = min(days_diff // 30 + 10, 800)
-            else:
-                count = 800
-            
-            # 获取K线数据
-            category_map = {'D': 9, 'W': 5, 'M': 6}
-            category = category_map.get(period, 9)
-            
-            data = self.api.get_security_bars(category, market, stock_code, 0, count)
-            
-            if not data:
-                return pd.DataFrame()
-            
-            # 转换为DataFrame
-            df = pd.DataFrame(data)
-            
-            # 处理数据格式
-            df['datetime'] = pd.to_datetime(df['datetime'])
-            df = df.set_index('datetime')
-            df = df.sort_index()
-            
+            df = self._get_stock_bars(stock_code, start_date, period)
+            if df.empty:
+                return df
+
             # 筛选日期范围
-            df = df[start_date:end_date]
-            
-            # 重命名列以匹配Yahoo Finance格式
-            df = df.rename(columns={
-                'open': 'Open',
-                'high': 'High', 
-                'low': 'Low',
-                'close': 'Close',
-                'vol': 'Volume',
-                'amount': 'Amount'
-            })
-            
-            # 添加股票代码信息
-            df['Symbol'] = stock_code
-            
-            return df
+            return df[start_date:end_date]
             
         except Exception as e:
             logger.error(f"获取历史数据失败: {e}")
             return pd.DataFrame()
+
+    def get_history_with_indicators(self, stock_code: str, start_date: str, end_date: str,
+                                    period: int = 20) -> Tuple[pd.DataFrame, Dict]:
+        """
+        用一次K线请求同时得到历史数据和技术指标
+        Args:
+            stock_code: 股票代码
+            start_date: 开始日期 'YYYY-MM-DD'
+            end_date: 结束日期 'YYYY-MM-DD'
+            period: 技术指标计算周期
+        Returns:
+            Tuple[DataFrame, Dict]: (历史数据, 技术指标)
+        """
+        indicator_start = (datetime.now() - timedelta(days=period*2)).strftime('%Y-%m-%d')
+        try:
+            bars = self._get_stock_bars(stock_code, min(start_date, indicator_start))
+        except Exception as e:
+            logger.error(f"获取历史数据失败: {e}")
+            return pd.DataFrame(), {}
+
+        if bars.empty:
+            return bars, {}
+        return bars[start_date:end_date], self.calculate_technical_indicators(bars[indicator_start:])
     
     def get_stock_technical_indicators(self, stock_code: str, period: int = 20) -> Dict:
         """
@@ -349,13 +330,22 @@ class TongDaXinDataProvider:
         Returns:
             Dict: 技术指标数据
         """
+        # 获取最近的历史数据
+        end_date = datetime.now().strftime('%Y-%m-%d')
+        start_date = (datetime.now() - timedelta(days=period*2)).strftime('%Y-%m-%d')
+
+        return self.calculate_technical_indicators(self.get_stock_history_data(stock_code, start_date, end_date))
+
+    @staticmethod
+    def calculate_technical_indicators(df: pd.DataFrame) -> Dict:
+        """
+        根据已获取的历史数据计算技术指标
+        Args:
+            df: 含 Close 列的历史数据
+        Returns:
+            Dict: 技术指标数据
+        """
         try:
-            # 获取最近的历史数据
-            end_date = datetime.now().strftime('%Y-%m-%d')
-            start_date = (datetime.now() - timedelta(days=period*2)).strftime('%Y-%m-%d')
-            
-            df = self.get_stock_history_data(stock_code, start_date, end_date)
-            
             if df.empty:
                 return {}
             
@@ -407,10 +397,6 @@ class TongDaXinDataProvider:
         Returns:
             List[Dict]: 搜索结果
         """
-        if not self.connected:
-            if not self.connect():
-                return []
-        
         try:
             # 中国股票数据没有直接的搜索API，这里提供一个简化的实现
             # 实际使用中可以维护一个股票代码表
@@ -467,10 +453,6 @@ class TongDaXinDataProvider:
     
     def get_market_overview(self) -> Dict:
         """获取市场概览"""
-        if not self.connected:
-            if not self.connect():
-                return {}
-        
         try:
             # 获取主要指数数据
             indices = {
@@ -484,7 +466,7 @@ class TongDaXinDataProvider:
             
             for name, (market, code) in indices.items():
                 try:
-                    data = self.api.get_security_quotes([(int(market), code)])
+                    data = self.pool.call('get_security_quotes', [(int(market), code)])
                     if data:
                         quote = data[0]
                         market_data[name] = {
@@ -613,13 +595,7 @@ def get_tdx_provider() -> TongDaXinDataProvider:
         logger.debug(f"🔍 [DEBUG] 创建新的通达信数据提供器实例...")
         _tdx_provider = TongDaXinDataProvider()
         logger.debug(f"🔍 [DEBUG] 通达信数据提供器实例创建完成")
-    else:
-        logger.debug(f"🔍 [DEBUG] 使用现有的通达信数据提供器实例")
-        # 检查连接状态，如果连接断开则重新创建
-        if not _tdx_provider.is_connected():
-            logger.debug(f"🔍 [DEBUG] 检测到连接断开，重新创建通达信数据提供器...")
-            _tdx_provider = TongDaXinDataProvider()
-            logger.debug(f"🔍 [DEBUG] 通达信数据提供器重新创建完成")
+    # 失效的连接由连接池在请求出错时替换，这里不再逐次探测
     return _tdx_provider
 
 
@@ -684,8 +660,8 @@ def get_china_stock_data(stock_code: str, start_date: str, end_date: str) -> str
     try:
         provider = get_tdx_provider()
 
-        # 获取历史数据
-        df = provider.get_stock_history_data(stock_code, start_date, end_date)
+        # 获取历史数据和技术指标（共用一次K线请求）
+        df, indicators = provider.get_history_with_indicators(stock_code, start_date, end_date)
 
         if df.empty:
             error_msg = f"❌ 未能获取股票 {stock_code} 的历史数据"
@@ -694,9 +670,6 @@ def get_china_stock_data(stock_code: str, start_date: str, end_date: str) -> str
         
         # 获取实时数据
         realtime_data = provider.get_real_time_data(stock_code)
-
-        # 获取技术指标
-        indicators = provider.get_stock_technical_indicators(stock_code)
         
         # 格式化输出
         result = f"""
@@ -13,6 +13,7 @@ warnings.filterwarnings('ignore')
 
 # 导入统一日志系统
 from tradingagents.utils.logging_init import get_logger
+from tradingagents.utils.logging_manager import LazyArg
 logger = get_logger("default")
 
 # 导入Tushare工具
@@ -90,12 +91,12 @@ class TushareDataAdapter:
             logger.debug(f"🔄 获取{symbol}数据 (类型: {data_type})...")
 
             # 添加详细的股票代码追踪日志
-            logger.info(f"🔍 [股票代码追踪] TushareAdapter.get_stock_data 接收到的股票代码: '{symbol}' (类型: {type(symbol)})")
-            logger.info(f"🔍 [股票代码追踪] 股票代码长度: {len(str(symbol))}")
-            logger.info(f"🔍 [股票代码追踪] 股票代码字符: {list(str(symbol))}")
+            logger.info("🔍 [股票代码追踪] TushareAdapter.get_stock_data 接收到的股票代码: '%s' (类型: %s)",
+                        symbol, type(symbol).__name__)
+            logger.debug("🔍 [股票代码追踪] 股票代码字符: %s", LazyArg(lambda: list(str(symbol))))
 
             if data_type == "daily":
-                logger.info(f"🔍 [股票代码追踪] 调用 _get_daily_data，传入参数: symbol='{symbol}'")
+                logger.info("🔍 [股票代码追踪] 调用 _get_daily_data，传入参数: symbol='%s'", symbol)
                 return self._get_daily_data(symbol, start_date, end_date)
             elif data_type == "realtime":
                 return self._get_realtime_data(symbol)
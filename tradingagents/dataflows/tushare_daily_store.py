@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Tushare按交易日批量入库的A股日线库
+每个交易日只调用一次 daily(trade_date=...) 拉取全市场日线，再按股票拆分合并到本地的单股历史文件，
+自选股等批量分析直接读取本地历史，不再逐只股票调用接口
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from .cache_manager import StockDataCache
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+
+class TushareDailyStore:
+    """按交易日批量入库、按股票读取的本地日线库
+
+    - manifest.json 记录已入库的交易日，以及已完整入库的日历区间（spans）
+    - 查询区间落在某个已完整入库的区间内时，本地历史即为完整结果；否则返回None由调用方走接口
+    - 当天收盘数据尚未发布（接口返回空）时不记为已入库，下次入库会重新拉取
+    """
+
+    MANIFEST_NAME = "manifest.json"
+    # 两次按日请求之间的最小间隔（秒），daily接口基础积分每分钟500次
+    DEFAULT_MIN_INTERVAL = 0.15
+
+    def __init__(self, store_dir: Optional[Path] = None, file_format: Optional[str] = None):
+        """
+        Args:
+            store_dir: 单股历史文件所在目录，默认 dataflows/data_cache/tushare_daily
+            file_format: csv/feather/parquet，默认使用 CACHE_DATAFRAME_FORMAT 配置
+        """
+        if store_dir is None:
+            store_dir = Path(__file__).parent / "data_cache" / "tushare_daily"
+        self.store_dir = Path(store_dir)
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        self.file_format = StockDataCache._resolve_dataframe_format(
+            file_format or os.getenv('CACHE_DATAFRAME_FORMAT', 'csv'))
+
+        self._lock = threading.RLock()
+        self._ingested = set()
+        self._spans: List[List[str]] = []
+        self._stats = {'trade_date_calls': 0, 'symbols_written': 0, 'local_hits': 0, 'local_misses': 0}
+        self._load_manifest()
+
+    # ------------------------------------------------------------------
+    # 入库清单
+    # ------------------------------------------------------------------
+
+    @property
+    def manifest_file(self) -> Path:
+        return self.store_dir / self.MANIFEST_NAME
+
+    def _load_manifest(self):
+        if not self.manifest_file.exists():
+            return
+        try:
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            self._ingested = set(manifest.get('ingested_dates', []))
+            self._spans = [list(span) for span in manifest.get('spans', [])]
+        except Exception as e:
+            logger.warning(f"⚠️ [Tushare日线库] 读取入库清单失败，按空库处理: {e}")
+
+    def _save_manifest_locked(self):
+        manifest = {
+            'ingested_dates': sorted(self._ingested),
+            'spans': self._spans,
+            'updated_at': datetime.now().isoformat(),
+        }
+        tmp_file = self.manifest_file.with_name(self.manifest_file.name + ".tmp")
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, self.manifest_file)
+
+    @staticmethod
+    def _normalize_date(value) -> str:
+        return str(value).replace('-', '')[:8]
+
+    @staticmethod
+    def _shift_date(date: str, days: int) -> str:
+        return (datetime.strptime(date, '%Y%m%d') + timedelta(days=days)).strftime('%Y%m%d')
+
+    def _add_span_locked(self, start: str, end: str):
+        """加入一个已完整入库的区间，与重叠或相邻的区间合并"""
+        merged = []
+        for span_start, span_end in sorted(self._spans + [[start, end]]):
+            if merged and span_start <= self._shift_date(merged[-1][1], 1):
+                merged[-1][1] = max(merged[-1][1], span_end)
+            else:
+                merged.append([span_start, span_end])
+        self._spans = merged
+
+    def covers(self, start_date: str, end_date: str) -> bool:
+        """区间内所有交易日是否都已入库"""
+        start, end = self._normalize_date(start_date), self._normalize_date(end_date)
+        with self._lock:
+            return any(span_start <= start and end <= span_end for span_start, span_end in self._spans)
+
+    # ------------------------------------------------------------------
+    # 单股历史文件
+    # ------------------------------------------------------------------
+
+    def _symbol_file(self, ts_code: str) -> Path:
+        return self.store_dir / f"{ts_code}.{self.file_format}"
+
+    def _read_symbol(self, ts_code: str) -> Optional[pd.DataFrame]:
+        path = self._symbol_file(ts_code)
+        if not path.exists():
+            return None
+        data = StockDataCache._read_dataframe(path, self.file_format).reset_index(drop=True)
+        # CSV会把 YYYYMMDD 读成整数，统一为字符串
+        data['trade_date'] = data['trade_date'].astype(str)
+        return data
+
+    def _merge_symbol(self, ts_code: str, rows: pd.DataFrame):
+        """把新拉取的行合并进单股历史，同一交易日以新数据为准"""
+        existing = self._read_symbol(ts_code)
+        if existing is not None:
+            rows = pd.concat([existing, rows], ignore_index=True)
+        rows = (rows.drop_duplicates(subset='trade_date', keep='last')
+                    .sort_values('trade_date')
+                    .reset_index(drop=True))
+        path = self._symbol_file(ts_code)
+        tmp_file = path.with_name(path.name + ".tmp")
+        StockDataCache._write_dataframe(rows, tmp_file, self.file_format)
+        os.replace(tmp_file, path)
+
+    def _write_frames(self, frames: List[pd.DataFrame]) -> int:
+        """按股票拆分一批交易日数据并写入，返回涉及的股票数"""
+        data = pd.concat(frames, ignore_index=True)
+        data['trade_date'] = data['trade_date'].astype(str)
+        count = 0
+        for ts_code, rows in data.groupby('ts_code', sort=False):
+            self._merge_symbol(ts_code, rows)
+            count += 1
+        with self._lock:
+            self._stats['symbols_written'] += count
+        return count
+
+    # ------------------------------------------------------------------
+    # 入库与读取
+    # ------------------------------------------------------------------
+
+    def ingest(self, api, start_date: str, end_date: str, with_adj_factor: bool = False,
+               min_interval: float = DEFAULT_MIN_INTERVAL) -> Dict[str, Any]:
+        """
+        按交易日批量拉取 [start_date, end_date] 的全市场日线并入库，已入库的交易日跳过
+
+        Args:
+            api: tushare pro_api 实例
+            start_date: 开始日期（YYYYMMDD 或 YYYY-MM-DD）
+            end_date: 结束日期
+            with_adj_factor: 是否同时按交易日拉取复权因子（每个交易日多一次调用）
+            min_interval: 两次请求之间的最小间隔（秒）
+
+        Returns:
+            Dict: 入库摘要（trade_dates 本次拉取的交易日数、skipped 已入库跳过数、symbols 写入股票数、complete 是否完整）
+        """
+        start, end = self._normalize_date(start_date), self._normalize_date(end_date)
+        calendar = api.trade_cal(exchange='SSE', start_date=start, end_date=end)
+        open_dates = sorted(calendar.loc[calendar['is_open'].astype(int) == 1, 'cal_date'].astype(str))
+        with self._lock:
+            pending = [date for date in open_dates if date not in self._ingested]
+
+        today = datetime.now().strftime('%Y%m%d')
+        frames, completed = [], []
+        first_missing = None
+        today_pending = False
+        last_call = 0.0
+        for trade_date in pending:
+            wait = min_interval - (time.time() - last_call)
+            if wait > 0:
+                time.sleep(wait)
+            last_call = time.time()
+            try:
+                daily = api.daily(trade_date=trade_date)
+                with self._lock:
+                    self._stats['trade_date_calls'] += 1
+                if daily is not None and not daily.empty and with_adj_factor:
+                    adj_factor = api.adj_factor(trade_date=trade_date)
+                    if adj_factor is not None and not adj_factor.empty:
+                        daily = daily.merge(adj_factor[['ts_code', 'adj_factor']], on='ts_code', how='left')
+            except Exception as e:
+                logger.error(f"❌ [Tushare日线库] {trade_date} 拉取失败，停止本次入库: {e}")
+                first_missing = trade_date
+                break
+
+            if daily is None or daily.empty:
+                if trade_date == today:
+                    logger.info(f"⏳ [Tushare日线库] {trade_date} 收盘数据尚未发布，稍后再入库")
+                    today_pending = True
+                    continue
+                logger.warning(f"⚠️ [Tushare日线库] {trade_date} 返回空数据，停止本次入库")
+                first_missing = trade_date
+                break
+
+            frames.append(daily)
+            completed.append(trade_date)
+            logger.debug(f"📥 [Tushare日线库] {trade_date}: {len(daily)}条")
+
+        # 先写单股文件再更新清单，清单只记录已落盘的交易日
+        symbols = self._write_frames(frames) if frames else 0
+        span_end = end if first_missing is None else self._shift_date(first_missing, -1)
+        # 覆盖范围不超过今天；今天收盘数据未发布时只覆盖到昨天，让今天的请求回退到逐股接口
+        span_end = min(span_end, self._shift_date(today, -1) if today_pending else today)
+        with self._lock:
+            self._ingested.update(completed)
+            if span_end >= start:
+                self._add_span_locked(start, span_end)
+            self._save_manifest_locked()
+
+        logger.info(f"✅ [Tushare日线库] 入库完成: {start}-{end}，拉取{len(completed)}个交易日，"
+                    f"跳过{len(open_dates) - len(pending)}个，写入{symbols}只股票")
+        return {
+            'trade_dates': len(completed),
+            'skipped': len(open_dates) - len(pending),
+            'symbols': symbols,
+            'complete': first_missing is None,
+        }
+
+    def get_history(self, ts_code: str, start_date: str, end_date: str) -> Optional[pd.DataFrame]:
+        """
+        从本地读取单股日线
+
+        Returns:
+            区间已完整入库时返回该股票的日线（停牌或未上市时为空DataFrame），否则返回None
+        """
+        start, end = self._normalize_date(start_date), self._normalize_date(end_date)
+        if not self.covers(start, end):
+            with self._lock:
+                self._stats['local_misses'] += 1
+            return None
+
+        data = self._read_symbol(ts_code)
+        with self._lock:
+            self._stats['local_hits'] += 1
+        if data is None:
+            return pd.DataFrame()
+        mask = (data['trade_date'] >= start) & (data['trade_date'] <= end)
+        return data[mask].reset_index(drop=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """入库与本地读取统计"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['ingested_dates'] = len(self._ingested)
+            stats['spans'] = [list(span) for span in self._spans]
+        return stats
+
+
+# 全局日线库实例
+_tushare_daily_store = None
+_tushare_daily_store_lock = threading.Lock()
+
+def get_tushare_daily_store() -> TushareDailyStore:
+    """获取全局Tushare日线库"""
+    global _tushare_daily_store
+    if _tushare_daily_store is None:
+        with _tushare_daily_store_lock:
+            if _tushare_daily_store is None:
+                store_dir = os.getenv('TUSHARE_DAILY_STORE_DIR')
+                _tushare_daily_store = TushareDailyStore(Path(store_dir) if store_dir else None)
+    return _tushare_daily_store
@@ -13,7 +13,7 @@ import warnings
 import time
 
 # 导入日志模块
-from tradingagents.utils.logging_manager import get_logger
+from tradingagents.utils.logging_manager import LazyArg, get_logger
 logger = get_logger('agents')
 warnings.filterwarnings('ignore')
 
@@ -51,6 +51,22 @@ class TushareProvider:
         self.connected = False
         self.enable_cache = enable_cache and CACHE_AVAILABLE
         self.api = None
+
+        # 是否额外请求adj_factor复权因子计算前复权价格（每次取数多一次API调用）
+        try:
+            from ..config.env_utils import parse_bool_env
+            self.use_adj_factor = parse_bool_env('TUSHARE_USE_ADJ_FACTOR', False)
+        except ImportError:
+            self.use_adj_factor = os.getenv('TUSHARE_USE_ADJ_FACTOR', 'false').lower() == 'true'
+
+        # 按交易日批量入库的本地日线库，区间已入库时直接读取本地，不再逐只股票调用接口
+        self.daily_store = None
+        if os.getenv('TUSHARE_DAILY_STORE_ENABLED', 'true').lower() == 'true':
+            try:
+                from .tushare_daily_store import get_tushare_daily_store
+                self.daily_store = get_tushare_daily_store()
+            except Exception as e:
+                logger.warning(f"⚠️ Tushare本地日线库初始化失败: {e}")
         
         # 初始化缓存管理器
         self.cache_manager = None
@@ -164,10 +180,11 @@ class TushareProvider:
             DataFrame: 日线数据
         """
         # 记录详细的调用信息
-        logger.info(f"🔍 [Tushare详细日志] get_stock_daily 开始执行")
-        logger.info(f"🔍 [Tushare详细日志] 输入参数: symbol='{symbol}', start_date='{start_date}', end_date='{end_date}'")
-        logger.info(f"🔍 [Tushare详细日志] 连接状态: {self.connected}")
-        logger.info(f"🔍 [Tushare详细日志] API对象: {type(self.api).__name__ if self.api else 'None'}")
+        # 热点路径：追踪日志使用惰性参数，被采样丢弃时不做格式化
+        logger.info("🔍 [Tushare详细日志] get_stock_daily 开始执行: symbol='%s', start_date='%s', end_date='%s'",
+                    symbol, start_date, end_date)
+        logger.info("🔍 [Tushare详细日志] 连接状态: %s, API对象: %s",
+                    self.connected, type(self.api).__name__ if self.api else 'None')
 
         if not self.connected:
             logger.error(f"❌ [Tushare详细日志] Tushare未连接，无法获取数据")
@@ -175,9 +192,9 @@ class TushareProvider:
 
         try:
             # 标准化股票代码
-            logger.info(f"🔍 [股票代码追踪] get_stock_daily 调用 _normalize_symbol，传入参数: '{symbol}'")
+            logger.info("🔍 [股票代码追踪] get_stock_daily 调用 _normalize_symbol，传入参数: '%s'", symbol)
             ts_code = self._normalize_symbol(symbol)
-            logger.info(f"🔍 [股票代码追踪] _normalize_symbol 返回结果: '{ts_code}'")
+            logger.info("🔍 [股票代码追踪] _normalize_symbol 返回结果: '%s'", ts_code)
 
             # 设置默认日期
             original_start = start_date
@@ -185,57 +202,63 @@ class TushareProvider:
 
             if end_date is None:
                 end_date = datetime.now().strftime('%Y%m%d')
-                logger.info(f"🔍 [Tushare详细日志] 结束日期为空，设置为当前日期: {end_date}")
+                logger.info("🔍 [Tushare详细日志] 结束日期为空，设置为当前日期: %s", end_date)
             else:
                 end_date = end_date.replace('-', '')
-                logger.info(f"🔍 [Tushare详细日志] 结束日期转换: '{original_end}' -> '{end_date}'")
+                logger.info("🔍 [Tushare详细日志] 结束日期转换: '%s' -> '%s'", original_end, end_date)
 
             if start_date is None:
                 start_date = (datetime.now() - timedelta(days=365)).strftime('%Y%m%d')
-                logger.info(f"🔍 [Tushare详细日志] 开始日期为空，设置为一年前: {start_date}")
+                logger.info("🔍 [Tushare详细日志] 开始日期为空，设置为一年前: %s", start_date)
             else:
                 start_date = start_date.replace('-', '')
-                logger.info(f"🔍 [Tushare详细日志] 开始日期转换: '{original_start}' -> '{start_date}'")
+                logger.info("🔍 [Tushare详细日志] 开始日期转换: '%s' -> '%s'", original_start, start_date)
 
-            logger.info(f"🔄 从Tushare获取{ts_code}数据 ({start_date} 到 {end_date})...")
-            logger.info(f"🔍 [股票代码追踪] 调用 Tushare API daily，传入参数: ts_code='{ts_code}', start_date='{start_date}', end_date='{end_date}'")
-
-            # 记录API调用前的状态
-            api_start_time = time.time()
-            logger.info(f"🔍 [Tushare详细日志] API调用开始时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')}")
-
-            # 获取日线数据
-            try:
-                data = self.api.daily(
-                    ts_code=ts_code,
-                    start_date=start_date,
-                    end_date=end_date
-                )
-                api_duration = time.time() - api_start_time
-                logger.info(f"🔍 [Tushare详细日志] API调用完成，耗时: {api_duration:.3f}秒")
-
-            except Exception as api_error:
-                api_duration = time.time() - api_start_time
-                logger.error(f"❌ [Tushare详细日志] API调用异常，耗时: {api_duration:.3f}秒")
-                logger.error(f"❌ [Tushare详细日志] API异常类型: {type(api_error).__name__}")
-                logger.error(f"❌ [Tushare详细日志] API异常信息: {str(api_error)}")
-                raise api_error
+            # 区间已按交易日批量入库时直接读取本地日线库
+            data = self.daily_store.get_history(ts_code, start_date, end_date) if self.daily_store else None
+            from_local = data is not None
+            if from_local:
+                logger.info(f"📦 从本地日线库读取{ts_code}数据 ({start_date} 到 {end_date}): {len(data)}条")
+            else:
+                logger.info(f"🔄 从Tushare获取{ts_code}数据 ({start_date} 到 {end_date})...")
+                logger.info("🔍 [股票代码追踪] 调用 Tushare API daily，传入参数: ts_code='%s', start_date='%s', end_date='%s'",
+                            ts_code, start_date, end_date)
+
+                # 记录API调用前的状态
+                api_start_time = time.time()
+
+                # 获取日线数据
+                try:
+                    data = self.api.daily(
+                        ts_code=ts_code,
+                        start_date=start_date,
+                        end_date=end_date
+                    )
+                    api_duration = time.time() - api_start_time
+                    logger.info("🔍 [Tushare详细日志] API调用完成，耗时: %.3f秒", api_duration)
+
+                except Exception as api_error:
+                    api_duration = time.time() - api_start_time
+                    logger.error(f"❌ [Tushare详细日志] API调用异常，耗时: {api_duration:.3f}秒")
+                    logger.error(f"❌ [Tushare详细日志] API异常类型: {type(api_error).__name__}")
+                    logger.error(f"❌ [Tushare详细日志] API异常信息: {str(api_error)}")
+                    raise api_error
 
             # 详细记录返回数据的信息
-            logger.info(f"🔍 [股票代码追踪] Tushare API daily 返回数据形状: {data.shape if data is not None and hasattr(data, 'shape') else 'None'}")
-            logger.info(f"🔍 [Tushare详细日志] 返回数据类型: {type(data)}")
+            logger.info("🔍 [股票代码追踪] Tushare API daily 返回数据形状: %s",
+                        LazyArg(lambda: data.shape if data is not None and hasattr(data, 'shape') else 'None'))
+            logger.info("🔍 [Tushare详细日志] 返回数据类型: %s", type(data).__name__)
 
             if data is not None:
-                logger.info(f"🔍 [Tushare详细日志] 数据是否为空: {data.empty}")
+                logger.info("🔍 [Tushare详细日志] 数据是否为空: %s", bool(data.empty))
                 if not data.empty:
-                    logger.info(f"🔍 [Tushare详细日志] 数据列名: {list(data.columns)}")
-                    logger.info(f"🔍 [Tushare详细日志] 数据索引类型: {type(data.index)}")
+                    logger.info("🔍 [Tushare详细日志] 数据列名: %s", LazyArg(lambda: list(data.columns)))
+                    logger.info("🔍 [Tushare详细日志] 数据索引类型: %s", type(data.index).__name__)
                     if 'ts_code' in data.columns:
-                        unique_codes = data['ts_code'].unique()
-                        logger.info(f"🔍 [股票代码追踪] 返回数据中的ts_code: {unique_codes}")
+                        logger.info("🔍 [股票代码追踪] 返回数据中的ts_code: %s", LazyArg(lambda: data['ts_code'].unique()))
                     if 'trade_date' in data.columns:
-                        date_range = f"{data['trade_date'].min()} 到 {data['trade_date'].max()}"
-                        logger.info(f"🔍 [Tushare详细日志] 数据日期范围: {date_range}")
+                        logger.info("🔍 [Tushare详细日志] 数据日期范围: %s",
+                                    LazyArg(lambda: f"{data['trade_date'].min()} 到 {data['trade_date'].max()}"))
                 else:
                     logger.warning(f"⚠️ [Tushare详细日志] 返回的DataFrame为空")
             else:
@@ -247,17 +270,26 @@ class TushareProvider:
                 data = data.sort_values('trade_date')
                 data['trade_date'] = pd.to_datetime(data['trade_date'])
 
-                # 计算前复权价格（基于pct_chg重新计算连续价格）
+                # 计算前复权价格（优先使用复权因子，否则基于pct_chg重新计算连续价格）
                 logger.info(f"🔍 [Tushare详细日志] 开始计算前复权价格...")
-                data = self._calculate_forward_adjusted_prices(data)
+                adj_factor = None
+                if from_local:
+                    # 本地日线库使用批量入库时一并拉取的复权因子，没有时基于pct_chg计算
+                    if 'adj_factor' in data.columns:
+                        if self.use_adj_factor:
+                            adj_factor = data[['trade_date', 'adj_factor']].dropna()
+                        data = data.drop(columns='adj_factor')
+                elif self.use_adj_factor:
+                    adj_factor = self._get_adj_factor(ts_code, start_date, end_date)
+                data = self._calculate_forward_adjusted_prices(data, adj_factor)
                 logger.info(f"🔍 [Tushare详细日志] 前复权价格计算完成")
 
                 logger.info(f"🔍 [Tushare详细日志] 数据预处理完成")
 
                 logger.info(f"✅ 获取{ts_code}数据成功: {len(data)}条")
 
-                # 缓存数据
-                if self.enable_cache and self.cache_manager:
+                # 缓存数据（本地日线库读取的数据无需再缓存）
+                if self.enable_cache and self.cache_manager and not from_local:
                     try:
                         logger.info(f"🔍 [Tushare详细日志] 开始缓存数据...")
                         cache_key = self.cache_manager.save_stock_data(
@@ -286,20 +318,23 @@ class TushareProvider:
             logger.error(f"❌ [Tushare详细日志] 异常堆栈: {traceback.format_exc()}")
             return pd.DataFrame()
 
-    def _calculate_forward_adjusted_prices(self, data: pd.DataFrame) -> pd.DataFrame:
+    def _calculate_forward_adjusted_prices(self, data: pd.DataFrame,
+                                           adj_factor: Optional[pd.DataFrame] = None) -> pd.DataFrame:
         """
-        基于pct_chg计算前复权价格
+        计算前复权价格
 
-        Tushare的daily接口返回除权价格，在除权日会出现价格跳跃。
-        使用pct_chg（涨跌幅）重新计算连续的前复权价格，确保价格序列的连续性。
+        优先使用Tushare的adj_factor复权因子（前复权价 = 除权价 × 当日因子 / 最新因子）；
+        没有复权因子时，基于pct_chg（涨跌幅）从最新收盘价向前递推连续的前复权收盘价。
+        两种方式都按整列一次性计算，复杂度为O(n)。
 
         Args:
             data: 包含除权价格和pct_chg的DataFrame
+            adj_factor: 可选，Tushare adj_factor接口返回的复权因子（trade_date, adj_factor）
 
         Returns:
             DataFrame: 包含前复权价格的数据
         """
-        if data.empty or 'pct_chg' not in data.columns:
+        if data.empty or ('pct_chg' not in data.columns and adj_factor is None):
             logger.warning("⚠️ 数据为空或缺少pct_chg列，无法计算前复权价格")
             return data
 
@@ -316,34 +351,25 @@ class TushareProvider:
             adjusted_data['high_raw'] = adjusted_data['high'].copy()
             adjusted_data['low_raw'] = adjusted_data['low'].copy()
 
-            # 从最新的收盘价开始，向前计算前复权价格
-            # 使用最后一天的收盘价作为基准
-            latest_close = float(adjusted_data.iloc[-1]['close'])
-
-            # 计算前复权收盘价
-            adjusted_closes = [latest_close]
-
-            # 从倒数第二天开始向前计算
-            for i in range(len(adjusted_data) - 2, -1, -1):
-                pct_change = float(adjusted_data.iloc[i + 1]['pct_chg']) / 100.0  # 转换为小数
+            close_raw = adjusted_data['close_raw'].to_numpy(dtype=float)
 
+            factor_ratio = self._adj_factor_ratio(adjusted_data['trade_date'], adj_factor)
+            if factor_ratio is not None:
+                adjusted_data['close'] = close_raw * factor_ratio
+            else:
                 # 前一天的前复权收盘价 = 今天的前复权收盘价 / (1 + 今天的涨跌幅)
-                prev_close = adjusted_closes[0] / (1 + pct_change)
-                adjusted_closes.insert(0, prev_close)
-
-            # 更新收盘价
-            adjusted_data['close'] = adjusted_closes
-
-            # 计算其他价格的调整比例
-            for i in range(len(adjusted_data)):
-                if adjusted_data.iloc[i]['close_raw'] != 0:  # 避免除零
-                    # 计算调整比例
-                    adjustment_ratio = adjusted_data.iloc[i]['close'] / adjusted_data.iloc[i]['close_raw']
-
-                    # 应用调整比例到其他价格
-                    adjusted_data.iloc[i, adjusted_data.columns.get_loc('open')] = adjusted_data.iloc[i]['open_raw'] * adjustment_ratio
-                    adjusted_data.iloc[i, adjusted_data.columns.get_loc('high')] = adjusted_data.iloc[i]['high_raw'] * adjustment_ratio
-                    adjusted_data.iloc[i, adjusted_data.columns.get_loc('low')] = adjusted_data.iloc[i]['low_raw'] * adjustment_ratio
+                # 从最新收盘价开始依次除以各日的 (1 + 涨跌幅)，用累积除法一次完成整列递推
+                growth = 1 + adjusted_data['pct_chg'].to_numpy(dtype=float)[:0:-1] / 100.0
+                adjusted_closes = np.divide.accumulate(np.concatenate(([close_raw[-1]], growth)))
+                adjusted_data['close'] = adjusted_closes[::-1]
+
+            # 按收盘价的调整比例同步调整开盘价、最高价、最低价（收盘价为0的行保持不变）
+            valid = close_raw != 0
+            adjustment_ratio = adjusted_data['close'].to_numpy(dtype=float)[valid] / close_raw[valid]
+            for column in ['open', 'high', 'low']:
+                values = adjusted_data[column].to_numpy(dtype=float, copy=True)
+                values[valid] = adjusted_data[f'{column}_raw'].to_numpy(dtype=float)[valid] * adjustment_ratio
+                adjusted_data[column] = values
 
             # 添加标记表示这是前复权价格
             adjusted_data['price_type'] = 'forward_adjusted'
@@ -357,7 +383,40 @@ class TushareProvider:
             logger.error(f"❌ 前复权价格计算失败: {e}")
             logger.error(f"❌ 返回原始数据")
             return data
-    
+
+    def _adj_factor_ratio(self, trade_dates: pd.Series,
+                          adj_factor: Optional[pd.DataFrame]) -> Optional[np.ndarray]:
+        """
+        将复权因子对齐到行情日期，返回 当日因子 / 最新因子
+
+        因子缺失或无法对齐时返回None，由调用方回退到pct_chg递推。
+        """
+        if adj_factor is None or adj_factor.empty or 'adj_factor' not in adj_factor.columns:
+            return None
+
+        factors = pd.Series(
+            adj_factor['adj_factor'].to_numpy(dtype=float),
+            index=pd.to_datetime(adj_factor['trade_date'])
+        )
+        factors = factors[~factors.index.duplicated(keep='last')].sort_index()
+        aligned = factors.reindex(pd.to_datetime(trade_dates)).ffill()
+
+        if aligned.isna().any() or aligned.iloc[-1] == 0:
+            logger.warning("⚠️ 复权因子与行情日期无法完全对齐，改用pct_chg计算前复权价格")
+            return None
+
+        return (aligned / aligned.iloc[-1]).to_numpy()
+
+    def _get_adj_factor(self, ts_code: str, start_date: str, end_date: str) -> Optional[pd.DataFrame]:
+        """获取复权因子，失败时返回None（不影响行情获取）"""
+        try:
+            adj_factor = self.api.adj_factor(ts_code=ts_code, start_date=start_date, end_date=end_date)
+            if adj_factor is not None and not adj_factor.empty:
+                return adj_factor
+        except Exception as e:
+            logger.warning(f"⚠️ 获取{ts_code}复权因子失败，改用pct_chg计算前复权价格: {e}")
+        return None
+
     def get_stock_info(self, symbol: str) -> Dict:
         """
         获取股票基本信息
@@ -372,20 +431,21 @@ class TushareProvider:
             return {'symbol': symbol, 'name': f'股票{symbol}', 'source': 'unknown'}
         
         try:
-            logger.info(f"🔍 [股票代码追踪] get_stock_info 调用 _normalize_symbol，传入参数: '{symbol}'")
+            logger.info("🔍 [股票代码追踪] get_stock_info 调用 _normalize_symbol，传入参数: '%s'", symbol)
             ts_code = self._normalize_symbol(symbol)
-            logger.info(f"🔍 [股票代码追踪] _normalize_symbol 返回结果: '{ts_code}'")
+            logger.info("🔍 [股票代码追踪] _normalize_symbol 返回结果: '%s'", ts_code)
 
             # 获取股票基本信息
-            logger.info(f"🔍 [股票代码追踪] 调用 Tushare API stock_basic，传入参数: ts_code='{ts_code}'")
+            logger.info("🔍 [股票代码追踪] 调用 Tushare API stock_basic，传入参数: ts_code='%s'", ts_code)
             basic_info = self.api.stock_basic(
                 ts_code=ts_code,
                 fields='ts_code,symbol,name,area,industry,market,list_date'
             )
 
-            logger.info(f"🔍 [股票代码追踪] Tushare API stock_basic 返回数据形状: {basic_info.shape if basic_info is not None and hasattr(basic_info, 'shape') else 'None'}")
+            logger.info("🔍 [股票代码追踪] Tushare API stock_basic 返回数据形状: %s",
+                        LazyArg(lambda: basic_info.shape if basic_info is not None and hasattr(basic_info, 'shape') else 'None'))
             if basic_info is not None and not basic_info.empty:
-                logger.info(f"🔍 [股票代码追踪] 返回数据内容: {basic_info.to_dict('records')}")
+                logger.info("🔍 [股票代码追踪] 返回数据内容: %s", LazyArg(lambda: basic_info.to_dict('records')))
             
             if basic_info is not None and not basic_info.empty:
                 info = basic_info.iloc[0]
@@ -478,39 +538,38 @@ class TushareProvider:
             str: Tushare格式的股票代码
         """
         # 添加详细的股票代码追踪日志
-        logger.info(f"🔍 [股票代码追踪] _normalize_symbol 接收到的原始股票代码: '{symbol}' (类型: {type(symbol)})")
-        logger.info(f"🔍 [股票代码追踪] 股票代码长度: {len(str(symbol))}")
-        logger.info(f"🔍 [股票代码追踪] 股票代码字符: {list(str(symbol))}")
+        logger.info("🔍 [股票代码追踪] _normalize_symbol 接收到的原始股票代码: '%s' (类型: %s)", symbol, type(symbol).__name__)
+        logger.debug("🔍 [股票代码追踪] 股票代码字符: %s", LazyArg(lambda: list(str(symbol))))
 
         original_symbol = symbol
 
         # 移除可能的前缀
         symbol = symbol.replace('sh.', '').replace('sz.', '')
         if symbol != original_symbol:
-            logger.info(f"🔍 [股票代码追踪] 移除前缀后: '{original_symbol}' -> '{symbol}'")
+            logger.info("🔍 [股票代码追踪] 移除前缀后: '%s' -> '%s'", original_symbol, symbol)
 
         # 如果已经是Tushare格式，直接返回
         if '.' in symbol:
-            logger.info(f"🔍 [股票代码追踪] 已经是Tushare格式，直接返回: '{symbol}'")
+            logger.info("🔍 [股票代码追踪] 已经是Tushare格式，直接返回: '%s'", symbol)
             return symbol
 
         # 根据代码判断交易所
         if symbol.startswith('6'):
             result = f"{symbol}.SH"  # 上海证券交易所
-            logger.info(f"🔍 [股票代码追踪] 上海证券交易所: '{symbol}' -> '{result}'")
+            logger.info("🔍 [股票代码追踪] 上海证券交易所: '%s' -> '%s'", symbol, result)
             return result
         elif symbol.startswith(('0', '3')):
             result = f"{symbol}.SZ"  # 深圳证券交易所
-            logger.info(f"🔍 [股票代码追踪] 深圳证券交易所: '{symbol}' -> '{result}'")
+            logger.info("🔍 [股票代码追踪] 深圳证券交易所: '%s' -> '%s'", symbol, result)
             return result
         elif symbol.startswith('8'):
             result = f"{symbol}.BJ"  # 北京证券交易所
-            logger.info(f"🔍 [股票代码追踪] 北京证券交易所: '{symbol}' -> '{result}'")
+            logger.info("🔍 [股票代码追踪] 北京证券交易所: '%s' -> '%s'", symbol, result)
             return result
         else:
             # 默认深圳
             result = f"{symbol}.SZ"
-            logger.info(f"🔍 [股票代码追踪] 默认深圳证券交易所: '{symbol}' -> '{result}'")
+            logger.info("🔍 [股票代码追踪] 默认深圳证券交易所: '%s' -> '%s'", symbol, result)
             return result
     
     def search_stocks(self, keyword: str) -> pd.DataFrame:
@@ -546,6 +605,44 @@ class TushareProvider:
             return pd.DataFrame()
 
 
+    def ingest_trade_dates(self, start_date: str, end_date: str) -> Dict:
+        """
+        按交易日批量拉取全市场日线到本地日线库
+
+        每个交易日一次 daily(trade_date=...) 调用，之后区间内任意股票的 get_stock_daily 都直接读取本地。
+
+        Args:
+            start_date: 开始日期（YYYYMMDD 或 YYYY-MM-DD）
+            end_date: 结束日期
+
+        Returns:
+            Dict: 入库摘要，未连接或未启用本地日线库时为空
+        """
+        if not self.connected or self.daily_store is None:
+            logger.warning("⚠️ Tushare未连接或本地日线库未启用，无法批量入库")
+            return {}
+        try:
+            return self.daily_store.ingest(self.api, start_date, end_date, with_adj_factor=self.use_adj_factor)
+        except Exception as e:
+            logger.error(f"❌ 批量入库失败: {e}")
+            return {}
+
+    def get_stocks_daily(self, symbols: List[str], start_date: str = None,
+                         end_date: str = None) -> Dict[str, pd.DataFrame]:
+        """
+        批量获取多只股票的日线数据（自选股筛选等场景）
+
+        先按交易日批量入库，再逐只从本地日线库读取；接口调用次数与交易日数相关，与股票数量无关。
+
+        Returns:
+            Dict[str, DataFrame]: 股票代码 -> 日线数据
+        """
+        end_date = (end_date or datetime.now().strftime('%Y%m%d')).replace('-', '')
+        start_date = (start_date or (datetime.now() - timedelta(days=365)).strftime('%Y%m%d')).replace('-', '')
+        self.ingest_trade_dates(start_date, end_date)
+        return {symbol: self.get_stock_daily(symbol, start_date, end_date) for symbol in symbols}
+
+
 # 全局提供器实例
 _tushare_provider = None
 
@@ -21,6 +21,8 @@ DEFAULT_CONFIG = {
     "online_tools": os.getenv("ONLINE_TOOLS_ENABLED", "false").lower() == "true",
     "online_news": os.getenv("ONLINE_NEWS_ENABLED", "true").lower() == "true", 
     "realtime_data": os.getenv("REALTIME_DATA_ENABLED", "false").lower() == "true",
+    # Graph settings - 并行运行分析师（各自独立子图，在Bull Researcher前汇合）
+    "parallel_analysts": os.getenv("PARALLEL_ANALYSTS_ENABLED", "false").lower() == "true",
 
     # Note: Database and cache configuration is now managed by .env file and config.database_manager
     # No database/cache settings in default config to avoid configuration conflicts
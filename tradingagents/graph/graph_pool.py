@@ -0,0 +1,176 @@
+# TradingAgents/graph/graph_pool.py
+
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+
+class TradingAgentsGraphPool:
+    """Pool of pre-built TradingAgentsGraph instances keyed by configuration.
+
+    Building a graph creates the LLM clients, the Toolkit, the memory
+    collections, the tool nodes and the compiled LangGraph. None of these
+    depend on the ticker or date being analysed, so a graph built for one
+    (analysts, config) pair is handed out again for the next analysis with
+    the same pair. Each instance serves one analysis at a time; per-run state
+    is reset on checkout and cleared on return.
+    """
+
+    def __init__(self, max_idle: int = 4, idle_ttl: float = 1800,
+                 graph_factory: Optional[Callable[..., Any]] = None):
+        """
+        Args:
+            max_idle: Maximum number of idle graphs kept across all keys, 0 disables pooling
+            idle_ttl: Seconds an idle graph is kept before eviction, 0 keeps it until displaced
+            graph_factory: Callable building a graph, defaults to TradingAgentsGraph
+        """
+        self.max_idle = max_idle
+        self.idle_ttl = idle_ttl
+        self._graph_factory = graph_factory
+        # id(graph) -> (key, graph, released_at), oldest release first
+        self._idle: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._janitor: Optional[threading.Thread] = None
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    @staticmethod
+    def make_key(selected_analysts: List[str], config: Dict[str, Any], debug: bool = False) -> str:
+        """Key covering everything that shapes the built graph: analysts (in order), debug flag and config."""
+        payload = json.dumps(
+            {'analysts': list(selected_analysts), 'debug': debug, 'config': config},
+            sort_keys=True, default=str,
+        )
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def acquire(self, selected_analysts: List[str], config: Dict[str, Any], debug: bool = False):
+        """Check out a graph for one analysis, reusing an idle instance when the key matches."""
+        key = self.make_key(selected_analysts, config, debug)
+        graph = None
+        with self._lock:
+            self._evict_expired_locked()
+            # Most recently returned instance first
+            for graph_id in reversed(self._idle):
+                entry_key, entry_graph, _ = self._idle[graph_id]
+                if entry_key == key:
+                    del self._idle[graph_id]
+                    graph = entry_graph
+                    break
+            self._stats['hits' if graph is not None else 'misses'] += 1
+
+        if graph is not None:
+            graph.reset_state()
+            logger.info(f"♻️ [分析引擎池] 复用已初始化的分析引擎: {key[:8]}")
+        else:
+            start = time.time()
+            graph = self._build(selected_analysts, copy.deepcopy(config), debug)
+            logger.info(f"🔧 [分析引擎池] 新建分析引擎: {key[:8]}, 耗时: {time.time() - start:.2f}秒")
+        graph._pool_key = key
+        return graph
+
+    def release(self, graph):
+        """Return a graph to the pool after its analysis finished."""
+        key = getattr(graph, '_pool_key', None)
+        if key is None or self.max_idle <= 0:
+            return
+        # Drop per-run state so idle graphs do not hold on to the last analysis
+        graph.reset_state()
+        with self._lock:
+            self._idle[id(graph)] = (key, graph, time.time())
+            while len(self._idle) > self.max_idle:
+                self._idle.popitem(last=False)
+                self._stats['evictions'] += 1
+            self._ensure_janitor_locked()
+
+    @contextmanager
+    def lease(self, selected_analysts: List[str], config: Dict[str, Any], debug: bool = False):
+        """Context manager wrapping acquire/release."""
+        graph = self.acquire(selected_analysts, config, debug)
+        try:
+            yield graph
+        finally:
+            self.release(graph)
+
+    def warm(self, selected_analysts: List[str], config: Dict[str, Any], debug: bool = False):
+        """Build a graph ahead of time so the next matching analysis starts immediately."""
+        self.release(self.acquire(selected_analysts, config, debug))
+
+    def evict_idle(self) -> int:
+        """Evict graphs idle for longer than idle_ttl, returns the number evicted."""
+        with self._lock:
+            return self._evict_expired_locked()
+
+    def clear(self):
+        """Drop all idle graphs."""
+        with self._lock:
+            self._idle.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Pool statistics."""
+        with self._lock:
+            return dict(self._stats, idle=len(self._idle), max_idle=self.max_idle)
+
+    def _build(self, selected_analysts, config, debug):
+        factory = self._graph_factory
+        if factory is None:
+            from .trading_graph import TradingAgentsGraph
+            factory = TradingAgentsGraph
+        return factory(selected_analysts, debug=debug, config=config)
+
+    def _evict_expired_locked(self) -> int:
+        if not self.idle_ttl:
+            return 0
+        deadline = time.time() - self.idle_ttl
+        evicted = 0
+        while self._idle:
+            graph_id, (_, _, released_at) = next(iter(self._idle.items()))
+            if released_at > deadline:
+                break
+            del self._idle[graph_id]
+            evicted += 1
+        if evicted:
+            self._stats['evictions'] += evicted
+            logger.info(f"🧹 [分析引擎池] 淘汰 {evicted} 个空闲分析引擎")
+        return evicted
+
+    def _ensure_janitor_locked(self):
+        # Idle graphs are also evicted without further traffic
+        if not self.idle_ttl or (self._janitor is not None and self._janitor.is_alive()):
+            return
+
+        def run():
+            while True:
+                time.sleep(max(self.idle_ttl / 2, 1))
+                with self._lock:
+                    self._evict_expired_locked()
+                    if not self._idle:
+                        self._janitor = None
+                        return
+
+        self._janitor = threading.Thread(target=run, daemon=True, name="graph-pool-janitor")
+        self._janitor.start()
+
+
+# 全局分析引擎池实例
+_graph_pool = None
+_graph_pool_lock = threading.Lock()
+
+def get_graph_pool() -> TradingAgentsGraphPool:
+    """获取全局分析引擎池"""
+    global _graph_pool
+    if _graph_pool is None:
+        with _graph_pool_lock:
+            if _graph_pool is None:
+                _graph_pool = TradingAgentsGraphPool(
+                    max_idle=int(os.getenv('GRAPH_POOL_MAX_IDLE', '4')),
+                    idle_ttl=float(os.getenv('GRAPH_POOL_IDLE_TTL', '1800')),
+                )
+    return _graph_pool
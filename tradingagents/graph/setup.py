@@ -1,6 +1,7 @@
 # TradingAgents/graph/setup.py
 
 from typing import Dict, Any
+from langchain_core.runnables import RunnableConfig
 from langchain_openai import ChatOpenAI
 from langgraph.graph import END, StateGraph, START
 from langgraph.prebuilt import ToolNode
@@ -16,6 +17,15 @@ from tradingagents.utils.logging_init import get_logger
 logger = get_logger("default")
 
 
+# 各分析师写入的报告字段
+ANALYST_REPORT_KEYS = {
+    "market": "market_report",
+    "social": "sentiment_report",
+    "news": "news_report",
+    "fundamentals": "fundamentals_report",
+}
+
+
 class GraphSetup:
     """Handles the setup and configuration of the agent graph."""
 
@@ -48,6 +58,65 @@ class GraphSetup:
         self.config = config or {}
         self.react_llm = react_llm
 
+    def _create_parallel_analyst_node(self, analyst_type, analyst_node, tool_node):
+        """Wrap one analyst's analyst -> tools loop in its own sub-graph.
+
+        The sub-graph keeps its own message channel, so analysts running side
+        by side never see each other's tool calls. Only the analyst's report
+        field is written back to the parent state.
+        """
+        analyst_name = f"{analyst_type.capitalize()} Analyst"
+        tools_name = f"tools_{analyst_type}"
+        clear_name = f"Msg Clear {analyst_type.capitalize()}"
+        report_key = ANALYST_REPORT_KEYS[analyst_type]
+
+        subgraph = StateGraph(AgentState)
+        subgraph.add_node(analyst_name, analyst_node)
+        subgraph.add_node(tools_name, tool_node)
+        subgraph.add_edge(START, analyst_name)
+        subgraph.add_conditional_edges(
+            analyst_name,
+            getattr(self.conditional_logic, f"should_continue_{analyst_type}"),
+            {tools_name: tools_name, clear_name: END},
+        )
+        subgraph.add_edge(tools_name, analyst_name)
+        compiled_subgraph = subgraph.compile()
+
+        def run_analyst(state, config: RunnableConfig):
+            logger.info(f"🔀 [并行分析] {analyst_name} 开始")
+            result = compiled_subgraph.invoke(state, config)
+            logger.info(f"🔀 [并行分析] {analyst_name} 完成")
+            return {report_key: result.get(report_key, "")}
+
+        return run_analyst
+
+    def _connect_sequential_analysts(self, workflow, selected_analysts):
+        """Chain analysts one after another: analyst -> tools -> Msg Clear -> next."""
+        # Start with the first analyst
+        first_analyst = selected_analysts[0]
+        workflow.add_edge(START, f"{first_analyst.capitalize()} Analyst")
+
+        # Connect analysts in sequence
+        for i, analyst_type in enumerate(selected_analysts):
+            current_analyst = f"{analyst_type.capitalize()} Analyst"
+            current_tools = f"tools_{analyst_type}"
+            current_clear = f"Msg Clear {analyst_type.capitalize()}"
+
+            # Add conditional edges for current analyst
+            workflow.add_conditional_edges(
+                current_analyst,
+                getattr(self.conditional_logic, f"should_continue_{analyst_type}"),
+                [current_tools, current_clear],
+            )
+            workflow.add_edge(current_tools, current_analyst)
+
+            # Connect to next analyst or to Bull Researcher if this is the last analyst
+            if i < len(selected_analysts) - 1:
+                next_analyst = f"{selected_analysts[i+1].capitalize()} Analyst"
+                workflow.add_edge(current_clear, next_analyst)
+            else:
+                workflow.add_edge(current_clear, "Bull Researcher")
+
     def setup_graph(
         self, selected_analysts=["market", "social", "news", "fundamentals"]
     ):
@@ -59,6 +128,10 @@ class GraphSetup:
                 - "social": Social media analyst
                 - "news": News analyst
                 - "fundamentals": Fundamentals analyst
+
+        When ``config["parallel_analysts"]`` is true, the selected analysts run
+        concurrently, each in an isolated sub-graph, and are joined before
+        "Bull Researcher". Otherwise they run one after another.
         """
         if len(selected_analysts) == 0:
             raise ValueError("Trading Agents Graph Setup Error: no analysts selected!")
@@ -159,8 +232,18 @@ class GraphSetup:
         # Create workflow
         workflow = StateGraph(AgentState)
 
+        parallel_analysts = self.config.get("parallel_analysts", False)
+
         # Add analyst nodes to the graph
         for analyst_type, node in analyst_nodes.items():
+            if parallel_analysts:
+                workflow.add_node(
+                    f"{analyst_type.capitalize()} Analyst",
+                    self._create_parallel_analyst_node(
+                        analyst_type, node, tool_nodes[analyst_type]
+                    ),
+                )
+                continue
             workflow.add_node(f"{analyst_type.capitalize()} Analyst", node)
             workflow.add_node(
                 f"Msg Clear {analyst_type.capitalize()}", delete_nodes[analyst_type]
@@ -178,30 +261,18 @@ class GraphSetup:
         workflow.add_node("Risk Judge", risk_manager_node)
 
         # Define edges
-        # Start with the first analyst
-        first_analyst = selected_analysts[0]
-        workflow.add_edge(START, f"{first_analyst.capitalize()} Analyst")
-
-        # Connect analysts in sequence
-        for i, analyst_type in enumerate(selected_analysts):
-            current_analyst = f"{analyst_type.capitalize()} Analyst"
-            current_tools = f"tools_{analyst_type}"
-            current_clear = f"Msg Clear {analyst_type.capitalize()}"
-
-            # Add conditional edges for current analyst
-            workflow.add_conditional_edges(
-                current_analyst,
-                getattr(self.conditional_logic, f"should_continue_{analyst_type}"),
-                [current_tools, current_clear],
-            )
-            workflow.add_edge(current_tools, current_analyst)
-
-            # Connect to next analyst or to Bull Researcher if this is the last analyst
-            if i < len(selected_analysts) - 1:
-                next_analyst = f"{selected_analysts[i+1].capitalize()} Analyst"
-                workflow.add_edge(current_clear, next_analyst)
-            else:
-                workflow.add_edge(current_clear, "Bull Researcher")
+        if parallel_analysts:
+            # Fan out from START to every analyst, fan in before Bull Researcher
+            logger.info(f"🔀 [并行分析] 启用并行分析师模式: {selected_analysts}")
+            analyst_names = [
+                f"{analyst_type.capitalize()} Analyst"
+                for analyst_type in selected_analysts
+            ]
+            for analyst_name in analyst_names:
+                workflow.add_edge(START, analyst_name)
+            workflow.add_edge(analyst_names, "Bull Researcher")
+        else:
+            self._connect_sequential_analysts(workflow, selected_analysts)
 
         # Add remaining edges
         workflow.add_conditional_edges(
@@ -331,8 +331,20 @@ class TradingAgentsGraph:
             ),
         }
 
-    def propagate(self, company_name, trade_date):
-        """Run the trading agents graph for a company on a specific date."""
+    def reset_state(self):
+        """Clear per-run state so the instance can serve another analysis."""
+        self.curr_state = None
+        self.ticker = None
+        self.log_states_dict = {}
+        # The dataflows config is module-global; re-apply ours in case another graph replaced it
+        set_config(self.config)
+
+    def propagate(self, company_name, trade_date, step_callback=None):
+        """Run the trading agents graph for a company on a specific date.
+
+        Args:
+            step_callback: 可选，每个节点更新后以当前状态调用（如检查任务是否已取消），抛出异常即中止分析
+        """
 
         # 添加详细的接收日志
         logger.debug(f"🔍 [GRAPH DEBUG] ===== TradingAgentsGraph.propagate 接收参数 =====")
@@ -360,8 +372,16 @@ class TradingAgentsGraph:
                 else:
                     chunk["messages"][-1].pretty_print()
                     trace.append(chunk)
+                if step_callback is not None:
+                    step_callback(chunk)
 
             final_state = trace[-1]
+        elif step_callback is not None:
+            # 逐步执行，节点之间调用回调
+            final_state = None
+            for chunk in self.graph.stream(init_agent_state, **args):
+                final_state = chunk
+                step_callback(chunk)
         else:
             # Standard mode without tracing
             final_state = self.graph.invoke(init_agent_state, **args)
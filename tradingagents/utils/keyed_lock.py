@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+按键加锁工具
+同一键的操作串行执行（如同一文本只请求一次embedding、同一股票只下载一次），不同键互不阻塞；
+键锁按持有/等待者计数，最后一个持有者释放后立即删除，键的数量不会随访问过的键无限增长
+"""
+
+import threading
+from contextlib import contextmanager
+from typing import Dict, Hashable, List
+
+
+class KeyedLock:
+    """按键分配的互斥锁，没有持有者和等待者的键锁自动回收"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[Hashable, List] = {}  # key -> [锁, 持有和等待的线程数]
+
+    @contextmanager
+    def hold(self, key: Hashable):
+        """持有某个键的锁直到退出上下文"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = [threading.Lock(), 0]
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._entries[key]
+
+    def __len__(self) -> int:
+        """当前被持有或等待中的键数量"""
+        with self._lock:
+            return len(self._entries)
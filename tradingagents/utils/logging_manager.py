@@ -4,10 +4,15 @@
 提供项目级别的日志配置和管理功能
 """
 
+import atexit
+import copy
 import logging
 import logging.handlers
 import os
+import queue
 import sys
+import threading
+import time
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, Any, Optional, Union
@@ -69,6 +74,165 @@ class StructuredFormatter(logging.Formatter):
         return json.dumps(log_entry, ensure_ascii=False)
 
 
+class LazyArg:
+    """延迟计算的日志参数，只有日志记录真正输出时才调用 fn
+
+    用于热点路径上开销较大的参数（DataFrame列名、数据预览等）：
+        logger.info("数据列名: %s", LazyArg(lambda: list(data.columns)))
+    """
+
+    __slots__ = ('fn',)
+
+    def __init__(self, fn):
+        self.fn = fn
+
+    def __str__(self):
+        return str(self.fn())
+
+    __repr__ = __str__
+
+
+# 可以放心留到后台线程再格式化的参数类型（不可变，调用方之后无法修改）
+_LAZY_SAFE_ARG_TYPES = (str, int, float, bool, type(None))
+
+
+class _QueueListener(logging.handlers.QueueListener):
+    """停止标记阻塞入队，队列满时也能写完剩余日志后退出"""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+class AsyncQueueHandler(logging.handlers.QueueHandler):
+    """异步队列处理器：调用线程只做采样判断和入队，格式化和写文件由后台线程完成
+
+    - 参数都是不可变基本类型时保留 msg % args，交给后台线程格式化；其他参数在入队前格式化，
+      避免之后对象被修改或跨线程读取
+    - 队列满时丢弃 INFO 及以下级别的日志并计数；WARNING 及以上最多等待1秒入队，
+      仍然满时在调用线程上直接交给处理器写出，不会丢弃
+    """
+
+    def __init__(self, handlers, queue_size: int = 10000):
+        super().__init__(queue.Queue(maxsize=queue_size))
+        self.dropped = 0
+        self.sync_fallbacks = 0
+        self.listener = _QueueListener(self.queue, *handlers, respect_handler_level=True)
+        self.listener.start()
+        atexit.register(self.stop)
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        if record.args and not (isinstance(record.args, tuple)
+                                and all(type(arg) in _LAZY_SAFE_ARG_TYPES for arg in record.args)):
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            if record.levelno >= logging.WARNING:
+                self.queue.put(record, timeout=1)
+            else:
+                self.queue.put_nowait(record)
+        except queue.Full:
+            if record.levelno >= logging.WARNING and self.listener is not None:
+                self.sync_fallbacks += 1
+                self.listener.handle(record)
+            else:
+                self.dropped += 1
+
+    def stop(self):
+        """写完队列中剩余的日志并停止后台线程"""
+        if self.listener is None:
+            return
+        listener, self.listener = self.listener, None
+        listener.stop()
+        for handler in listener.handlers:
+            handler.flush()
+
+    def close(self):
+        self.stop()
+        super().close()
+
+
+class _SamplingRule:
+    """单条采样/限流规则：sample 为保留比例，rate/burst 为每秒条数的令牌桶"""
+
+    def __init__(self, sample: float = 1.0, rate: Optional[float] = None, burst: Optional[float] = None):
+        self.sample = max(0.0, min(float(sample), 1.0))
+        self.rate = float(rate) if rate else None
+        self.burst = float(burst) if burst else (self.rate or 0.0)
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self._seen = 0
+        self._lock = threading.Lock()
+        self.passed = 0
+        self.dropped = 0
+
+    def allow(self) -> bool:
+        with self._lock:
+            self._seen += 1
+            # 按计数均匀保留 sample 比例
+            keep = int(self._seen * self.sample) > int((self._seen - 1) * self.sample)
+            if keep and self.rate:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                keep = self._tokens >= 1
+                if keep:
+                    self._tokens -= 1
+            if keep:
+                self.passed += 1
+            else:
+                self.dropped += 1
+            return keep
+
+
+class SamplingFilter(logging.Filter):
+    """高频追踪日志的采样与限流
+
+    规则按消息中的分类标签（如 "股票代码追踪" 匹配 "[股票代码追踪]"）或日志器名称（含子日志器）匹配，
+    分类规则优先。WARNING 及以上级别始终保留。同一条记录经过多个处理器时只判断一次。
+    """
+
+    def __init__(self, categories: Optional[Dict[str, Dict[str, Any]]] = None,
+                 loggers: Optional[Dict[str, Dict[str, Any]]] = None):
+        super().__init__()
+        self.category_rules = {f"[{tag}]": _SamplingRule(**rule) for tag, rule in (categories or {}).items()}
+        self.logger_rules = {name: _SamplingRule(**rule) for name, rule in (loggers or {}).items()}
+
+    def filter(self, record) -> bool:
+        decision = getattr(record, '_sampling_passed', None)
+        if decision is None:
+            rule = self._match(record)
+            decision = True if rule is None else rule.allow()
+            record._sampling_passed = decision
+        return decision
+
+    def _match(self, record) -> Optional[_SamplingRule]:
+        if record.levelno >= logging.WARNING:
+            return None
+        if isinstance(record.msg, str):
+            for tag, rule in self.category_rules.items():
+                if tag in record.msg:
+                    return rule
+        name = record.name
+        while name:
+            rule = self.logger_rules.get(name)
+            if rule is not None:
+                return rule
+            name = name.rpartition('.')[0]
+        return None
+
+    def get_stats(self) -> Dict[str, Dict[str, int]]:
+        rules = list(self.category_rules.items()) + list(self.logger_rules.items())
+        return {name: {'passed': rule.passed, 'dropped': rule.dropped} for name, rule in rules}
+
+
 class TradingAgentsLogger:
     """TradingAgents统一日志管理器"""
     
@@ -125,7 +289,12 @@ class TradingAgentsLogger:
             'docker': {
                 'enabled': os.getenv('DOCKER_CONTAINER', 'false').lower() == 'true',
                 'stdout_only': True  # Docker环境只输出到stdout
-            }
+            },
+            'async': {
+                'enabled': False,
+                'queue_size': 10000
+            },
+            'sampling': {}
         }
 
     def _load_config_file(self) -> Optional[Dict[str, Any]]:
@@ -170,6 +339,8 @@ class TradingAgentsLogger:
                 'enabled': is_docker,
                 'stdout_only': logging_config.get('docker', {}).get('stdout_only', True)
             },
+            'async': logging_config.get('async', {}),
+            'sampling': logging_config.get('sampling', {}),
             'performance': logging_config.get('performance', {}),
             'security': logging_config.get('security', {}),
             'business': logging_config.get('business', {})
@@ -186,7 +357,10 @@ class TradingAgentsLogger:
         root_logger = logging.getLogger()
         root_logger.setLevel(getattr(logging, self.config['level']))
         
-        # 清除现有处理器
+        # 清除现有处理器（之前的异步处理器先写完队列中的日志）
+        for handler in root_logger.handlers:
+            if isinstance(handler, AsyncQueueHandler):
+                handler.stop()
         root_logger.handlers.clear()
         
         # 添加处理器
@@ -196,6 +370,26 @@ class TradingAgentsLogger:
             self._add_file_handler(root_logger)
             if self.config['handlers']['structured']['enabled']:
                 self._add_structured_handler(root_logger)
+
+        # 高频追踪日志的采样与限流
+        sampling_config = self.config.get('sampling') or {}
+        self.sampling_filter = None
+        if sampling_config.get('enabled', True) and (sampling_config.get('categories') or sampling_config.get('loggers')):
+            self.sampling_filter = SamplingFilter(sampling_config.get('categories'), sampling_config.get('loggers'))
+
+        # 异步模式：处理器移到后台线程，调用线程只入队
+        async_config = self.config.get('async') or {}
+        async_enabled = os.getenv('TRADINGAGENTS_LOG_ASYNC', str(async_config.get('enabled', False))).lower() == 'true'
+        self.async_handler = None
+        if async_enabled and root_logger.handlers:
+            handlers = list(root_logger.handlers)
+            root_logger.handlers.clear()
+            self.async_handler = AsyncQueueHandler(handlers, int(async_config.get('queue_size', 10000)))
+            root_logger.addHandler(self.async_handler)
+
+        if self.sampling_filter:
+            for handler in root_logger.handlers:
+                handler.addFilter(self.sampling_filter)
         
         # 配置特定日志器
         self._configure_specific_loggers()
@@ -282,6 +476,16 @@ class TradingAgentsLogger:
         else:
             return int(size_str)
     
+    def get_logging_stats(self) -> Dict[str, Any]:
+        """异步队列积压/丢弃数和各采样规则的通过/丢弃数"""
+        stats: Dict[str, Any] = {'async': self.async_handler is not None}
+        if self.async_handler is not None:
+            stats['queue_depth'] = self.async_handler.queue.qsize()
+            stats['queue_dropped'] = self.async_handler.dropped
+            stats['queue_sync_fallbacks'] = self.async_handler.sync_fallbacks
+        stats['sampling'] = self.sampling_filter.get_stats() if self.sampling_filter else {}
+        return stats
+
     def get_logger(self, name: str) -> logging.Logger:
         """获取指定名称的日志器"""
         if name not in self.loggers:
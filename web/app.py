@@ -38,9 +38,8 @@ from components.results_display import render_results
 from components.login import render_login_form, check_authentication, render_user_info, render_sidebar_user_info, render_sidebar_logout, require_permission
 from components.user_activity_dashboard import render_user_activity_dashboard, render_activity_summary_widget
 from utils.api_checker import check_api_keys
-from utils.analysis_runner import run_stock_analysis, validate_analysis_params, format_analysis_results
+from utils.analysis_runner import validate_analysis_params, format_analysis_results
 from utils.progress_tracker import SmartStreamlitProgressDisplay, create_smart_progress_callback
-from utils.async_progress_tracker import AsyncProgressTracker
 from components.async_progress_display import display_unified_progress
 from utils.smart_session_manager import get_persistent_analysis_id, set_persistent_analysis_id
 from utils.auth_manager import auth_manager
@@ -388,7 +387,7 @@ def initialize_session_state():
             if actual_status == 'running':
                 st.session_state.analysis_running = True
                 st.session_state.current_analysis_id = persistent_analysis_id
-            elif actual_status in ['completed', 'failed']:
+            elif actual_status in ['completed', 'failed', 'cancelled']:
                 st.session_state.analysis_running = False
                 st.session_state.current_analysis_id = persistent_analysis_id
             else:  # not_found
@@ -1156,153 +1155,82 @@ def main():
                 import uuid
                 analysis_id = f"analysis_{uuid.uuid4().hex[:8]}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}"
 
-                # 保存分析ID和表单配置到session state和cookie
-                form_config = st.session_state.get('form_config', {})
-                set_persistent_analysis_id(
-                    analysis_id=analysis_id,
-                    status="running",
-                    stock_symbol=form_data['stock_symbol'],
-                    market_type=form_data.get('market_type', 'US Stock'),
-                    form_config=form_config
-                )
-
-                # 创建异步进度跟踪器
-                async_tracker = AsyncProgressTracker(
-                    analysis_id=analysis_id,
-                    analysts=form_data['analysts'],
-                    research_depth=form_data['research_depth'],
-                    llm_provider=config['llm_provider']
-                )
-
-                # 创建进度回调函数
-                def progress_callback(message: str, step: int = None, total_steps: int = None):
-                    async_tracker.update_progress(message, step)
-
-                # 显示启动成功消息和加载动效
-                st.success(f"🚀 分析已启动！分析ID: {analysis_id}")
-
-                # 添加加载动效
-                with st.spinner("🔄 正在初始化分析..."):
-                    time.sleep(1.5)  # 让用户看到反馈
-
-                st.info(f"📊 正在分析: {form_data.get('market_type', 'US Stock')} {form_data['stock_symbol']}")
-                st.info("""
-                ⏱️ 页面将在6秒后自动刷新...
-
-                📋 **查看分析进度：**
-                刷新后请向下滚动到 "📊 股票分析" 部分查看实时进度
-                """)
-
-                # 确保AsyncProgressTracker已经保存初始状态
-                time.sleep(0.1)  # 等待100毫秒确保数据已写入
-
-                # 设置分析状态
-                st.session_state.analysis_running = True
-                st.session_state.current_analysis_id = analysis_id
-                st.session_state.last_stock_symbol = form_data['stock_symbol']
-                st.session_state.last_market_type = form_data.get('market_type', 'US Stock')
-
-                # 自动启用自动刷新选项（设置所有可能的key）
-                auto_refresh_keys = [
-                    f"auto_refresh_unified_{analysis_id}",
-                    f"auto_refresh_unified_default_{analysis_id}",
-                    f"auto_refresh_static_{analysis_id}",
-                    f"auto_refresh_streamlit_{analysis_id}"
-                ]
-                for key in auto_refresh_keys:
-                    st.session_state[key] = True
-
-                # 在后台线程中运行分析（立即启动，不等待倒计时）
-                import threading
-
-                def run_analysis_in_background():
-                    try:
-                        results = run_stock_analysis(
-                            stock_symbol=form_data['stock_symbol'],
-                            analysis_date=form_data['analysis_date'],
-                            analysts=form_data['analysts'],
-                            research_depth=form_data['research_depth'],
-                            llm_provider=config['llm_provider'],
-                            market_type=form_data.get('market_type', 'US Stock'),
-                            llm_model=config['llm_model'],
-                            progress_callback=progress_callback
-                        )
-
-                        # 标记分析完成并保存结果（不访问session state）
-                        async_tracker.mark_completed("✅ 分析成功完成！", results=results)
-
-                        # 自动保存分析结果到历史记录
-                        try:
-                            from components.analysis_results import save_analysis_result
-                            
-                            save_success = save_analysis_result(
-                                analysis_id=analysis_id,
-                                stock_symbol=form_data['stock_symbol'],
-                                analysts=form_data['analysts'],
-                                research_depth=form_data['research_depth'],
-                                result_data=results,
-                                status="completed"
-                            )
-                            
-                            if save_success:
-                                logger.info(f"💾 [后台保存] 分析结果已保存到历史记录: {analysis_id}")
-                            else:
-                                logger.warning(f"⚠️ [后台保存] 保存失败: {analysis_id}")
-                                
-                        except Exception as save_error:
-                            logger.error(f"❌ [后台保存] 保存异常: {save_error}")
-
-                        logger.info(f"✅ [分析完成] 股票分析成功完成: {analysis_id}")
-
-                    except Exception as e:
-                        # 标记分析失败（不访问session state）
-                        async_tracker.mark_failed(str(e))
-                        
-                        # 保存失败的分析记录
-                        try:
-                            from components.analysis_results import save_analysis_result
-                            
-                            save_analysis_result(
-                                analysis_id=analysis_id,
-                                stock_symbol=form_data['stock_symbol'],
-                                analysts=form_data['analysts'],
-                                research_depth=form_data['research_depth'],
-                                result_data={"error": str(e)},
-                                status="failed"
-                            )
-                            logger.info(f"💾 [失败记录] 分析失败记录已保存: {analysis_id}")
-                            
-                        except Exception as save_error:
-                            logger.error(f"❌ [失败记录] 保存异常: {save_error}")
-                        
-                        logger.error(f"❌ [分析失败] {analysis_id}: {e}")
-
-                    finally:
-                        # 分析结束后注销线程
-                        from utils.thread_tracker import unregister_analysis_thread
-                        unregister_analysis_thread(analysis_id)
-                        logger.info(f"🧵 [线程清理] 分析线程已注销: {analysis_id}")
-
-                # 启动后台分析线程
-                analysis_thread = threading.Thread(target=run_analysis_in_background)
-                analysis_thread.daemon = True  # 设置为守护线程，这样主程序退出时线程也会退出
-                analysis_thread.start()
-
-                # 注册线程到跟踪器
-                from utils.thread_tracker import register_analysis_thread
-                register_analysis_thread(analysis_id, analysis_thread)
-
-                logger.info(f"🧵 [后台分析] 分析线程已启动: {analysis_id}")
-
-                # 分析已在后台线程中启动，显示启动信息并刷新页面
-                st.success("🚀 分析已启动！正在后台运行...")
-
-                # 显示启动信息
-                st.info("⏱️ 页面将自动刷新显示分析进度...")
-
-                # 等待2秒让用户看到启动信息，然后刷新页面
-                time.sleep(2)
-                st.rerun()
+                # 提交到分析任务调度器（并发数有上限，超出的任务排队等待）
+                from utils.analysis_scheduler import get_analysis_scheduler, AnalysisQueueFullError
+                user_info = st.session_state.get('user_info') or {}
+                try:
+                    queue_position = get_analysis_scheduler().submit(
+                        analysis_id=analysis_id,
+                        user_id=user_info.get('username', 'anonymous'),
+                        params={
+                            'stock_symbol': form_data['stock_symbol'],
+                            'analysis_date': form_data['analysis_date'],
+                            'analysts': form_data['analysts'],
+                            'research_depth': form_data['research_depth'],
+                            'llm_provider': config['llm_provider'],
+                            'market_type': form_data.get('market_type', 'US Stock'),
+                            'llm_model': config['llm_model'],
+                        }
+                    )
+                except AnalysisQueueFullError as e:
+                    queue_position = None
+                    st.session_state.analysis_running = False
+                    logger.warning(f"⚠️ [任务调度] 拒绝分析任务: {analysis_id}, 原因: {e}")
+                    st.error(f"❌ {e}")
+
+                if queue_position is not None:
+                    # 保存分析ID和表单配置到session state和cookie
+                    form_config = st.session_state.get('form_config', {})
+                    set_persistent_analysis_id(
+                        analysis_id=analysis_id,
+                        status="running",
+                        stock_symbol=form_data['stock_symbol'],
+                        market_type=form_data.get('market_type', 'US Stock'),
+                        form_config=form_config
+                    )
+
+                    # 显示启动成功消息和加载动效
+                    if queue_position:
+                        st.success(f"📥 分析已加入队列，当前排队第 {queue_position} 位！分析ID: {analysis_id}")
+                    else:
+                        st.success(f"🚀 分析已启动！分析ID: {analysis_id}")
+
+                    # 添加加载动效
+                    with st.spinner("🔄 正在初始化分析..."):
+                        time.sleep(1.5)  # 让用户看到反馈
+
+                    st.info(f"📊 正在分析: {form_data.get('market_type', 'US Stock')} {form_data['stock_symbol']}")
+                    st.info("""
+                    ⏱️ 页面将在6秒后自动刷新...
+
+                    📋 **查看分析进度：**
+                    刷新后请向下滚动到 "📊 股票分析" 部分查看实时进度
+                    """)
+
+                    # 设置分析状态
+                    st.session_state.analysis_running = True
+                    st.session_state.current_analysis_id = analysis_id
+                    st.session_state.last_stock_symbol = form_data['stock_symbol']
+                    st.session_state.last_market_type = form_data.get('market_type', 'US Stock')
+
+                    # 自动启用自动刷新选项（设置所有可能的key）
+                    auto_refresh_keys = [
+                        f"auto_refresh_unified_{analysis_id}",
+                        f"auto_refresh_unified_default_{analysis_id}",
+                        f"auto_refresh_static_{analysis_id}",
+                        f"auto_refresh_streamlit_{analysis_id}"
+                    ]
+                    for key in auto_refresh_keys:
+                        st.session_state[key] = True
+
+                    logger.info(f"🧵 [后台分析] 分析任务已提交: {analysis_id}, 排队位置: {queue_position}")
+
+                    # 显示启动信息
+                    st.info("⏱️ 页面将自动刷新显示分析进度...")
+
+                    # 等待2秒让用户看到启动信息，然后刷新页面
+                    time.sleep(2)
+                    st.rerun()
 
         # 2. 股票分析区域（只有在有分析ID时才显示）
         current_analysis_id = st.session_state.get('current_analysis_id')
@@ -1327,13 +1255,32 @@ def main():
 
             # 显示分析信息
             if is_running:
-                st.info(f"🔄 正在分析: {current_analysis_id}")
+                from utils.analysis_scheduler import get_analysis_scheduler
+                from utils.async_progress_tracker import format_time
+                scheduler = get_analysis_scheduler()
+                queue_position = scheduler.get_position(current_analysis_id)
+
+                info_col, cancel_col = st.columns([4, 1])
+                with info_col:
+                    if queue_position:
+                        wait_seconds = scheduler.estimate_wait_seconds(current_analysis_id)
+                        st.info(f"⏳ 排队中: 第 {queue_position} 位，预计等待 {format_time(wait_seconds)} ({current_analysis_id})")
+                    else:
+                        st.info(f"🔄 正在分析: {current_analysis_id}")
+                with cancel_col:
+                    if st.button("🚫 取消分析", key=f"cancel_analysis_{current_analysis_id}"):
+                        if scheduler.cancel(current_analysis_id):
+                            st.warning("🚫 已请求取消，正在停止分析...")
+                        time.sleep(1)
+                        st.rerun()
             else:
                 if actual_status == 'completed':
                     st.success(f"✅ 分析完成: {current_analysis_id}")
 
                 elif actual_status == 'failed':
                     st.error(f"❌ 分析失败: {current_analysis_id}")
+                elif actual_status == 'cancelled':
+                    st.warning(f"🚫 分析已取消: {current_analysis_id}")
                 else:
                     st.warning(f"⚠️ 分析状态未知: {current_analysis_id}")
 
@@ -24,6 +24,8 @@ except ImportError as e:
     MONGODB_AVAILABLE = False
     print(f"❌ MongoDB模块导入失败: {e}")
 
+from web.utils.analysis_catalog import get_analysis_catalog
+
 # 设置日志
 logger = logging.getLogger(__name__)
 
@@ -59,72 +61,53 @@ def get_tags_file():
 
 def load_favorites():
     """加载收藏列表"""
-    favorites_file = get_favorites_file()
-    if favorites_file.exists():
-        try:
-            with open(favorites_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except:
-            return []
-    return []
+    try:
+        return get_analysis_catalog().get_favorites()
+    except Exception as e:
+        logger.error(f"加载收藏列表失败: {e}")
+        return []
 
 def save_favorites(favorites):
     """保存收藏列表"""
-    favorites_file = get_favorites_file()
     try:
-        with open(favorites_file, 'w', encoding='utf-8') as f:
-            json.dump(favorites, f, ensure_ascii=False, indent=2)
+        get_analysis_catalog().set_favorites(favorites)
         return True
-    except:
+    except Exception as e:
+        logger.error(f"保存收藏列表失败: {e}")
         return False
 
 def load_tags():
     """加载标签数据"""
-    tags_file = get_tags_file()
-    if tags_file.exists():
-        try:
-            with open(tags_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except:
-            return {}
-    return {}
+    try:
+        return get_analysis_catalog().get_all_tags()
+    except Exception as e:
+        logger.error(f"加载标签数据失败: {e}")
+        return {}
 
 def save_tags(tags):
     """保存标签数据"""
-    tags_file = get_tags_file()
     try:
-        with open(tags_file, 'w', encoding='utf-8') as f:
-            json.dump(tags, f, ensure_ascii=False, indent=2)
+        get_analysis_catalog().set_all_tags(tags)
         return True
-    except:
+    except Exception as e:
+        logger.error(f"保存标签数据失败: {e}")
         return False
 
 def add_tag_to_analysis(analysis_id, tag):
     """为分析结果添加标签"""
-    tags = load_tags()
-    if analysis_id not in tags:
-        tags[analysis_id] = []
-    if tag not in tags[analysis_id]:
-        tags[analysis_id].append(tag)
-        save_tags(tags)
+    get_analysis_catalog().add_tag(analysis_id, tag)
 
 def remove_tag_from_analysis(analysis_id, tag):
     """从分析结果移除标签"""
-    tags = load_tags()
-    if analysis_id in tags and tag in tags[analysis_id]:
-        tags[analysis_id].remove(tag)
-        if not tags[analysis_id]:  # 如果没有标签了，删除该条目
-            del tags[analysis_id]
-        save_tags(tags)
+    get_analysis_catalog().remove_tag(analysis_id, tag)
 
 def get_analysis_tags(analysis_id):
     """获取分析结果的标签"""
-    tags = load_tags()
-    return tags.get(analysis_id, [])
+    return get_analysis_catalog().get_tags(analysis_id)
 
 def load_analysis_results(start_date=None, end_date=None, stock_symbol=None, analyst_type=None,
-                         limit=100, search_text=None, tags_filter=None, favorites_only=False):
-    """加载分析结果 - 优先从MongoDB加载"""
+                         limit=100, search_text=None, tags_filter=None, favorites_only=False, offset=0):
+    """加载分析结果 - 优先从MongoDB加载，否则从分析历史目录分页查询（列表条目不含完整报告）"""
     all_results = []
     favorites = load_favorites() if favorites_only else []
     tags_data = load_tags()
@@ -168,123 +151,25 @@ def load_analysis_results(start_date=None, end_date=None, stock_symbol=None, ana
 
     # 只有在MongoDB加载失败或不可用时才从文件系统加载
     if not mongodb_loaded:
-        print("🔄 [备用数据源] 从文件系统加载分析结果")
-
-        # 首先尝试从Web界面的保存位置读取
-        web_results_dir = get_analysis_results_dir()
-        for result_file in web_results_dir.glob("*.json"):
-            if result_file.name in ['favorites.json', 'tags.json']:
-                continue
-
-            try:
-                with open(result_file, 'r', encoding='utf-8') as f:
-                    result = json.load(f)
-
-                    # 添加标签信息
-                    result['tags'] = tags_data.get(result.get('analysis_id', ''), [])
-                    result['is_favorite'] = result.get('analysis_id', '') in favorites
-                    result['source'] = 'file_system'  # 标记数据来源
-
-                    all_results.append(result)
-            except Exception as e:
-                st.warning(f"读取分析结果文件 {result_file.name} 失败: {e}")
+        print("🔄 [备用数据源] 从分析历史目录加载分析结果")
+        catalog = get_analysis_catalog()
+        catalog.sync()
 
-        # 然后从实际的分析结果保存位置读取
-        project_results_dir = Path(__file__).parent.parent.parent / "data" / "analysis_results" / "detailed"
-
-        if project_results_dir.exists():
-            # 遍历股票代码目录
-            for stock_dir in project_results_dir.iterdir():
-                if not stock_dir.is_dir():
-                    continue
-
-                stock_code = stock_dir.name
-
-                # 遍历日期目录
-                for date_dir in stock_dir.iterdir():
-                    if not date_dir.is_dir():
-                        continue
-
-                    date_str = date_dir.name
-                    reports_dir = date_dir / "reports"
-
-                    if not reports_dir.exists():
-                        continue
+        filters = {
+            'stock_symbol': stock_symbol,
+            'analyst_type': analyst_type,
+            'search_text': search_text,
+            'tags_filter': tags_filter,
+            'favorites_only': favorites_only,
+        }
+        if start_date:
+            filters['min_timestamp'] = datetime.combine(start_date, datetime.min.time()).timestamp()
+        if end_date:
+            filters['max_timestamp'] = datetime.combine(end_date + timedelta(days=1), datetime.min.time()).timestamp()
 
-                    # 读取所有报告文件
-                    reports = {}
-                    summary_content = ""
-
-                    for report_file in reports_dir.glob("*.md"):
-                        try:
-                            with open(report_file, 'r', encoding='utf-8') as f:
-                                content = f.read()
-                                report_name = report_file.stem
-                                reports[report_name] = content
-
-                                # 如果是最终决策报告，提取摘要
-                                if report_name == "final_trade_decision":
-                                    # 提取前200个字符作为摘要
-                                    summary_content = content[:200].replace('#', '').replace('*', '').strip()
-                                    if len(content) > 200:
-                                        summary_content += "..."
-
-                        except Exception as e:
-                            continue
-
-                    if reports:
-                        # 解析日期
-                        try:
-                            analysis_date = datetime.strptime(date_str, '%Y-%m-%d')
-                            timestamp = analysis_date.timestamp()
-                        except:
-                            timestamp = datetime.now().timestamp()
-
-                        # 创建分析结果条目
-                        analysis_id = f"{stock_code}_{date_str}_{int(timestamp)}"
-
-                        # 尝试从元数据文件中读取真实的研究深度和分析师信息
-                        research_depth = 1
-                        analysts = ['market', 'fundamentals', 'trader']  # 默认值
-
-                        metadata_file = date_dir / "analysis_metadata.json"
-                        if metadata_file.exists():
-                            try:
-                                with open(metadata_file, 'r', encoding='utf-8') as f:
-                                    metadata = json.load(f)
-                                    research_depth = metadata.get('research_depth', 1)
-                                    analysts = metadata.get('analysts', analysts)
-                            except Exception as e:
-                                # 如果读取元数据失败，使用推断逻辑
-                                if len(reports) >= 5:
-                                    research_depth = 3
-                                elif len(reports) >= 3:
-                                    research_depth = 2
-                        else:
-                            # 如果没有元数据文件，使用推断逻辑
-                            if len(reports) >= 5:
-                                research_depth = 3
-                            elif len(reports) >= 3:
-                                research_depth = 2
-
-                        result = {
-                            'analysis_id': analysis_id,
-                            'timestamp': timestamp,
-                            'stock_symbol': stock_code,
-                            'analysts': analysts,
-                            'research_depth': research_depth,
-                            'status': 'completed',
-                            'summary': summary_content,
-                            'performance': {},
-                            'tags': tags_data.get(analysis_id, []),
-                            'is_favorite': analysis_id in favorites,
-                            'reports': reports,  # 保存所有报告内容
-                            'source': 'file_system'  # 标记数据来源
-                        }
-
-                        all_results.append(result)
-
-        print(f"🔄 [备用数据源] 从文件系统加载了 {len(all_results)} 个分析结果")
+        results = catalog.query(limit=limit, offset=offset, **filters)
+        print(f"🔄 [备用数据源] 从分析历史目录加载了 {len(results)} 个分析结果")
+        return results
     
     # 过滤结果
     filtered_results = []
@@ -327,8 +212,8 @@ def load_analysis_results(start_date=None, end_date=None, stock_symbol=None, ana
     # 按时间倒序排列 - 使用安全的时间戳转换函数确保类型一致
     filtered_results.sort(key=lambda x: safe_timestamp_to_datetime(x.get('timestamp', 0)), reverse=True)
     
-    # 限制数量
-    return filtered_results[:limit]
+    # 分页
+    return filtered_results[offset:offset + limit]
 
 def render_analysis_results():
     """渲染分析结果管理界面"""
@@ -590,12 +475,13 @@ def render_results_cards(results: List[Dict[str, Any]]):
 
 def toggle_favorite(analysis_id):
     """切换收藏状态"""
-    favorites = load_favorites()
-    if analysis_id in favorites:
-        favorites.remove(analysis_id)
-    else:
-        favorites.append(analysis_id)
-    save_favorites(favorites)
+    get_analysis_catalog().toggle_favorite(analysis_id)
+
+def ensure_result_details(result):
+    """列表条目只含摘要，查看详情时才从分析历史目录读取完整报告"""
+    if result.get('source') == 'file_system' and not result.get('reports') and not result.get('full_data'):
+        result.update(get_analysis_catalog().load_details(result.get('analysis_id', '')))
+    return result
 
 def render_results_comparison(results: List[Dict[str, Any]]):
     """渲染结果对比功能"""
@@ -1240,6 +1126,7 @@ def render_detailed_analysis(results: List[Dict[str, Any]]):
 def render_detailed_analysis_content(selected_result):
     """渲染详细分析结果内容"""
     st.subheader("📊 完整分析数据")
+    ensure_result_details(selected_result)
 
     # 检查是否有报告数据（支持文件系统和MongoDB）
     if 'reports' in selected_result and selected_result['reports']:
@@ -1616,6 +1503,11 @@ def save_analysis_result(analysis_id: str, stock_symbol: str, analysts: List[str
         with open(result_file, 'w', encoding='utf-8') as f:
             json.dump(result_entry, f, ensure_ascii=False, indent=2)
 
+        try:
+            get_analysis_catalog().upsert_result_file(result_file)
+        except Exception as e:
+            logger.warning(f"更新分析历史目录失败: {e}")
+
         # 2. 保存到MongoDB（如果可用）
         if MONGODB_AVAILABLE:
             try:
@@ -1693,6 +1585,7 @@ def save_analysis_result(analysis_id: str, stock_symbol: str, analysts: List[str
 
 def show_expanded_detail(result):
     """显示展开的详情内容"""
+    ensure_result_details(result)
 
     # 创建详情容器
     with st.container():
@@ -86,14 +86,14 @@ def render_token_statistics():
         render_overview_metrics(stats, time_range)
         
         # 显示详细图表
-        if records:
+        if not records.empty:
             render_detailed_charts(records, stats)
         
         # 显示供应商统计
         render_provider_statistics(stats)
         
         # 显示成本趋势
-        if records:
+        if not records.empty:
             render_cost_trends(records)
         
         # 显示详细记录表
@@ -157,7 +157,7 @@ def render_overview_metrics(stats: Dict[str, Any], time_range: str):
             delta=f"{stats['total_output_tokens']/(stats['total_input_tokens']+stats['total_output_tokens'])*100:.1f}%"
         )
 
-def render_detailed_charts(records: List[UsageRecord], stats: Dict[str, Any]):
+def render_detailed_charts(records: pd.DataFrame, stats: Dict[str, Any]):
     """渲染详细图表"""
     st.markdown("**📊 详细分析图表**")
     
@@ -186,15 +186,7 @@ def render_detailed_charts(records: List[UsageRecord], stats: Dict[str, Any]):
         st.markdown("**📈 成本vs Token关系**")
         
         # 创建散点图
-        df_records = pd.DataFrame([
-            {
-                'total_tokens': record.input_tokens + record.output_tokens,
-                'cost': record.cost,
-                'provider': record.provider,
-                'model': record.model_name
-            }
-            for record in records
-        ])
+        df_records = records.rename(columns={'model_name': 'model'})
         
         if not df_records.empty:
             fig_scatter = px.scatter(
@@ -262,30 +254,19 @@ def render_provider_statistics(stats: Dict[str, Any]):
         )
         st.plotly_chart(fig_requests, use_container_width=True)
 
-def render_cost_trends(records: List[UsageRecord]):
+def render_cost_trends(records: pd.DataFrame):
     """渲染成本趋势图"""
     st.markdown("**📈 成本趋势分析**")
     
-    # 按日期聚合数据
-    df_records = pd.DataFrame([
-        {
-            'date': datetime.fromisoformat(record.timestamp).date(),
-            'cost': record.cost,
-            'tokens': record.input_tokens + record.output_tokens,
-            'provider': record.provider
-        }
-        for record in records
-    ])
-    
-    if df_records.empty:
+    if records.empty:
         st.info("暂无趋势数据")
         return
     
     # 按日期聚合
-    daily_stats = df_records.groupby('date').agg({
-        'cost': 'sum',
-        'tokens': 'sum'
-    }).reset_index()
+    daily_stats = records.groupby(records['timestamp'].dt.date.rename('date')).agg(
+        cost=('cost', 'sum'),
+        tokens=('total_tokens', 'sum')
+    ).reset_index()
     
     # 创建双轴图表
     fig = make_subplots(
@@ -325,29 +306,29 @@ def render_cost_trends(records: List[UsageRecord]):
     fig.update_layout(height=400)
     st.plotly_chart(fig, use_container_width=True)
 
-def render_detailed_records_table(records: List[UsageRecord]):
+def render_detailed_records_table(records: pd.DataFrame):
     """渲染详细记录表"""
     st.markdown("**📋 详细使用记录**")
     
-    if not records:
+    if records.empty:
         st.info("暂无详细记录")
         return
     
     # 创建记录表格
-    records_df = pd.DataFrame([
-        {
-            '时间': datetime.fromisoformat(record.timestamp).strftime('%Y-%m-%d %H:%M:%S'),
-            '供应商': record.provider,
-            '模型': record.model_name,
-            '输入Token': record.input_tokens,
-            '输出Token': record.output_tokens,
-            '总Token': record.input_tokens + record.output_tokens,
-            '成本(¥)': f"{record.cost:.4f}",
-            '会话ID': record.session_id[:12] + '...' if len(record.session_id) > 12 else record.session_id,
-            '分析类型': record.analysis_type
-        }
-        for record in sorted(records, key=lambda x: x.timestamp, reverse=True)
-    ])
+    sorted_records = records.sort_values('timestamp', ascending=False)
+    session_ids = sorted_records['session_id'].astype(str)
+    records_df = pd.DataFrame({
+        '时间': sorted_records['timestamp'].dt.strftime('%Y-%m-%d %H:%M:%S'),
+        '供应商': sorted_records['provider'],
+        '模型': sorted_records['model_name'],
+        '输入Token': sorted_records['input_tokens'],
+        '输出Token': sorted_records['output_tokens'],
+        '总Token': sorted_records['total_tokens'],
+        '成本(¥)': sorted_records['cost'].map('{:.4f}'.format),
+        '当前费率成本(¥)': sorted_records['current_cost'].map('{:.4f}'.format),
+        '会话ID': session_ids.where(session_ids.str.len() <= 12, session_ids.str[:12] + '...'),
+        '分析类型': sorted_records['analysis_type']
+    }).reset_index(drop=True)
     
     # 分页显示
     page_size = 20
@@ -364,27 +345,33 @@ def render_detailed_records_table(records: List[UsageRecord]):
     
     st.dataframe(display_df, use_container_width=True)
 
-def load_detailed_records(days: int) -> List[UsageRecord]:
+USAGE_COLUMNS = ['timestamp', 'provider', 'model_name', 'input_tokens', 'output_tokens',
+                 'cost', 'session_id', 'analysis_type']
+
+def build_usage_dataframe(records: List[UsageRecord]) -> pd.DataFrame:
+    """
+    把使用记录转换为DataFrame，时间解析和成本计算按列批量完成
+
+    额外的列: total_tokens（输入+输出）, current_cost（按当前定价重新计算的成本）
+    """
+    usage_df = pd.DataFrame([record.__dict__ for record in records], columns=USAGE_COLUMNS)
+    usage_df['timestamp'] = pd.to_datetime(usage_df['timestamp'], errors='coerce', format='ISO8601')
+    usage_df = usage_df.dropna(subset=['timestamp'])
+    usage_df['total_tokens'] = usage_df['input_tokens'] + usage_df['output_tokens']
+    usage_df['current_cost'] = config_manager.calculate_costs(usage_df)
+    return usage_df
+
+def load_detailed_records(days: int) -> pd.DataFrame:
     """加载详细记录"""
     try:
-        all_records = config_manager.load_usage_records()
+        usage_df = build_usage_dataframe(config_manager.load_usage_records())
         
         # 过滤时间范围
         cutoff_date = datetime.now() - timedelta(days=days)
-        filtered_records = []
-        
-        for record in all_records:
-            try:
-                record_date = datetime.fromisoformat(record.timestamp)
-                if record_date >= cutoff_date:
-                    filtered_records.append(record)
-            except:
-                continue
-        
-        return filtered_records
+        return usage_df[usage_df['timestamp'] >= cutoff_date]
     except Exception as e:
         st.error(f"加载记录失败: {e}")
-        return []
+        return build_usage_dataframe([])
 
 def export_statistics_data(days: int):
     """导出统计数据"""
@@ -395,19 +382,9 @@ def export_statistics_data(days: int):
         # 创建导出数据
         export_data = {
             'summary': stats,
-            'detailed_records': [
-                {
-                    'timestamp': record.timestamp,
-                    'provider': record.provider,
-                    'model_name': record.model_name,
-                    'input_tokens': record.input_tokens,
-                    'output_tokens': record.output_tokens,
-                    'cost': record.cost,
-                    'session_id': record.session_id,
-                    'analysis_type': record.analysis_type
-                }
-                for record in records
-            ]
+            'detailed_records': records[USAGE_COLUMNS].assign(
+                timestamp=records['timestamp'].map(lambda ts: ts.isoformat())
+            ).to_dict('records')
         }
         
         # 生成文件名
@@ -0,0 +1,505 @@
+"""
+分析历史目录索引
+用SQLite为分析结果建立持久化目录（元数据、摘要、标签、收藏），
+历史列表按条件分页查询，完整报告内容在查看详情时才按需读取
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from tradingagents.utils.logging_manager import get_logger
+
+logger = get_logger('web')
+
+
+class AnalysisCatalog:
+    """分析历史目录
+
+    分析结果JSON文件和 detailed/<股票>/<日期>/reports 报告目录仍是权威数据，
+    目录中的分析条目可随时从中重建；收藏和标签只保存在目录中，重建时保留。
+    同步时只比较文件修改时间，只有新增或变化的结果才会被重新读取。
+    """
+
+    SCHEMA_VERSION = 1
+
+    # 摘要长度（与历史列表展示一致）
+    SUMMARY_LENGTH = 200
+
+    # 两次自动同步之间的最短间隔（秒）
+    SYNC_INTERVAL = 5.0
+
+    # 不是分析结果的JSON文件
+    RESERVED_FILES = ('favorites.json', 'tags.json')
+
+    COLUMNS = ('analysis_id', 'timestamp', 'stock_symbol', 'analysts', 'research_depth', 'status',
+               'summary', 'performance', 'search_text', 'kind', 'location', 'mtime')
+
+    def __init__(self, db_path: Path, results_dir: Path, detailed_dir: Optional[Path] = None):
+        """
+        初始化分析历史目录
+
+        Args:
+            db_path: SQLite目录文件路径
+            results_dir: Web界面保存的 analysis_*.json 所在目录，旧的 favorites.json/tags.json 也在这里
+            detailed_dir: detailed/<股票>/<日期>/reports 报告目录的根目录
+        """
+        self.db_path = Path(db_path)
+        self.results_dir = Path(results_dir)
+        self.detailed_dir = Path(detailed_dir) if detailed_dir else None
+        self._lock = threading.Lock()
+        self._last_sync = 0.0
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS analyses (
+                    analysis_id TEXT PRIMARY KEY,
+                    timestamp REAL,
+                    stock_symbol TEXT,
+                    analysts TEXT,
+                    research_depth INTEGER,
+                    status TEXT,
+                    summary TEXT,
+                    performance TEXT,
+                    search_text TEXT,
+                    kind TEXT,
+                    location TEXT,
+                    mtime REAL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_analyses_time ON analyses (timestamp)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_analyses_stock ON analyses (stock_symbol, timestamp)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_analyses_location ON analyses (location)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS favorites (analysis_id TEXT PRIMARY KEY)")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS tags (
+                    analysis_id TEXT,
+                    tag TEXT,
+                    PRIMARY KEY (analysis_id, tag)
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_tags_tag ON tags (tag)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS catalog_info (key TEXT PRIMARY KEY, value TEXT)")
+
+        if self._get_info('legacy_imported') is None:
+            self._import_legacy_files()
+        if self._get_info('schema_version') != str(self.SCHEMA_VERSION):
+            self.rebuild()
+
+    def _get_info(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM catalog_info WHERE key = ?", (key,)).fetchone()
+        return row['value'] if row else None
+
+    def _import_legacy_files(self):
+        """导入旧版 favorites.json 和 tags.json（只在首次创建目录时执行）"""
+        favorites, tags = [], {}
+        try:
+            favorites_file = self.results_dir / "favorites.json"
+            if favorites_file.exists():
+                with open(favorites_file, 'r', encoding='utf-8') as f:
+                    favorites = json.load(f)
+            tags_file = self.results_dir / "tags.json"
+            if tags_file.exists():
+                with open(tags_file, 'r', encoding='utf-8') as f:
+                    tags = json.load(f)
+        except Exception as e:
+            logger.warning(f"⚠️ [分析目录] 读取旧版收藏/标签文件失败: {e}")
+
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR IGNORE INTO favorites VALUES (?)",
+                                   [(analysis_id,) for analysis_id in favorites])
+            self._conn.executemany("INSERT OR IGNORE INTO tags VALUES (?, ?)",
+                                   [(analysis_id, tag) for analysis_id, tag_list in tags.items()
+                                    for tag in tag_list])
+            self._conn.execute("INSERT OR REPLACE INTO catalog_info VALUES ('legacy_imported', '1')")
+
+        if favorites or tags:
+            logger.info(f"🗂️ [分析目录] 已导入旧版收藏 {len(favorites)} 条, 标签 {len(tags)} 条")
+
+    # ------------------------------------------------------------------
+    # 索引构建
+    # ------------------------------------------------------------------
+
+    def _scan_sources(self) -> Dict[str, tuple]:
+        """列出所有分析结果来源及其修改时间，只做stat不读取内容"""
+        sources = {}
+        if self.results_dir.exists():
+            for result_file in self.results_dir.glob("*.json"):
+                if result_file.name in self.RESERVED_FILES:
+                    continue
+                try:
+                    sources[str(result_file)] = ('result_file', result_file.stat().st_mtime)
+                except OSError:
+                    continue
+
+        if self.detailed_dir and self.detailed_dir.exists():
+            for stock_dir in self.detailed_dir.iterdir():
+                if not stock_dir.is_dir():
+                    continue
+                for date_dir in stock_dir.iterdir():
+                    reports_dir = date_dir / "reports"
+                    if not reports_dir.is_dir():
+                        continue
+                    try:
+                        mtimes = [p.stat().st_mtime for p in reports_dir.glob("*.md")]
+                        if not mtimes:
+                            continue
+                        metadata_file = date_dir / "analysis_metadata.json"
+                        if metadata_file.exists():
+                            mtimes.append(metadata_file.stat().st_mtime)
+                        mtimes.append(reports_dir.stat().st_mtime)
+                    except OSError:
+                        continue
+                    sources[str(date_dir)] = ('report_dir', max(mtimes))
+        return sources
+
+    @staticmethod
+    def _make_row(entry: Dict[str, Any], kind: str, location: str, mtime: float) -> tuple:
+        analysts = entry.get('analysts') or []
+        summary = entry.get('summary') or ''
+        if not isinstance(summary, str):
+            summary = str(summary)
+        search_text = f"{entry.get('stock_symbol', '')} {summary} {' '.join(analysts)}".lower()
+        return (
+            entry.get('analysis_id', ''),
+            float(entry.get('timestamp') or 0),
+            entry.get('stock_symbol', ''),
+            json.dumps(analysts, ensure_ascii=False),
+            entry.get('research_depth', 1),
+            entry.get('status', 'completed'),
+            summary,
+            json.dumps(entry.get('performance') or {}, ensure_ascii=False, default=str),
+            search_text,
+            kind,
+            location,
+            mtime,
+        )
+
+    def _index_result_file(self, result_file: Path, mtime: float) -> Optional[tuple]:
+        """读取Web界面保存的分析结果JSON，完整数据不进入目录"""
+        with open(result_file, 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+        if not entry.get('analysis_id'):
+            return None
+        return self._make_row(entry, 'result_file', str(result_file), mtime)
+
+    def _index_report_dir(self, date_dir: Path, mtime: float) -> Optional[tuple]:
+        """为报告目录生成目录条目，只读取最终决策报告的开头作为摘要"""
+        reports_dir = date_dir / "reports"
+        report_count = len(list(reports_dir.glob("*.md")))
+        if not report_count:
+            return None
+
+        summary = ""
+        decision_file = reports_dir / "final_trade_decision.md"
+        if decision_file.exists():
+            with open(decision_file, 'r', encoding='utf-8') as f:
+                head = f.read(self.SUMMARY_LENGTH + 1)
+            summary = head[:self.SUMMARY_LENGTH].replace('#', '').replace('*', '').strip()
+            if len(head) > self.SUMMARY_LENGTH:
+                summary += "..."
+
+        stock_code = date_dir.parent.name
+        date_str = date_dir.name
+        try:
+            timestamp = datetime.strptime(date_str, '%Y-%m-%d').timestamp()
+        except ValueError:
+            timestamp = mtime
+
+        # 优先使用元数据文件中的研究深度和分析师，否则按报告数量推断
+        research_depth = 3 if report_count >= 5 else 2 if report_count >= 3 else 1
+        analysts = ['market', 'fundamentals', 'trader']
+        metadata_file = date_dir / "analysis_metadata.json"
+        if metadata_file.exists():
+            try:
+                with open(metadata_file, 'r', encoding='utf-8') as f:
+                    metadata = json.load(f)
+                research_depth = metadata.get('research_depth', 1)
+                analysts = metadata.get('analysts', analysts)
+            except Exception:
+                pass
+
+        entry = {
+            'analysis_id': f"{stock_code}_{date_str}_{int(timestamp)}",
+            'timestamp': timestamp,
+            'stock_symbol': stock_code,
+            'analysts': analysts,
+            'research_depth': research_depth,
+            'status': 'completed',
+            'summary': summary,
+            'performance': {},
+        }
+        return self._make_row(entry, 'report_dir', str(date_dir), mtime)
+
+    def _index_source(self, location: str, kind: str, mtime: float) -> Optional[tuple]:
+        try:
+            if kind == 'result_file':
+                return self._index_result_file(Path(location), mtime)
+            return self._index_report_dir(Path(location), mtime)
+        except Exception as e:
+            logger.warning(f"⚠️ [分析目录] 跳过无法解析的分析结果 {location}: {e}")
+            return None
+
+    def sync(self, force: bool = False) -> int:
+        """
+        增量同步目录：新增或修改过的结果重新索引，已删除的结果移出目录
+
+        Args:
+            force: 忽略同步间隔立即同步
+
+        Returns:
+            int: 重新索引和移除的条目数
+        """
+        now = time.time()
+        if not force and now - self._last_sync < self.SYNC_INTERVAL:
+            return 0
+        self._last_sync = now
+
+        sources = self._scan_sources()
+        with self._lock:
+            known = {row['location']: row['mtime']
+                     for row in self._conn.execute("SELECT location, mtime FROM analyses")}
+
+        changed = [(location, kind, mtime) for location, (kind, mtime) in sources.items()
+                   if known.get(location) != mtime]
+        removed = [location for location in known if location not in sources]
+        if not changed and not removed:
+            return 0
+
+        rows = [row for row in (self._index_source(*item) for item in changed) if row]
+        placeholders = ", ".join("?" for _ in self.COLUMNS)
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM analyses WHERE location = ?",
+                                   [(location,) for location in removed + [item[0] for item in changed]])
+            self._conn.executemany(f"INSERT OR REPLACE INTO analyses VALUES ({placeholders})", rows)
+
+        logger.info(f"🗂️ [分析目录] 同步完成: 更新 {len(rows)} 条, 移除 {len(removed)} 条")
+        return len(rows) + len(removed)
+
+    def rebuild(self) -> int:
+        """从结果文件和报告目录全量重建分析条目（收藏和标签保留）"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM analyses")
+            self._conn.execute("INSERT OR REPLACE INTO catalog_info VALUES ('schema_version', ?)",
+                               (str(self.SCHEMA_VERSION),))
+        self.sync(force=True)
+        count = self.count()
+        logger.info(f"🗂️ [分析目录] 目录已重建: {count} 条分析结果")
+        return count
+
+    def upsert_result_file(self, result_file: Path):
+        """保存分析结果后立即写入目录，不必等待下一次同步"""
+        result_file = Path(result_file)
+        row = self._index_source(str(result_file), 'result_file', result_file.stat().st_mtime)
+        if row is None:
+            return
+        placeholders = ", ".join("?" for _ in self.COLUMNS)
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM analyses WHERE location = ?", (str(result_file),))
+            self._conn.execute(f"INSERT OR REPLACE INTO analyses VALUES ({placeholders})", row)
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _build_filters(min_timestamp: float = None, max_timestamp: float = None,
+                       stock_symbol: str = None, analyst_type: str = None, search_text: str = None,
+                       tags_filter: List[str] = None, favorites_only: bool = False) -> tuple:
+        conditions, params = [], []
+        if min_timestamp is not None:
+            conditions.append("timestamp >= ?")
+            params.append(min_timestamp)
+        if max_timestamp is not None:
+            conditions.append("timestamp < ?")
+            params.append(max_timestamp)
+        if stock_symbol:
+            conditions.append("instr(upper(stock_symbol), ?) > 0")
+            params.append(stock_symbol.upper())
+        if analyst_type:
+            # 分析师列表以JSON保存，带引号匹配保证是完整元素
+            conditions.append("instr(analysts, ?) > 0")
+            params.append(json.dumps(analyst_type, ensure_ascii=False))
+        if search_text:
+            conditions.append("instr(search_text, ?) > 0")
+            params.append(search_text.lower())
+        if tags_filter:
+            conditions.append(f"analysis_id IN (SELECT analysis_id FROM tags WHERE tag IN "
+                              f"({', '.join('?' for _ in tags_filter)}))")
+            params.extend(tags_filter)
+        if favorites_only:
+            conditions.append("analysis_id IN (SELECT analysis_id FROM favorites)")
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        return where, params
+
+    def query(self, limit: int = 100, offset: int = 0, **filters) -> List[Dict[str, Any]]:
+        """
+        分页查询分析历史，按分析时间从新到旧排序
+
+        Args:
+            limit: 每页条数
+            offset: 跳过的条数
+            **filters: min_timestamp, max_timestamp（不含）, stock_symbol（子串）, analyst_type,
+                       search_text, tags_filter（任一标签）, favorites_only
+
+        Returns:
+            List[Dict]: 列表条目，不含完整报告内容，需要时用 load_details 读取
+        """
+        where, params = self._build_filters(**filters)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT * FROM analyses{where} ORDER BY timestamp DESC LIMIT ? OFFSET ?",
+                params + [limit, offset]).fetchall()
+            ids = [row['analysis_id'] for row in rows]
+            tags, favorites = {}, set()
+            if ids:
+                id_placeholders = ", ".join("?" for _ in ids)
+                for tag_row in self._conn.execute(
+                        f"SELECT analysis_id, tag FROM tags WHERE analysis_id IN ({id_placeholders}) "
+                        f"ORDER BY rowid", ids):
+                    tags.setdefault(tag_row['analysis_id'], []).append(tag_row['tag'])
+                favorites = {fav_row['analysis_id'] for fav_row in self._conn.execute(
+                    f"SELECT analysis_id FROM favorites WHERE analysis_id IN ({id_placeholders})", ids)}
+
+        results = []
+        for row in rows:
+            results.append({
+                'analysis_id': row['analysis_id'],
+                'timestamp': row['timestamp'],
+                'stock_symbol': row['stock_symbol'],
+                'analysts': json.loads(row['analysts']),
+                'research_depth': row['research_depth'],
+                'status': row['status'],
+                'summary': row['summary'],
+                'performance': json.loads(row['performance']),
+                'tags': tags.get(row['analysis_id'], []),
+                'is_favorite': row['analysis_id'] in favorites,
+                'source': 'file_system',
+            })
+        return results
+
+    def count(self, **filters) -> int:
+        """符合条件的分析结果数量"""
+        where, params = self._build_filters(**filters)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM analyses{where}", params).fetchone()[0]
+
+    def load_details(self, analysis_id: str) -> Dict[str, Any]:
+        """
+        按需读取完整分析内容
+
+        Returns:
+            Dict: 结果JSON返回 {'full_data': ...}，报告目录返回 {'reports': {报告名: 内容}}，找不到时为空字典
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT kind, location FROM analyses WHERE analysis_id = ?",
+                                     (analysis_id,)).fetchone()
+        if row is None:
+            return {}
+
+        try:
+            if row['kind'] == 'result_file':
+                with open(row['location'], 'r', encoding='utf-8') as f:
+                    entry = json.load(f)
+                return {'full_data': entry.get('full_data', {})}
+
+            reports = {}
+            for report_file in (Path(row['location']) / "reports").glob("*.md"):
+                with open(report_file, 'r', encoding='utf-8') as f:
+                    reports[report_file.stem] = f.read()
+            return {'reports': reports}
+        except Exception as e:
+            logger.warning(f"⚠️ [分析目录] 读取分析详情失败 {analysis_id}: {e}")
+            return {}
+
+    # ------------------------------------------------------------------
+    # 收藏和标签
+    # ------------------------------------------------------------------
+
+    def get_favorites(self) -> List[str]:
+        """收藏的分析ID列表"""
+        with self._lock:
+            return [row['analysis_id'] for row in
+                    self._conn.execute("SELECT analysis_id FROM favorites ORDER BY rowid")]
+
+    def set_favorites(self, analysis_ids: List[str]):
+        """整体替换收藏列表"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM favorites")
+            self._conn.executemany("INSERT OR IGNORE INTO favorites VALUES (?)",
+                                   [(analysis_id,) for analysis_id in analysis_ids])
+
+    def toggle_favorite(self, analysis_id: str) -> bool:
+        """切换收藏状态，返回切换后是否已收藏"""
+        with self._lock, self._conn:
+            deleted = self._conn.execute("DELETE FROM favorites WHERE analysis_id = ?",
+                                         (analysis_id,)).rowcount
+            if not deleted:
+                self._conn.execute("INSERT INTO favorites VALUES (?)", (analysis_id,))
+        return not deleted
+
+    def get_all_tags(self) -> Dict[str, List[str]]:
+        """所有分析的标签 {分析ID: [标签]}"""
+        tags: Dict[str, List[str]] = {}
+        with self._lock:
+            for row in self._conn.execute("SELECT analysis_id, tag FROM tags ORDER BY rowid"):
+                tags.setdefault(row['analysis_id'], []).append(row['tag'])
+        return tags
+
+    def set_all_tags(self, tags: Dict[str, List[str]]):
+        """整体替换标签数据"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM tags")
+            self._conn.executemany("INSERT OR IGNORE INTO tags VALUES (?, ?)",
+                                   [(analysis_id, tag) for analysis_id, tag_list in tags.items()
+                                    for tag in tag_list])
+
+    def get_tags(self, analysis_id: str) -> List[str]:
+        """单个分析的标签"""
+        with self._lock:
+            return [row['tag'] for row in self._conn.execute(
+                "SELECT tag FROM tags WHERE analysis_id = ? ORDER BY rowid", (analysis_id,))]
+
+    def add_tag(self, analysis_id: str, tag: str):
+        """为分析结果添加标签"""
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR IGNORE INTO tags VALUES (?, ?)", (analysis_id, tag))
+
+    def remove_tag(self, analysis_id: str, tag: str):
+        """从分析结果移除标签"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM tags WHERE analysis_id = ? AND tag = ?", (analysis_id, tag))
+
+    def close(self):
+        """关闭目录连接"""
+        with self._lock:
+            self._conn.close()
+
+
+# 全局分析历史目录实例
+_analysis_catalog = None
+_analysis_catalog_lock = threading.Lock()
+
+def get_analysis_catalog() -> AnalysisCatalog:
+    """获取全局分析历史目录"""
+    global _analysis_catalog
+    if _analysis_catalog is None:
+        with _analysis_catalog_lock:
+            if _analysis_catalog is None:
+                web_root = Path(__file__).parent.parent
+                results_dir = web_root / "data" / "analysis_results"
+                results_dir.mkdir(parents=True, exist_ok=True)
+                _analysis_catalog = AnalysisCatalog(
+                    db_path=os.getenv('ANALYSIS_CATALOG_DB', str(results_dir / "analysis_catalog.db")),
+                    results_dir=results_dir,
+                    detailed_dir=web_root.parent / "data" / "analysis_results" / "detailed",
+                )
+    return _analysis_catalog
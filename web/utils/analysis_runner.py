@@ -24,6 +24,8 @@ load_dotenv(project_root / ".env", override=True)
 from tradingagents.utils.logging_init import setup_web_logging
 logger = setup_web_logging()
 
+from .analysis_scheduler import AnalysisCancelledError
+
 # Add configuration manager
 try:
     from tradingagents.config.config_manager import token_tracker
@@ -97,7 +99,8 @@ def extract_risk_assessment(state):
         logger.info(f"Error extracting risk assessment data: {e}")
         return None
 
-def run_stock_analysis(stock_symbol, analysis_date, analysts, research_depth, llm_provider, llm_model, market_type="US Stock", progress_callback=None):
+def run_stock_analysis(stock_symbol, analysis_date, analysts, research_depth, llm_provider, llm_model, market_type="US Stock", progress_callback=None,
+                       cancel_event=None):
     """执行股票分析
 
     Args:
@@ -108,10 +111,20 @@ def run_stock_analysis(stock_symbol, analysis_date, analysts, research_depth, ll
         llm_provider: LLM提供商 (dashscope/deepseek/google)
         llm_model: 大模型名称
         progress_callback: 进度回调函数，用于更新UI状态
+        cancel_event: 取消事件，设置后在下一次进度更新或图节点之间抛出 AnalysisCancelledError
+
+    Raises:
+        AnalysisCancelledError: 分析被取消
     """
 
+    def check_cancelled(*_):
+        """已请求取消时中止分析"""
+        if cancel_event is not None and cancel_event.is_set():
+            raise AnalysisCancelledError(f"分析已取消: {stock_symbol}")
+
     def update_progress(message, step=None, total_steps=None):
         """更新进度"""
+        check_cancelled()
         if progress_callback:
             progress_callback(message, step, total_steps)
         logger.info(f"[进度] {message}")
@@ -153,6 +166,8 @@ def run_stock_analysis(stock_symbol, analysis_date, analysts, research_depth, ll
         logger.info(f"[{session_id}] {success_msg}")
         logger.info(f"[{session_id}] 缓存状态: {preparation_result.cache_status}")
 
+    except AnalysisCancelledError:
+        raise
     except Exception as e:
         error_msg = f"❌ 数据预获取过程中发生错误: {str(e)}"
         update_progress(error_msg)
@@ -217,7 +232,7 @@ def run_stock_analysis(stock_symbol, analysis_date, analysts, research_depth, ll
 
     try:
         # 导入必要的模块
-        from tradingagents.graph.trading_graph import TradingAgentsGraph
+        from tradingagents.graph.graph_pool import get_graph_pool
         from tradingagents.default_config import DEFAULT_CONFIG
 
         # 创建配置
@@ -448,18 +463,18 @@ def run_stock_analysis(stock_symbol, analysis_date, analysts, research_depth, ll
 
         logger.debug(f"🔍 [RUNNER DEBUG] 最终传递给分析引擎的股票代码: '{formatted_symbol}'")
 
-        # 初始化交易图
+        # 初始化交易图（相同配置和分析师组合复用已初始化的实例）
         update_progress("🔧 初始化分析引擎...")
-        graph = TradingAgentsGraph(analysts, config=config, debug=False)
+        with get_graph_pool().lease(analysts, config, debug=False) as graph:
+            # 执行分析
+            update_progress(f"📊 开始分析 {formatted_symbol} 股票，这可能需要几分钟时间...")
+            logger.debug(f"🔍 [RUNNER DEBUG] ===== 调用graph.propagate =====")
+            logger.debug(f"🔍 [RUNNER DEBUG] 传递给graph.propagate的参数:")
+            logger.debug(f"🔍 [RUNNER DEBUG]   symbol: '{formatted_symbol}'")
+            logger.debug(f"🔍 [RUNNER DEBUG]   date: '{analysis_date}'")
 
-        # 执行分析
-        update_progress(f"📊 开始分析 {formatted_symbol} 股票，这可能需要几分钟时间...")
-        logger.debug(f"🔍 [RUNNER DEBUG] ===== 调用graph.propagate =====")
-        logger.debug(f"🔍 [RUNNER DEBUG] 传递给graph.propagate的参数:")
-        logger.debug(f"🔍 [RUNNER DEBUG]   symbol: '{formatted_symbol}'")
-        logger.debug(f"🔍 [RUNNER DEBUG]   date: '{analysis_date}'")
-
-        state, decision = graph.propagate(formatted_symbol, analysis_date)
+            # 每个节点之间检查取消，被取消的分析尽快释放工作线程
+            state, decision = graph.propagate(formatted_symbol, analysis_date, step_callback=check_cancelled)
 
         # 调试信息
         logger.debug(f"🔍 [DEBUG] 分析完成，decision类型: {type(decision)}")
@@ -574,6 +589,10 @@ def run_stock_analysis(stock_symbol, analysis_date, analysts, research_depth, ll
         update_progress("✅ 分析成功完成！")
         return results
 
+    except AnalysisCancelledError:
+        logger.info(f"🚫 [分析取消] 股票分析已取消: {stock_symbol}")
+        raise
+
     except Exception as e:
         # 记录分析失败的详细日志
         analysis_duration = time.time() - analysis_start_time
@@ -0,0 +1,392 @@
+"""
+分析任务调度器
+有界工作线程池 + 持久化排队队列，按用户轮转出队，支持排队位置查询和取消
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, List, Optional
+
+from tradingagents.utils.logging_manager import get_logger
+
+logger = get_logger('web')
+
+
+class AnalysisQueueFullError(Exception):
+    """排队已满，拒绝新的分析任务"""
+
+
+class AnalysisCancelledError(Exception):
+    """分析任务已被取消"""
+
+
+class AnalysisScheduler:
+    """分析任务调度器
+
+    同时运行的分析数不超过 max_workers，其余任务进入排队队列。
+    出队时在有排队任务的用户之间轮转，单个用户提交的大量任务不会阻塞其他用户。
+    排队中和运行中的任务写入队列文件，进程重启后重新入队。
+    """
+
+    # 没有历史耗时样本时用于估算等待时间的单次分析耗时（秒）
+    DEFAULT_JOB_DURATION = 300.0
+    # 内存中保留的已结束任务状态数量
+    MAX_FINISHED_JOBS = 500
+
+    def __init__(self, job_runner: Callable[[Dict[str, Any], threading.Event], None],
+                 max_workers: int = 2, max_queue_size: int = 20,
+                 max_jobs_per_user: int = 2, max_wait_seconds: float = 0,
+                 queue_file: Optional[str] = None):
+        """
+        Args:
+            job_runner: 执行单个任务的函数 job_runner(job, cancel_event)，抛出异常视为失败
+            max_workers: 同时运行的分析数
+            max_queue_size: 排队任务总数上限
+            max_jobs_per_user: 单个用户排队和运行中的任务总数上限
+            max_wait_seconds: 预计等待时间上限，超过时拒绝新任务，0表示不限制
+            queue_file: 队列持久化文件路径，None表示不持久化
+        """
+        self.job_runner = job_runner
+        self.max_workers = max(1, max_workers)
+        self.max_queue_size = max_queue_size
+        self.max_jobs_per_user = max_jobs_per_user
+        self.max_wait_seconds = max_wait_seconds
+        self.queue_file = queue_file
+
+        self._condition = threading.Condition()
+        self._pending: "OrderedDict[str, deque]" = OrderedDict()  # 用户 -> 排队任务，顺序即轮转顺序
+        self._running: Dict[str, Dict[str, Any]] = {}
+        self._cancel_events: Dict[str, threading.Event] = {}
+        self._finished: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._workers: List[threading.Thread] = []
+        self._avg_duration = self.DEFAULT_JOB_DURATION
+        self._stats = {'submitted': 0, 'rejected': 0, 'completed': 0, 'failed': 0, 'cancelled': 0}
+
+        self._load_queue()
+
+    # ---------- 提交与取消 ----------
+
+    def submit(self, analysis_id: str, user_id: str, params: Dict[str, Any]) -> int:
+        """提交分析任务，返回排队位置（0表示立即开始运行）
+
+        Raises:
+            AnalysisQueueFullError: 排队已满、用户任务数超限或预计等待过长
+        """
+        user_id = user_id or 'anonymous'
+        with self._condition:
+            user_jobs = len(self._pending.get(user_id, ())) + sum(
+                1 for job in self._running.values() if job['user_id'] == user_id)
+            if user_jobs >= self.max_jobs_per_user:
+                self._stats['rejected'] += 1
+                raise AnalysisQueueFullError(
+                    f"您已有 {user_jobs} 个分析在排队或运行中，请等待完成后再提交")
+
+            queued = self._pending_count()
+            if queued >= self.max_queue_size:
+                self._stats['rejected'] += 1
+                raise AnalysisQueueFullError(f"分析队列已满（{queued} 个任务排队中），请稍后再试")
+
+            if self.max_wait_seconds and self._estimate_wait(queued + 1) > self.max_wait_seconds:
+                self._stats['rejected'] += 1
+                raise AnalysisQueueFullError("当前排队任务较多，预计等待时间过长，请稍后再试")
+
+            job = {
+                'analysis_id': analysis_id,
+                'user_id': user_id,
+                'params': params,
+                'status': 'queued',
+                'submitted_at': time.time(),
+            }
+            self._pending.setdefault(user_id, deque()).append(job)
+            self._stats['submitted'] += 1
+            self._save_queue()
+            self._ensure_workers()
+            self._condition.notify()
+
+            position = self._position_locked(analysis_id)
+            if len(self._running) < self.max_workers and position == 1:
+                position = 0
+            logger.info(f"📥 [任务调度] 分析任务入队: {analysis_id}, 用户: {user_id}, 排队位置: {position}")
+            return position
+
+    def cancel(self, analysis_id: str) -> bool:
+        """取消任务：排队中的任务直接移除，运行中的任务在下一个进度更新或分析图节点之间中止"""
+        with self._condition:
+            for user_id, jobs in self._pending.items():
+                for job in jobs:
+                    if job['analysis_id'] == analysis_id:
+                        jobs.remove(job)
+                        if not jobs:
+                            del self._pending[user_id]
+                        self._finish_locked(job, 'cancelled')
+                        self._save_queue()
+                        logger.info(f"🚫 [任务调度] 已取消排队任务: {analysis_id}")
+                        return True
+
+            event = self._cancel_events.get(analysis_id)
+            if event is not None:
+                event.set()
+                logger.info(f"🚫 [任务调度] 已请求取消运行中的任务: {analysis_id}")
+                return True
+        return False
+
+    def is_cancelled(self, analysis_id: str) -> bool:
+        """运行中的任务是否已请求取消"""
+        event = self._cancel_events.get(analysis_id)
+        return event is not None and event.is_set()
+
+    # ---------- 查询 ----------
+
+    def get_status(self, analysis_id: str) -> Optional[str]:
+        """任务状态: queued / running / completed / failed / cancelled，未知任务返回None"""
+        with self._condition:
+            if analysis_id in self._running:
+                return 'running'
+            if self._position_locked(analysis_id):
+                return 'queued'
+            job = self._finished.get(analysis_id)
+            return job['status'] if job else None
+
+    def get_position(self, analysis_id: str) -> int:
+        """排队位置（从1开始），不在排队中返回0"""
+        with self._condition:
+            return self._position_locked(analysis_id)
+
+    def estimate_wait_seconds(self, analysis_id: str) -> float:
+        """按历史平均耗时估算排队任务开始运行前的等待时间"""
+        with self._condition:
+            position = self._position_locked(analysis_id)
+            return self._estimate_wait(position) if position else 0.0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取调度统计"""
+        with self._condition:
+            return dict(self._stats,
+                        queued=self._pending_count(),
+                        running=len(self._running),
+                        max_workers=self.max_workers,
+                        avg_duration=round(self._avg_duration, 1))
+
+    # ---------- 内部实现 ----------
+
+    def _pending_count(self) -> int:
+        return sum(len(jobs) for jobs in self._pending.values())
+
+    def _dispatch_order(self) -> List[Dict[str, Any]]:
+        """按轮转规则展开的出队顺序"""
+        queues = [list(jobs) for jobs in self._pending.values()]
+        order = []
+        for depth in range(max((len(q) for q in queues), default=0)):
+            order.extend(q[depth] for q in queues if depth < len(q))
+        return order
+
+    def _position_locked(self, analysis_id: str) -> int:
+        for i, job in enumerate(self._dispatch_order()):
+            if job['analysis_id'] == analysis_id:
+                return i + 1
+        return 0
+
+    def _estimate_wait(self, position: int) -> float:
+        # 空闲工作线程可立即接收任务，其余按批次估算
+        free = self.max_workers - len(self._running)
+        if position <= free:
+            return 0.0
+        return math.ceil((position - free) / self.max_workers) * self._avg_duration
+
+    def _next_job_locked(self) -> Optional[Dict[str, Any]]:
+        if not self._pending:
+            return None
+        user_id, jobs = next(iter(self._pending.items()))
+        job = jobs.popleft()
+        # 出队的用户移到轮转末尾
+        del self._pending[user_id]
+        if jobs:
+            self._pending[user_id] = jobs
+        return job
+
+    def _finish_locked(self, job: Dict[str, Any], status: str):
+        job['status'] = status
+        job['finished_at'] = time.time()
+        self._stats[status] += 1
+        self._finished[job['analysis_id']] = job
+        while len(self._finished) > self.MAX_FINISHED_JOBS:
+            self._finished.popitem(last=False)
+
+    def _ensure_workers(self):
+        self._workers = [w for w in self._workers if w.is_alive()]
+        while len(self._workers) < self.max_workers:
+            worker = threading.Thread(target=self._worker_loop, daemon=True,
+                                      name=f"analysis-worker-{len(self._workers) + 1}")
+            worker.start()
+            self._workers.append(worker)
+
+    def _worker_loop(self):
+        while True:
+            with self._condition:
+                job = self._next_job_locked()
+                while job is None:
+                    self._condition.wait()
+                    job = self._next_job_locked()
+                analysis_id = job['analysis_id']
+                cancel_event = threading.Event()
+                job['status'] = 'running'
+                job['started_at'] = time.time()
+                self._running[analysis_id] = job
+                self._cancel_events[analysis_id] = cancel_event
+                self._save_queue()
+
+            logger.info(f"🚀 [任务调度] 开始执行: {analysis_id}, "
+                        f"排队耗时: {job['started_at'] - job['submitted_at']:.1f}秒")
+            status = 'completed'
+            try:
+                self.job_runner(job, cancel_event)
+                if cancel_event.is_set():
+                    status = 'cancelled'
+            except AnalysisCancelledError:
+                status = 'cancelled'
+            except Exception as e:
+                status = 'cancelled' if cancel_event.is_set() else 'failed'
+                logger.error(f"❌ [任务调度] 任务执行异常: {analysis_id}, 错误: {e}")
+
+            with self._condition:
+                duration = time.time() - job['started_at']
+                self._running.pop(analysis_id, None)
+                self._cancel_events.pop(analysis_id, None)
+                if status == 'completed':
+                    # 指数滑动平均，用于估算排队等待时间
+                    self._avg_duration = 0.7 * self._avg_duration + 0.3 * duration
+                self._finish_locked(job, status)
+                self._save_queue()
+            logger.info(f"🏁 [任务调度] 任务结束: {analysis_id}, 状态: {status}, 耗时: {duration:.1f}秒")
+
+    def _save_queue(self):
+        """把排队中和运行中的任务写入队列文件"""
+        if not self.queue_file:
+            return
+        jobs = [job for job in self._running.values()] + self._dispatch_order()
+        data = {
+            'jobs': [{k: job[k] for k in ('analysis_id', 'user_id', 'params', 'submitted_at')} for job in jobs],
+            'avg_duration': self._avg_duration,
+        }
+        try:
+            os.makedirs(os.path.dirname(self.queue_file) or '.', exist_ok=True)
+            tmp_file = f"{self.queue_file}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_file, self.queue_file)
+        except Exception as e:
+            logger.error(f"❌ [任务调度] 保存队列失败: {e}")
+
+    def _load_queue(self):
+        """启动时恢复队列文件中的任务，运行中被中断的任务重新排队"""
+        if not self.queue_file or not os.path.exists(self.queue_file):
+            return
+        try:
+            with open(self.queue_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.error(f"❌ [任务调度] 读取队列文件失败: {e}")
+            return
+
+        self._avg_duration = data.get('avg_duration', self.DEFAULT_JOB_DURATION)
+        for saved in data.get('jobs', []):
+            job = dict(saved, status='queued')
+            self._pending.setdefault(job['user_id'], deque()).append(job)
+        if self._pending:
+            logger.info(f"📥 [任务调度] 从队列文件恢复 {self._pending_count()} 个任务")
+            self._ensure_workers()
+
+
+def run_analysis_job(job: Dict[str, Any], cancel_event: threading.Event):
+    """默认任务执行函数：创建进度跟踪器、运行分析并保存历史记录"""
+    from .analysis_runner import run_stock_analysis
+    from .async_progress_tracker import AsyncProgressTracker
+    from .thread_tracker import register_analysis_thread, unregister_analysis_thread
+
+    analysis_id = job['analysis_id']
+    params = job['params']
+    register_analysis_thread(analysis_id, threading.current_thread())
+
+    # 开始运行时才创建跟踪器，耗时不包含排队时间
+    async_tracker = AsyncProgressTracker(
+        analysis_id=analysis_id,
+        analysts=params['analysts'],
+        research_depth=params['research_depth'],
+        llm_provider=params['llm_provider']
+    )
+
+    def progress_callback(message: str, step: int = None, total_steps: int = None):
+        async_tracker.update_progress(message, step)
+
+    def save_result(result_data, status):
+        try:
+            from components.analysis_results import save_analysis_result
+
+            return save_analysis_result(
+                analysis_id=analysis_id,
+                stock_symbol=params['stock_symbol'],
+                analysts=params['analysts'],
+                research_depth=params['research_depth'],
+                result_data=result_data,
+                status=status
+            )
+        except Exception as save_error:
+            logger.error(f"❌ [后台保存] 保存异常: {save_error}")
+            return False
+
+    try:
+        results = run_stock_analysis(progress_callback=progress_callback, cancel_event=cancel_event, **params)
+        if cancel_event.is_set():
+            raise AnalysisCancelledError(f"分析已取消: {analysis_id}")
+
+        # 标记分析完成并保存结果（不访问session state）
+        async_tracker.mark_completed("✅ 分析成功完成！", results=results)
+
+        if save_result(results, "completed"):
+            logger.info(f"💾 [后台保存] 分析结果已保存到历史记录: {analysis_id}")
+        else:
+            logger.warning(f"⚠️ [后台保存] 保存失败: {analysis_id}")
+
+        logger.info(f"✅ [分析完成] 股票分析成功完成: {analysis_id}")
+
+    except AnalysisCancelledError:
+        async_tracker.mark_cancelled()
+        raise
+
+    except Exception as e:
+        # 标记分析失败（不访问session state）
+        async_tracker.mark_failed(str(e))
+        if save_result({"error": str(e)}, "failed"):
+            logger.info(f"💾 [失败记录] 分析失败记录已保存: {analysis_id}")
+        logger.error(f"❌ [分析失败] {analysis_id}: {e}")
+        raise
+
+    finally:
+        # 分析结束后注销线程
+        unregister_analysis_thread(analysis_id)
+        logger.info(f"🧵 [线程清理] 分析线程已注销: {analysis_id}")
+
+
+# 全局调度器实例
+_analysis_scheduler = None
+_analysis_scheduler_lock = threading.Lock()
+
+def get_analysis_scheduler() -> AnalysisScheduler:
+    """获取全局分析任务调度器"""
+    global _analysis_scheduler
+    if _analysis_scheduler is None:
+        with _analysis_scheduler_lock:
+            if _analysis_scheduler is None:
+                _analysis_scheduler = AnalysisScheduler(
+                    job_runner=run_analysis_job,
+                    max_workers=int(os.getenv('ANALYSIS_MAX_WORKERS', '2')),
+                    max_queue_size=int(os.getenv('ANALYSIS_QUEUE_MAX_SIZE', '20')),
+                    max_jobs_per_user=int(os.getenv('ANALYSIS_MAX_JOBS_PER_USER', '2')),
+                    max_wait_seconds=float(os.getenv('ANALYSIS_MAX_QUEUE_WAIT', '0')),
+                    queue_file=os.getenv('ANALYSIS_QUEUE_FILE', './data/analysis_queue.json')
+                )
+    return _analysis_scheduler
@@ -2,12 +2,16 @@
 """
 异步进度跟踪器
 支持Redis和文件两种存储方式，前端定时轮询获取进度
+
+每次进度更新只追加一条增量事件（Redis Stream 或 JSONL 文件），完整快照按间隔写入；
+读取端缓存每个分析的状态和事件游标，轮询时只读取新增事件
 """
 
 import json
 import time
 import os
-from typing import Dict, Any, Optional, List
+from collections import OrderedDict
+from typing import Dict, Any, Optional, List, Tuple
 from datetime import datetime
 import threading
 from pathlib import Path
@@ -16,6 +20,18 @@ from pathlib import Path
 from tradingagents.utils.logging_manager import get_logger
 logger = get_logger('async_progress')
 
+# 完整快照的写入间隔（秒），间隔内的更新只追加增量事件
+SNAPSHOT_INTERVAL = float(os.getenv('PROGRESS_SNAPSHOT_INTERVAL', '5'))
+# 体积大且很少变化的字段只写入快照，不进入增量事件
+SNAPSHOT_ONLY_KEYS = ('steps', 'raw_results')
+# Redis中进度数据的过期时间（秒）
+PROGRESS_TTL = 3600
+# 单个分析在Redis Stream中保留的事件数上限
+PROGRESS_STREAM_MAXLEN = 10000
+PROGRESS_DATA_DIR = "./data"
+
+_MISSING = object()
+
 def safe_serialize(obj):
     """安全序列化对象，处理不可序列化的类型"""
     # 特殊处理LangChain消息对象
@@ -69,6 +85,139 @@ def safe_serialize(obj):
         except (TypeError, ValueError):
             return str(obj)  # 转换为字符串
 
+# 进度读写共享的Redis连接池
+_redis_pool = None
+_redis_pool_lock = threading.Lock()
+
+def get_progress_redis_client():
+    """获取使用共享连接池的Redis客户端，Redis未启用时返回None"""
+    global _redis_pool
+    if os.getenv('REDIS_ENABLED', 'false').lower() != 'true':
+        return None
+
+    import redis
+
+    if _redis_pool is None:
+        with _redis_pool_lock:
+            if _redis_pool is None:
+                # 从环境变量获取Redis配置
+                _redis_pool = redis.ConnectionPool(
+                    host=os.getenv('REDIS_HOST', 'localhost'),
+                    port=int(os.getenv('REDIS_PORT', 6379)),
+                    password=os.getenv('REDIS_PASSWORD', None) or None,
+                    db=int(os.getenv('REDIS_DB', 0)),
+                    decode_responses=True
+                )
+    return redis.Redis(connection_pool=_redis_pool)
+
+
+class _FileProgressStore:
+    """文件存储：快照 progress_{id}.json + 只追加的事件文件 progress_{id}.events.jsonl
+
+    游标是事件文件中已读取的字节偏移
+    """
+
+    name = 'file'
+
+    def __init__(self, data_dir: Optional[str] = None):
+        self.data_dir = data_dir or PROGRESS_DATA_DIR
+
+    def snapshot_path(self, analysis_id: str) -> str:
+        return os.path.join(self.data_dir, f"progress_{analysis_id}.json")
+
+    def events_path(self, analysis_id: str) -> str:
+        return os.path.join(self.data_dir, f"progress_{analysis_id}.events.jsonl")
+
+    def initial_cursor(self, analysis_id: str) -> int:
+        path = self.events_path(analysis_id)
+        return os.path.getsize(path) if os.path.exists(path) else 0
+
+    def append_event(self, analysis_id: str, event: Dict[str, Any]) -> int:
+        os.makedirs(self.data_dir, exist_ok=True)
+        line = (json.dumps(event, ensure_ascii=False) + "\n").encode('utf-8')
+        with open(self.events_path(analysis_id), 'ab') as f:
+            f.write(line)
+            return f.tell()
+
+    def write_snapshot(self, analysis_id: str, snapshot: Dict[str, Any]):
+        os.makedirs(self.data_dir, exist_ok=True)
+        path = self.snapshot_path(analysis_id)
+        # 先写临时文件再替换，轮询方不会读到写了一半的快照
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def read_snapshot(self, analysis_id: str) -> Optional[Dict[str, Any]]:
+        path = self.snapshot_path(analysis_id)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def read_events(self, analysis_id: str, cursor) -> Tuple[List[Dict[str, Any]], int]:
+        cursor = cursor or 0
+        path = self.events_path(analysis_id)
+        if not os.path.exists(path):
+            return [], cursor
+        with open(path, 'rb') as f:
+            f.seek(cursor)
+            chunk = f.read()
+        # 只消费完整的行，写了一半的行留到下次读取
+        end = chunk.rfind(b"\n") + 1
+        events = [json.loads(line) for line in chunk[:end].splitlines() if line.strip()]
+        return events, cursor + end
+
+
+class _RedisProgressStore:
+    """Redis存储：快照键 progress:{id} + 事件流 progress_events:{id}
+
+    游标是已读取的最后一个Stream条目ID
+    """
+
+    name = 'redis'
+
+    def __init__(self, client):
+        self.client = client
+
+    @staticmethod
+    def snapshot_key(analysis_id: str) -> str:
+        return f"progress:{analysis_id}"
+
+    @staticmethod
+    def events_key(analysis_id: str) -> str:
+        return f"progress_events:{analysis_id}"
+
+    def initial_cursor(self, analysis_id: str):
+        return None
+
+    def append_event(self, analysis_id: str, event: Dict[str, Any]) -> str:
+        key = self.events_key(analysis_id)
+        pipe = self.client.pipeline()
+        pipe.xadd(key, {'event': json.dumps(event, ensure_ascii=False)},
+                  maxlen=PROGRESS_STREAM_MAXLEN, approximate=True)
+        pipe.expire(key, PROGRESS_TTL)
+        event_id, _ = pipe.execute()
+        return event_id
+
+    def write_snapshot(self, analysis_id: str, snapshot: Dict[str, Any]):
+        self.client.setex(self.snapshot_key(analysis_id), PROGRESS_TTL, json.dumps(snapshot, ensure_ascii=False))
+
+    def read_snapshot(self, analysis_id: str) -> Optional[Dict[str, Any]]:
+        data = self.client.get(self.snapshot_key(analysis_id))
+        return json.loads(data) if data else None
+
+    def read_events(self, analysis_id: str, cursor) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        entries = self.client.xrange(self.events_key(analysis_id), min=cursor or '-')
+        events = []
+        for entry_id, fields in entries:
+            if entry_id == cursor:
+                continue
+            events.append(json.loads(fields['event']))
+            cursor = entry_id
+        return events, cursor
+
+
 class AsyncProgressTracker:
     """异步进度跟踪器"""
     
@@ -105,12 +254,20 @@ class AsyncProgressTracker:
         # 尝试初始化Redis，失败则使用文件
         self.redis_client = None
         self.use_redis = self._init_redis()
-        
-        if not self.use_redis:
+
+        if self.use_redis:
+            self.store = _RedisProgressStore(self.redis_client)
+        else:
             # 使用文件存储
-            self.progress_file = f"./data/progress_{analysis_id}.json"
-            os.makedirs(os.path.dirname(self.progress_file), exist_ok=True)
-        
+            self.store = _FileProgressStore()
+            self.progress_file = self.store.snapshot_path(analysis_id)
+
+        # 增量发布状态：已发布的字段值、事件游标、上次快照的时间和状态
+        self._published: Dict[str, Any] = {}
+        self._cursor = self.store.initial_cursor(analysis_id)
+        self._last_snapshot = 0.0
+        self._snapshot_status = None
+
         # 保存初始状态
         self._save_progress()
         
@@ -154,30 +311,10 @@ class AsyncProgressTracker:
                 logger.info(f"📊 [异步进度] Redis已禁用，使用文件存储")
                 return False
 
-            import redis
-
-            # 从环境变量获取Redis配置
+            # 使用共享连接池，避免每个分析单独建立连接
+            self.redis_client = get_progress_redis_client()
             redis_host = os.getenv('REDIS_HOST', 'localhost')
             redis_port = int(os.getenv('REDIS_PORT', 6379))
-            redis_password = os.getenv('REDIS_PASSWORD', None)
-            redis_db = int(os.getenv('REDIS_DB', 0))
-
-            # 创建Redis连接
-            if redis_password:
-                self.redis_client = redis.Redis(
-                    host=redis_host,
-                    port=redis_port,
-                    password=redis_password,
-                    db=redis_db,
-                    decode_responses=True
-                )
-            else:
-                self.redis_client = redis.Redis(
-                    host=redis_host,
-                    port=redis_port,
-                    db=redis_db,
-                    decode_responses=True
-                )
 
             # 测试连接
             self.redis_client.ping()
@@ -500,61 +637,48 @@ class AsyncProgressTracker:
 
         return remaining
     
-    def _save_progress(self):
-        """保存进度到存储"""
+    def _save_progress(self, force_snapshot: bool = False):
+        """保存进度：追加变化字段的增量事件，按间隔或在状态变化时写入完整快照"""
         try:
             current_step_name = self.progress_data.get('current_step_name', '未知')
             progress_pct = self.progress_data.get('progress_percentage', 0)
             status = self.progress_data.get('status', 'running')
 
-            if self.use_redis:
-                # 保存到Redis（安全序列化）
-                key = f"progress:{self.analysis_id}"
-                safe_data = safe_serialize(self.progress_data)
-                data_json = json.dumps(safe_data, ensure_ascii=False)
-                self.redis_client.setex(key, 3600, data_json)  # 1小时过期
-
-                logger.info(f"📊 [Redis写入] {self.analysis_id} -> {status} | {current_step_name} | {progress_pct:.1f}%")
-                logger.debug(f"📊 [Redis详情] 键: {key}, 数据大小: {len(data_json)} 字节")
-            else:
-                # 保存到文件（安全序列化）
-                safe_data = safe_serialize(self.progress_data)
-                with open(self.progress_file, 'w', encoding='utf-8') as f:
-                    json.dump(safe_data, f, ensure_ascii=False, indent=2)
-
-                logger.info(f"📊 [文件写入] {self.analysis_id} -> {status} | {current_step_name} | {progress_pct:.1f}%")
-                logger.debug(f"📊 [文件详情] 路径: {self.progress_file}")
+            delta = {
+                key: value for key, value in self.progress_data.items()
+                if key not in SNAPSHOT_ONLY_KEYS and self._published.get(key, _MISSING) != value
+            }
+            if delta:
+                self._cursor = self.store.append_event(self.analysis_id, {'data': safe_serialize(delta)})
+                self._published.update(delta)
+
+            force_snapshot = force_snapshot or status != self._snapshot_status
+            now = time.time()
+            if force_snapshot or now - self._last_snapshot >= SNAPSHOT_INTERVAL:
+                snapshot = safe_serialize(self.progress_data)
+                snapshot['event_cursor'] = self._cursor
+                self.store.write_snapshot(self.analysis_id, snapshot)
+                self._last_snapshot = now
+                self._snapshot_status = status
+                if force_snapshot:
+                    # 通知已缓存状态的读取端重新加载快照（快照独有的字段可能已变化）
+                    self._cursor = self.store.append_event(self.analysis_id, {'snapshot': True})
+
+            logger.info(f"📊 [{'Redis' if self.use_redis else '文件'}写入] {self.analysis_id} -> {status} | {current_step_name} | {progress_pct:.1f}%")
+            logger.debug(f"📊 [写入详情] 增量字段: {list(delta)}, 游标: {self._cursor}")
 
         except Exception as e:
             logger.error(f"📊 [异步进度] 保存失败: {e}")
-            # 尝试备用存储方式
-            try:
-                if self.use_redis:
-                    # Redis失败，尝试文件存储
-                    logger.warning(f"📊 [异步进度] Redis保存失败，尝试文件存储")
-                    backup_file = f"./data/progress_{self.analysis_id}.json"
-                    os.makedirs(os.path.dirname(backup_file), exist_ok=True)
-                    safe_data = safe_serialize(self.progress_data)
-                    with open(backup_file, 'w', encoding='utf-8') as f:
-                        json.dump(safe_data, f, ensure_ascii=False, indent=2)
-                    logger.info(f"📊 [备用存储] 文件保存成功: {backup_file}")
-                else:
-                    # 文件存储失败，尝试简化数据
-                    logger.warning(f"📊 [异步进度] 文件保存失败，尝试简化数据")
-                    simplified_data = {
-                        'analysis_id': self.analysis_id,
-                        'status': self.progress_data.get('status', 'unknown'),
-                        'progress_percentage': self.progress_data.get('progress_percentage', 0),
-                        'last_message': str(self.progress_data.get('last_message', '')),
-                        'last_update': self.progress_data.get('last_update', time.time())
-                    }
-                    backup_file = f"./data/progress_{self.analysis_id}.json"
-                    with open(backup_file, 'w', encoding='utf-8') as f:
-                        json.dump(simplified_data, f, ensure_ascii=False, indent=2)
-                    logger.info(f"📊 [备用存储] 简化数据保存成功: {backup_file}")
-            except Exception as backup_e:
-                logger.error(f"📊 [异步进度] 备用存储也失败: {backup_e}")
-    
+            if self.use_redis:
+                # Redis失败，后续改用文件存储并重新写入完整快照
+                logger.warning(f"📊 [异步进度] Redis保存失败，改用文件存储")
+                self.use_redis = False
+                self.store = _FileProgressStore()
+                self.progress_file = self.store.snapshot_path(self.analysis_id)
+                self._published = {}
+                self._cursor = self.store.initial_cursor(self.analysis_id)
+                self._save_progress(force_snapshot=True)
+
     def get_progress(self) -> Dict[str, Any]:
         """获取当前进度"""
         return self.progress_data.copy()
@@ -575,7 +699,7 @@ class AsyncProgressTracker:
                 logger.warning(f"📊 [异步进度] 结果序列化失败: {e}")
                 self.progress_data['raw_results'] = str(results)  # 最后的fallback
 
-        self._save_progress()
+        self._save_progress(force_snapshot=True)
         logger.info(f"📊 [异步进度] 分析完成: {self.analysis_id}")
 
         # 从日志系统注销
@@ -590,7 +714,7 @@ class AsyncProgressTracker:
         self.progress_data['status'] = 'failed'
         self.progress_data['last_message'] = f"分析失败: {error_message}"
         self.progress_data['last_update'] = time.time()
-        self._save_progress()
+        self._save_progress(force_snapshot=True)
         logger.error(f"📊 [异步进度] 分析失败: {self.analysis_id}, 错误: {error_message}")
 
         # 从日志系统注销
@@ -600,58 +724,117 @@ class AsyncProgressTracker:
         except ImportError:
             pass
 
-def get_progress_by_id(analysis_id: str) -> Optional[Dict[str, Any]]:
-    """根据分析ID获取进度"""
-    try:
-        # 检查REDIS_ENABLED环境变量
-        redis_enabled = os.getenv('REDIS_ENABLED', 'false').lower() == 'true'
+    def mark_cancelled(self, message: str = "分析已取消"):
+        """标记分析已取消"""
+        self.progress_data['status'] = 'cancelled'
+        self.progress_data['last_message'] = message
+        self.progress_data['last_update'] = time.time()
+        self._save_progress(force_snapshot=True)
+        logger.info(f"📊 [异步进度] 分析已取消: {self.analysis_id}")
 
-        # 如果Redis启用，先尝试Redis
-        if redis_enabled:
-            try:
-                import redis
+        # 从日志系统注销
+        try:
+            from .progress_log_handler import unregister_analysis_tracker
+            unregister_analysis_tracker(self.analysis_id)
+        except ImportError:
+            pass
 
-                # 从环境变量获取Redis配置
-                redis_host = os.getenv('REDIS_HOST', 'localhost')
-                redis_port = int(os.getenv('REDIS_PORT', 6379))
-                redis_password = os.getenv('REDIS_PASSWORD', None)
-                redis_db = int(os.getenv('REDIS_DB', 0))
-
-                # 创建Redis连接
-                if redis_password:
-                    redis_client = redis.Redis(
-                        host=redis_host,
-                        port=redis_port,
-                        password=redis_password,
-                        db=redis_db,
-                        decode_responses=True
-                    )
+class ProgressReader:
+    """进度读取器
+
+    缓存每个分析的当前状态和事件游标，再次轮询时只读取游标之后的新增事件。
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._states: "OrderedDict[str, tuple]" = OrderedDict()  # analysis_id -> (存储名, 状态, 游标)
+        self._lock = threading.Lock()
+
+    def _stores(self) -> list:
+        stores = []
+        try:
+            redis_client = get_progress_redis_client()
+            if redis_client is not None:
+                stores.append(_RedisProgressStore(redis_client))
+        except Exception as e:
+            logger.debug(f"📊 [异步进度] Redis不可用: {e}")
+        stores.append(_FileProgressStore())
+        return stores
+
+    def read(self, analysis_id: str) -> Optional[Dict[str, Any]]:
+        """读取分析的当前完整状态"""
+        for store in self._stores():
+            try:
+                with self._lock:
+                    cached = self._states.get(analysis_id)
+                if cached is not None and cached[0] == store.name:
+                    state, cursor = cached[1], cached[2]
                 else:
-                    redis_client = redis.Redis(
-                        host=redis_host,
-                        port=redis_port,
-                        db=redis_db,
-                        decode_responses=True
-                    )
-
-                key = f"progress:{analysis_id}"
-                data = redis_client.get(key)
-                if data:
-                    return json.loads(data)
+                    state = store.read_snapshot(analysis_id)
+                    if state is None:
+                        continue
+                    cursor = state.get('event_cursor')
+
+                events, cursor = store.read_events(analysis_id, cursor)
+                state = dict(state)
+                for event in events:
+                    if event.get('snapshot'):
+                        # 写入端刚写入完整快照，重新加载以获取快照独有的字段
+                        state = store.read_snapshot(analysis_id) or state
+                    else:
+                        state.update(event.get('data', {}))
+
+                with self._lock:
+                    self._states[analysis_id] = (store.name, state, cursor)
+                    self._states.move_to_end(analysis_id)
+                    while len(self._states) > self.max_entries:
+                        self._states.popitem(last=False)
+                return dict(state)
+            except Exception as e:
+                logger.debug(f"📊 [异步进度] {store.name}读取失败: {e}")
+        return None
+
+    def read_events(self, analysis_id: str, cursor=None) -> Tuple[List[Dict[str, Any]], Any]:
+        """读取游标之后的增量事件，返回 (事件列表, 新游标)"""
+        for store in self._stores():
+            try:
+                if store.read_snapshot(analysis_id) is None:
+                    continue
+                return store.read_events(analysis_id, cursor)
             except Exception as e:
-                logger.debug(f"📊 [异步进度] Redis读取失败: {e}")
+                logger.debug(f"📊 [异步进度] {store.name}读取事件失败: {e}")
+        return [], cursor
 
-        # 尝试文件
-        progress_file = f"./data/progress_{analysis_id}.json"
-        if os.path.exists(progress_file):
-            with open(progress_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
+    def forget(self, analysis_id: str):
+        """丢弃缓存的状态，下次读取时重新加载快照"""
+        with self._lock:
+            self._states.pop(analysis_id, None)
 
-        return None
+
+# 全局进度读取器实例
+_progress_reader = None
+
+def get_progress_reader() -> ProgressReader:
+    """获取全局进度读取器"""
+    global _progress_reader
+    if _progress_reader is None:
+        _progress_reader = ProgressReader()
+    return _progress_reader
+
+
+def get_progress_by_id(analysis_id: str) -> Optional[Dict[str, Any]]:
+    """根据分析ID获取进度"""
+    try:
+        return get_progress_reader().read(analysis_id)
     except Exception as e:
         logger.error(f"📊 [异步进度] 获取进度失败: {analysis_id}, 错误: {e}")
         return None
 
+
+def get_progress_events(analysis_id: str, cursor=None) -> Tuple[List[Dict[str, Any]], Any]:
+    """获取游标之后的增量进度事件，供前端只拉取变化部分"""
+    return get_progress_reader().read_events(analysis_id, cursor)
+
 def format_time(seconds: float) -> str:
     """格式化时间显示"""
     if seconds < 60:
@@ -673,30 +856,7 @@ def get_latest_analysis_id() -> Optional[str]:
         # 如果Redis启用，先尝试从Redis获取
         if redis_enabled:
             try:
-                import redis
-
-                # 从环境变量获取Redis配置
-                redis_host = os.getenv('REDIS_HOST', 'localhost')
-                redis_port = int(os.getenv('REDIS_PORT', 6379))
-                redis_password = os.getenv('REDIS_PASSWORD', None)
-                redis_db = int(os.getenv('REDIS_DB', 0))
-
-                # 创建Redis连接
-                if redis_password:
-                    redis_client = redis.Redis(
-                        host=redis_host,
-                        port=redis_port,
-                        password=redis_password,
-                        db=redis_db,
-                        decode_responses=True
-                    )
-                else:
-                    redis_client = redis.Redis(
-                        host=redis_host,
-                        port=redis_port,
-                        db=redis_db,
-                        decode_responses=True
-                    )
+                redis_client = get_progress_redis_client()
 
                 # 获取所有progress键
                 keys = redis_client.keys("progress:*")
@@ -127,8 +127,19 @@ def get_all_analysis_threads() -> Dict[str, Dict]:
 def check_analysis_status(analysis_id: str) -> str:
     """
     检查分析状态
-    返回: 'running', 'completed', 'failed', 'not_found'
+    返回: 'running', 'completed', 'failed', 'cancelled', 'not_found'
     """
+    # 排队中的任务也视为运行中，界面据此继续刷新并显示排队位置
+    try:
+        from .analysis_scheduler import get_analysis_scheduler
+        job_status = get_analysis_scheduler().get_status(analysis_id)
+        if job_status in ['queued', 'running']:
+            return 'running'
+        if job_status == 'cancelled':
+            return 'cancelled'
+    except Exception as e:
+        logger.debug(f"📊 [状态检查] 查询任务调度器失败: {e}")
+
     # 首先检查线程是否存活
     if is_analysis_thread_alive(analysis_id):
         return 'running'
@@ -140,7 +151,7 @@ def check_analysis_status(analysis_id: str) -> str:
         
         if progress_data:
             status = progress_data.get('status', 'unknown')
-            if status in ['completed', 'failed']:
+            if status in ['completed', 'failed', 'cancelled']:
                 return status
             else:
                 # 状态显示运行中但线程已死亡，说明异常终止